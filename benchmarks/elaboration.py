@@ -0,0 +1,87 @@
+"""Elaboration with a cache.
+
+Elaborates a SoC made of many identical peripherals, each with a CSR multiplexer, once without
+an elaboration cache, once with an empty cache, and once with a cache persisted by the previous
+run, and reports the time each elaboration takes.
+
+Usage: python benchmarks/elaboration.py [PERIPHERALS] [REGISTERS] [RUNS]
+"""
+
+import statistics
+import sys
+import tempfile
+import time
+
+from nmigen import *
+from nmigen.hdl.ir import Fragment
+
+from nmigen_soc import csr
+from nmigen_soc.elaboration import ElaborationCache
+
+
+def make_mux(registers):
+    mux = csr.Multiplexer(addr_width=(registers * 4 - 1).bit_length(), data_width=8)
+    for reg_index in range(registers):
+        mux.add(csr.Element(32, "rw", name="r{}".format(reg_index)))
+    return mux
+
+
+class Peripheral(Elaboratable):
+    def __init__(self, cache, registers):
+        self.cache = cache
+        self.mux   = make_mux(registers)
+
+    def elaborate(self, platform):
+        m = Module()
+        if self.cache is None:
+            m.submodules.mux = self.mux
+        else:
+            m.submodules.mux = self.cache(self.mux)
+        return m
+
+
+class SoC(Elaboratable):
+    def __init__(self, cache, peripherals, registers):
+        self.periphs = [Peripheral(cache, registers) for _ in range(peripherals)]
+        self.decoder = csr.Decoder(addr_width=24, data_width=8)
+        for periph in self.periphs:
+            self.decoder.add(periph.mux.bus)
+
+    def elaborate(self, platform):
+        m = Module()
+        m.submodules.decoder = self.decoder
+        for index, periph in enumerate(self.periphs):
+            m.submodules["periph_{}".format(index)] = periph
+        return m
+
+
+def elaborate(make_cache, peripherals, registers, runs):
+    times = []
+    for _ in range(runs):
+        soc = SoC(make_cache(), peripherals, registers)
+        start_time = time.perf_counter()
+        Fragment.get(soc, platform=None)
+        times.append(time.perf_counter() - start_time)
+    return statistics.median(times)
+
+
+def main():
+    peripherals = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    registers   = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    runs        = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    with tempfile.TemporaryDirectory() as path:
+        ElaborationCache(path=path).get(make_mux(registers))
+
+        no_cache   = elaborate(lambda: None, peripherals, registers, runs)
+        cold_cache = elaborate(lambda: ElaborationCache(), peripherals, registers, runs)
+        warm_cache = elaborate(lambda: ElaborationCache(path=path), peripherals, registers, runs)
+
+    print("{} peripherals, {} registers each".format(peripherals, registers))
+    print("  no cache:   {:9.2f} ms".format(no_cache * 1000))
+    print("  cold cache: {:9.2f} ms".format(cold_cache * 1000))
+    print("  warm cache: {:9.2f} ms".format(warm_cache * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Register access batching.
+
+Performs the same register accesses through a socket transport connected to a server backed by
+a memory-mapped file, once per access and in a single batch, and reports the amount of round
+trips and the time each takes. ``DELAY`` adds a simulated network latency to each round trip,
+in milliseconds.
+
+Usage: python benchmarks/host_batching.py [ACCESSES] [DELAY]
+"""
+
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from nmigen_soc.host.transport import MmapTransport, SocketTransport, serve
+
+
+class DelayedTransport(MmapTransport):
+    def __init__(self, *args, delay, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.delay = delay
+
+    def _execute(self, ops):
+        time.sleep(self.delay)
+        return super()._execute(ops)
+
+
+def main():
+    accesses = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    delay    = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.0
+
+    fd, path = tempfile.mkstemp()
+    try:
+        os.write(fd, bytes(4 * accesses))
+        os.close(fd)
+        with DelayedTransport(path, size=4 * accesses, delay=delay) as target:
+            client_sock, server_sock = socket.socketpair()
+            server = threading.Thread(target=serve, args=(server_sock, target))
+            server.start()
+            with SocketTransport(client_sock) as transport:
+                ops = [("w", addr, addr) for addr in range(accesses)]
+
+                start_time = time.perf_counter()
+                for op in ops:
+                    transport.execute([op])
+                unbatched = time.perf_counter() - start_time
+                unbatched_trips = transport.round_trips
+
+                start_time = time.perf_counter()
+                transport.execute(ops)
+                batched = time.perf_counter() - start_time
+                batched_trips = transport.round_trips - unbatched_trips
+            server.join()
+            server_sock.close()
+    finally:
+        os.unlink(path)
+
+    print("{} accesses, {:.1f} ms per round trip".format(accesses, delay * 1000))
+    print("  unbatched: {:6d} round trips, {:9.2f} ms".format(unbatched_trips, unbatched * 1000))
+    print("  batched:   {:6d} round trips, {:9.2f} ms".format(batched_trips, batched * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Import time of the package.
+
+Imports modules of the package in fresh interpreters, and reports the median time it takes,
+in excess of the time it takes to start an interpreter that imports nothing.
+
+Usage: python benchmarks/import_time.py [RUNS]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATEMENTS = [
+    "import nmigen_soc",
+    "import nmigen_soc.memory",
+    "import nmigen_soc.latency",
+    "import nmigen_soc.host.trace",
+    "import nmigen_soc.host.client",
+    "import nmigen_soc; getattr(nmigen_soc, '__version__', None)",
+    "import nmigen_soc.csr",
+    "import nmigen_soc.wishbone",
+]
+
+
+def run(statement, runs):
+    times = []
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        subprocess.check_call([sys.executable, "-c", statement], cwd=ROOT_DIR)
+        times.append(time.perf_counter() - start_time)
+    return statistics.median(times)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    baseline = run("pass", runs)
+    print("{:<60} {:>8.1f} ms".format("(interpreter startup)", baseline * 1000))
+    for statement in STATEMENTS:
+        elapsed = run(statement, runs) - baseline
+        print("{:<60} {:>8.1f} ms".format(statement[:60], elapsed * 1000))
+
+
+if __name__ == "__main__":
+    main()
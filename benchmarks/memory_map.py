@@ -0,0 +1,54 @@
+"""Memory usage of large memory maps.
+
+Adds many resources to a memory map, as e.g. an auto-generated table of descriptors would, and
+reports the memory allocated by the memory map with and without compact storage.
+
+Usage: python benchmarks/memory_map.py [ENTRIES]
+"""
+
+import sys
+import time
+import tracemalloc
+
+from nmigen_soc.memory import MemoryMap
+
+
+def build(resources, *, compact):
+    memory_map = MemoryMap(addr_width=40, data_width=32, compact=compact)
+    for resource in resources:
+        memory_map.add_resource(resource, size=4)
+    return memory_map
+
+
+def measure(entries, *, compact):
+    # Resources are created outside of the measurement, since they are owned by the caller.
+    resources = [("desc", index) for index in range(entries)]
+
+    # Tracing allocations slows down building considerably, so time is measured separately.
+    start_time = time.perf_counter()
+    memory_map = build(resources, compact=compact)
+    elapsed = time.perf_counter() - start_time
+    assert memory_map.decode_address(4 * (entries - 1)) is resources[-1]
+    del memory_map
+
+    tracemalloc.start()
+    memory_map = build(resources, compact=compact)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return allocated, elapsed
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    results = {}
+    for compact in (False, True):
+        allocated, elapsed = measure(entries, compact=compact)
+        results[compact] = allocated
+        print("{:<8} {:>10} entries {:>10.1f} MiB {:>8.1f} bytes/entry {:>7.2f} s"
+              .format("compact" if compact else "default", entries, allocated / 2 ** 20,
+                      allocated / entries, elapsed))
+    print("reduction: {:.1f}x".format(results[False] / results[True]))
+
+
+if __name__ == "__main__":
+    main()
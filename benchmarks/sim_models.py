@@ -0,0 +1,123 @@
+"""Simulation with behavioural models.
+
+Simulates a SoC made of peripherals with many registers behind a CSR decoder and a Wishbone
+bridge, performing the same Wishbone reads and writes once with the logic of the bus components,
+and once with their behavioural models, and reports the time it takes to build each simulator and
+to run it.
+
+Usage: python benchmarks/sim_models.py [PERIPHERALS] [REGISTERS] [ACCESSES]
+"""
+
+import random
+import sys
+import time
+
+from nmigen import *
+from nmigen.back.pysim import *
+
+from nmigen_soc import csr
+from nmigen_soc.csr.wishbone import WishboneCSRBridge
+from nmigen_soc.model import SimulationModels
+
+
+class Peripheral(Elaboratable):
+    def __init__(self, models, index, registers):
+        self.models = models
+        self.mux    = csr.Multiplexer(addr_width=(registers * 4 - 1).bit_length(), data_width=8)
+        self.regs   = []
+        for reg_index in range(registers):
+            elem = csr.Element(32, "rw", name="p{}_r{}".format(index, reg_index))
+            self.mux.add(elem)
+            self.regs.append(elem)
+
+    def elaborate(self, platform):
+        m = Module()
+        m.submodules.mux = self.models(self.mux)
+        for elem in self.regs:
+            storage = Signal(32, name="{}_storage".format(elem.name))
+            m.d.comb += elem.r_data.eq(storage)
+            with m.If(elem.w_stb):
+                m.d.sync += storage.eq(elem.w_data)
+        return m
+
+
+class SoC(Elaboratable):
+    def __init__(self, models, peripherals, registers):
+        self.models  = models
+        self.periphs = [Peripheral(models, index, registers) for index in range(peripherals)]
+        self.decoder = csr.Decoder(addr_width=24, data_width=8)
+        for periph in self.periphs:
+            self.decoder.add(periph.mux.bus)
+        self.bridge  = WishboneCSRBridge(self.decoder.bus, data_width=32)
+
+    def elaborate(self, platform):
+        m = Module()
+        m.submodules.decoder = self.models(self.decoder)
+        m.submodules.bridge  = self.models(self.bridge)
+        for index, periph in enumerate(self.periphs):
+            m.submodules["periph_{}".format(index)] = periph
+        return m
+
+
+def simulate(enabled, peripherals, registers, ops):
+    models = SimulationModels(enabled=enabled)
+    soc    = SoC(models, peripherals, registers)
+    bus    = soc.bridge.wb_bus
+    data   = []
+
+    def process():
+        for we, adr, dat_w in ops:
+            yield bus.cyc.eq(1)
+            yield bus.stb.eq(1)
+            yield bus.we.eq(we)
+            yield bus.adr.eq(adr)
+            yield bus.sel.eq(0b1111)
+            yield bus.dat_w.eq(dat_w)
+            yield
+            yield Settle()
+            while not (yield bus.ack):
+                yield
+                yield Settle()
+            if not we:
+                data.append((yield bus.dat_r))
+            yield bus.cyc.eq(0)
+            yield bus.stb.eq(0)
+            yield
+
+    start_time = time.perf_counter()
+    sim = Simulator(soc)
+    sim.add_clock(1e-6)
+    models.add_process(sim)
+    sim.add_sync_process(process)
+    build_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    sim.run()
+    return build_time, time.perf_counter() - start_time, data
+
+
+def main():
+    peripherals = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    registers   = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    accesses    = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+
+    rng    = random.Random(0)
+    stride = 1 << (registers * 4 - 1).bit_length() >> 2
+    ops    = []
+    for _ in range(accesses):
+        adr = rng.randrange(peripherals) * stride + rng.randrange(registers)
+        ops.append((rng.random() < 0.1, adr, rng.getrandbits(32)))
+
+    logic_build, logic_run, logic_data = simulate(False, peripherals, registers, ops)
+    model_build, model_run, model_data = simulate(True,  peripherals, registers, ops)
+    assert model_data == logic_data
+
+    print("{} peripherals, {} registers each, {} accesses"
+          .format(peripherals, registers, accesses))
+    print("  logic:  {:9.2f} ms to build, {:9.2f} ms to run"
+          .format(logic_build * 1000, logic_run * 1000))
+    print("  models: {:9.2f} ms to build, {:9.2f} ms to run"
+          .format(model_build * 1000, model_run * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Throughput of stream components.
+
+Simulates each stream component, and a pipeline of them, fed by a source that always has a beat,
+and drained by a sink that is always ready, or is ready in a random half of the cycles. Reports
+the throughput on either side in beats per cycle, and the fraction of cycles with the sink ready
+in which a beat was transferred. For comparison, a naive pipeline register whose sink is only ready
+while it is empty is also simulated.
+
+Usage: python benchmarks/stream.py [BEATS]
+"""
+
+import random
+import sys
+
+from nmigen import *
+from nmigen.back.pysim import *
+
+from nmigen_soc.stream import *
+
+
+class NaiveRegister(Elaboratable):
+    def __init__(self, payload):
+        self.sink   = Interface(payload, name="sink")
+        self.source = Interface(payload, name="source")
+
+    def elaborate(self, platform):
+        m = Module()
+        m.d.comb += self.sink.ready.eq(~self.source.valid)
+        with m.If(self.source.valid & self.source.ready):
+            m.d.sync += self.source.valid.eq(0)
+        with m.If(self.sink.valid & self.sink.ready):
+            m.d.sync += [
+                self.source.payload.eq(self.sink.payload),
+                self.source.valid.eq(1),
+            ]
+        return m
+
+
+class Pipeline(Elaboratable):
+    def __init__(self):
+        self._stages = [
+            SkidBuffer(8),
+            UpConverter(width=8, ratio=4),
+            SyncFIFO(32, depth=8),
+            DownConverter(width=8, ratio=4),
+            SkidBuffer(8),
+        ]
+        self.sink   = self._stages[0].sink
+        self.source = self._stages[-1].source
+
+    def elaborate(self, platform):
+        m = Module()
+        for index, stage in enumerate(self._stages):
+            m.submodules["stage_{}".format(index)] = stage
+            if index > 0:
+                m.d.comb += self._stages[index - 1].source.connect(stage.sink)
+        return m
+
+
+def rate(cycles):
+    return len(cycles) / (cycles[-1] - cycles[0] + 1)
+
+
+def run(name, dut, beats, *, ratio=1, domains=None, backpressure=False):
+    # `ratio` is the amount of beats provided by `dut` for each beat it accepts.
+    out_count = int(beats * ratio)
+    rng = random.Random(0)
+    ready_pattern = [rng.randrange(2) if backpressure else 1 for _ in range(4 * out_count + 64)]
+    in_cycles  = []
+    out_cycles = []
+
+    def produce():
+        cycle = 0
+        for beat in range(beats):
+            yield dut.sink.payload.eq(beat)
+            yield dut.sink.valid.eq(1)
+            yield Settle()
+            while not (yield dut.sink.ready):
+                yield
+                yield Settle()
+                cycle += 1
+            in_cycles.append(cycle)
+            yield
+            cycle += 1
+        yield dut.sink.valid.eq(0)
+
+    def consume():
+        cycle = 0
+        while len(out_cycles) < out_count:
+            yield dut.source.ready.eq(ready_pattern[cycle])
+            yield Settle()
+            if (yield dut.source.valid) and (yield dut.source.ready):
+                out_cycles.append(cycle)
+            yield
+            cycle += 1
+
+    w_domain, r_domain = domains or ("sync", "sync")
+    sim = Simulator(dut)
+    sim.add_clock(1e-6, domain=w_domain)
+    if r_domain != w_domain:
+        sim.add_clock(1e-6, domain=r_domain, phase=0.3e-6)
+    sim.add_sync_process(produce, domain=w_domain)
+    sim.add_sync_process(consume, domain=r_domain)
+    sim.run()
+
+    ready_cycles = sum(ready_pattern[out_cycles[0]:out_cycles[-1] + 1])
+    print("{:<20} {:<13} in {:>5.3f} out {:>5.3f} beats/cycle {:>6.1f}% of ready cycles"
+          .format(name, "backpressure" if backpressure else "full rate",
+                  rate(in_cycles), rate(out_cycles), 100 * len(out_cycles) / ready_cycles))
+
+
+def main():
+    beats = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    for backpressure in (False, True):
+        run("naive register", NaiveRegister(8), beats, backpressure=backpressure)
+        run("SkidBuffer", SkidBuffer(8), beats, backpressure=backpressure)
+        run("SyncFIFO", SyncFIFO(8, depth=4), beats, backpressure=backpressure)
+        run("SyncFIFO (buffered)", SyncFIFO(8, depth=4, buffered=True), beats,
+            backpressure=backpressure)
+        run("AsyncFIFO", AsyncFIFO(8, depth=16), beats, domains=("write", "read"),
+            backpressure=backpressure)
+        run("UpConverter", UpConverter(width=8, ratio=4), beats, ratio=1 / 4,
+            backpressure=backpressure)
+        run("DownConverter", DownConverter(width=8, ratio=4), beats // 4, ratio=4,
+            backpressure=backpressure)
+        run("pipeline", Pipeline(), beats, backpressure=backpressure)
+
+
+if __name__ == "__main__":
+    main()
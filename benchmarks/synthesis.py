@@ -0,0 +1,244 @@
+"""Synthesis area and logic depth of interconnect components.
+
+Converts a matrix of configurations of the interconnect generators to RTLIL, synthesizes each of
+them to 4-input LUTs with Yosys, and reports their amount of LUTs and flip-flops, and the length
+of their longest combinatorial path in LUTs, which bounds their fmax. Yosys is found in PATH,
+or through the YOSYS environment variable.
+
+Results are compared with a JSON baseline, and the script exits with status 1 if any of them
+is worse than the baseline by more than the threshold, in percent. With ``--update``, the results
+are recorded as the new baseline instead, e.g. after an intended change.
+
+Usage: python benchmarks/synthesis.py [--baseline FILE] [--threshold PERCENT] [--update] [FILTER]
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from nmigen import *
+from nmigen.back import rtlil
+
+from nmigen_soc import csr, wishbone
+from nmigen_soc.csr.wishbone import WishboneCSRBridge
+
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "synthesis_baseline.json")
+
+METRICS = ("luts", "ffs", "depth")
+
+SCRIPT = """
+read_rtlil {design}
+synth -flatten -top top
+abc -lut 4
+opt_clean
+tee -q -o {stat} stat -json
+tee -q -o {ltp} ltp -noff
+"""
+
+
+def record_ports(*records):
+    return [field for record in records for field in record.fields.values()]
+
+
+def csr_multiplexer(*, elements, data_width):
+    dut = csr.Multiplexer(addr_width=16, data_width=data_width)
+    ports = record_ports(dut.bus)
+    for index in range(elements):
+        elem = csr.Element(32, "rw", name="elem_{}".format(index))
+        dut.add(elem)
+        ports += [elem.r_data, elem.r_stb, elem.w_data, elem.w_stb]
+    return dut, ports
+
+
+def csr_banked_multiplexer(*, elements, data_width, bank_addr_width):
+    dut = csr.BankedMultiplexer(addr_width=16, data_width=data_width,
+                                bank_addr_width=bank_addr_width)
+    ports = []
+    for index in range(elements):
+        elem = dut.add(csr.Element(32, "rw", name="elem_{}".format(index)))
+        ports += [elem.r_data, elem.r_stb, elem.w_data, elem.w_stb]
+    return dut, record_ports(dut.bus) + ports
+
+
+def csr_decoder(*, subs, data_width):
+    dut = csr.Decoder(addr_width=16, data_width=data_width)
+    ports = record_ports(dut.bus)
+    for index in range(subs):
+        sub_bus = csr.Interface(addr_width=4, data_width=data_width, name="sub_{}".format(index))
+        dut.add(sub_bus)
+        ports += record_ports(sub_bus)
+    return dut, ports
+
+
+def wishbone_decoder(*, subs, register_response):
+    dut = wishbone.Decoder(addr_width=30, data_width=32, granularity=8,
+                           register_response=register_response)
+    ports = record_ports(dut.bus)
+    for index in range(subs):
+        sub_bus = wishbone.Interface(addr_width=10, data_width=32, granularity=8,
+                                     name="sub_{}".format(index))
+        dut.add(sub_bus)
+        ports += record_ports(sub_bus)
+    return dut, ports
+
+
+def wishbone_decoder_tree(*, subs, max_fanout, register_response):
+    dut = wishbone.DecoderTree(addr_width=30, data_width=32, granularity=8, max_fanout=max_fanout,
+                               register_response=register_response)
+    ports = []
+    for index in range(subs):
+        sub_bus = wishbone.Interface(addr_width=10, data_width=32, granularity=8,
+                                     name="sub_{}".format(index))
+        dut.add(sub_bus)
+        ports += record_ports(sub_bus)
+    return dut, record_ports(dut.bus) + ports
+
+
+def wishbone_csr_bridge(*, csr_data_width, data_width):
+    csr_bus = csr.Interface(addr_width=16, data_width=csr_data_width, name="csr")
+    dut = WishboneCSRBridge(csr_bus, data_width=data_width)
+    return dut, record_ports(dut.wb_bus, csr_bus)
+
+
+CONFIGS = {}
+
+for elements in (4, 16, 64):
+    for data_width in (8, 32):
+        CONFIGS["csr.Multiplexer(elements={}, data_width={})".format(elements, data_width)] = \
+            (csr_multiplexer, dict(elements=elements, data_width=data_width))
+
+for elements in (64, 256):
+    CONFIGS["csr.BankedMultiplexer(elements={}, data_width=8, bank_addr_width=6)"
+            .format(elements)] = \
+        (csr_banked_multiplexer, dict(elements=elements, data_width=8, bank_addr_width=6))
+
+for subs in (4, 16, 64):
+    CONFIGS["csr.Decoder(subs={}, data_width=8)".format(subs)] = \
+        (csr_decoder, dict(subs=subs, data_width=8))
+
+for subs in (4, 16, 64):
+    for register_response in (False, True):
+        CONFIGS["wishbone.Decoder(subs={}, register_response={})"
+                .format(subs, register_response)] = \
+            (wishbone_decoder, dict(subs=subs, register_response=register_response))
+
+for subs in (64, 256):
+    for register_response in (False, True):
+        CONFIGS["wishbone.DecoderTree(subs={}, max_fanout=8, register_response={})"
+                .format(subs, register_response)] = \
+            (wishbone_decoder_tree, dict(subs=subs, max_fanout=8,
+                                         register_response=register_response))
+
+for csr_data_width, data_width in ((8, 8), (8, 32), (16, 32)):
+    CONFIGS["WishboneCSRBridge(csr_data_width={}, data_width={})"
+            .format(csr_data_width, data_width)] = \
+        (wishbone_csr_bridge, dict(csr_data_width=csr_data_width, data_width=data_width))
+
+
+def synthesize(yosys, build, params):
+    dut, ports = build(**params)
+    with tempfile.TemporaryDirectory() as root:
+        # Yosys runs in the temporary directory and is given relative paths, since builds of it
+        # such as YoWASP can only access their working directory.
+        with open(os.path.join(root, "design"), "w") as f:
+            f.write(rtlil.convert(dut, ports=ports))
+        with open(os.path.join(root, "script.ys"), "w") as f:
+            f.write(SCRIPT.format(design="design", stat="stat", ltp="ltp"))
+        subprocess.run([yosys, "-q", "-s", "script.ys"], cwd=root, check=True)
+
+        with open(os.path.join(root, "stat")) as f:
+            stat = json.load(f)
+        with open(os.path.join(root, "ltp")) as f:
+            ltp = f.read()
+
+    cells = stat["design"]["num_cells_by_type"]
+    match = re.search(r"Longest topological path in \S+ \(length=(\d+)\)", ltp)
+    if match is None:
+        raise RuntimeError("Cannot find the longest topological path in the output of ltp:\n{}"
+                           .format(ltp))
+    return {
+        "luts":  sum(count for cell, count in cells.items() if cell == "$lut"),
+        "ffs":   sum(count for cell, count in cells.items() if "DFF" in cell.upper()),
+        "depth": int(match.group(1)),
+    }
+
+
+def compare(baseline, results, threshold):
+    regressions = []
+    for name, metrics in results.items():
+        if name not in baseline:
+            print("  {}: not in baseline".format(name))
+            continue
+        for metric in METRICS:
+            old, new = baseline[name][metric], metrics[metric]
+            if new > old * (1 + threshold / 100):
+                regressions.append((name, metric, old, new))
+            elif new != old:
+                print("  {}: {} {} -> {}".format(name, metric, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--baseline", default=BASELINE,
+                        help="baseline file (default: %(default)s)")
+    parser.add_argument("--threshold", type=float, default=5.0,
+                        help="largest tolerated increase, in percent (default: %(default)s)")
+    parser.add_argument("--update", action="store_true",
+                        help="record the results as the baseline")
+    parser.add_argument("filter", nargs="?", default="",
+                        help="only synthesize configurations whose name contains FILTER")
+    args = parser.parse_args()
+
+    # The read data of large multiplexers is a deep expression, which nMigen converts recursively.
+    sys.setrecursionlimit(10000)
+
+    yosys = os.environ.get("YOSYS", "yosys")
+    if shutil.which(yosys) is None:
+        print("Yosys not found; place it in PATH or set the YOSYS environment variable",
+              file=sys.stderr)
+        sys.exit(2)
+
+    results = {}
+    for name, (build, params) in CONFIGS.items():
+        if args.filter not in name:
+            continue
+        results[name] = synthesize(yosys, build, params)
+        print("{:<68} {:>6} LUTs {:>6} FFs {:>4} levels"
+              .format(name, *(results[name][metric] for metric in METRICS)))
+
+    if args.update:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print("baseline updated: {}".format(args.baseline))
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baseline at {}; run with --update to record one".format(args.baseline),
+              file=sys.stderr)
+        sys.exit(2)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(baseline, results, args.threshold)
+    for name, metric, old, new in regressions:
+        print("REGRESSION {}: {} {} -> {} (+{:.1f}%)"
+              .format(name, metric, old, new, (new - old) / max(old, 1) * 100))
+    if regressions:
+        sys.exit(1)
+    print("no regressions beyond {}%".format(args.threshold))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,54 @@
-import pkg_resources
-try:
-    __version__ = pkg_resources.get_distribution(__name__).version
-except pkg_resources.DistributionNotFound:
-    pass
+# Importing this package must stay cheap, and must not import nMigen: host-side tools only need
+# e.g. `nmigen_soc.memory`. The version and the subpackages are therefore looked up lazily, except
+# on Python 3.6, which lacks module `__getattr__`.
+
+import importlib
+import sys
+
+
+_submodules = frozenset({
+    "csr", "wishbone", "axi", "stream", "event", "latency", "elaboration", "memory", "model",
+    "interconnect", "trace", "protocol", "host",
+})
+
+
+def _get_version():
+    try:
+        from importlib import metadata
+    except ImportError: # :nocov:
+        import pkg_resources
+        try:
+            return pkg_resources.get_distribution(__name__).version
+        except pkg_resources.DistributionNotFound:
+            return None
+    try:
+        return metadata.version("nmigen-soc")
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def __getattr__(name):
+    if name == "__version__":
+        version = _get_version()
+        if version is not None:
+            globals()["__version__"] = version
+            return version
+    elif name in _submodules:
+        return importlib.import_module("." + name, __name__)
+    raise AttributeError("module {!r} has no attribute {!r}"
+                         .format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | _submodules | {"__version__"})
+
+
+if sys.version_info < (3, 7): # :nocov:
+    # Module `__getattr__` (PEP 562) is not available; resolve everything eagerly instead, at
+    # the cost of importing nMigen along with the package.
+    _version = _get_version()
+    if _version is not None:
+        __version__ = _version
+    for _name in sorted(_submodules):
+        importlib.import_module("." + _name, __name__)
+    del _version, _name
@@ -0,0 +1,2 @@
+from .bus import *
+from .wishbone import *
@@ -0,0 +1,374 @@
+from enum import Enum
+from nmigen import *
+from nmigen.hdl.rec import Direction
+
+from ..memory import MemoryMap
+from ..latency import Latency
+
+
+__all__ = ["Burst", "Response", "Interface", "Decoder"]
+
+
+class Burst(Enum):
+    """AXI burst type."""
+    FIXED = 0b00
+    INCR  = 0b01
+    WRAP  = 0b10
+
+
+class Response(Enum):
+    """AXI response."""
+    OKAY   = 0b00
+    EXOKAY = 0b01
+    SLVERR = 0b10
+    DECERR = 0b11
+
+
+class Interface(Record):
+    """AXI4 or AXI4-Lite interface.
+
+    See the `AMBA AXI protocol specification <https://developer.arm.com/documentation/ihi0022>`_ for
+    description of the AXI signals. The ``ACLK`` and ``ARESETn`` signals are provided as a part
+    of the clock domain that drives the interface.
+
+    AXI addresses are byte addresses, so the data width of the underlying memory map of
+    the interface is always 8, and its address width is equal to that of the interface.
+
+    Parameters
+    ----------
+    addr_width : int
+        Width of the address signals.
+    data_width : int
+        Width of the data signals. One of 8, 16, 32, 64, 128, 256, 512, 1024 for AXI4,
+        or one of 32, 64 for AXI4-Lite.
+    id_width : int
+        Width of the transaction ID signals. If 0, the interface has no ID signals. Must be 0 for
+        AXI4-Lite.
+    lite : bool
+        Whether the interface is an AXI4-Lite interface, which has no burst, ID and optional
+        signals.
+    alignment : int
+        Resource and window alignment. See :class:`MemoryMap`.
+    name : str
+        Name of the underlying record.
+
+    Attributes
+    ----------
+    Each of the five channels is a sub-record whose fields correspond to the AXI signals of
+    that channel, with the channel prefix removed; e.g. ``aw.addr`` corresponds to ``AWADDR``.
+    Directions are given from the point of view of an initiator.
+
+    aw : Record
+        Write address channel: ``addr``, ``prot``, ``valid``, ``ready``; and for AXI4, ``id``
+        (if ``id_width`` is not 0), ``len``, ``size``, ``burst``, ``lock``, ``cache``, ``qos``.
+    w : Record
+        Write data channel: ``data``, ``strb``, ``valid``, ``ready``; and for AXI4, ``last``.
+    b : Record
+        Write response channel: ``resp``, ``valid``, ``ready``; and for AXI4, ``id``.
+    ar : Record
+        Read address channel, with the same fields as ``aw``.
+    r : Record
+        Read data channel: ``data``, ``resp``, ``valid``, ``ready``; and for AXI4, ``id`` and
+        ``last``.
+    """
+    def __init__(self, *, addr_width, data_width, id_width=0, lite=False, alignment=0,
+                 name=None):
+        if not isinstance(addr_width, int) or addr_width < 0:
+            raise ValueError("Address width must be a non-negative integer, not {!r}"
+                             .format(addr_width))
+        if lite:
+            if data_width not in (32, 64):
+                raise ValueError("AXI4-Lite data width must be one of 32, 64, not {!r}"
+                                 .format(data_width))
+            if id_width != 0:
+                raise ValueError("AXI4-Lite interfaces have no ID signals, ID width must be 0, "
+                                 "not {!r}"
+                                 .format(id_width))
+        else:
+            if data_width not in (8, 16, 32, 64, 128, 256, 512, 1024):
+                raise ValueError("Data width must be one of 8, 16, 32, 64, 128, 256, 512, 1024, "
+                                 "not {!r}"
+                                 .format(data_width))
+            if not isinstance(id_width, int) or id_width < 0:
+                raise ValueError("ID width must be a non-negative integer, not {!r}"
+                                 .format(id_width))
+        self.addr_width = addr_width
+        self.data_width = data_width
+        self.id_width   = id_width
+        self.lite       = bool(lite)
+        self.memory_map = MemoryMap(addr_width=max(1, addr_width), data_width=8,
+                                    alignment=alignment)
+
+        def addr_layout(direction):
+            layout = [
+                ("addr",  addr_width, direction),
+                ("prot",  3,          direction),
+            ]
+            if not lite:
+                if id_width:
+                    layout += [("id", id_width, direction)]
+                layout += [
+                    ("len",   8,     direction),
+                    ("size",  3,     direction),
+                    ("burst", Burst, direction),
+                    ("lock",  1,     direction),
+                    ("cache", 4,     direction),
+                    ("qos",   4,     direction),
+                ]
+            return layout
+
+        def handshake(direction):
+            flip = Direction.FANIN if direction == Direction.FANOUT else Direction.FANOUT
+            return [("valid", 1, direction), ("ready", 1, flip)]
+
+        w_layout = [
+            ("data", data_width,      Direction.FANOUT),
+            ("strb", data_width // 8, Direction.FANOUT),
+        ]
+        b_layout = [
+            ("resp", Response, Direction.FANIN),
+        ]
+        r_layout = [
+            ("data", data_width, Direction.FANIN),
+            ("resp", Response,   Direction.FANIN),
+        ]
+        if not lite:
+            w_layout += [("last", 1, Direction.FANOUT)]
+            if id_width:
+                b_layout += [("id", id_width, Direction.FANIN)]
+                r_layout += [("id", id_width, Direction.FANIN)]
+            r_layout += [("last", 1, Direction.FANIN)]
+
+        layout = [
+            ("aw", addr_layout(Direction.FANOUT) + handshake(Direction.FANOUT)),
+            ("w",  w_layout + handshake(Direction.FANOUT)),
+            ("b",  b_layout + handshake(Direction.FANIN)),
+            ("ar", addr_layout(Direction.FANOUT) + handshake(Direction.FANOUT)),
+            ("r",  r_layout + handshake(Direction.FANIN)),
+        ]
+        super().__init__(layout, name=name, src_loc_at=1)
+
+
+def _payload(channel):
+    return [name for name in channel.fields if name not in ("valid", "ready")]
+
+
+class Decoder(Elaboratable):
+    """AXI4 or AXI4-Lite bus decoder.
+
+    An address decoder for subordinate AXI buses of the same kind, data width and ID width.
+
+    Operation
+    ---------
+
+    Writes and reads are decoded independently, and each of them has at most one outstanding
+    transaction. A write is routed when its address is accepted, and its data beats are forwarded
+    to the same subordinate bus until its response is accepted; likewise, a read is routed until
+    its last data beat is accepted. Since responses are always returned in order, IDs are passed
+    through unchanged.
+
+    Unmapped addresses
+    ------------------
+
+    Transactions to addresses outside of any window are accepted by the decoder itself, as
+    the AXI protocol requires, and are terminated with a ``DECERR`` response. All data beats of
+    such a write are accepted and discarded; such a read returns as many beats as requested,
+    which read as zero.
+
+    Latency
+    -------
+
+    The decoder adds no latency, which is declared in the memory map of :attr:`bus`;
+    see :class:`..latency.LatencyAnalysis`.
+
+    Parameters
+    ----------
+    addr_width : int
+        Address width. See :class:`Interface`.
+    data_width : int
+        Data width. See :class:`Interface`.
+    id_width : int
+        ID width. See :class:`Interface`.
+    lite : bool
+        Whether the decoder is an AXI4-Lite decoder. See :class:`Interface`.
+    alignment : int
+        Window alignment. See :class:`Interface`.
+
+    Attributes
+    ----------
+    bus : :class:`Interface`
+        AXI bus providing access to subordinate buses.
+    """
+    def __init__(self, *, addr_width, data_width, id_width=0, lite=False, alignment=0):
+        self.bus   = Interface(addr_width=addr_width, data_width=data_width, id_width=id_width,
+                               lite=lite, alignment=alignment)
+        self._map  = self.bus.memory_map
+        self._subs = dict()
+        self._map.latency = Latency(read=0, write=0)
+
+    def align_to(self, alignment):
+        """Align the implicit address of the next window.
+
+        See :meth:`MemoryMap.align_to` for details.
+        """
+        return self._map.align_to(alignment)
+
+    def add(self, sub_bus, *, addr=None):
+        """Add a window to a subordinate bus.
+
+        The subordinate bus must be of the same kind, and have the same data width and ID width
+        as the decoder.
+
+        See :meth:`MemoryMap.add_resource` for details.
+        """
+        if not isinstance(sub_bus, Interface):
+            raise TypeError("Subordinate bus must be an instance of axi.Interface, not {!r}"
+                            .format(sub_bus))
+        if sub_bus.lite != self.bus.lite:
+            raise ValueError("Subordinate bus is an {} interface, but the decoder is an {} "
+                             "decoder"
+                             .format("AXI4-Lite" if sub_bus.lite else "AXI4",
+                                     "AXI4-Lite" if self.bus.lite else "AXI4"))
+        if sub_bus.data_width != self.bus.data_width:
+            raise ValueError("Subordinate bus has data width {}, which is not the same as "
+                             "decoder data width {}"
+                             .format(sub_bus.data_width, self.bus.data_width))
+        if sub_bus.id_width != self.bus.id_width:
+            raise ValueError("Subordinate bus has ID width {}, which is not the same as "
+                             "decoder ID width {}"
+                             .format(sub_bus.id_width, self.bus.id_width))
+
+        self._subs[sub_bus.memory_map] = sub_bus
+        return self._map.add_window(sub_bus.memory_map, addr=addr)
+
+    def elaborate(self, platform):
+        m = Module()
+
+        bus  = self.bus
+        subs = [(self._subs[sub_map], sub_pat)
+                for sub_map, (sub_pat, _) in self._map.window_patterns()]
+
+        def decode(addr, name):
+            hit  = Signal(len(subs), name="{}_hit".format(name))
+            miss = Signal(name="{}_miss".format(name))
+            with m.Switch(addr):
+                for index, (_, sub_pat) in enumerate(subs):
+                    with m.Case(sub_pat):
+                        m.d.comb += hit[index].eq(1)
+                with m.Default():
+                    m.d.comb += miss.eq(1)
+            return hit, miss
+
+        for sub_bus, _ in subs:
+            for channel in ("aw", "w", "ar"):
+                for field in _payload(getattr(sub_bus, channel)):
+                    m.d.comb += getattr(sub_bus, channel)[field].eq(getattr(bus, channel)[field])
+
+        # Write path.
+
+        aw_hit, aw_miss = decode(bus.aw.addr, "aw")
+        w_busy = Signal()
+        w_sel  = Signal(len(subs))
+        w_miss = Signal()
+        w_done = Signal()
+        w_id   = Signal(self.bus.id_width)
+
+        aw_ready_fanin = aw_miss
+        w_ready_fanin  = w_miss & ~w_done
+        b_valid_fanin  = w_miss & w_done
+        b_resp_fanin   = Mux(w_miss, Response.DECERR.value, 0)
+        b_id_fanin     = Mux(w_miss, w_id, 0)
+        for index, (sub_bus, _) in enumerate(subs):
+            m.d.comb += [
+                sub_bus.aw.valid.eq(bus.aw.valid & ~w_busy & aw_hit[index]),
+                sub_bus.w.valid.eq(bus.w.valid & w_busy & w_sel[index]),
+                sub_bus.b.ready.eq(bus.b.ready & w_busy & w_sel[index]),
+            ]
+            aw_ready_fanin |= sub_bus.aw.ready & aw_hit[index]
+            w_ready_fanin  |= sub_bus.w.ready & w_sel[index]
+            b_valid_fanin  |= sub_bus.b.valid & w_sel[index]
+            b_resp_fanin   |= Mux(w_sel[index], sub_bus.b.resp, 0)
+            if self.bus.id_width:
+                b_id_fanin |= Mux(w_sel[index], sub_bus.b.id, 0)
+
+        m.d.comb += [
+            bus.aw.ready.eq(~w_busy & aw_ready_fanin),
+            bus.w.ready.eq(w_busy & w_ready_fanin),
+            bus.b.valid.eq(w_busy & b_valid_fanin),
+            bus.b.resp.eq(b_resp_fanin),
+        ]
+        if self.bus.id_width:
+            m.d.comb += bus.b.id.eq(b_id_fanin)
+
+        with m.If(bus.aw.valid & bus.aw.ready):
+            m.d.sync += [
+                w_busy.eq(1),
+                w_sel.eq(aw_hit),
+                w_miss.eq(aw_miss),
+                w_done.eq(0),
+            ]
+            if self.bus.id_width:
+                m.d.sync += w_id.eq(bus.aw.id)
+        w_last = 1 if self.bus.lite else bus.w.last
+        with m.If(bus.w.valid & bus.w.ready & w_last):
+            m.d.sync += w_done.eq(1)
+        with m.If(bus.b.valid & bus.b.ready):
+            m.d.sync += w_busy.eq(0)
+
+        # Read path.
+
+        ar_hit, ar_miss = decode(bus.ar.addr, "ar")
+        r_busy  = Signal()
+        r_sel   = Signal(len(subs))
+        r_miss  = Signal()
+        r_count = Signal(8)
+        r_id    = Signal(self.bus.id_width)
+
+        ar_ready_fanin = ar_miss
+        r_valid_fanin  = r_miss
+        r_data_fanin   = 0
+        r_resp_fanin   = Mux(r_miss, Response.DECERR.value, 0)
+        r_id_fanin     = Mux(r_miss, r_id, 0)
+        r_last_fanin   = r_miss & (r_count == 0)
+        for index, (sub_bus, _) in enumerate(subs):
+            m.d.comb += [
+                sub_bus.ar.valid.eq(bus.ar.valid & ~r_busy & ar_hit[index]),
+                sub_bus.r.ready.eq(bus.r.ready & r_busy & r_sel[index]),
+            ]
+            ar_ready_fanin |= sub_bus.ar.ready & ar_hit[index]
+            r_valid_fanin  |= sub_bus.r.valid & r_sel[index]
+            r_data_fanin   |= Mux(r_sel[index], sub_bus.r.data, 0)
+            r_resp_fanin   |= Mux(r_sel[index], sub_bus.r.resp, 0)
+            if self.bus.id_width:
+                r_id_fanin |= Mux(r_sel[index], sub_bus.r.id, 0)
+            if not self.bus.lite:
+                r_last_fanin |= sub_bus.r.last & r_sel[index]
+
+        m.d.comb += [
+            bus.ar.ready.eq(~r_busy & ar_ready_fanin),
+            bus.r.valid.eq(r_busy & r_valid_fanin),
+            bus.r.data.eq(r_data_fanin),
+            bus.r.resp.eq(r_resp_fanin),
+        ]
+        if self.bus.id_width:
+            m.d.comb += bus.r.id.eq(r_id_fanin)
+        if not self.bus.lite:
+            m.d.comb += bus.r.last.eq(r_last_fanin)
+
+        with m.If(bus.ar.valid & bus.ar.ready):
+            m.d.sync += [
+                r_busy.eq(1),
+                r_sel.eq(ar_hit),
+                r_miss.eq(ar_miss),
+            ]
+            if not self.bus.lite:
+                m.d.sync += r_count.eq(bus.ar.len)
+            if self.bus.id_width:
+                m.d.sync += r_id.eq(bus.ar.id)
+        r_last = 1 if self.bus.lite else bus.r.last
+        with m.If(bus.r.valid & bus.r.ready):
+            m.d.sync += r_count.eq(r_count - 1)
+            with m.If(r_last):
+                m.d.sync += r_busy.eq(0)
+
+        return m
@@ -0,0 +1,347 @@
+from nmigen import *
+from nmigen.utils import log2_int
+
+from .bus import Burst, Response, Interface
+from ..latency import Latency
+from ..wishbone.bus import CycleType, BurstTypeExt, Interface as WishboneInterface
+
+
+__all__ = ["AXILiteWishboneBridge", "WishboneAXIBridge"]
+
+
+class AXILiteWishboneBridge(Elaboratable):
+    """AXI4-Lite to Wishbone bridge.
+
+    A bus bridge for accessing a Wishbone bus from AXI4-Lite. Byte addresses of the AXI4-Lite bus
+    are translated to word addresses of the Wishbone bus, and write strobes are forwarded as
+    select signals.
+
+    Operation
+    ---------
+
+    The bridge performs one transaction at a time. A write is accepted once both its address and
+    its data are valid; if a write and a read are both pending, they are performed alternately.
+    Each transaction is performed as a single Wishbone transfer, and a transfer terminated with
+    ``err`` or ``rty`` is reported as a ``SLVERR`` response; transfers are not retried.
+
+    Latency
+    -------
+
+    The transfer starts the cycle after the transaction is accepted, and read data is returned
+    the cycle after the transfer is terminated. The bridge declares 2 cycles of added read latency
+    and 1 cycle of added write latency in the memory map of :attr:`axi_bus`; see
+    :class:`..latency.LatencyAnalysis`.
+
+    Parameters
+    ----------
+    wb_bus : :class:`..wishbone.Interface`
+        Wishbone bus driven by the bridge. Its data width must be 32 or 64, and its granularity
+        must be 8.
+
+    Attributes
+    ----------
+    axi_bus : :class:`Interface`
+        AXI4-Lite bus provided by the bridge.
+    """
+    def __init__(self, wb_bus):
+        if not isinstance(wb_bus, WishboneInterface):
+            raise TypeError("Wishbone bus must be an instance of wishbone.Interface, not {!r}"
+                            .format(wb_bus))
+        if wb_bus.data_width not in (32, 64):
+            raise ValueError("Wishbone bus data width must be one of 32, 64, not {!r}"
+                             .format(wb_bus.data_width))
+        if wb_bus.granularity != 8:
+            raise ValueError("Wishbone bus granularity must be 8, not {!r}"
+                             .format(wb_bus.granularity))
+
+        self.wb_bus  = wb_bus
+        self.axi_bus = Interface(
+            addr_width=wb_bus.addr_width + log2_int(wb_bus.data_width // 8),
+            data_width=wb_bus.data_width, lite=True, name="axi")
+        self.axi_bus.memory_map.add_window(wb_bus.memory_map)
+        self.axi_bus.memory_map.latency = Latency(read=2, write=1)
+
+    def elaborate(self, platform):
+        m = Module()
+
+        axi_bus, wb_bus = self.axi_bus, self.wb_bus
+        offset_bits = log2_int(wb_bus.data_width // 8)
+
+        addr       = Signal.like(wb_bus.adr)
+        error      = Signal()
+        last_write = Signal()
+        issued     = Signal()
+
+        m.d.comb += [
+            wb_bus.adr.eq(addr),
+            axi_bus.r.resp.eq(Mux(error, Response.SLVERR.value, Response.OKAY.value)),
+            axi_bus.b.resp.eq(Mux(error, Response.SLVERR.value, Response.OKAY.value)),
+        ]
+
+        term = wb_bus.ack
+        if hasattr(wb_bus, "err"):
+            term = term | wb_bus.err
+        if hasattr(wb_bus, "rty"):
+            term = term | wb_bus.rty
+
+        with m.FSM():
+            with m.State("IDLE"):
+                write_req = axi_bus.aw.valid & axi_bus.w.valid
+                read_req  = axi_bus.ar.valid
+                with m.If(read_req & (~write_req | last_write)):
+                    m.d.comb += axi_bus.ar.ready.eq(1)
+                    m.d.sync += [
+                        addr.eq(axi_bus.ar.addr[offset_bits:]),
+                        wb_bus.we.eq(0),
+                        wb_bus.sel.eq(~0),
+                        last_write.eq(0),
+                    ]
+                    m.next = "TRANSFER"
+                with m.Elif(write_req):
+                    m.d.comb += [
+                        axi_bus.aw.ready.eq(1),
+                        axi_bus.w.ready.eq(1),
+                    ]
+                    m.d.sync += [
+                        addr.eq(axi_bus.aw.addr[offset_bits:]),
+                        wb_bus.we.eq(1),
+                        wb_bus.sel.eq(axi_bus.w.strb),
+                        wb_bus.dat_w.eq(axi_bus.w.data),
+                        last_write.eq(1),
+                    ]
+                    m.next = "TRANSFER"
+
+            with m.State("TRANSFER"):
+                m.d.comb += wb_bus.cyc.eq(1)
+                if hasattr(wb_bus, "stall"):
+                    # A pipelined transfer is issued once, and may be terminated later.
+                    m.d.comb += wb_bus.stb.eq(~issued)
+                    with m.If(wb_bus.stb & ~wb_bus.stall):
+                        m.d.sync += issued.eq(1)
+                else:
+                    m.d.comb += wb_bus.stb.eq(1)
+                with m.If(term):
+                    m.d.sync += [
+                        axi_bus.r.data.eq(wb_bus.dat_r),
+                        error.eq(~wb_bus.ack),
+                        issued.eq(0),
+                    ]
+                    with m.If(wb_bus.we):
+                        m.next = "WRITE_RESPONSE"
+                    with m.Else():
+                        m.next = "READ_RESPONSE"
+
+            with m.State("WRITE_RESPONSE"):
+                m.d.comb += axi_bus.b.valid.eq(1)
+                with m.If(axi_bus.b.ready):
+                    m.next = "IDLE"
+
+            with m.State("READ_RESPONSE"):
+                m.d.comb += axi_bus.r.valid.eq(1)
+                with m.If(axi_bus.r.ready):
+                    m.next = "IDLE"
+
+        return m
+
+
+class WishboneAXIBridge(Elaboratable):
+    """Wishbone to AXI4 bridge.
+
+    A bus bridge for accessing an AXI4 bus from Wishbone. Word addresses of the Wishbone bus are
+    translated to byte addresses of the AXI4 bus, and select signals are forwarded as write
+    strobes.
+
+    Bursts
+    ------
+
+    Classic cycles are performed as single-beat AXI transactions. Incrementing bursts, i.e.
+    transfers with ``cti`` set to ``CycleType.INCR_BURST`` and ``bte`` set to
+    ``BurstTypeExt.LINEAR``, are performed as ``INCR`` AXI bursts of up to ``burst_length`` beats,
+    which never cross a 4 KiB boundary; a Wishbone burst that is longer continues with another
+    AXI burst. Each beat of an AXI burst takes one cycle if neither side inserts wait states.
+
+    Since the length of a Wishbone burst is not known in advance, an AXI burst may be longer than
+    the remainder of the Wishbone burst. The remaining beats of such a write are sent with all
+    write strobes deasserted, which has no effect; the remaining beats of such a read are read and
+    discarded, so incrementing read bursts should only be used towards memory-like subordinates
+    where reads have no side effects. The same happens if the Wishbone cycle is aborted.
+
+    Writes are posted: each beat is acknowledged as soon as it is accepted, except for the last
+    beat of the Wishbone burst and the last beat of each AXI burst, which are terminated once
+    the write response is received, with ``err`` if it is ``SLVERR`` or ``DECERR``. Read beats
+    are terminated with ``err`` if their response is ``SLVERR`` or ``DECERR``.
+
+    Latency
+    -------
+
+    The AXI transaction is issued the cycle after the Wishbone transfer starts, and write data is
+    sent the cycle after the write address is accepted. The bridge declares 1 cycle of added read
+    latency and 2 cycles of added write latency in the memory map of :attr:`wb_bus`; see
+    :class:`..latency.LatencyAnalysis`.
+
+    Parameters
+    ----------
+    axi_bus : :class:`Interface`
+        AXI4 bus driven by the bridge. Its data width must be at most 64.
+    burst_length : int
+        Maximum amount of beats in an AXI burst.
+
+    Attributes
+    ----------
+    wb_bus : :class:`..wishbone.Interface`
+        Wishbone bus provided by the bridge. It has a granularity of 8, and the ``err``, ``cti``
+        and ``bte`` signals.
+    """
+    def __init__(self, axi_bus, *, burst_length=16):
+        if not isinstance(axi_bus, Interface):
+            raise TypeError("AXI bus must be an instance of axi.Interface, not {!r}"
+                            .format(axi_bus))
+        if axi_bus.lite:
+            raise ValueError("AXI bus must be an AXI4 interface, not an AXI4-Lite interface")
+        if axi_bus.data_width not in (8, 16, 32, 64):
+            raise ValueError("AXI bus data width must be one of 8, 16, 32, 64, not {!r}"
+                             .format(axi_bus.data_width))
+        offset_bits = log2_int(axi_bus.data_width // 8)
+        if axi_bus.addr_width < offset_bits:
+            raise ValueError("AXI bus address width must be at least {}, not {!r}"
+                             .format(offset_bits, axi_bus.addr_width))
+        if not isinstance(burst_length, int) or not 1 <= burst_length <= 256:
+            raise ValueError("Burst length must be an integer between 1 and 256, not {!r}"
+                             .format(burst_length))
+
+        self.axi_bus      = axi_bus
+        self.burst_length = burst_length
+        self.wb_bus = WishboneInterface(addr_width=axi_bus.addr_width - offset_bits,
+                                        data_width=axi_bus.data_width, granularity=8,
+                                        features={"err", "cti", "bte"}, name="wb")
+        self.wb_bus.memory_map.add_window(axi_bus.memory_map)
+        self.wb_bus.memory_map.latency = Latency(read=1, write=2)
+
+    def elaborate(self, platform):
+        m = Module()
+
+        axi_bus, wb_bus = self.axi_bus, self.wb_bus
+        offset_bits = log2_int(axi_bus.data_width // 8)
+
+        addr       = Signal(axi_bus.addr_width)
+        burst      = Signal()
+        beats_left = Signal(range(self.burst_length))
+        held       = Signal()
+        padding    = Signal()
+        draining   = Signal()
+
+        # Beats up to the next 4 KiB boundary, which AXI bursts must not cross.
+        boundary_beats = Signal(13 - offset_bits)
+        m.d.comb += boundary_beats.eq((4096 - addr[:12]) >> offset_bits)
+        length = Signal(8)
+        with m.If(burst & (boundary_beats >= self.burst_length)):
+            m.d.comb += length.eq(self.burst_length - 1)
+        with m.Elif(burst):
+            m.d.comb += length.eq(boundary_beats - 1)
+
+        for channel in (axi_bus.aw, axi_bus.ar):
+            m.d.comb += [
+                channel.addr.eq(addr),
+                channel.len.eq(length),
+                channel.size.eq(offset_bits),
+                channel.burst.eq(Burst.INCR),
+            ]
+
+        wb_req   = wb_bus.cyc & wb_bus.stb
+        wb_incr  = (wb_bus.cti == CycleType.INCR_BURST) & (wb_bus.bte == BurstTypeExt.LINEAR)
+        wb_final = Signal()
+        m.d.comb += wb_final.eq(~burst | ~wb_incr)
+
+        # SLVERR and DECERR both have the most significant bit set.
+        b_error = axi_bus.b.resp[1]
+        r_error = axi_bus.r.resp[1]
+
+        m.d.comb += [
+            axi_bus.w.data.eq(wb_bus.dat_w),
+            wb_bus.dat_r.eq(axi_bus.r.data),
+        ]
+
+        with m.FSM():
+            with m.State("IDLE"):
+                with m.If(wb_req):
+                    m.d.sync += [
+                        addr.eq(Cat(Const(0, offset_bits), wb_bus.adr)),
+                        burst.eq(wb_incr),
+                    ]
+                    m.next = "ADDRESS"
+
+            with m.State("ADDRESS"):
+                with m.If(~wb_bus.cyc):
+                    m.next = "IDLE"
+                with m.Elif(wb_bus.we):
+                    m.d.comb += axi_bus.aw.valid.eq(1)
+                    with m.If(axi_bus.aw.ready):
+                        m.d.sync += beats_left.eq(length)
+                        m.next = "WRITE_DATA"
+                with m.Else():
+                    m.d.comb += axi_bus.ar.valid.eq(1)
+                    with m.If(axi_bus.ar.ready):
+                        m.next = "READ_DATA"
+
+            with m.State("WRITE_DATA"):
+                pad = Signal()
+                m.d.comb += [
+                    pad.eq(padding | ~wb_bus.cyc),
+                    axi_bus.w.valid.eq(wb_req | pad),
+                    axi_bus.w.strb.eq(Mux(pad, 0, wb_bus.sel)),
+                    axi_bus.w.last.eq(beats_left == 0),
+                ]
+                with m.If(~wb_bus.cyc):
+                    m.d.sync += padding.eq(1)
+                with m.If(axi_bus.w.valid & axi_bus.w.ready):
+                    m.d.sync += beats_left.eq(beats_left - 1)
+                    with m.If(axi_bus.w.last):
+                        # The last beat of the AXI burst is terminated with the write response.
+                        with m.If(~pad):
+                            m.d.sync += held.eq(1)
+                        m.next = "WRITE_RESPONSE"
+                    with m.Elif(~pad & wb_final):
+                        # The Wishbone burst ended early; see above.
+                        m.d.sync += [
+                            held.eq(1),
+                            padding.eq(1),
+                        ]
+                    with m.Elif(~pad):
+                        m.d.comb += wb_bus.ack.eq(1)
+
+            with m.State("WRITE_RESPONSE"):
+                m.d.comb += axi_bus.b.ready.eq(1)
+                with m.If(axi_bus.b.valid):
+                    with m.If(held & wb_req):
+                        m.d.comb += [
+                            wb_bus.ack.eq(~b_error),
+                            wb_bus.err.eq(b_error),
+                        ]
+                    m.d.sync += [
+                        held.eq(0),
+                        padding.eq(0),
+                    ]
+                    m.next = "IDLE"
+
+            with m.State("READ_DATA"):
+                drain = Signal()
+                m.d.comb += [
+                    drain.eq(draining | ~wb_bus.cyc),
+                    axi_bus.r.ready.eq(wb_req | drain),
+                ]
+                with m.If(~wb_bus.cyc):
+                    m.d.sync += draining.eq(1)
+                with m.If(axi_bus.r.valid & axi_bus.r.ready):
+                    with m.If(~drain):
+                        m.d.comb += [
+                            wb_bus.ack.eq(~r_error),
+                            wb_bus.err.eq(r_error),
+                        ]
+                    with m.If(axi_bus.r.last):
+                        m.d.sync += draining.eq(0)
+                        m.next = "IDLE"
+                    with m.Elif(~drain & wb_final):
+                        # The Wishbone burst ended early; see above.
+                        m.d.sync += draining.eq(1)
+
+        return m
@@ -1 +1,2 @@
 from .bus import *
+from .bank import *
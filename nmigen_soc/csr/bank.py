@@ -0,0 +1,257 @@
+import enum
+from nmigen import *
+
+from .bus import Element, Multiplexer
+
+
+__all__ = ["Field", "RegisterBank"]
+
+
+class Field(Record):
+    class Access(enum.Enum):
+        """Field access mode.
+
+        All fields are readable. The access mode describes the effect of register writes and reads
+        on the field, as well as which side (the peripheral or the register bank) holds its value.
+        """
+        R   = "r"
+        RW  = "rw"
+        W1C = "w1c"
+        W1S = "w1s"
+        RC  = "rc"
+
+        def writable(self):
+            return self in (self.RW, self.W1C, self.W1S)
+
+    """Register field.
+
+    A part of a register with its own access semantics. Fields are gathered into registers by
+    a :class:`RegisterBank`, which also provides storage for them.
+
+    Access modes
+    ------------
+
+    * ``"r"``: read-only. The value is driven by the peripheral through ``value``.
+    * ``"rw"``: read/write. The value is stored in the register bank; ``w_stb`` is asserted for
+      one cycle when the field is written.
+    * ``"w1c"``: write 1 to clear. The peripheral sets bits through ``set``; writing 1 to a bit
+      clears it. If a bit is set and cleared in the same cycle, it remains set.
+    * ``"w1s"``: write 1 to set. Writing 1 to a bit sets it; the peripheral clears bits through
+      ``clear``. If a bit is set and cleared in the same cycle, it becomes set.
+    * ``"rc"``: read to clear. The peripheral sets bits through ``set``; reading the register
+      clears it. If a bit is set and cleared in the same cycle, it remains set.
+
+    Parameters
+    ----------
+    width : int
+        Width of the field.
+    access : :class:`Access`
+        Field access mode.
+    reset : int
+        Reset value of the field. Ignored for read-only fields.
+    name : str
+        Name of the underlying record.
+
+    Attributes
+    ----------
+    value : Signal(width)
+        Value of the field. Driven by the peripheral for read-only fields, and by the register bank
+        otherwise.
+    w_stb : Signal()
+        Write strobe. Only present for read/write fields.
+    set : Signal(width)
+        Bits to set. Only present for write 1 to clear and read to clear fields.
+    clear : Signal(width)
+        Bits to clear. Only present for write 1 to set fields.
+    """
+    def __init__(self, width, access, *, reset=0, name=None, src_loc_at=0):
+        if not isinstance(width, int) or width <= 0:
+            raise ValueError("Width must be a positive integer, not {!r}"
+                             .format(width))
+        if not isinstance(access, Field.Access) and access not in ("r", "rw", "w1c", "w1s", "rc"):
+            raise ValueError("Access mode must be one of \"r\", \"rw\", \"w1c\", \"w1s\", "
+                             "or \"rc\", not {!r}"
+                             .format(access))
+        if not isinstance(reset, int) or reset < 0 or reset >= 1 << width:
+            raise ValueError("Reset value must be a non-negative integer that fits in {} bits, "
+                             "not {!r}"
+                             .format(width, reset))
+        self.width  = width
+        self.access = Field.Access(access)
+        self.reset  = reset
+
+        layout = [("value", width)]
+        if self.access == Field.Access.RW:
+            layout += [("w_stb", 1)]
+        if self.access in (Field.Access.W1C, Field.Access.RC):
+            layout += [("set",   width)]
+        if self.access == Field.Access.W1S:
+            layout += [("clear", width)]
+        super().__init__(layout, name=name, src_loc_at=1 + src_loc_at)
+
+    # FIXME: get rid of this
+    __hash__ = object.__hash__
+
+
+class RegisterBank(Elaboratable):
+    """CSR register bank.
+
+    A set of fields, packed into registers and served by a :class:`Multiplexer`.
+
+    Packing
+    -------
+
+    Fields are packed into registers using the first fit decreasing heuristic, such that the amount
+    of CSR bus chunks occupied by the bank is minimized. A field is never split between registers;
+    a field wider than the CSR bus data width occupies a multi-chunk register, and narrower fields
+    can be placed in its unused upper bits. Registers are placed in the memory map in the order in
+    which their first fields were added.
+
+    Fields are packed when the layout of the bank is first needed, i.e. when any of :attr:`bus`,
+    :meth:`registers`, :meth:`fields` is accessed, or when the bank is elaborated. After that,
+    no more fields can be added.
+
+    Parameters
+    ----------
+    addr_width : int
+        Address width. See :class:`Interface`.
+    data_width : int
+        Data width. See :class:`Interface`.
+    alignment : int
+        Register alignment. See :class:`Interface`.
+
+    Attributes
+    ----------
+    bus : :class:`Interface`
+        CSR bus providing access to registers.
+    """
+    def __init__(self, *, addr_width, data_width, alignment=0):
+        self._mux    = Multiplexer(addr_width=addr_width, data_width=data_width,
+                                   alignment=alignment)
+        self._fields = []
+        self._regs   = None
+
+    @property
+    def bus(self):
+        self._freeze()
+        return self._mux.bus
+
+    def add(self, field):
+        """Add a field.
+
+        Return value
+        ------------
+        The field that was added.
+
+        Exceptions
+        ----------
+        Raises :exn:`ValueError` if the register layout of the bank has already been computed.
+        """
+        if not isinstance(field, Field):
+            raise TypeError("Field must be an instance of csr.Field, not {!r}"
+                            .format(field))
+        if self._regs is not None:
+            raise ValueError("Cannot add field {!r} because the register layout has already been "
+                             "computed"
+                             .format(field))
+        if any(field is other for other in self._fields):
+            raise ValueError("Field {!r} is already added"
+                             .format(field))
+        self._fields.append(field)
+        return field
+
+    def _freeze(self):
+        if self._regs is not None:
+            return
+
+        data_width = self._mux.bus.data_width
+        # Each bin is a list ``[first_index, capacity, used, [(field, offset), ...]]``.
+        bins  = []
+        order = sorted(range(len(self._fields)), key=lambda index: -self._fields[index].width)
+        for index in order:
+            field = self._fields[index]
+            for bin_ in bins:
+                if bin_[1] - bin_[2] >= field.width:
+                    break
+            else:
+                capacity = (field.width + data_width - 1) // data_width * data_width
+                bin_ = [index, capacity, 0, []]
+                bins.append(bin_)
+            bin_[0] = min(bin_[0], index)
+            bin_[3].append((field, bin_[2]))
+            bin_[2] += field.width
+
+        self._regs = []
+        for _, _, used, layout in sorted(bins, key=lambda bin_: bin_[0]):
+            layout = sorted(layout, key=lambda item: item[1])
+            if any(field.access.writable() for field, _ in layout):
+                access = Element.Access.RW
+            else:
+                access = Element.Access.R
+            elem_name = "__".join(field.name or "field" for field, _ in layout)
+            elem = Element(used, access, name=elem_name)
+            self._mux.add(elem)
+            self._regs.append((elem, tuple(layout)))
+
+    def registers(self):
+        """Iterate registers.
+
+        Yield values
+        ------------
+        A tuple ``element, ((field, offset), ...)`` describing each register in ascending order
+        of its address, and the fields it contains in ascending order of their bit offset.
+        """
+        self._freeze()
+        yield from self._regs
+
+    def fields(self):
+        """Iterate fields.
+
+        Yield values
+        ------------
+        A tuple ``field, (element, offset)`` describing the register containing each field and
+        the bit offset of the field within that register, in the order the fields were added.
+        """
+        self._freeze()
+        placement = dict()
+        for elem, layout in self._regs:
+            for field, offset in layout:
+                placement[field] = elem, offset
+        for field in self._fields:
+            yield field, placement[field]
+
+    def elaborate(self, platform):
+        self._freeze()
+
+        m = Module()
+        m.submodules.mux = self._mux
+
+        for elem, layout in self._regs:
+            for field, offset in layout:
+                r_slice = elem.r_data[offset:offset + field.width]
+                m.d.comb += r_slice.eq(field.value)
+                if field.access == Field.Access.R:
+                    continue
+
+                storage = Signal(field.width, reset=field.reset,
+                                 name="{}__storage".format(field.name or "field"))
+                m.d.comb += field.value.eq(storage)
+
+                w_bits = 0
+                if field.access.writable():
+                    w_bits = Mux(elem.w_stb, elem.w_data[offset:offset + field.width], 0)
+
+                if field.access == Field.Access.RW:
+                    m.d.comb += field.w_stb.eq(elem.w_stb)
+                    with m.If(elem.w_stb):
+                        m.d.sync += storage.eq(elem.w_data[offset:offset + field.width])
+                elif field.access == Field.Access.W1C:
+                    m.d.sync += storage.eq(storage & ~w_bits | field.set)
+                elif field.access == Field.Access.W1S:
+                    m.d.sync += storage.eq(storage & ~field.clear | w_bits)
+                elif field.access == Field.Access.RC:
+                    m.d.sync += storage.eq(Mux(elem.r_stb, 0, storage) | field.set)
+                else:
+                    assert False # :nocov:
+
+        return m
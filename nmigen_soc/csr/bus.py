@@ -3,9 +3,12 @@ from nmigen import *
 from nmigen.utils import log2_int
 
 from ..memory import MemoryMap
+from ..latency import Latency
+from ..interconnect import DecoderTree as _DecoderTree
 
 
-__all__ = ["Element", "Interface", "Decoder", "Multiplexer"]
+__all__ = ["Element", "Alias", "Interface", "Decoder", "Multiplexer", "MultiportMultiplexer",
+           "BankedMultiplexer", "DecoderTree"]
 
 
 class Element(Record):
@@ -31,12 +34,23 @@ class Element(Record):
     This interface supports any register width and semantics, provided that both reads and writes
     always succeed and complete in one cycle.
 
+    Constant registers
+    ------------------
+
+    ID, version and capability registers often have a value that is known at elaboration time.
+    Such registers are described by specifying ``constant``. The value of ``r_data`` is then
+    driven by the :class:`Multiplexer` the register is added to rather than by the peripheral,
+    and the multiplexer serves reads of the register directly from the address decoder, without
+    a shadow register.
+
     Parameters
     ----------
     width : int
         Width of the register.
     access : :class:`Access`
         Register access mode.
+    constant : int or None
+        Value of a constant register. Only read-only registers may be constant.
     name : str
         Name of the underlying record.
 
@@ -53,15 +67,24 @@ class Element(Record):
         Write strobe. Registers should update their value or perform the write side effect when
         this strobe is asserted.
     """
-    def __init__(self, width, access, *, name=None, src_loc_at=0):
+    def __init__(self, width, access, *, constant=None, name=None, src_loc_at=0):
         if not isinstance(width, int) or width < 0:
             raise ValueError("Width must be a non-negative integer, not {!r}"
                              .format(width))
         if not isinstance(access, Element.Access) and access not in ("r", "w", "rw"):
             raise ValueError("Access mode must be one of \"r\", \"w\", or \"rw\", not {!r}"
                              .format(access))
-        self.width  = width
-        self.access = Element.Access(access)
+        if constant is not None:
+            if not isinstance(constant, int) or constant < 0 or constant >= 1 << width:
+                raise ValueError("Constant must be a non-negative integer that fits in {} bits, "
+                                 "not {!r}"
+                                 .format(width, constant))
+            if Element.Access(access) != Element.Access.R:
+                raise ValueError("Constant element must have access mode \"r\", not {!r}"
+                                 .format(access))
+        self.width    = width
+        self.access   = Element.Access(access)
+        self.constant = constant
 
         layout = []
         if self.access.readable():
@@ -80,6 +103,60 @@ class Element(Record):
     __hash__ = object.__hash__
 
 
+class Alias:
+    class Op(enum.Enum):
+        """Alias operation.
+
+        Bits of the register that are set in the written value are set, cleared or toggled;
+        the other bits keep their value.
+        """
+        SET    = "set"
+        CLEAR  = "clear"
+        TOGGLE = "toggle"
+
+    """Register alias.
+
+    A write-only address range of a :class:`Multiplexer`, through which a write updates some bits
+    of a register while keeping the others, without the read-modify-write sequence that firmware
+    would otherwise need. See :meth:`Multiplexer.add_alias`.
+
+    Parameters
+    ----------
+    element : :class:`Element`
+        Register. Must be readable and writable.
+    op : :class:`Op`
+        Alias operation.
+
+    Attributes
+    ----------
+    name : str
+        Name of the alias, derived from the name of the register and the operation.
+    width : int
+        Width of the register.
+    access : :class:`Element.Access`
+        Access mode of the alias, always write-only.
+    """
+    def __init__(self, element, op):
+        if not isinstance(element, Element):
+            raise TypeError("Element must be an instance of csr.Element, not {!r}"
+                            .format(element))
+        if not element.access.readable() or not element.access.writable():
+            raise ValueError("Element {!r} must have access mode \"rw\" to have aliases, not {!r}"
+                             .format(element.name, element.access.value))
+        if not isinstance(op, Alias.Op) and op not in ("set", "clear", "toggle"):
+            raise ValueError("Operation must be one of \"set\", \"clear\", or \"toggle\", "
+                             "not {!r}"
+                             .format(op))
+        self.element = element
+        self.op      = Alias.Op(op)
+        self.name    = "{}__{}".format(element.name, self.op.value)
+        self.width   = element.width
+        self.access  = Element.Access.W
+
+    def __repr__(self):
+        return "Alias({!r}, {!r})".format(self.element.name, self.op.value)
+
+
 class Interface(Record):
     """CPU-side CSR interface.
 
@@ -161,7 +238,19 @@ class Multiplexer(Elaboratable):
     Latency
     -------
 
-    Writes are registered, and are performed 1 cycle after ``w_stb`` is asserted.
+    Reads return data 1 cycle after ``r_stb`` is asserted. Writes are registered, and are
+    performed 1 cycle after ``w_stb`` is asserted. This latency is declared in the memory map of
+    :attr:`bus`; see :class:`..latency.LatencyAnalysis`.
+
+    Aliases
+    -------
+
+    A read-write register may be given set, clear and toggle aliases with :meth:`add_alias`.
+    Each alias is a write-only address range as large as the register. A complete write to
+    an alias asserts ``w_stb`` like a write to the register, with ``w_data`` computed from
+    ``r_data`` in the same cycle, so that a single bus write atomically sets, clears or toggles
+    the bits of the register that are set in the written value. This is only meaningful for
+    registers whose ``r_data`` reflects the value last written. Reads from an alias return 0.
 
     Alignment
     ---------
@@ -204,6 +293,7 @@ class Multiplexer(Elaboratable):
         self.bus  = Interface(addr_width=addr_width, data_width=data_width, alignment=alignment,
                               name="csr")
         self._map = self.bus.memory_map
+        self._map.latency = Latency(read=1, write=1)
 
     def align_to(self, alignment):
         """Align the implicit address of the next register.
@@ -224,6 +314,43 @@ class Multiplexer(Elaboratable):
         size = (element.width + self.bus.data_width - 1) // self.bus.data_width
         return self._map.add_resource(element, size=size, addr=addr, alignment=alignment)
 
+    def add_alias(self, element, op, *, addr=None, alignment=None):
+        """Add a set, clear or toggle alias of a register.
+
+        The register must have been added to the multiplexer, and have access mode ``"rw"``.
+        See :meth:`MemoryMap.add_resource` for details on the address range.
+
+        Arguments
+        ---------
+        element : :class:`Element`
+            Register.
+        op : :class:`Alias.Op`
+            Alias operation.
+
+        Return value
+        ------------
+        The address range of the alias, as a tuple ``(start, end)``.
+        """
+        alias = Alias(element, op)
+        if not any(resource is element for resource, _ in self._map.resources()):
+            raise ValueError("Element {!r} has not been added to the multiplexer"
+                             .format(element.name))
+        size = (element.width + self.bus.data_width - 1) // self.bus.data_width
+        return self._map.add_resource(alias, size=size, addr=addr, alignment=alignment)
+
+    def _elaboration_signature(self):
+        # See :class:`..elaboration.ElaborationCache`.
+        key   = [self.bus.addr_width, self.bus.data_width]
+        ports = list(self.bus.fields.values())
+        for elem, (elem_start, elem_end) in self._map.resources():
+            if isinstance(elem, Alias):
+                key.append((elem.name, elem.op.value, elem_start, elem_end))
+                continue
+            key.append((elem.name, elem.width, elem.access.value, elem.constant,
+                        elem_start, elem_end))
+            ports += elem.fields.values()
+        return tuple(key), ports
+
     def elaborate(self, platform):
         m = Module()
 
@@ -234,15 +361,65 @@ class Multiplexer(Elaboratable):
         # 2-AND or 2-OR gates.
         r_data_fanin = 0
 
-        for elem, (elem_start, elem_end) in self._map.resources():
+        elems   = []
+        aliases = dict()
+        for elem, elem_range in self._map.resources():
+            if isinstance(elem, Alias):
+                aliases.setdefault(id(elem.element), []).append((elem.op, elem_range))
+            else:
+                elems.append((elem, elem_range))
+
+        for elem, (elem_start, elem_end) in elems:
+            if elem.constant is not None:
+                # Constant registers are served straight from the address decoder. Only a read
+                # enable flip-flop per non-zero chunk is needed, and ANDing it with a constant
+                # reduces to wiring; all-zero chunks do not contribute to the read fan-in at all.
+                m.d.comb += elem.r_data.eq(elem.constant)
+
+                chunk_ens = dict()
+                for chunk_offset in range(elem_end - elem_start):
+                    chunk_value = elem.constant >> (chunk_offset * self.bus.data_width)
+                    chunk_value &= (1 << self.bus.data_width) - 1
+                    if chunk_value != 0:
+                        chunk_en = Signal(name="{}__chunk_{}_en".format(elem.name, chunk_offset))
+                        r_data_fanin |= Mux(chunk_en, Const(chunk_value, self.bus.data_width), 0)
+                        m.d.sync += chunk_en.eq(0)
+                        chunk_ens[chunk_offset] = chunk_en
+
+                with m.Switch(self.bus.addr):
+                    for chunk_offset, chunk_addr in enumerate(range(elem_start, elem_end)):
+                        with m.Case(chunk_addr):
+                            if chunk_addr == elem_start:
+                                m.d.comb += elem.r_stb.eq(self.bus.r_stb)
+                            if chunk_offset in chunk_ens:
+                                # Delay by 1 cycle, like the shadow register below.
+                                m.d.sync += chunk_ens[chunk_offset].eq(self.bus.r_stb)
+                continue
+
             shadow = Signal(elem.width, name="{}__shadow".format(elem.name))
             if elem.access.readable():
                 shadow_en = Signal(elem_end - elem_start, name="{}__shadow_en".format(elem.name))
                 m.d.sync += shadow_en.eq(0)
             if elem.access.writable():
-                m.d.comb += elem.w_data.eq(shadow)
                 m.d.sync += elem.w_stb.eq(0)
 
+            elem_aliases = aliases.get(id(elem), [])
+            if elem_aliases:
+                # Operation of the write being completed; 0 for a plain write.
+                w_op  = Signal(range(len(Alias.Op) + 1), name="{}__w_op".format(elem.name))
+                op_id = {op: index + 1 for index, op in enumerate(Alias.Op)}
+                with m.Switch(w_op):
+                    with m.Case(op_id[Alias.Op.SET]):
+                        m.d.comb += elem.w_data.eq(elem.r_data | shadow)
+                    with m.Case(op_id[Alias.Op.CLEAR]):
+                        m.d.comb += elem.w_data.eq(elem.r_data & ~shadow)
+                    with m.Case(op_id[Alias.Op.TOGGLE]):
+                        m.d.comb += elem.w_data.eq(elem.r_data ^ shadow)
+                    with m.Default():
+                        m.d.comb += elem.w_data.eq(shadow)
+            elif elem.access.writable():
+                m.d.comb += elem.w_data.eq(shadow)
+
             # Enumerate every address used by the register explicitly, rather than using
             # arithmetic comparisons, since some toolchains (e.g. Yosys) are too eager to infer
             # carry chains for comparisons, even with a constant. (Register sizes don't have
@@ -266,6 +443,22 @@ class Multiplexer(Elaboratable):
                                 # Delay by 1 cycle, avoiding combinatorial paths through
                                 # the CSR bus and into CSR registers.
                                 m.d.sync += elem.w_stb.eq(self.bus.w_stb)
+                                if elem_aliases:
+                                    m.d.sync += w_op.eq(0)
+                            with m.If(self.bus.w_stb):
+                                m.d.sync += shadow_slice.eq(self.bus.w_data)
+
+                # Aliases share the shadow register, and differ only in how the write completes.
+                for op, (alias_start, alias_end) in elem_aliases:
+                    for chunk_offset, chunk_addr in enumerate(range(alias_start, alias_end)):
+                        shadow_slice = shadow.word_select(chunk_offset, self.bus.data_width)
+
+                        with m.Case(chunk_addr):
+                            if chunk_addr == alias_end - 1:
+                                m.d.sync += [
+                                    elem.w_stb.eq(self.bus.w_stb),
+                                    w_op.eq(op_id[op]),
+                                ]
                             with m.If(self.bus.w_stb):
                                 m.d.sync += shadow_slice.eq(self.bus.w_data)
 
@@ -274,6 +467,154 @@ class Multiplexer(Elaboratable):
         return m
 
 
+class MultiportMultiplexer(Elaboratable):
+    """Multi-port CSR register multiplexer.
+
+    A CSR register multiplexer like :class:`Multiplexer`, which serves the same registers to
+    several CSR buses, e.g. to a CPU and to a debugger, at the same time. Every bus has the same
+    memory map, and may access any register in any cycle, independently of the others.
+
+    Atomicity
+    ---------
+
+    Each bus has its own shadow registers, so multi-chunk reads and writes through one bus are
+    atomic, and are never corrupted by accesses through other buses, even to the same register.
+
+    Conflicts
+    ---------
+
+    Reads never conflict. If several buses read the first chunk of a register in the same cycle,
+    ``r_stb`` is asserted once, and all of them return the same value.
+
+    If several buses complete a write to the same register in the same cycle, the write through
+    the bus with the lowest index takes effect, and the others are discarded. ``w_stb`` is asserted
+    once.
+
+    Latency
+    -------
+
+    The latency of every bus is that of a :class:`Multiplexer`, and is declared in each of their
+    memory maps; see :class:`..latency.LatencyAnalysis`.
+
+    Parameters
+    ----------
+    ports : int
+        Amount of CSR buses. Must be at least 2.
+    addr_width : int
+        Address width. See :class:`Interface`.
+    data_width : int
+        Data width. See :class:`Interface`.
+    alignment : int
+        Register alignment. See :class:`Interface`.
+
+    Attributes
+    ----------
+    buses : list of :class:`Interface`
+        CSR buses providing access to registers, in descending order of write priority.
+    """
+    def __init__(self, *, ports=2, addr_width, data_width, alignment=0):
+        if not isinstance(ports, int) or ports < 2:
+            raise ValueError("Amount of ports must be an integer greater than or equal to 2, "
+                             "not {!r}"
+                             .format(ports))
+        self.buses = [Interface(addr_width=addr_width, data_width=data_width,
+                                alignment=alignment, name="csr_{}".format(index))
+                      for index in range(ports)]
+        for bus in self.buses:
+            bus.memory_map.latency = Latency(read=1, write=1)
+
+    def align_to(self, alignment):
+        """Align the implicit address of the next register.
+
+        See :meth:`MemoryMap.align_to` for details.
+        """
+        for bus in self.buses:
+            next_addr = bus.memory_map.align_to(alignment)
+        return next_addr
+
+    def add(self, element, *, addr=None, alignment=None):
+        """Add a register.
+
+        See :meth:`MemoryMap.add_resource` for details.
+        """
+        if not isinstance(element, Element):
+            raise TypeError("Element must be an instance of csr.Element, not {!r}"
+                            .format(element))
+
+        data_width = self.buses[0].data_width
+        size = (element.width + data_width - 1) // data_width
+        # The memory maps are always modified in the same way, so they stay identical.
+        for bus in self.buses:
+            addr_range = bus.memory_map.add_resource(element, size=size, addr=addr,
+                                                     alignment=alignment)
+        return addr_range
+
+    def elaborate(self, platform):
+        m = Module()
+
+        data_width   = self.buses[0].data_width
+        r_data_fanin = [0 for bus in self.buses]
+
+        for elem, (elem_start, elem_end) in self.buses[0].memory_map.resources():
+            if elem.constant is not None:
+                # Constant registers are captured in the shadow registers like any other.
+                m.d.comb += elem.r_data.eq(elem.constant)
+
+            r_stb_fanin = 0
+            w_stbs      = []
+
+            for index, bus in enumerate(self.buses):
+                prefix = "{}__port_{}".format(elem.name, index)
+                shadow = Signal(elem.width, name="{}__shadow".format(prefix))
+                if elem.access.readable():
+                    shadow_en = Signal(elem_end - elem_start, name="{}__shadow_en".format(prefix))
+                    m.d.sync += shadow_en.eq(0)
+                    # The read strobe of each bus is gated by a select signal that is only
+                    # asserted when that bus addresses the first chunk of this register.
+                    r_stb = Signal(name="{}__r_stb".format(prefix))
+                    r_stb_fanin |= r_stb
+                if elem.access.writable():
+                    w_stb = Signal(name="{}__w_stb".format(prefix))
+                    m.d.sync += w_stb.eq(0)
+                    w_stbs.append((w_stb, shadow))
+
+                # See Multiplexer.elaborate() for the reasoning behind this structure.
+                with m.Switch(bus.addr):
+                    for chunk_offset, chunk_addr in enumerate(range(elem_start, elem_end)):
+                        shadow_slice = shadow.word_select(chunk_offset, data_width)
+
+                        with m.Case(chunk_addr):
+                            if elem.access.readable():
+                                r_data_fanin[index] |= Mux(shadow_en[chunk_offset],
+                                                           shadow_slice, 0)
+                                if chunk_addr == elem_start:
+                                    m.d.comb += r_stb.eq(bus.r_stb)
+                                    with m.If(bus.r_stb):
+                                        m.d.sync += shadow.eq(elem.r_data)
+                                m.d.sync += shadow_en.eq(bus.r_stb << chunk_offset)
+
+                            if elem.access.writable():
+                                if chunk_addr == elem_end - 1:
+                                    m.d.sync += w_stb.eq(bus.w_stb)
+                                with m.If(bus.w_stb):
+                                    m.d.sync += shadow_slice.eq(bus.w_data)
+
+            if elem.access.readable():
+                m.d.comb += elem.r_stb.eq(r_stb_fanin)
+            if elem.access.writable():
+                m.d.comb += elem.w_stb.eq(Cat(w_stb for w_stb, _ in w_stbs).any())
+                # Later assignments take precedence, so the bus with the lowest index is
+                # assigned last.
+                for w_stb, shadow in reversed(w_stbs):
+                    with m.If(w_stb):
+                        m.d.comb += elem.w_data.eq(shadow)
+
+        for bus, fanin in zip(self.buses, r_data_fanin):
+            m.d.comb += bus.r_data.eq(fanin)
+
+        return m
+
+
 class Decoder(Elaboratable):
     """CSR bus decoder.
 
@@ -291,6 +632,21 @@ class Decoder(Elaboratable):
     With a decoder, only five signals per peripheral will be used, and the logic could be kept
     together with the peripheral.
 
+    Latency
+    -------
+
+    The decoder is combinatorial, and adds no latency. This latency is declared in the memory map
+    of :attr:`bus`; see :class:`..latency.LatencyAnalysis`.
+
+    Minimal decoding
+    ----------------
+
+    If ``minimal_decode`` is true, subordinate buses are selected by comparing only the address
+    bits needed to tell their windows apart, as computed by
+    :meth:`..memory.MemoryMap.window_patterns` with ``minimize=True``. This reduces decoding
+    logic, but accesses to addresses outside of any window are forwarded to one of
+    the subordinate buses instead of being ignored.
+
     Parameters
     ----------
     addr_width : int
@@ -299,17 +655,21 @@ class Decoder(Elaboratable):
         Data width. See :class:`Interface`.
     alignment : int
         Window alignment. See :class:`Interface`.
+    minimal_decode : bool
+        Only compare the address bits needed to tell windows apart.
 
     Attributes
     ----------
     bus : :class:`Interface`
         CSR bus providing access to subordinate buses.
     """
-    def __init__(self, *, addr_width, data_width, alignment=0):
+    def __init__(self, *, addr_width, data_width, alignment=0, minimal_decode=False):
         self.bus   = Interface(addr_width=addr_width, data_width=data_width, alignment=alignment,
                                name="csr")
         self._map  = self.bus.memory_map
+        self._map.latency = Latency(read=0, write=0)
         self._subs = dict()
+        self.minimal_decode = minimal_decode
 
     def align_to(self, alignment):
         """Align the implicit address of the next window.
@@ -323,6 +683,11 @@ class Decoder(Elaboratable):
 
         See :meth:`MemoryMap.add_resource` for details.
         """
+        self._check_sub_bus(sub_bus)
+        self._subs[sub_bus.memory_map] = sub_bus
+        return self._map.add_window(sub_bus.memory_map, addr=addr)
+
+    def _check_sub_bus(self, sub_bus):
         if not isinstance(sub_bus, Interface):
             raise TypeError("Subordinate bus must be an instance of csr.Interface, not {!r}"
                             .format(sub_bus))
@@ -330,8 +695,16 @@ class Decoder(Elaboratable):
             raise ValueError("Subordinate bus has data width {}, which is not the same as "
                              "decoder data width {}"
                              .format(sub_bus.data_width, self.bus.data_width))
-        self._subs[sub_bus.memory_map] = sub_bus
-        return self._map.add_window(sub_bus.memory_map, addr=addr)
+
+    def _elaboration_signature(self):
+        # See :class:`..elaboration.ElaborationCache`.
+        key   = [self.bus.addr_width, self.bus.data_width, self.minimal_decode]
+        ports = list(self.bus.fields.values())
+        for sub_map, (sub_start, sub_end, sub_ratio) in self._map.windows():
+            sub_bus = self._subs[sub_map]
+            key.append((sub_start, sub_end, sub_ratio, sub_bus.addr_width))
+            ports += sub_bus.fields.values()
+        return tuple(key), ports
 
     def elaborate(self, platform):
         m = Module()
@@ -340,7 +713,8 @@ class Decoder(Elaboratable):
         r_data_fanin = 0
 
         with m.Switch(self.bus.addr):
-            for sub_map, (sub_pat, sub_ratio) in self._map.window_patterns():
+            for sub_map, (sub_pat, sub_ratio) in \
+                    self._map.window_patterns(minimize=self.minimal_decode):
                 assert sub_ratio == 1
 
                 sub_bus = self._subs[sub_map]
@@ -358,3 +732,216 @@ class Decoder(Elaboratable):
         m.d.comb += self.bus.r_data.eq(r_data_fanin)
 
         return m
+
+
+class BankedMultiplexer(Elaboratable):
+    """Banked CSR register multiplexer.
+
+    Serves a large set of registers through several :class:`Multiplexer` banks joined by
+    a :class:`Decoder`, such that no multiplexer has to decode more than a small amount of
+    addresses. A single multiplexer serving thousands of registers has a read data fan-in and
+    an address decoder as large as the register set, which limit the clock frequency it can reach.
+
+    Banking
+    -------
+
+    Registers are partitioned into banks when the layout of the multiplexer is first needed, i.e.
+    when any of :attr:`bus` or :meth:`banks` is accessed, or when the multiplexer is elaborated.
+    After that, no more registers can be added.
+
+    Each bank holds a run of consecutive registers, in the order in which they were added, that
+    spans at most ``2 ** bank_addr_width`` addresses. The amount of banks is the least possible,
+    and registers are spread among them such that the largest bank is as small as possible.
+    Each bank is placed in its own window of ``2 ** bank_addr_width`` addresses, so that
+    the decoder only compares the address bits above ``bank_addr_width``.
+
+    The memory map of :attr:`bus` contains the windows of every bank, such that
+    :meth:`..memory.MemoryMap.all_resources` and :meth:`..memory.MemoryMap.find_resource` give
+    the address of each register as if it were served by a single multiplexer.
+
+    Latency
+    -------
+
+    The latency is that of a :class:`Multiplexer`.
+
+    Parameters
+    ----------
+    addr_width : int
+        Address width. See :class:`Interface`.
+    data_width : int
+        Data width. See :class:`Interface`.
+    alignment : int
+        Register alignment. See :class:`Interface`.
+    bank_addr_width : int
+        Address width of each bank. Must be less than or equal to ``addr_width``.
+
+    Attributes
+    ----------
+    bus : :class:`Interface`
+        CSR bus providing access to registers.
+    """
+    def __init__(self, *, addr_width, data_width, alignment=0, bank_addr_width=6):
+        if not isinstance(bank_addr_width, int) or bank_addr_width <= 0:
+            raise ValueError("Bank address width must be a positive integer, not {!r}"
+                             .format(bank_addr_width))
+        if not isinstance(addr_width, int) or bank_addr_width > addr_width:
+            raise ValueError("Bank address width must be less than or equal to address width "
+                             "{!r}, not {!r}"
+                             .format(addr_width, bank_addr_width))
+        self._decoder   = Decoder(addr_width=addr_width, data_width=data_width)
+        self._alignment = alignment
+        self._bank_addr_width = bank_addr_width
+        self._elements  = []
+        self._banks     = None
+
+    @property
+    def bus(self):
+        self._freeze()
+        return self._decoder.bus
+
+    def add(self, element):
+        """Add a register.
+
+        Return value
+        ------------
+        The register that was added.
+
+        Exceptions
+        ----------
+        Raises :exn:`ValueError` if the layout of the multiplexer has already been computed, or if
+        the register spans more addresses than a bank.
+        """
+        if not isinstance(element, Element):
+            raise TypeError("Element must be an instance of csr.Element, not {!r}"
+                            .format(element))
+        if self._banks is not None:
+            raise ValueError("Cannot add element {!r} because the bank layout has already been "
+                             "computed"
+                             .format(element.name))
+        if any(element is other for other in self._elements):
+            raise ValueError("Element {!r} is already added"
+                             .format(element.name))
+        if self._size(element) > 1 << self._bank_addr_width:
+            raise ValueError("Element {!r} spans {} addresses, which is more than the {} addresses "
+                             "of a bank"
+                             .format(element.name, self._size(element), 1 << self._bank_addr_width))
+        self._elements.append(element)
+        return element
+
+    def _size(self, element):
+        data_width = self._decoder.bus.data_width
+        size = (element.width + data_width - 1) // data_width
+        return MemoryMap._align_up(size, self._alignment)
+
+    def _partition(self, limit):
+        # Split the registers into runs spanning at most ``limit`` addresses each, greedily.
+        runs = [[]]
+        used = 0
+        for element in self._elements:
+            size = self._size(element)
+            if runs[-1] and used + size > limit:
+                runs.append([])
+                used = 0
+            runs[-1].append(element)
+            used += size
+        return runs
+
+    def _freeze(self):
+        if self._banks is not None:
+            return
+
+        # Filling banks greedily gives the least amount of banks. Among the partitions with that
+        # amount of banks, find the one whose largest bank is smallest, by bisecting the limit.
+        bank_size = 1 << self._bank_addr_width
+        count = len(self._partition(bank_size))
+        low   = max([self._size(element) for element in self._elements], default=0)
+        high  = bank_size
+        while low < high:
+            middle = (low + high) // 2
+            if len(self._partition(middle)) <= count:
+                high = middle
+            else:
+                low = middle + 1
+
+        self._banks = []
+        if not self._elements:
+            return
+        for index, run in enumerate(self._partition(high)):
+            mux = Multiplexer(addr_width=self._bank_addr_width,
+                              data_width=self._decoder.bus.data_width,
+                              alignment=self._alignment)
+            for element in run:
+                mux.add(element)
+            start, end, _ = self._decoder.add(mux.bus, addr=index * bank_size)
+            self._banks.append((mux, (start, end)))
+
+    def banks(self):
+        """Iterate banks.
+
+        Yield values
+        ------------
+        A tuple ``multiplexer, (start, end)`` describing each bank and the address range of its
+        window, in ascending order of address.
+        """
+        self._freeze()
+        yield from self._banks
+
+    def elaborate(self, platform):
+        self._freeze()
+
+        m = Module()
+        m.submodules.decoder = self._decoder
+        for index, (mux, _) in enumerate(self._banks):
+            m.submodules["bank_{}".format(index)] = mux
+        return m
+
+
+class DecoderTree(_DecoderTree):
+    """CSR bus decoder tree.
+
+    Connects many subordinate CSR buses through a hierarchy of :class:`Decoder`s, in which no
+    decoder has more than ``max_fanout`` windows. See :class:`..interconnect.DecoderTree` for
+    the layout of the tree.
+
+    Latency
+    -------
+
+    The tree is combinatorial, and adds no latency. Unlike :class:`..wishbone.DecoderTree`, it
+    cannot have register slices: the CSR bus has no handshake, and its initiators, e.g.
+    :class:`..csr.wishbone.WishboneCSRBridge`, rely on read data being returned 1 cycle after
+    ``r_stb`` is asserted.
+
+    Parameters
+    ----------
+    addr_width : int
+        Address width. See :class:`Interface`.
+    data_width : int
+        Data width. See :class:`Interface`.
+    alignment : int
+        Window alignment. See :class:`Interface`.
+    max_fanout : int
+        Largest amount of windows of any decoder. Must be at least 2.
+
+    Attributes
+    ----------
+    bus : :class:`Interface`
+        CSR bus providing access to subordinate buses.
+    """
+    def __init__(self, *, addr_width, data_width, alignment=0, max_fanout=16):
+        self._decoder_params = dict(data_width=data_width, alignment=alignment)
+        super().__init__(Decoder(addr_width=addr_width, **self._decoder_params),
+                         max_fanout=max_fanout)
+
+    def _new_decoder(self, map_addr_width):
+        return Decoder(addr_width=map_addr_width, **self._decoder_params)
+
+    def add(self, sub_bus, *, addr=None):
+        """Add a window to a subordinate bus.
+
+        See :meth:`Decoder.add` for details.
+
+        Exceptions
+        ----------
+        Raises :exn:`ValueError` if the layout of the tree has already been computed.
+        """
+        return self._add_sub_bus(sub_bus, addr, dict())
@@ -2,6 +2,7 @@ from nmigen import *
 from nmigen.utils import log2_int
 
 from . import Interface as CSRInterface
+from ..latency import Latency
 from ..wishbone import Interface as WishboneInterface
 
 
@@ -19,6 +20,9 @@ class WishboneCSRBridge(Elaboratable):
 
     Reads and writes always take ``self.data_width // csr_bus.data_width + 1`` cycles to complete,
     regardless of the select inputs. Write side effects occur simultaneously with acknowledgement.
+    The bridge declares ``self.data_width // csr_bus.data_width`` cycles of added latency in
+    the memory map of :attr:`wb_bus`, the remaining cycle being the latency of the CSR bus itself;
+    see :class:`..latency.LatencyAnalysis`.
 
     Parameters
     ----------
@@ -53,6 +57,9 @@ class WishboneCSRBridge(Elaboratable):
         # no width conversion is performed, even if the Wishbone data width is greater.
         self.wb_bus.memory_map.add_window(self.csr_bus.memory_map)
 
+        ratio = data_width // csr_bus.data_width
+        self.wb_bus.memory_map.latency = Latency(read=ratio, write=ratio)
+
     def elaborate(self, platform):
         csr_bus = self.csr_bus
         wb_bus  = self.wb_bus
@@ -0,0 +1,258 @@
+import hashlib
+import io
+import os
+import pickle
+import warnings
+
+import nmigen
+from nmigen import *
+from nmigen.hdl.ast import Shape
+from nmigen.hdl.ir import Fragment
+
+
+__all__ = ["ElaborationCache"]
+
+
+_source_digest = None
+
+
+def _get_source_digest():
+    # Cached fragments are only valid for the code that produced them, so the sources of this
+    # package and the version of nMigen are a part of every key.
+    global _source_digest
+    if _source_digest is None:
+        digest = hashlib.sha256(nmigen.__version__.encode())
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        for dirpath, dirnames, filenames in os.walk(package_dir):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if not filename.endswith(".py"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                digest.update(os.path.relpath(path, package_dir).encode())
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+        _source_digest = digest.hexdigest()
+    return _source_digest
+
+
+def _elaborate_as(component, fragment, platform=None):
+    # Elaborate ``component`` through :meth:`Fragment.get`, with ``fragment`` as the result instead
+    # of that of its ``elaborate()`` method. This is how components whose logic is provided
+    # by other means (e.g. a cached fragment, or a simulation model) are marked as used, so that
+    # nMigen does not warn about them.
+    component.elaborate = lambda platform: fragment
+    try:
+        return Fragment.get(component, platform)
+    finally:
+        del component.elaborate
+
+
+class _FragmentPickler(pickle.Pickler):
+    def __init__(self, file, ports):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._ports    = {id(port): index for index, port in enumerate(ports)}
+        self._internal = dict()
+        self.signals   = []
+
+    def persistent_id(self, obj):
+        if not isinstance(obj, Signal):
+            return None
+        if id(obj) in self._ports:
+            return "port", self._ports[id(obj)]
+        if id(obj) not in self._internal:
+            self._internal[id(obj)] = len(self.signals)
+            self.signals.append((obj.width, obj.signed, obj.name, obj.reset, obj.reset_less,
+                                 dict(obj.attrs)))
+        return "signal", self._internal[id(obj)]
+
+
+class _FragmentUnpickler(pickle.Unpickler):
+    def __init__(self, file, ports, signals):
+        super().__init__(file)
+        self._ports   = ports
+        self._signals = signals
+
+    def persistent_load(self, pid):
+        kind, index = pid
+        if kind == "port":
+            return self._ports[index]
+        return self._signals[index]
+
+
+class ElaborationCache:
+    """Elaboration result cache.
+
+    Bus components such as :class:`..csr.Multiplexer`, :class:`..csr.Decoder` and
+    :class:`..wishbone.Decoder` are fully described by their parameters and memory maps, and
+    a SoC often contains many identical instances of them. The cache memoizes the fragment
+    elaborated for such a component, and reuses it for any later component with the same
+    description instead of elaborating it again.
+
+    Usage
+    -----
+
+    Components are wrapped with the cache where they are added to the design, e.g.
+    ``m.submodules.mux = cache(mux)``. A component can be cached if it provides
+    a ``_elaboration_signature()`` method, returning a tuple ``key, ports``, where ``key`` is
+    a tuple of plain values describing the component, including its memory map, and ``ports``
+    is a list of the signals through which the component is connected to the rest of the design,
+    in an order determined by ``key``. The elaborated fragment must not depend on the platform.
+
+    Only fragments without subfragments, clock domains or ports, and whose statements can be
+    pickled, can be cached. A component whose fragment cannot be cached is elaborated every time
+    it is used, and a warning is emitted the first time.
+
+    Keys
+    ----
+
+    Components are looked up by a SHA-256 digest of the type of the component, its key,
+    the version of nMigen and the sources of this package. Signals of a cached fragment other than
+    its ports are replaced with new ones each time it is reused, so that instances are independent.
+
+    Persistence
+    -----------
+
+    If ``path`` is not ``None``, cached fragments are also stored in that directory, one file per
+    digest, and are reused by later processes. Files are written with :mod:`pickle`; the directory
+    must not be writable by untrusted users. Files that cannot be read are ignored.
+
+    Parameters
+    ----------
+    path : str or None
+        Directory where cached fragments are persisted. Created if it does not exist.
+
+    Attributes
+    ----------
+    hits : int
+        Amount of components whose elaboration was avoided.
+    misses : int
+        Amount of components that were elaborated.
+    """
+    def __init__(self, *, path=None):
+        if path is not None and not isinstance(path, str):
+            raise TypeError("Cache path must be a string or None, not {!r}"
+                            .format(path))
+        self.path    = path
+        self.hits    = 0
+        self.misses  = 0
+        self._frags  = dict()
+        self._uncacheable = set()
+
+    def __call__(self, component):
+        """Wrap a component.
+
+        Return value
+        ------------
+        An elaboratable that elaborates ``component`` through the cache.
+        """
+        if not hasattr(component, "_elaboration_signature"):
+            raise TypeError("Component {!r} does not support elaboration caching"
+                            .format(component))
+        return _CachedElaboratable(self, component)
+
+    def digest(self, component):
+        """Compute the cache key of a component.
+
+        Return value
+        ------------
+        A hexadecimal string.
+        """
+        key, _ = component._elaboration_signature()
+        return self._digest(component, key)
+
+    def _digest(self, component, key):
+        material = (type(component).__module__, type(component).__qualname__,
+                    _get_source_digest(), key)
+        return hashlib.sha256(repr(material).encode()).hexdigest()
+
+    def _file_path(self, digest):
+        return os.path.join(self.path, "{}.pickle".format(digest))
+
+    def _dump(self, fragment, ports):
+        if fragment.subfragments or fragment.domains or fragment.ports:
+            return None
+        stmts   = list(fragment.statements)
+        drivers = [(domain, list(signals)) for domain, signals in fragment.drivers.items()]
+        buffer  = io.BytesIO()
+        pickler = _FragmentPickler(buffer, ports)
+        try:
+            pickler.dump((stmts, drivers))
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return None
+        return pickle.dumps((pickler.signals, buffer.getvalue()),
+                            protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _load(self, data, ports):
+        signals, frag_data = pickle.loads(data)
+        signals = [Signal(Shape(width, signed), name=name, reset=reset, reset_less=reset_less,
+                          attrs=attrs)
+                   for width, signed, name, reset, reset_less, attrs in signals]
+        stmts, drivers = _FragmentUnpickler(io.BytesIO(frag_data), ports, signals).load()
+
+        fragment = Fragment()
+        fragment.add_statements(stmts)
+        for domain, signals in drivers:
+            for signal in signals:
+                fragment.add_driver(signal, domain)
+        return fragment
+
+    def get(self, component, platform=None):
+        """Elaborate a component through the cache.
+
+        Return value
+        ------------
+        A :class:`Fragment`.
+        """
+        key, ports = component._elaboration_signature()
+        digest     = self._digest(component, key)
+
+        data = self._frags.get(digest)
+        if data is None and self.path is not None:
+            try:
+                with open(self._file_path(digest), "rb") as f:
+                    data = f.read()
+            except OSError:
+                pass
+        if data is not None:
+            try:
+                fragment = self._load(data, ports)
+            except Exception:
+                # A corrupted or incompatible persisted fragment; elaborate the component instead.
+                self._frags.pop(digest, None)
+            else:
+                self._frags[digest] = data
+                self.hits += 1
+                return _elaborate_as(component, fragment, platform)
+
+        self.misses += 1
+        fragment = Fragment.get(component, platform)
+        data = self._dump(fragment, ports)
+        if data is None:
+            if digest not in self._uncacheable:
+                self._uncacheable.add(digest)
+                warnings.warn("Component {!r} cannot be cached, because its fragment has "
+                              "subfragments, clock domains or ports, or cannot be pickled"
+                              .format(component), stacklevel=2)
+        else:
+            self._frags[digest] = data
+            if self.path is not None:
+                os.makedirs(self.path, exist_ok=True)
+                temp_path = self._file_path(digest) + ".{}.tmp".format(os.getpid())
+                with open(temp_path, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, self._file_path(digest))
+        return fragment
+
+    def clear(self):
+        """Forget the fragments cached in this process. Persisted fragments are kept."""
+        self._frags.clear()
+
+
+class _CachedElaboratable(Elaboratable):
+    def __init__(self, cache, component):
+        self.cache     = cache
+        self.component = component
+
+    def elaborate(self, platform):
+        return self.cache.get(self.component, platform)
@@ -0,0 +1,199 @@
+import enum
+from nmigen import *
+from nmigen.utils import bits_for
+
+from .csr.bus import Element, Multiplexer
+
+
+__all__ = ["Source", "EventManager"]
+
+
+class Source(Record):
+    class Trigger(enum.Enum):
+        """Event trigger mode."""
+        LEVEL = "level"
+        RISE  = "rise"
+        FALL  = "fall"
+
+    """Event source.
+
+    Trigger modes
+    -------------
+
+    * ``"level"``: the event is pending while ``i`` is asserted, and until it is cleared.
+    * ``"rise"``: the event becomes pending when ``i`` rises, and remains pending until it is
+      cleared.
+    * ``"fall"``: the event becomes pending when ``i`` falls, and remains pending until it is
+      cleared.
+
+    Parameters
+    ----------
+    trigger : :class:`Trigger`
+        Trigger mode.
+    name : str
+        Name of the underlying record.
+
+    Attributes
+    ----------
+    i : Signal()
+        Input line, driven by the peripheral.
+    """
+    def __init__(self, *, trigger="level", name=None, src_loc_at=0):
+        if not isinstance(trigger, Source.Trigger) and trigger not in ("level", "rise", "fall"):
+            raise ValueError("Trigger mode must be one of \"level\", \"rise\", or \"fall\", "
+                             "not {!r}"
+                             .format(trigger))
+        self.trigger = Source.Trigger(trigger)
+
+        super().__init__([("i", 1)], name=name, src_loc_at=1 + src_loc_at)
+
+    # FIXME: get rid of this
+    __hash__ = object.__hash__
+
+
+class EventManager(Elaboratable):
+    """Event manager.
+
+    Gathers events from many sources into packed pending and enable registers, and raises
+    an interrupt request while any enabled event is pending. The source of an interrupt can be
+    determined by reading a single register, ``highest``.
+
+    Events are numbered in the order their sources were added, starting from 0. An event with
+    a lower number has a higher priority.
+
+    Control and status registers
+    ----------------------------
+
+    * ``pending`` (W1C): bit *n* is set while event *n* is pending; writing 1 to it clears
+      the event. An event that is cleared while its level-triggered source is asserted becomes
+      pending again.
+    * ``enable`` (R/W): bit *n* enables event *n* to raise the interrupt request.
+    * ``highest`` (R/O): one plus the number of the enabled pending event with the highest
+      priority, or 0 if there is none.
+
+    Each register is a separate :class:`..csr.Element`, so that writes to one of them never affect
+    the others. Registers wider than the CSR bus are read and written atomically, as usual.
+
+    Sources are added until the layout of the registers is first needed, i.e. when
+    :attr:`csr_bus` is accessed or the event manager is elaborated.
+
+    Parameters
+    ----------
+    csr_data_width : int
+        Data width of the CSR bus.
+
+    Attributes
+    ----------
+    csr_bus : :class:`..csr.Interface`
+        CSR bus providing access to the registers.
+    irq : Signal()
+        Interrupt request. Asserted while any enabled event is pending.
+    """
+    def __init__(self, *, csr_data_width=8):
+        if not isinstance(csr_data_width, int) or csr_data_width <= 0:
+            raise ValueError("CSR data width must be a positive integer, not {!r}"
+                             .format(csr_data_width))
+        self.csr_data_width = csr_data_width
+        self.irq = Signal()
+
+        self._sources = []
+        self._mux     = None
+
+    def add(self, source):
+        """Add an event source.
+
+        Return value
+        ------------
+        The number of the event.
+
+        Exceptions
+        ----------
+        Raises :exn:`ValueError` if the register layout has already been computed.
+        """
+        if not isinstance(source, Source):
+            raise TypeError("Event source must be an instance of event.Source, not {!r}"
+                            .format(source))
+        if self._mux is not None:
+            raise ValueError("Cannot add event source {!r} because the register layout has "
+                             "already been computed"
+                             .format(source))
+        if any(source is other for other in self._sources):
+            raise ValueError("Event source {!r} is already added"
+                             .format(source))
+        self._sources.append(source)
+        return len(self._sources) - 1
+
+    def sources(self):
+        """Iterate event sources.
+
+        Yield values
+        ------------
+        A tuple ``number, source`` for each event source, in ascending order of the event number.
+        """
+        yield from enumerate(self._sources)
+
+    def _freeze(self):
+        if self._mux is not None:
+            return
+        if not self._sources:
+            raise ValueError("Event manager has no event sources")
+
+        count = len(self._sources)
+        self._pending = Element(count, "rw", name="pending")
+        self._enable  = Element(count, "rw", name="enable")
+        self._highest = Element(bits_for(count), "r", name="highest")
+
+        elements = [self._pending, self._enable, self._highest]
+        chunks = sum((elem.width + self.csr_data_width - 1) // self.csr_data_width
+                     for elem in elements)
+        self._mux = Multiplexer(addr_width=max(1, bits_for(chunks - 1)),
+                                data_width=self.csr_data_width)
+        for elem in elements:
+            self._mux.add(elem)
+
+    @property
+    def csr_bus(self):
+        self._freeze()
+        return self._mux.bus
+
+    def elaborate(self, platform):
+        self._freeze()
+
+        m = Module()
+        m.submodules.mux = self._mux
+
+        pending = Signal(len(self._sources))
+        enable  = Signal(len(self._sources))
+        trigger = Signal(len(self._sources))
+
+        for number, source in self.sources():
+            if source.trigger == Source.Trigger.LEVEL:
+                m.d.comb += trigger[number].eq(source.i)
+            else:
+                i_prev = Signal(name="{}__prev".format(source.name or "event_{}".format(number)))
+                m.d.sync += i_prev.eq(source.i)
+                if source.trigger == Source.Trigger.RISE:
+                    m.d.comb += trigger[number].eq(~i_prev & source.i)
+                else:
+                    m.d.comb += trigger[number].eq(i_prev & ~source.i)
+
+        # If an event is triggered and cleared in the same cycle, it remains pending.
+        clear = Mux(self._pending.w_stb, self._pending.w_data, 0)
+        m.d.sync += pending.eq(pending & ~clear | trigger)
+        with m.If(self._enable.w_stb):
+            m.d.sync += enable.eq(self._enable.w_data)
+
+        active = Signal(len(self._sources))
+        m.d.comb += [
+            self._pending.r_data.eq(pending),
+            self._enable.r_data.eq(enable),
+            active.eq(pending & enable),
+            self.irq.eq(active.any()),
+        ]
+
+        # Later assignments take precedence, so the event with the lowest number is assigned last.
+        for number in reversed(range(len(self._sources))):
+            with m.If(active[number]):
+                m.d.comb += self._highest.r_data.eq(number + 1)
+
+        return m
@@ -0,0 +1,5 @@
+"""Host-side tools.
+
+The modules in this package run on the host rather than describe hardware, and do not depend on
+nMigen.
+"""
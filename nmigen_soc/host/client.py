@@ -0,0 +1,261 @@
+from collections import OrderedDict
+
+from .transport import Transport
+
+
+__all__ = ["Register", "Pending", "Batch", "RegisterClient"]
+
+
+class Register:
+    """Register accessor.
+
+    Describes a register of a :class:`RegisterClient`, as found in its memory map. Registers
+    wider than the data width of the bus span consecutive addresses, least significant bits
+    first, and are always accessed as a whole, from the lowest address to the highest one; this
+    is the order in which a :class:`..csr.Multiplexer` makes multi-chunk accesses atomic.
+
+    Attributes
+    ----------
+    name : str
+        Name of the register.
+    resource : object
+        Resource of the memory map, e.g. a :class:`..csr.Element`.
+    addr : int
+        Address of the register.
+    size : int
+        Amount of addresses spanned by the register.
+    width : int
+        Width of the register.
+    access : str
+        Access mode of the register: ``"r"``, ``"w"`` or ``"rw"``.
+    """
+    def __init__(self, client, name, resource, start, end, chunk_width):
+        self._client      = client
+        self._chunk_width = chunk_width
+        self.name     = name
+        self.resource = resource
+        self.addr     = start
+        self.size     = end - start
+        self.width    = getattr(resource, "width", self.size * chunk_width)
+        access        = getattr(resource, "access", "rw")
+        self.access   = getattr(access, "value", access)
+
+    def _read_ops(self):
+        if "r" not in self.access:
+            raise ValueError("Register {!r} is write-only"
+                             .format(self.name))
+        return [("r", self.addr + index) for index in range(self.size)]
+
+    def _write_ops(self, value):
+        if "w" not in self.access:
+            raise ValueError("Register {!r} is read-only"
+                             .format(self.name))
+        if not isinstance(value, int) or value < 0 or value >= 1 << self.width:
+            raise ValueError("Value of register {!r} must be a non-negative integer that fits "
+                             "in {} bits, not {!r}"
+                             .format(self.name, self.width, value))
+        mask = (1 << self._chunk_width) - 1
+        return [("w", self.addr + index, (value >> (index * self._chunk_width)) & mask)
+                for index in range(self.size)]
+
+    def _merge(self, chunks):
+        value = 0
+        for index, chunk in enumerate(chunks):
+            value |= chunk << (index * self._chunk_width)
+        return value & ((1 << self.width) - 1)
+
+    def read(self):
+        """Read the register, in a batch of its own.
+
+        Return value
+        ------------
+        The value of the register.
+        """
+        with self._client.batch() as batch:
+            pending = batch.read(self)
+        return pending.value
+
+    def write(self, value):
+        """Write the register, in a batch of its own."""
+        with self._client.batch() as batch:
+            batch.write(self, value)
+
+    def __repr__(self):
+        return "Register({!r}, addr={:#x}, width={}, access={!r})".format(
+            self.name, self.addr, self.width, self.access)
+
+
+class Pending:
+    """Result of a queued read.
+
+    Attributes
+    ----------
+    register : :class:`Register`
+        Register that is read.
+    value : int
+        Value read. Only available once the batch is committed.
+    """
+    def __init__(self, register):
+        self.register = register
+        self._value   = None
+
+    @property
+    def value(self):
+        if self._value is None:
+            raise ValueError("Read of register {!r} has not been committed yet"
+                             .format(self.register.name))
+        return self._value
+
+    def __repr__(self):
+        return "Pending({!r}, value={!r})".format(self.register.name, self._value)
+
+
+class Batch:
+    """Batch of register accesses.
+
+    Reads and writes are queued, and performed in order, in a single call to
+    :meth:`Transport.execute` when the batch is committed. Used as a context manager, a batch is
+    committed on exit, unless an exception is raised.
+    """
+    def __init__(self, client):
+        self._client  = client
+        self._ops     = []
+        self._reads   = []
+
+    def _register(self, register):
+        if isinstance(register, Register):
+            return register
+        return self._client[register]
+
+    def read(self, register):
+        """Queue a read.
+
+        Arguments
+        ---------
+        register : :class:`Register` or str or object
+            Register, or its name or resource.
+
+        Return value
+        ------------
+        A :class:`Pending` holding the value once the batch is committed.
+        """
+        register = self._register(register)
+        self._ops.extend(register._read_ops())
+        pending = Pending(register)
+        self._reads.append(pending)
+        return pending
+
+    def write(self, register, value):
+        """Queue a write.
+
+        Arguments
+        ---------
+        register : :class:`Register` or str or object
+            Register, or its name or resource.
+        value : int
+            Value to write.
+        """
+        register = self._register(register)
+        self._ops.extend(register._write_ops(value))
+
+    def __len__(self):
+        return len(self._ops)
+
+    def commit(self):
+        """Perform the queued accesses, and empty the batch."""
+        ops, reads = self._ops, self._reads
+        self._ops, self._reads = [], []
+        if not ops:
+            return
+        chunks = iter(self._client.transport.execute(ops))
+        for pending in reads:
+            pending._value = pending.register._merge(
+                [next(chunks) for _ in range(pending.register.size)])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+
+
+class RegisterClient:
+    """Host-side register access client.
+
+    Provides an accessor for each named resource of a memory map, e.g. each :class:`..csr.Element`
+    added to a :class:`..csr.Multiplexer`, and performs accesses through a :class:`Transport`.
+    Registers are looked up by name, as ``client["name"]`` or ``client.name``, or by resource.
+    Names that are shared by several resources of the memory map cannot be used for lookup.
+
+    Accesses are best queued in a :class:`Batch`, which costs a single round trip to the target
+    regardless of the amount of accesses. For example::
+
+        with client.batch() as batch:
+            status = batch.read("status")
+            batch.write("ctrl", 1)
+        print(status.value)
+
+    Parameters
+    ----------
+    memory_map : :class:`..memory.MemoryMap`
+        Memory map describing the registers. Its data width is the data width of the bus
+        the transport accesses.
+    transport : :class:`Transport`
+        Transport performing the accesses.
+    """
+    def __init__(self, memory_map, transport):
+        if not isinstance(transport, Transport):
+            raise TypeError("Transport must be an instance of Transport, not {!r}"
+                            .format(transport))
+        self.memory_map = memory_map
+        self.transport  = transport
+
+        self._registers = OrderedDict()
+        self._by_name   = dict()
+        for resource, (start, end, width) in memory_map.all_resources():
+            name = getattr(resource, "name", None)
+            if name is None:
+                name = str(resource)
+            register = Register(self, name, resource, start, end, width)
+            self._registers[id(resource)] = register
+            self._by_name[name] = None if name in self._by_name else register
+
+    def registers(self):
+        """Iterate registers.
+
+        Yield values
+        ------------
+        A :class:`Register` for each resource, in ascending order of its address.
+        """
+        yield from self._registers.values()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in self._by_name:
+                raise KeyError(key)
+            register = self._by_name[key]
+            if register is None:
+                raise KeyError("Register name {!r} is ambiguous; look the register up by its "
+                               "resource instead"
+                               .format(key))
+            return register
+        return self._registers[id(key)]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError as e:
+            raise AttributeError("Register client has no register {!r}"
+                                 .format(name)) from e
+
+    def batch(self):
+        """Start a batch.
+
+        Return value
+        ------------
+        An empty :class:`Batch`.
+        """
+        return Batch(self)
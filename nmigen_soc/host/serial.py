@@ -0,0 +1,170 @@
+from ..protocol import Command, Status
+from .transport import Transport
+
+
+__all__ = ["Command", "Status", "SerialTransport"]
+
+
+class SerialTransport(Transport):
+    """Serial transport.
+
+    Performs accesses through a :class:`..stream.wishbone.StreamWishboneBridge` connected to
+    a byte stream, e.g. a UART. Runs of accesses of the same kind to consecutive addresses, or to
+    the same address, are merged into burst commands, and all the commands of a batch are sent
+    before any response is awaited.
+
+    Protocol
+    --------
+
+    All integers are little endian. A command is made of:
+
+    * a command byte; see :class:`..protocol.Command`;
+    * a byte holding the amount of words to access, minus 1;
+    * the word address of the first access, in ``(addr_width + 7) // 8`` bytes;
+    * for writes, the data of each word, in ``data_width // 8`` bytes.
+
+    Words after the first one are accessed at the same address, or, if auto-increment is
+    requested, at consecutive addresses. The response to a command is made of the data of each
+    word read, if any, followed by a status byte; see :class:`..protocol.Status`. A word
+    terminated with an error reads as 0, and the status reports an error if any word of
+    the command was terminated with an error.
+
+    Since the length of a response only depends on its command, any amount of commands may be
+    sent without waiting for their responses, which are returned in order. The transport sends
+    a batch as a whole, unless its responses exceed ``max_pending`` bytes.
+
+    Parameters
+    ----------
+    port : file-like object
+        Unbuffered binary stream connected to the bridge, e.g. an instance of
+        :class:`serial.Serial`, a pseudo-terminal opened with ``open(path, "r+b", buffering=0)``,
+        or a socket opened with ``sock.makefile("rwb", buffering=0)``.
+    addr_width : int
+        Address width of the bus of the bridge.
+    data_width : int
+        Data width of the bus of the bridge.
+    max_pending : int
+        Maximum amount of response bytes awaited at any time. Must not exceed the amount of data
+        buffered on the path from the bridge to the host.
+
+    Attributes
+    ----------
+    commands : int
+        Amount of commands sent so far.
+    """
+    def __init__(self, port, *, addr_width, data_width=32, max_pending=1024):
+        super().__init__()
+        if not isinstance(addr_width, int) or addr_width < 0:
+            raise ValueError("Address width must be a non-negative integer, not {!r}"
+                             .format(addr_width))
+        if data_width not in (8, 16, 32, 64):
+            raise ValueError("Data width must be one of 8, 16, 32, 64, not {!r}"
+                             .format(data_width))
+        if not isinstance(max_pending, int) or max_pending < 1 + data_width // 8:
+            raise ValueError("Maximum amount of pending response bytes must be an integer greater "
+                             "than or equal to {}, not {!r}"
+                             .format(1 + data_width // 8, max_pending))
+        self.port        = port
+        self.addr_width  = addr_width
+        self.data_width  = data_width
+        self.max_pending = max_pending
+        self.commands    = 0
+
+    def _bursts(self, ops):
+        # The response to a read burst must fit in `max_pending` bytes.
+        max_reads = min(256, (self.max_pending - 1) // (self.data_width // 8))
+        start = 0
+        while start < len(ops):
+            limit = max_reads if ops[start][0] == "r" else 256
+            step  = None
+            end   = start + 1
+            while end < len(ops) and end - start < limit and ops[end][0] == ops[start][0]:
+                delta = ops[end][1] - ops[end - 1][1]
+                if step is None and delta in (0, 1):
+                    step = delta
+                if delta != step:
+                    break
+                end += 1
+            yield ops[start:end], step == 1
+            start = end
+
+    def _write(self, data):
+        data = memoryview(data)
+        while data:
+            written = self.port.write(data)
+            data = data[len(data) if written is None else written:]
+        if hasattr(self.port, "flush"):
+            self.port.flush()
+
+    def _read(self, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.port.read(size - len(data))
+            if not chunk:
+                raise ConnectionError("Connection closed")
+            data += chunk
+        return data
+
+    def _execute(self, ops):
+        addr_bytes = (self.addr_width + 7) // 8
+        data_bytes = self.data_width // 8
+        for op in ops:
+            if not 0 <= op[1] < 1 << self.addr_width:
+                raise ValueError("Address {:#x} is outside of the address space"
+                                 .format(op[1]))
+            if op[0] == "w" and not 0 <= op[2] < 1 << self.data_width:
+                raise ValueError("Value {:#x} does not fit in {} bits"
+                                 .format(op[2], self.data_width))
+
+        results = []
+        failed  = None
+        def receive(bursts, size):
+            nonlocal failed
+            data   = self._read(size)
+            offset = 0
+            for burst in bursts:
+                if burst[0][0] == "r":
+                    for _ in burst:
+                        results.append(int.from_bytes(data[offset:offset + data_bytes], "little"))
+                        offset += data_bytes
+                if data[offset] != Status.OK.value and failed is None:
+                    failed = burst[0][1]
+                offset += 1
+
+        # Commands are sent ahead of their responses, but only as long as the responses that are
+        # awaited fit in `max_pending` bytes; otherwise, once the return path is full, the bridge
+        # would stop accepting commands, and the host would block sending them.
+        request = bytearray()
+        pending = []
+        size    = 0
+        for burst, incr in self._bursts(ops):
+            if burst[0][0] == "w":
+                command = Command.WRITE_INCR if incr else Command.WRITE
+                length  = 1
+            else:
+                command = Command.READ_INCR if incr else Command.READ
+                length  = len(burst) * data_bytes + 1
+            if pending and size + length > self.max_pending:
+                self._write(request)
+                receive(pending, size)
+                request, pending, size = bytearray(), [], 0
+            request.append(command.value)
+            request.append(len(burst) - 1)
+            request += burst[0][1].to_bytes(addr_bytes, "little")
+            for op in burst:
+                if op[0] == "w":
+                    request += op[2].to_bytes(data_bytes, "little")
+            pending.append(burst)
+            size += length
+            self.commands += 1
+        if pending:
+            self._write(request)
+            receive(pending, size)
+
+        if failed is not None:
+            raise OSError("Register access to address {:#x} failed"
+                          .format(failed))
+        return results
+
+    def close(self):
+        self.port.close()
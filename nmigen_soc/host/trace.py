@@ -0,0 +1,167 @@
+from collections import namedtuple
+
+
+__all__ = ["TraceEntry", "TraceDecoder"]
+
+
+def _entry_layout(entry_width):
+    """Compute the layout of a delta entry.
+
+    Return value
+    ------------
+    A tuple ``(delta_ts_width, delta_addr_width)``.
+    """
+    payload_width    = entry_width - 3
+    delta_ts_width   = payload_width // 2
+    delta_addr_width = payload_width - delta_ts_width
+    return delta_ts_width, delta_addr_width
+
+
+TraceEntry = namedtuple("TraceEntry", ("timestamp", "addr", "we", "err", "lost", "resource"))
+TraceEntry.__doc__ = """Decoded trace entry.
+
+    Attributes
+    ----------
+    timestamp : int
+        Cycle at which the transaction completed, counted from the start of recording.
+    addr : int
+        Bus address of the transaction.
+    we : bool
+        Whether the transaction was a write.
+    err : bool
+        Whether the transaction was terminated with an error.
+    lost : bool
+        Whether any transactions were dropped right before this one.
+    resource : object or None
+        Resource the address decodes to, if a memory map was provided.
+"""
+
+
+class TraceDecoder:
+    """Trace buffer decoder.
+
+    Decodes the contents of the ring buffer of a :class:`..trace.TraceRecorder`.
+
+    Encoding
+    --------
+
+    The buffer consists of ``entry_width`` wide words. The most significant bits of each word
+    are a tag:
+
+    * ``0``: delta entry. The remaining bits are, from the most significant: ``we``, ``err``,
+      the timestamp delta (unsigned), and the address delta (two's complement), relative to
+      the previous entry. Of the ``entry_width - 3`` delta bits, the address delta gets the larger
+      half.
+    * ``10``: sync entry header. The remaining bits are, from the most significant: ``we``,
+      ``err``, ``lost``, and zero padding. The header is followed by as many extension words as
+      needed to hold the absolute address followed by the absolute timestamp, least significant
+      bits first.
+    * ``11``: sync entry extension word, holding ``entry_width - 2`` payload bits.
+
+    Delta entries preceding the first complete sync entry in the buffer (e.g. because the sync
+    entry they refer to was overwritten) cannot be decoded, and are skipped.
+
+    Parameters
+    ----------
+    entry_width : int
+        Width of buffer words.
+    addr_width : int
+        Width of recorded addresses.
+    timestamp_width : int
+        Width of recorded timestamps.
+    memory_map : :class:`..memory.MemoryMap` or None
+        Memory map used to annotate entries with resources.
+    addr_shift : int
+        Amount of bits recorded addresses are shifted left by before being looked up in
+        ``memory_map``. Used when addresses on the bus are in units larger than the units
+        of the memory map.
+    """
+    def __init__(self, *, entry_width, addr_width, timestamp_width, memory_map=None,
+                 addr_shift=0):
+        if not isinstance(entry_width, int) or entry_width < 5:
+            raise ValueError("Entry width must be an integer greater than or equal to 5, not {!r}"
+                             .format(entry_width))
+        self.entry_width     = entry_width
+        self.addr_width      = addr_width
+        self.timestamp_width = timestamp_width
+        self.memory_map      = memory_map
+        self.addr_shift      = addr_shift
+
+        self._dts_width, self._da_width = _entry_layout(entry_width)
+        ext_bits = entry_width - 2
+        self._ext_count = (addr_width + timestamp_width + ext_bits - 1) // ext_bits
+
+    def _entry(self, timestamp, addr, we, err, lost):
+        resource = None
+        if self.memory_map is not None:
+            resource = self.memory_map.decode_address(addr << self.addr_shift)
+        return TraceEntry(timestamp, addr, bool(we), bool(err), bool(lost), resource)
+
+    def decode(self, words, *, wr_ptr=None, wrapped=False):
+        """Decode buffer contents.
+
+        Arguments
+        ---------
+        words : list of int
+            Contents of the buffer, in address order.
+        wr_ptr : int or None
+            Write pointer of the recorder, i.e. the address of the next word to be written.
+            If ``None``, ``len(words)`` is used.
+        wrapped : bool
+            Whether the write pointer wrapped around, i.e. whether the words at and after
+            ``wr_ptr`` are older than the words before it.
+
+        Return value
+        ------------
+        A list of :class:`TraceEntry`, oldest first.
+        """
+        if wr_ptr is None:
+            wr_ptr = len(words)
+        if wrapped:
+            words = list(words[wr_ptr:]) + list(words[:wr_ptr])
+        else:
+            words = list(words[:wr_ptr])
+
+        w = self.entry_width
+        addr_mask = (1 << self.addr_width) - 1
+        ts_mask   = (1 << self.timestamp_width) - 1
+        ext_bits  = w - 2
+
+        entries   = []
+        timestamp = addr = None
+        index = 0
+        while index < len(words):
+            word = words[index]
+            index += 1
+            if not word >> (w - 1) & 1:
+                if addr is None:
+                    continue
+                we    = word >> (w - 2) & 1
+                err   = word >> (w - 3) & 1
+                dts   = word >> self._da_width & ((1 << self._dts_width) - 1)
+                da    = word & ((1 << self._da_width) - 1)
+                if da & (1 << (self._da_width - 1)):
+                    da -= 1 << self._da_width
+                timestamp = (timestamp + dts) & ts_mask
+                addr      = (addr + da) & addr_mask
+                entries.append(self._entry(timestamp, addr, we, err, lost=False))
+            elif not word >> (w - 2) & 1:
+                we    = word >> (w - 3) & 1
+                err   = word >> (w - 4) & 1
+                lost  = word >> (w - 5) & 1
+                ext   = words[index:index + self._ext_count]
+                if len(ext) < self._ext_count or any(not ext_word >> (w - 2) & 1
+                                                     for ext_word in ext):
+                    # Incomplete sync entry; its extension words will be skipped as orphans.
+                    continue
+                index += self._ext_count
+                payload = 0
+                for ext_index, ext_word in enumerate(ext):
+                    payload |= (ext_word & ((1 << ext_bits) - 1)) << (ext_index * ext_bits)
+                addr      = payload & addr_mask
+                timestamp = payload >> self.addr_width & ts_mask
+                entries.append(self._entry(timestamp, addr, we, err, lost))
+            else:
+                # Orphaned extension word of a sync entry whose header was overwritten.
+                continue
+        return entries
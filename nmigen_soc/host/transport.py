@@ -0,0 +1,330 @@
+import mmap
+import os
+import struct
+
+
+__all__ = ["Transport", "MmapTransport", "SocketTransport", "SimulationTransport", "serve"]
+
+
+class Transport:
+    """Register access transport.
+
+    A transport performs a sequence of register accesses, i.e. a batch, at once. Transports where
+    each batch costs a round trip (e.g. to a board over a network) amortize it over every access
+    in the batch.
+
+    Operations
+    ----------
+
+    Accesses are described by tuples ``("r", addr)`` (read) and ``("w", addr, value)`` (write).
+    Addresses are in units of the data width of the bus, and values are as wide as the data
+    width. Accesses are performed in order.
+
+    Subclasses implement :meth:`_execute`.
+
+    Attributes
+    ----------
+    round_trips : int
+        Amount of batches executed so far.
+    """
+    def __init__(self):
+        self.round_trips = 0
+
+    def execute(self, ops):
+        """Execute a batch of accesses.
+
+        Arguments
+        ---------
+        ops : list of tuple
+            Accesses; see above.
+
+        Return value
+        ------------
+        A list of the values read, in order.
+        """
+        ops = list(ops)
+        for op in ops:
+            if not (isinstance(op, tuple) and
+                    (len(op) == 2 and op[0] == "r" or len(op) == 3 and op[0] == "w")):
+                raise ValueError("Access must be a tuple (\"r\", addr) or (\"w\", addr, value), "
+                                 "not {!r}"
+                                 .format(op))
+        self.round_trips += 1
+        return self._execute(ops)
+
+    def _execute(self, ops): # :nocov:
+        raise NotImplementedError
+
+    def close(self):
+        """Release the resources held by the transport."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class MmapTransport(Transport):
+    """Memory-mapped file transport.
+
+    Accesses a bus mapped into the address space of the host through a file, e.g. ``/dev/mem``
+    or a UIO device. Each access is performed with a single load or store of ``word_size`` bytes,
+    in the byte order of the host.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file.
+    size : int
+        Size of the mapped region, in bytes.
+    offset : int
+        Offset of the mapped region in the file, in bytes. Need not be page aligned.
+    word_size : int
+        Size of each access, in bytes. One of 1, 2, 4, 8.
+    stride : int or None
+        Distance between consecutive addresses, in bytes. Must be a multiple of ``word_size``.
+        If ``None``, defaults to ``word_size``.
+    """
+    _formats = {1: "B", 2: "H", 4: "I", 8: "Q"}
+
+    def __init__(self, path, *, size, offset=0, word_size=4, stride=None):
+        super().__init__()
+        if word_size not in self._formats:
+            raise ValueError("Word size must be one of 1, 2, 4, 8, not {!r}"
+                             .format(word_size))
+        if stride is None:
+            stride = word_size
+        if not isinstance(stride, int) or stride <= 0 or stride % word_size:
+            raise ValueError("Stride must be a positive multiple of the word size {}, not {!r}"
+                             .format(word_size, stride))
+        self.word_size = word_size
+        self.stride    = stride
+        self.size      = size
+
+        # mmap() requires the offset to be aligned to the allocation granularity.
+        self._skew = offset % mmap.ALLOCATIONGRANULARITY
+        fd = os.open(path, os.O_RDWR | getattr(os, "O_SYNC", 0))
+        try:
+            self._mmap = mmap.mmap(fd, self._skew + size, offset=offset - self._skew)
+        finally:
+            os.close(fd)
+        length = (self._skew + size) // word_size * word_size
+        self._words = memoryview(self._mmap)[:length].cast(self._formats[word_size])
+
+    def _index(self, addr):
+        byte_offset = addr * self.stride
+        if not 0 <= byte_offset <= self.size - self.word_size:
+            raise ValueError("Address {:#x} is outside of the mapped region"
+                             .format(addr))
+        # The skew is a multiple of the word size for any naturally aligned region.
+        return (self._skew + byte_offset) // self.word_size
+
+    def _execute(self, ops):
+        results = []
+        for op in ops:
+            if op[0] == "r":
+                results.append(self._words[self._index(op[1])])
+            else:
+                self._words[self._index(op[1])] = op[2]
+        return results
+
+    def close(self):
+        if self._mmap is not None:
+            self._words.release()
+            self._mmap.close()
+            self._mmap = None
+
+
+def _recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed")
+        data += chunk
+    return bytes(data)
+
+
+_HEADER = struct.Struct("<I")
+_OP     = struct.Struct("<BQ")
+_VALUE  = struct.Struct("<Q")
+
+
+def _encode_request(ops):
+    chunks = [_HEADER.pack(len(ops))]
+    for op in ops:
+        chunks.append(_OP.pack(op[0] == "w", op[1]))
+        if op[0] == "w":
+            chunks.append(_VALUE.pack(op[2]))
+    return b"".join(chunks)
+
+
+def serve(sock, transport):
+    """Serve register accesses over a socket.
+
+    Executes the batches sent by a :class:`SocketTransport` connected to ``sock`` through
+    ``transport``, e.g. a :class:`MmapTransport` on the board, until the connection is closed.
+
+    Protocol
+    --------
+
+    All integers are little endian. A request is a 32-bit count of accesses, followed by each
+    access: an 8-bit kind (0 for reads, 1 for writes), a 64-bit address and, for writes, a 64-bit
+    value. A response is an 8-bit status; if it is 0, it is followed by the 64-bit values read,
+    and otherwise, by a 32-bit length and a UTF-8 error message of that length.
+
+    Arguments
+    ---------
+    sock : :class:`socket.socket`
+        Connected socket.
+    transport : :class:`Transport`
+        Transport performing the accesses.
+    """
+    while True:
+        try:
+            header = _recv_exact(sock, _HEADER.size)
+        except ConnectionError:
+            return
+        count, = _HEADER.unpack(header)
+        ops = []
+        for _ in range(count):
+            kind, addr = _OP.unpack(_recv_exact(sock, _OP.size))
+            if kind:
+                value, = _VALUE.unpack(_recv_exact(sock, _VALUE.size))
+                ops.append(("w", addr, value))
+            else:
+                ops.append(("r", addr))
+        try:
+            results = transport.execute(ops)
+        except Exception as e:
+            message = str(e).encode("utf-8")
+            sock.sendall(b"\x01" + _HEADER.pack(len(message)) + message)
+        else:
+            sock.sendall(b"\x00" + b"".join(_VALUE.pack(value) for value in results))
+
+
+class SocketTransport(Transport):
+    """Socket transport.
+
+    Sends each batch to a server, such as :func:`serve`, over a connected stream socket, and waits
+    for the values read. Each batch costs a single round trip. See :func:`serve` for
+    the protocol.
+
+    Parameters
+    ----------
+    sock : :class:`socket.socket`
+        Connected socket. It is closed when the transport is closed.
+    """
+    def __init__(self, sock):
+        super().__init__()
+        self.sock = sock
+
+    def _execute(self, ops):
+        self.sock.sendall(_encode_request(ops))
+        status = _recv_exact(self.sock, 1)
+        if status != b"\x00":
+            length, = _HEADER.unpack(_recv_exact(self.sock, _HEADER.size))
+            raise OSError("Register access failed: {}"
+                          .format(_recv_exact(self.sock, length).decode("utf-8")))
+        reads = sum(1 for op in ops if op[0] == "r")
+        data  = _recv_exact(self.sock, reads * _VALUE.size)
+        return [value for value, in _VALUE.iter_unpack(data)]
+
+    def close(self):
+        self.sock.close()
+
+
+class SimulationTransport(Transport):
+    """Simulation transport.
+
+    Performs accesses on a bus of a design simulated in the same process, by adding a process to
+    the simulator and running it until the accesses are done. The simulator keeps its state
+    between batches.
+
+    The bus may be a :class:`..csr.Interface`, or a :class:`..wishbone.Interface` whose
+    addresses are translated from units of its granularity, as in its memory map. Wishbone
+    accesses are performed as classic cycles selecting a single granule, separated by an idle
+    cycle.
+
+    Parameters
+    ----------
+    sim : :class:`nmigen.back.pysim.Simulator`
+        Simulator of the design, with a clock for ``domain``.
+    bus : :class:`..csr.Interface` or :class:`..wishbone.Interface`
+        Bus on which the accesses are performed.
+    domain : str
+        Clock domain of the bus.
+    """
+    def __init__(self, sim, bus, *, domain="sync"):
+        super().__init__()
+        self.sim    = sim
+        self.bus    = bus
+        self.domain = domain
+
+    def _csr_process(self, ops, results):
+        bus = self.bus
+        for op in ops:
+            if op[0] == "r":
+                yield bus.w_stb.eq(0)
+                yield bus.addr.eq(op[1])
+                yield bus.r_stb.eq(1)
+                yield
+                yield bus.r_stb.eq(0)
+                yield
+                results.append((yield bus.r_data))
+            else:
+                yield bus.addr.eq(op[1])
+                yield bus.w_data.eq(op[2])
+                yield bus.w_stb.eq(1)
+                yield
+        yield bus.w_stb.eq(0)
+        yield
+
+    def _wishbone_process(self, ops, results, errors):
+        from nmigen.back.pysim import Settle
+
+        bus   = self.bus
+        ratio = bus.data_width // bus.granularity
+        mask  = (1 << bus.granularity) - 1
+        for op in ops:
+            word, lane = divmod(op[1], ratio)
+            shift = lane * bus.granularity
+            yield bus.adr.eq(word)
+            yield bus.sel.eq(1 << lane)
+            yield bus.we.eq(op[0] == "w")
+            if op[0] == "w":
+                yield bus.dat_w.eq(op[2] << shift)
+            yield bus.cyc.eq(1)
+            yield bus.stb.eq(1)
+            while True:
+                yield Settle()
+                if (yield bus.ack):
+                    break
+                if hasattr(bus, "err") and (yield bus.err):
+                    errors.append(op[1])
+                    break
+                yield
+            if op[0] == "r":
+                results.append(((yield bus.dat_r) >> shift) & mask)
+            yield
+            yield bus.cyc.eq(0)
+            yield bus.stb.eq(0)
+            yield
+            if errors:
+                return
+
+    def _execute(self, ops):
+        results = []
+        errors  = []
+        def process():
+            if hasattr(self.bus, "cyc"):
+                yield from self._wishbone_process(ops, results, errors)
+            else:
+                yield from self._csr_process(ops, results)
+        self.sim.add_sync_process(process, domain=self.domain)
+        self.sim.run()
+        if errors:
+            raise OSError("Register access to address {:#x} failed"
+                          .format(errors[0]))
+        return results
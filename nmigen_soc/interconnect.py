@@ -0,0 +1,170 @@
+from collections import namedtuple
+from nmigen import *
+
+from .memory import MemoryMap
+from .latency import Latency
+
+
+__all__ = ["DecoderPath", "DecoderTree"]
+
+
+DecoderPath = namedtuple("DecoderPath", ("sub_bus", "start", "end", "depth", "latency"))
+DecoderPath.__doc__ = """Path from the root of a decoder tree to a subordinate bus.
+
+    Attributes
+    ----------
+    sub_bus : object
+        Subordinate bus.
+    start, end : int
+        Address range of the window of the subordinate bus, as seen from the root of the tree.
+    depth : int
+        Amount of decoders traversed by an access to the subordinate bus.
+    latency : :class:`..latency.Latency`
+        Sum of the latencies declared by the decoders traversed by an access to the subordinate
+        bus. The latency of the subordinate bus itself is not included; see
+        :class:`..latency.LatencyAnalysis`.
+"""
+
+
+class DecoderTree(Elaboratable):
+    """Decoder tree.
+
+    Base class of :class:`..wishbone.DecoderTree` and :class:`..csr.DecoderTree`, which connect
+    many subordinate buses through a hierarchy of decoders in which no decoder has more than
+    ``max_fanout`` windows. A single decoder serving hundreds of subordinate buses has a response
+    fan-in as large as the amount of buses, which limits the clock frequency it can reach.
+
+    Layout
+    ------
+
+    Subordinate buses are placed at the same addresses as they would be by a single decoder, i.e.
+    either at the address given when adding them, or at the implicit next address. The layout of
+    the tree is computed when it is first needed, i.e. when any of :attr:`bus` or :meth:`paths`
+    is accessed, or when the tree is elaborated. After that, no more buses can be added.
+
+    Each decoder serves an aligned address range, which it splits into as many aligned parts of
+    equal size as possible while keeping the amount of non-empty parts within ``max_fanout``.
+    A part holding a single subordinate bus is served directly; a part holding several of them
+    is served by a nested decoder. The address ranges of nested decoders are thus disjoint,
+    and every address is decoded by the same subordinate bus as in a single decoder. If
+    subordinate buses are densely packed, the effective fanout is ``max_fanout`` rounded down to
+    a power of 2.
+
+    The memory map of :attr:`bus` contains the windows of the nested decoders, such that
+    :meth:`..memory.MemoryMap.all_resources` and :meth:`..memory.MemoryMap.find_resource` give
+    the same addresses as with a single decoder.
+
+    Parameters
+    ----------
+    root : object
+        Decoder at the root of the tree, created by the subclass.
+    max_fanout : int
+        Largest amount of windows of any decoder. Must be at least 2.
+    """
+    def __init__(self, root, *, max_fanout):
+        if not isinstance(max_fanout, int) or max_fanout < 2:
+            raise ValueError("Maximum fanout must be an integer greater than or equal to 2, "
+                             "not {!r}"
+                             .format(max_fanout))
+        self.max_fanout = max_fanout
+        root_map    = root.bus.memory_map
+        self._root  = root
+        self._plan  = MemoryMap(addr_width=root_map.addr_width, data_width=root_map.data_width,
+                                alignment=root_map.alignment)
+        self._subs  = []
+        self._decoders = None
+        self._paths    = None
+
+    @property
+    def bus(self):
+        self._freeze()
+        return self._root.bus
+
+    def _new_decoder(self, map_addr_width):
+        """Create a nested decoder whose memory map has the given address width."""
+        raise NotImplementedError # :nocov:
+
+    def _add_sub_bus(self, sub_bus, addr, options):
+        # Validate the subordinate bus and allocate its address as a single decoder would.
+        if self._decoders is not None:
+            raise ValueError("Cannot add subordinate bus {!r} because the tree layout has already "
+                             "been computed"
+                             .format(sub_bus))
+        self._root._check_sub_bus(sub_bus, **options)
+        start, end, ratio = self._plan.add_window(sub_bus.memory_map, addr=addr, **options)
+        self._subs.append((start, end, sub_bus, options))
+        return start, end, ratio
+
+    @staticmethod
+    def _enclosing_width(subs):
+        start, end = subs[0][0], subs[-1][1]
+        return (start ^ (end - 1)).bit_length()
+
+    def _split(self, subs, width):
+        # Group subordinate buses by the aligned part of ``2 ** width`` addresses they are in.
+        # Windows are aligned to their size, so a window either lies within a part, or covers
+        # one or more parts by itself.
+        groups = []
+        last_key = None
+        for sub in subs:
+            start, end, _, _ = sub
+            key = (start >> width, (end - 1) >> width)
+            if key != last_key or key[0] != key[1]:
+                groups.append([])
+            groups[-1].append(sub)
+            last_key = key
+        return groups
+
+    def _build(self, decoder, subs, base, depth, latency):
+        latency = latency + decoder.bus.memory_map.latency
+        groups  = [[sub] for sub in subs]
+        if len(subs) > self.max_fanout:
+            # Split the smallest aligned range enclosing every window, such that there are always
+            # at least 2 groups. Splitting it in halves yields exactly 2 groups, which always fits.
+            for part_width in reversed(range(self._enclosing_width(subs))):
+                part_groups = self._split(subs, part_width)
+                if len(part_groups) > self.max_fanout:
+                    break
+                groups = part_groups
+
+        for group in groups:
+            if len(group) == 1:
+                start, end, sub_bus, options = group[0]
+                decoder.add(sub_bus, addr=start - base, **options)
+                self._paths.append(DecoderPath(sub_bus, start, end, depth, latency))
+                continue
+            # Serve the group by a nested decoder of the smallest aligned range enclosing it.
+            sub_width = self._enclosing_width(group)
+            sub_base  = group[0][0] >> sub_width << sub_width
+            sub_decoder = self._new_decoder(sub_width)
+            self._decoders.append(sub_decoder)
+            decoder.add(sub_decoder.bus, addr=sub_base - base)
+            self._build(sub_decoder, group, sub_base, depth + 1, latency)
+
+    def _freeze(self):
+        if self._decoders is not None:
+            return
+        self._decoders = []
+        self._paths    = []
+        subs = sorted(self._subs, key=lambda sub: sub[0])
+        self._build(self._root, subs, 0, 1, Latency(read=0, write=0))
+        self._paths.sort(key=lambda path: path.start)
+
+    def paths(self):
+        """Iterate paths to subordinate buses.
+
+        Yield values
+        ------------
+        A :class:`DecoderPath` for each subordinate bus, in ascending order of address.
+        """
+        self._freeze()
+        yield from self._paths
+
+    def elaborate(self, platform):
+        self._freeze()
+
+        m = Module()
+        m.submodules.root = self._root
+        for index, decoder in enumerate(self._decoders):
+            m.submodules["decoder_{}".format(index)] = decoder
+        return m
@@ -0,0 +1,194 @@
+from collections import namedtuple
+
+from .memory import MemoryMap
+
+
+__all__ = ["Latency", "ResourceLatency", "LatencyAnalysis"]
+
+
+class Latency:
+    """Access latency.
+
+    Latency is measured in clock cycles, from the cycle in which an access is issued until
+    the cycle in which read data is returned, or write side effects occur. Latencies of bus
+    components that are traversed one after another add up.
+
+    Parameters
+    ----------
+    read : int or tuple of (int, int)
+        Read latency, either exact or as a ``(best, worst)`` range.
+    write : int or tuple of (int, int)
+        Write latency, either exact or as a ``(best, worst)`` range.
+
+    Attributes
+    ----------
+    read : tuple of (int, int)
+        Best and worst case read latency.
+    write : tuple of (int, int)
+        Best and worst case write latency.
+    """
+    def __init__(self, *, read, write):
+        self.read  = self._cast(read,  "Read")
+        self.write = self._cast(write, "Write")
+
+    @staticmethod
+    def _cast(value, kind):
+        bounds = (value, value) if isinstance(value, int) else value
+        if (not isinstance(bounds, tuple) or len(bounds) != 2 or
+                not all(isinstance(bound, int) and bound >= 0 for bound in bounds) or
+                bounds[0] > bounds[1]):
+            raise ValueError("{} latency must be a non-negative integer or a (best, worst) tuple "
+                             "of non-negative integers, not {!r}"
+                             .format(kind, value))
+        return bounds
+
+    def __add__(self, other):
+        if not isinstance(other, Latency):
+            return NotImplemented
+        return Latency(read =(self.read[0]  + other.read[0],  self.read[1]  + other.read[1]),
+                       write=(self.write[0] + other.write[0], self.write[1] + other.write[1]))
+
+    def __eq__(self, other):
+        if not isinstance(other, Latency):
+            return NotImplemented
+        return self.read == other.read and self.write == other.write
+
+    def __hash__(self):
+        return hash((self.read, self.write))
+
+    def __repr__(self):
+        return "Latency(read={!r}, write={!r})".format(self.read, self.write)
+
+
+ResourceLatency = namedtuple("ResourceLatency", ("resource", "start", "end", "width", "latency",
+                                                 "complete"))
+ResourceLatency.__doc__ = """Access latency of a resource.
+
+    Attributes
+    ----------
+    resource : object
+        Resource.
+    start, end, width : int
+        Address range of the resource, as returned by :meth:`..memory.MemoryMap.all_resources`.
+    latency : :class:`Latency`
+        Sum of the latencies declared by the memory maps on the path to the resource.
+    complete : bool
+        Whether every memory map on the path to the resource declared its latency. If not,
+        ``latency`` is a lower bound.
+"""
+
+
+class LatencyAnalysis:
+    """Static access latency analysis.
+
+    Walks the hierarchy of memory maps, starting from ``root`` and descending into windows, and
+    computes the latency of accessing every resource from ``root``. The latency of a resource is
+    the sum of the latencies declared in the :attr:`..memory.MemoryMap.latency` attribute of every
+    memory map on the path to it, including ``root`` and the memory map the resource is added to.
+
+    Bus components declare their latency in the memory map of the bus they provide; e.g.
+    a :class:`..csr.Multiplexer` declares the latency of accessing its registers, and
+    a :class:`..csr.wishbone.WishboneCSRBridge` declares the latency it adds to accessing
+    the resources of the CSR bus behind it.
+
+    A resource reachable through several windows, e.g. an element of
+    a :class:`..csr.MultiportMultiplexer`, has a separate address range and latency for each path
+    to it.
+
+    The hierarchy is walked once, when the result is first needed; memory maps must not be changed
+    afterwards.
+
+    Parameters
+    ----------
+    root : :class:`..memory.MemoryMap`
+        Memory map to analyze, usually that of the bus of the initiator whose point of view is of
+        interest.
+    """
+    def __init__(self, root):
+        if not isinstance(root, MemoryMap):
+            raise TypeError("Root memory map must be an instance of MemoryMap, not {!r}"
+                            .format(root))
+        self.root = root
+        self._entries = None
+        self._found   = None
+
+    def _walk(self, memory_map, latency, complete):
+        # Yield every resource reachable from ``memory_map`` with its address range and the latency
+        # of its path, in no particular order.
+        if memory_map.latency is None:
+            complete = False
+        else:
+            latency = latency + memory_map.latency
+        for resource, (start, end) in memory_map.resources():
+            yield resource, (start, end, memory_map.data_width), latency, complete
+        for window, (start, end, ratio) in memory_map.windows():
+            window_range = range(start, end, ratio)
+            for resource, descr, sub_latency, sub_complete in self._walk(window, latency, complete):
+                yield (resource, MemoryMap._translate(*descr, window, window_range), sub_latency,
+                       sub_complete)
+
+    def _analyze(self):
+        if self._entries is not None:
+            return
+        self._entries = [ResourceLatency(resource, start, end, width, latency, complete)
+                         for resource, (start, end, width), latency, complete
+                         in self._walk(self.root, Latency(read=0, write=0), True)]
+        # Address ranges are disjoint, so this is the order of ``all_resources()``.
+        self._entries.sort(key=lambda entry: entry.start)
+        # Resources may override ``==``, so they are looked up by identity.
+        self._found = dict()
+        for entry in self._entries:
+            self._found.setdefault(id(entry.resource), entry)
+
+    def resources(self):
+        """Iterate resources and their latencies.
+
+        Yield values
+        ------------
+        A :class:`ResourceLatency` for each resource, in the order of
+        :meth:`..memory.MemoryMap.all_resources`.
+        """
+        self._analyze()
+        yield from self._entries
+
+    def find(self, resource):
+        """Find the latency of a resource.
+
+        Return value
+        ------------
+        A :class:`ResourceLatency`. If the resource is reachable through several windows, that of
+        its lowest address range.
+
+        Exceptions
+        ----------
+        Raises :exn:`KeyError` if the resource is not found.
+        """
+        self._analyze()
+        try:
+            return self._found[id(resource)]
+        except KeyError:
+            raise KeyError(resource) from None
+
+    def over_budget(self, *, read=None, write=None):
+        """Find resources whose worst case latency exceeds a budget.
+
+        Arguments
+        ---------
+        read : int or None
+            Read latency budget. If ``None``, read latency is not checked.
+        write : int or None
+            Write latency budget. If ``None``, write latency is not checked.
+
+        Return value
+        ------------
+        A list of :class:`ResourceLatency` for resources whose worst case read latency exceeds
+        ``read``, or whose worst case write latency exceeds ``write``.
+        """
+        for kind, budget in (("Read", read), ("Write", write)):
+            if budget is not None and (not isinstance(budget, int) or budget < 0):
+                raise ValueError("{} latency budget must be a non-negative integer or None, "
+                                 "not {!r}"
+                                 .format(kind, budget))
+        return [entry for entry in self.resources()
+                if (read  is not None and entry.latency.read[1]  > read) or
+                   (write is not None and entry.latency.write[1] > write)]
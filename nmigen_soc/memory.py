@@ -1,4 +1,5 @@
 import bisect
+from array import array
 
 
 __all__ = ["MemoryMap"]
@@ -45,6 +46,111 @@ class _RangeMap:
             yield key, self._values[key]
 
 
+class _CompactRangeMap:
+    """Compact range map.
+
+    A range map like :class:`_RangeMap`, which keeps the bounds of its ranges in integer arrays and
+    its values in a single list, sorted by address, instead of creating several Python objects per
+    range. Values must be hashable, and may only be inserted once.
+
+    Each value has a kind, an integer that is 0 when it is inserted. Values of a given kind can be
+    accessed with a mapping-like :meth:`view`, which is used in place of a dict from values to
+    ranges.
+    """
+    def __init__(self):
+        self._starts = array("Q")
+        self._stops  = array("Q")
+        self._steps  = array("Q")
+        self._kinds  = bytearray()
+        self._values = []
+        self._index  = dict()
+
+    def insert(self, key, value):
+        assert isinstance(key, range)
+        assert not self.overlaps(key)
+        assert value not in self._index
+
+        start_idx = bisect.bisect_right(self._starts, key.start)
+        stop_idx  = bisect.bisect_left(self._stops, key.stop)
+        assert start_idx == stop_idx
+
+        self._starts.insert(start_idx, key.start)
+        self._stops.insert(start_idx, key.stop)
+        self._steps.insert(start_idx, key.step)
+        self._kinds.insert(start_idx, 0)
+        self._values.insert(start_idx, value)
+        self._index[value] = key.start
+
+    def _find(self, value):
+        start = self._index.get(value)
+        if start is None:
+            return None
+        # Empty ranges may share their start with another range.
+        idx = bisect.bisect_left(self._starts, start)
+        while self._values[idx] is not value:
+            idx += 1
+        return idx
+
+    def _range(self, idx):
+        return range(self._starts[idx], self._stops[idx], self._steps[idx])
+
+    def get(self, point):
+        point_idx = bisect.bisect_right(self._stops, point)
+        if point_idx < len(self._values):
+            if point >= self._starts[point_idx] and point < self._stops[point_idx]:
+                return self._values[point_idx]
+
+    def overlaps(self, key):
+        start_idx = bisect.bisect_right(self._stops, key.start)
+        stop_idx  = bisect.bisect_left(self._starts, key.stop)
+        return self._values[start_idx:stop_idx]
+
+    def items(self):
+        for idx, value in enumerate(self._values):
+            yield self._range(idx), value
+
+    def view(self, kind):
+        return _CompactRangeView(self, kind)
+
+
+class _CompactRangeView:
+    """Mapping from the values of a given kind in a :class:`_CompactRangeMap` to their ranges.
+
+    Setting an item changes the kind of a value that is already inserted into the range map.
+    Items are iterated in ascending order of their address.
+    """
+    def __init__(self, range_map, kind):
+        assert kind != 0
+        self._range_map = range_map
+        self._kind      = kind
+
+    def _find(self, value):
+        idx = self._range_map._find(value)
+        if idx is None or self._range_map._kinds[idx] != self._kind:
+            return None
+        return idx
+
+    def __contains__(self, value):
+        return self._find(value) is not None
+
+    def __getitem__(self, value):
+        idx = self._find(value)
+        if idx is None:
+            raise KeyError(value)
+        return self._range_map._range(idx)
+
+    def __setitem__(self, value, key):
+        idx = self._range_map._find(value)
+        assert idx is not None and self._range_map._range(idx) == key
+        self._range_map._kinds[idx] = self._kind
+
+    def items(self):
+        range_map = self._range_map
+        for idx, value in enumerate(range_map._values):
+            if range_map._kinds[idx] == self._kind:
+                yield value, range_map._range(idx)
+
+
 class MemoryMap:
     """Memory map.
 
@@ -72,8 +178,21 @@ class MemoryMap:
         Range alignment. Each added resource and window will be placed at an address that is
         a multiple of ``2 ** alignment``, and its size will be rounded up to be a multiple of
         ``2 ** alignment``.
+    compact : bool
+        Store address ranges compactly. A memory map with many resources or windows, e.g. one
+        generated for a large descriptor table, normally uses several Python objects per entry;
+        a compact memory map keeps address ranges in integer arrays, and uses about half as much
+        memory, at the cost of somewhat slower insertion. Local resources and windows are then
+        always iterated in ascending order of their address, rather than in the order they were
+        added.
+
+    Attributes
+    ----------
+    latency : :class:`..latency.Latency` or None
+        Access latency added by the bus component that serves this memory map, if declared by
+        that component. See :class:`..latency.LatencyAnalysis`.
     """
-    def __init__(self, *, addr_width, data_width, alignment=0):
+    def __init__(self, *, addr_width, data_width, alignment=0, compact=False):
         if not isinstance(addr_width, int) or addr_width <= 0:
             raise ValueError("Address width must be a positive integer, not {!r}"
                              .format(addr_width))
@@ -87,10 +206,21 @@ class MemoryMap:
         self.addr_width = addr_width
         self.data_width = data_width
         self.alignment  = alignment
+        self.latency    = None
 
-        self._ranges    = _RangeMap()
-        self._resources = dict()
-        self._windows   = dict()
+        if compact and addr_width > 64:
+            raise ValueError("Compact memory map address width must be at most 64, not {!r}"
+                             .format(addr_width))
+        self.compact    = bool(compact)
+
+        if self.compact:
+            self._ranges    = _CompactRangeMap()
+            self._resources = self._ranges.view(1)
+            self._windows   = self._ranges.view(2)
+        else:
+            self._ranges    = _RangeMap()
+            self._resources = dict()
+            self._windows   = dict()
 
         self._next_addr = 0
 
@@ -321,11 +451,30 @@ class MemoryMap:
         for window, window_range in self._windows.items():
             yield window, (window_range.start, window_range.stop, window_range.step)
 
-    def window_patterns(self):
+    def window_patterns(self, *, minimize=False):
         """Iterate local windows and patterns that match their address ranges.
 
         Non-recursively iterate windows in ascending order of their address.
 
+        Minimization
+        ------------
+
+        By default, each pattern compares every address bit above the window, and matches exactly
+        the address range of the window. If ``minimize`` is true, each pattern instead compares only
+        the bits needed to tell the window apart from every other window and resource in this
+        memory map; addresses that are not assigned to any window or resource are treated as
+        don't-care, and may be matched by any pattern (or several of them). The set of compared
+        bits is the smallest possible one, which is found using an exact minimum cover search,
+        preferring more significant bits when several sets of the same size exist.
+
+        Minimized patterns reduce decoding logic when the address space is sparsely populated,
+        but cause accesses to unassigned addresses to alias onto windows.
+
+        Arguments
+        ---------
+        minimize : bool
+            Compute minimized patterns.
+
         Yield values
         ------------
         A tuple ``window, (pattern, ratio)`` describing the address range assigned to the window.
@@ -336,10 +485,78 @@ class MemoryMap:
         it is always 1.
         """
         for window, window_range in self._windows.items():
-            pattern = "{:0{}b}{}".format(window_range.start >> window.addr_width,
-                                         self.addr_width - window.addr_width,
-                                         "-" * window.addr_width)
-            yield window, (pattern, window_range.step)
+            prefix_width = self.addr_width - window.addr_width
+            prefix = window_range.start >> window.addr_width
+            if minimize:
+                care = self._minimal_care_mask(window, window_range)
+            else:
+                care = (1 << prefix_width) - 1
+            pattern = "".join("{:d}".format(prefix >> bit & 1) if care >> bit & 1 else "-"
+                              for bit in reversed(range(prefix_width)))
+            yield window, (pattern + "-" * window.addr_width, window_range.step)
+
+    @staticmethod
+    def _range_cubes(start, stop):
+        """Decompose an address range into aligned power-of-2 sized blocks, each described by
+        a tuple ``(value, size_bits)``."""
+        while start < stop:
+            size_bits = 0
+            while (start % (1 << (size_bits + 1)) == 0 and
+                    start + (1 << (size_bits + 1)) <= stop):
+                size_bits += 1
+            yield start, size_bits
+            start += 1 << size_bits
+
+    def _minimal_care_mask(self, window, window_range):
+        """Compute the smallest set of prefix bits that distinguishes a window from every other
+        assignment in this memory map. Bit *n* of the result refers to address bit
+        ``n + window.addr_width``."""
+        shift = window.addr_width
+        prefix_width = self.addr_width - shift
+        prefix = window_range.start >> shift
+
+        # For every other assignment, the set of prefix bits that exclude it if compared.
+        conflicts = set()
+        for addr_range, assignment in self._ranges.items():
+            if assignment is window:
+                continue
+            for value, size_bits in self._range_cubes(addr_range.start, addr_range.stop):
+                # Address bits that are fixed within both the window pattern and the block.
+                fixed = ((1 << self.addr_width) - 1) & ~((1 << max(shift, size_bits)) - 1)
+                diff  = (fixed & ((prefix << shift) ^ value)) >> shift
+                if diff == 0:
+                    # The window pattern overlaps the block (as it may for dense windows, whose
+                    # pattern is wider than their address range); do not minimize it.
+                    return (1 << prefix_width) - 1
+                conflicts.add(diff)
+
+        # Only keep the conflicts not implied by any other conflict.
+        conflicts = sorted(diff for diff in conflicts
+                           if not any(other != diff and other & diff == other
+                                      for other in conflicts))
+
+        def popcount(value):
+            return bin(value).count("1")
+
+        best = [(1 << prefix_width) - 1]
+        def search(chosen, remaining):
+            if not remaining:
+                if (popcount(chosen), -chosen) < (popcount(best[0]), -best[0]):
+                    best[0] = chosen
+                return
+            if popcount(chosen) + 1 > popcount(best[0]):
+                return
+            # Branch on the conflict with the fewest ways to resolve it.
+            diff = min(remaining, key=popcount)
+            for bit in reversed(range(prefix_width)):
+                if diff >> bit & 1:
+                    search(chosen | 1 << bit,
+                           [other for other in remaining if not other >> bit & 1])
+
+        if not conflicts:
+            return 0
+        search(0, conflicts)
+        return best[0]
 
     @staticmethod
     def _translate(start, end, width, window, window_range):
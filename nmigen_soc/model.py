@@ -0,0 +1,558 @@
+import bisect
+
+from nmigen import *
+from nmigen.back.pysim import Passive, Settle, Delay
+from nmigen.hdl.ir import Fragment
+from nmigen.utils import log2_int
+
+from .csr.bus import Alias, Multiplexer, Decoder
+from .csr.wishbone import WishboneCSRBridge
+from .elaboration import _elaborate_as
+
+
+__all__ = ["SimulationModels", "MultiplexerModel", "DecoderModel", "WishboneCSRBridgeModel"]
+
+
+class _Model(Elaboratable):
+    # A model elaborates to nothing; its signals are driven by the process of its
+    # :class:`SimulationModels`.
+    #
+    # Models are evaluated twice per cycle. Right after each clock edge, `_access()` updates their
+    # state from the values their inputs had before the edge, and `_commit()` drives their
+    # registered outputs. Once every other process has reacted to the edge, `_strobe()` computes
+    # their combinatorial outputs, which are driven through `SimulationModels._drive()`.
+    def __init__(self, component):
+        self.component = component
+        # The logic of the component is replaced by the model.
+        _elaborate_as(component, Fragment())
+        self._models  = None
+        self._active  = False
+
+    def _subordinate_buses(self):
+        return []
+
+    def _start(self):
+        yield from ()
+
+    def _link(self, models):
+        self._models = models
+
+    def _activate(self):
+        if not self._active:
+            self._active = True
+            self._models._active.append(self)
+
+    def elaborate(self, platform):
+        return Module()
+
+
+class MultiplexerModel(_Model):
+    """Behavioural model of a :class:`..csr.Multiplexer`.
+
+    Serves the registers of the multiplexer by looking each address up in a dictionary built from
+    its memory map, with the same timing as the multiplexer, including shadow registers and
+    aliases. See :class:`SimulationModels`.
+
+    Parameters
+    ----------
+    component : :class:`..csr.Multiplexer`
+        Modelled multiplexer.
+
+    Attributes
+    ----------
+    bus : :class:`..csr.Interface`
+        CSR bus of the multiplexer.
+    """
+    def __init__(self, component):
+        if not isinstance(component, Multiplexer):
+            raise TypeError("Component must be an instance of csr.Multiplexer, not {!r}"
+                            .format(component))
+        super().__init__(component)
+        self.bus = component.bus
+
+        # Address -> (element, chunk offset, alias operation or None, last chunk).
+        self._chunks  = dict()
+        self._shadows = dict()
+        for resource, (start, end) in self.bus.memory_map.resources():
+            if isinstance(resource, Alias):
+                elem, op = resource.element, resource.op
+            else:
+                elem, op = resource, None
+            self._shadows[id(elem)] = 0
+            for offset, addr in enumerate(range(start, end)):
+                self._chunks[addr] = elem, offset, op, addr == end - 1
+
+        self.r_data        = 0
+        self._r_data_next  = 0
+        self._w_strobe     = None
+        self._w_strobed    = None
+        self._w_alias      = None
+        self._w_dirty      = []
+
+    def _start(self):
+        for elem, _, _, _ in self._chunks.values():
+            if elem.constant is not None:
+                yield elem.r_data.eq(elem.constant)
+
+    def _strobe(self, addr, r_stb, w_stb, w_data):
+        entry = self._chunks.get(addr)
+        if entry is None:
+            return
+        elem, offset, op, last = entry
+        if r_stb and op is None and offset == 0 and elem.access.readable():
+            self._models._drive(elem.r_stb, 1)
+
+    def _access(self, addr, r_stb, w_stb, w_data):
+        entry = self._chunks.get(addr)
+        if entry is None:
+            return
+        elem, offset, op, last = entry
+        self._activate()
+
+        data_width = self.bus.data_width
+        shift = offset * data_width
+        mask  = (1 << data_width) - 1
+        if r_stb and op is None and elem.access.readable():
+            if offset == 0 and elem.constant is None:
+                self._shadows[id(elem)] = yield elem.r_data
+                if elem.access.writable():
+                    self._w_dirty.append(elem)
+            value = elem.constant if elem.constant is not None else self._shadows[id(elem)]
+            self._r_data_next = (value >> shift) & mask
+        if w_stb and (op is not None or elem.access.writable()):
+            shadow = self._shadows[id(elem)] & ~(mask << shift)
+            shadow |= (w_data & mask) << shift
+            self._shadows[id(elem)] = shadow & ((1 << elem.width) - 1)
+            self._w_dirty.append(elem)
+            if last:
+                self._w_strobe = elem, op
+
+    def _commit(self):
+        self.r_data, self._r_data_next = self._r_data_next, 0
+
+        if self._w_strobed is not None:
+            yield self._w_strobed.w_stb.eq(0)
+            self._w_strobed = None
+        self._w_alias = None
+        for elem in self._w_dirty:
+            self._models._release(elem.w_data)
+            yield elem.w_data.eq(self._shadows[id(elem)])
+        self._w_dirty = []
+        if self._w_strobe is not None:
+            elem, op = self._w_strobe
+            yield elem.w_stb.eq(1)
+            if op is not None:
+                self._w_alias = elem, op
+                self._models._settling.append(self)
+            self._w_strobe  = None
+            self._w_strobed = elem
+
+        # Stay active until the outputs are cleared.
+        if self.r_data or self._w_strobed is not None:
+            self._activate()
+
+    def _settle(self):
+        # Alias writes are computed from the value of the register in the cycle they complete.
+        elem, op = self._w_alias
+        r_data = yield elem.r_data
+        shadow = self._shadows[id(elem)]
+        if op == Alias.Op.SET:
+            w_data = r_data | shadow
+        elif op == Alias.Op.CLEAR:
+            w_data = r_data & ~shadow
+        else:
+            w_data = r_data ^ shadow
+        self._models._drive(elem.w_data, w_data & ((1 << elem.width) - 1), hold=True)
+
+
+class DecoderModel(_Model):
+    """Behavioural model of a :class:`..csr.Decoder`.
+
+    Forwards each access to the subordinate bus whose window contains its address, found by
+    a binary search of the windows of its memory map. See :class:`SimulationModels`.
+
+    Unlike a decoder with ``minimal_decode`` set, the model ignores accesses to addresses outside
+    of any window.
+
+    Parameters
+    ----------
+    component : :class:`..csr.Decoder`
+        Modelled decoder.
+
+    Attributes
+    ----------
+    bus : :class:`..csr.Interface`
+        CSR bus of the decoder.
+    """
+    def __init__(self, component):
+        if not isinstance(component, Decoder):
+            raise TypeError("Component must be an instance of csr.Decoder, not {!r}"
+                            .format(component))
+        super().__init__(component)
+        self.bus = component.bus
+
+        self._windows = []
+        for sub_map, (start, end, ratio) in self.bus.memory_map.windows():
+            self._windows.append((start, end, component._subs[sub_map]))
+        self._starts  = [start for start, _, _ in self._windows]
+        self._targets = None
+        self._reading = None
+
+    def _subordinate_buses(self):
+        return [sub_bus for _, _, sub_bus in self._windows]
+
+    def _link(self, models):
+        super()._link(models)
+        self._targets = [models._target(sub_bus) for _, _, sub_bus in self._windows]
+
+    @property
+    def r_data(self):
+        # Subordinate buses only return data in the cycle after a read, so only the subordinate bus
+        # that was read last can contribute to the read data.
+        if self._reading is None:
+            return 0
+        return self._reading.r_data
+
+    def _decode(self, addr):
+        index = bisect.bisect_right(self._starts, addr) - 1
+        if index < 0 or addr >= self._windows[index][1]:
+            return None, None
+        return self._targets[index], addr - self._windows[index][0]
+
+    def _strobe(self, addr, r_stb, w_stb, w_data):
+        target, sub_addr = self._decode(addr)
+        if target is not None:
+            target._strobe(sub_addr, r_stb, w_stb, w_data)
+
+    def _access(self, addr, r_stb, w_stb, w_data):
+        target, sub_addr = self._decode(addr)
+        if r_stb:
+            self._reading = target
+        if target is not None:
+            yield from target._access(sub_addr, r_stb, w_stb, w_data)
+
+
+class WishboneCSRBridgeModel(_Model):
+    """Behavioural model of a :class:`..csr.wishbone.WishboneCSRBridge`.
+
+    Performs the CSR accesses of each Wishbone cycle with the same timing as the bridge. See
+    :class:`SimulationModels`.
+
+    Parameters
+    ----------
+    component : :class:`..csr.wishbone.WishboneCSRBridge`
+        Modelled bridge.
+
+    Attributes
+    ----------
+    wb_bus : :class:`..wishbone.Interface`
+        Wishbone bus of the bridge.
+    """
+    def __init__(self, component):
+        if not isinstance(component, WishboneCSRBridge):
+            raise TypeError("Component must be an instance of WishboneCSRBridge, not {!r}"
+                            .format(component))
+        super().__init__(component)
+        self.wb_bus  = component.wb_bus
+        self.csr_bus = component.csr_bus
+
+        self._in_cycle  = self.wb_bus.cyc & self.wb_bus.stb
+        self._inputs    = Cat(self.wb_bus.we, self.wb_bus.sel, self.wb_bus.adr, self.wb_bus.dat_w)
+        self._target    = None
+        self._cycle     = 0
+        self._ack       = 0
+        self._dat_r     = 0
+        self._ack_out   = 0
+        self._dat_r_out = 0
+
+    def _subordinate_buses(self):
+        return [self.csr_bus]
+
+    def _link(self, models):
+        super()._link(models)
+        self._target = models._target(self.csr_bus)
+
+    def _chunk(self):
+        # The CSR access performed in the current cycle, if any. Reading signals from a process is
+        # slow, so they are read together, and only while a cycle is in progress.
+        wb_bus = self.wb_bus
+        if not (yield self._in_cycle) or self._cycle == len(wb_bus.sel):
+            return None
+        we, sel, adr, dat_w = self._unpack((yield self._inputs))
+        if not (sel >> self._cycle & 1):
+            return None
+        mask = (1 << wb_bus.granularity) - 1
+        return (adr << log2_int(len(wb_bus.sel)) | self._cycle, not we, we,
+                (dat_w >> (self._cycle * wb_bus.granularity)) & mask)
+
+    def _unpack(self, value):
+        wb_bus = self.wb_bus
+        fields = []
+        for width in (1, len(wb_bus.sel), len(wb_bus.adr), len(wb_bus.dat_w)):
+            fields.append(value & ((1 << width) - 1))
+            value >>= width
+        return fields
+
+    def _evaluate_comb(self):
+        chunk = yield from self._chunk()
+        if chunk is not None:
+            self._target._strobe(*chunk)
+
+    def _evaluate(self):
+        wb_bus = self.wb_bus
+        if not (yield self._in_cycle):
+            self._ack   = 0
+            self._cycle = 0
+            return
+
+        if self._cycle > 0:
+            # CSR reads are registered, and are re-registered by the bridge.
+            mask  = (1 << wb_bus.granularity) - 1
+            shift = (self._cycle - 1) * wb_bus.granularity
+            self._dat_r &= ~(mask << shift)
+            self._dat_r |= (self._target.r_data & mask) << shift
+        chunk = yield from self._chunk()
+        if chunk is not None:
+            yield from self._target._access(*chunk)
+        if self._cycle < len(wb_bus.sel):
+            self._cycle += 1
+        else:
+            self._ack   = 1
+            self._cycle = 0
+
+    def _commit(self):
+        if self._ack_out != self._ack:
+            self._ack_out = self._ack
+            yield self.wb_bus.ack.eq(self._ack)
+        if self._dat_r_out != self._dat_r:
+            self._dat_r_out = self._dat_r
+            yield self.wb_bus.dat_r.eq(self._dat_r)
+
+
+class _SignalTarget:
+    # A CSR bus driven by a model, and served by a component that is not modelled.
+    def __init__(self, models, bus):
+        self._models = models
+        self.bus     = bus
+        self.r_data  = 0
+        self._read   = False
+
+    def _strobe(self, addr, r_stb, w_stb, w_data):
+        self._models._drive(self.bus.addr, addr, hold=True)
+        self._models._drive(self.bus.w_data, w_data, hold=True)
+        if r_stb:
+            self._models._drive(self.bus.r_stb, 1)
+        if w_stb:
+            self._models._drive(self.bus.w_stb, 1)
+
+    def _access(self, addr, r_stb, w_stb, w_data):
+        # The served component samples the bus itself, and only returns read data in the cycle
+        # after a read.
+        self._read = bool(r_stb)
+        yield from ()
+
+
+class _SignalInitiator:
+    # A CSR bus served by a model, and driven by a component that is not modelled.
+    def __init__(self, model):
+        bus = model.bus
+        self.model    = model
+        self._any_stb = bus.r_stb | bus.w_stb
+        self._inputs  = Cat(bus.r_stb, bus.w_stb, bus.addr, bus.w_data)
+        self._r_data  = 0
+
+    def _chunk(self):
+        bus = self.model.bus
+        if not (yield self._any_stb):
+            return None
+        value  = yield self._inputs
+        r_stb  = value & 1
+        w_stb  = value >> 1 & 1
+        addr   = value >> 2 & ((1 << bus.addr_width) - 1)
+        w_data = value >> (2 + bus.addr_width)
+        return addr, r_stb, w_stb, w_data
+
+    def _evaluate_comb(self):
+        chunk = yield from self._chunk()
+        if chunk is not None:
+            self.model._strobe(*chunk)
+
+    def _evaluate(self):
+        chunk = yield from self._chunk()
+        if chunk is not None:
+            yield from self.model._access(*chunk)
+
+    def _commit(self):
+        r_data = self.model.r_data
+        if r_data != self._r_data:
+            self._r_data = r_data
+            yield self.model.bus.r_data.eq(r_data)
+
+
+class SimulationModels:
+    """Behavioural simulation models.
+
+    Replaces bus components with Python models, evaluated by a single simulator process, which
+    drive the same signals with the same timing. Models perform address decoding with dictionary
+    lookups and binary searches on memory maps, and only do work in the cycles in which their
+    buses are accessed, so simulating them is much faster than simulating the logic of large
+    components.
+
+    Usage
+    -----
+
+    Components are wrapped where they are added to the design, e.g.
+    ``m.submodules.mux = models(mux)``, and the process evaluating the models is added to
+    the simulator with :meth:`add_process` after the design is elaborated, i.e. once
+    the simulator is created. Components with a model are :class:`..csr.Multiplexer`,
+    :class:`..csr.Decoder` and :class:`..csr.wishbone.WishboneCSRBridge`.
+
+    If ``enabled`` is false, components are returned unchanged, and :meth:`add_process` does
+    nothing, so that the same testbench can simulate the logic of the components.
+
+    Timing
+    ------
+
+    Registered outputs are updated at each clock edge from the values the inputs had before it,
+    like those of the components. Combinatorial outputs are updated ``comb_delay`` seconds after
+    each clock edge, once every other process has reacted to it; processes of the testbench that
+    sample them must yield ``Delay()`` first, rather than ``Settle()``. The inputs of the models
+    must not change between this point and the next clock edge.
+
+    Models connected to each other exchange values directly, rather than through signals; in that
+    case, the signals of the buses connecting them are not driven.
+
+    Parameters
+    ----------
+    enabled : bool
+        Replace components with their models.
+    comb_delay : float
+        Delay between a clock edge and the update of combinatorial outputs, in seconds. Must be
+        shorter than the clock period.
+    """
+    def __init__(self, *, enabled=True, comb_delay=1e-12):
+        self.enabled    = enabled
+        self.comb_delay = comb_delay
+        self._models    = []
+        self._by_bus    = dict()
+        self._signal_targets = []
+        self._active    = []
+        self._settling  = []
+        self._driven    = dict()
+        self._driving   = dict()
+
+    def __call__(self, component):
+        """Wrap a component.
+
+        Return value
+        ------------
+        The model of ``component``, or ``component`` itself if models are disabled.
+        """
+        if not self.enabled:
+            return component
+        if isinstance(component, Multiplexer):
+            model = MultiplexerModel(component)
+        elif isinstance(component, Decoder):
+            model = DecoderModel(component)
+        elif isinstance(component, WishboneCSRBridge):
+            model = WishboneCSRBridgeModel(component)
+        else:
+            raise TypeError("Component {!r} has no behavioural model"
+                            .format(component))
+        self._models.append(model)
+        if not isinstance(model, WishboneCSRBridgeModel):
+            self._by_bus[id(model.bus)] = model
+        return model
+
+    def _target(self, bus):
+        if id(bus) in self._by_bus:
+            return self._by_bus[id(bus)]
+        target = _SignalTarget(self, bus)
+        self._signal_targets.append(target)
+        return target
+
+    def _drive(self, signal, value, *, hold=False):
+        # Drive a combinatorial output in the current cycle. Outputs that are not held return to 0
+        # in the cycles in which they are not driven.
+        self._driving[id(signal)] = signal, value, hold
+
+    def _release(self, signal):
+        # Forget the value of a combinatorial output that is about to be driven as a registered one.
+        self._driven.pop(id(signal), None)
+
+    def _update(self):
+        changed = False
+        for key, (signal, value, hold) in self._driven.items():
+            if key in self._driving:
+                continue
+            if hold:
+                self._driving[key] = signal, value, hold
+            elif value:
+                yield signal.eq(0)
+                changed = True
+        for key, (signal, value, hold) in self._driving.items():
+            if key not in self._driven or self._driven[key][1] != value:
+                yield signal.eq(value)
+                changed = True
+        self._driven, self._driving = self._driving, dict()
+        return changed
+
+    def add_process(self, sim, *, domain="sync"):
+        """Add the process evaluating the models to a simulator.
+
+        Arguments
+        ---------
+        sim : :class:`nmigen.back.pysim.Simulator`
+            Simulator of the design containing the models.
+        domain : str
+            Clock domain of the modelled components.
+        """
+        if self.enabled:
+            sim.add_sync_process(self._process, domain=domain)
+
+    def _process(self):
+        yield Passive()
+
+        subordinates = set()
+        for model in self._models:
+            model._link(self)
+            subordinates.update(id(bus) for bus in model._subordinate_buses())
+        roots = []
+        for model in self._models:
+            if isinstance(model, WishboneCSRBridgeModel):
+                roots.append(model)
+            elif id(model.bus) not in subordinates:
+                roots.append(_SignalInitiator(model))
+        for model in self._models:
+            yield from model._start()
+
+        while True:
+            yield Delay(self.comb_delay)
+            # Iterate until the combinatorial outputs no longer change, in case they reach
+            # the inputs of the models through logic that is not modelled.
+            while True:
+                for model in self._settling:
+                    yield from model._settle()
+                for root in roots:
+                    yield from root._evaluate_comb()
+                if not (yield from self._update()):
+                    break
+                yield Settle()
+
+            # Inputs are sampled before the clock edge takes effect, like flip-flops do.
+            yield
+            for target in self._signal_targets:
+                if target._read:
+                    target.r_data = yield target.bus.r_data
+                    target._read  = False
+                else:
+                    target.r_data = 0
+            for root in roots:
+                yield from root._evaluate()
+            self._settling = []
+            active, self._active = self._active, []
+            for target in active:
+                target._active = False
+                yield from target._commit()
+            for root in roots:
+                yield from root._commit()
@@ -0,0 +1,26 @@
+# Constants of the serial bus access protocol, shared by the gateware that implements it and by
+# the host tools that use it. This module must not import nMigen.
+
+import enum
+
+
+__all__ = ["Command", "Status"]
+
+
+class Command(enum.Enum):
+    """Command of the serial bus access protocol.
+
+    Bits 0..1 of a command byte select a write (1) or a read (2), and bit 2 requests address
+    auto-increment. Command bytes with any other value are ignored, e.g. for resynchronization.
+    See :class:`.host.serial.SerialTransport` for the whole protocol.
+    """
+    WRITE      = 0x01
+    READ       = 0x02
+    WRITE_INCR = 0x05
+    READ_INCR  = 0x06
+
+
+class Status(enum.Enum):
+    """Status of a command of the serial bus access protocol."""
+    OK    = 0x00
+    ERROR = 0x01
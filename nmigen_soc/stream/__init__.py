@@ -0,0 +1,5 @@
+from .bus import *
+from .buffer import *
+from .fifo import *
+from .convert import *
+from .wishbone import *
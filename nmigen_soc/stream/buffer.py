@@ -0,0 +1,72 @@
+from nmigen import *
+
+from .bus import Interface
+
+
+__all__ = ["SkidBuffer"]
+
+
+class SkidBuffer(Elaboratable):
+    """Stream skid buffer.
+
+    A pipeline stage that registers the payload, ``valid`` and ``ready``, breaking every
+    combinatorial path between its sink and its source.
+
+    Throughput
+    ----------
+
+    A beat is transferred in every cycle in which the sink has a beat and the source is ready.
+    Since ``sink.ready`` is registered, it reflects the state of the source with a delay of
+    a cycle; a second register, the skid register, holds the beat accepted in the cycle in which
+    the source stops being ready.
+
+    Latency
+    -------
+
+    A beat appears on the source the cycle after it is accepted by the sink.
+
+    Parameters
+    ----------
+    payload : int or :class:`Shape` or list of fields
+        Payload shape. See :class:`Interface`.
+
+    Attributes
+    ----------
+    sink : :class:`Interface`
+        Stream accepted by the buffer.
+    source : :class:`Interface`
+        Stream provided by the buffer.
+    """
+    def __init__(self, payload):
+        self.sink   = Interface(payload, name="sink")
+        self.source = Interface(payload, name="source")
+
+    def elaborate(self, platform):
+        m = Module()
+
+        sink, source = self.sink, self.source
+
+        skid_valid   = Signal()
+        skid_payload = Signal(sink.payload_width)
+
+        m.d.comb += sink.ready.eq(~skid_valid)
+
+        with m.If(~source.valid | source.ready):
+            with m.If(skid_valid):
+                m.d.sync += [
+                    source.payload.eq(skid_payload),
+                    source.valid.eq(1),
+                    skid_valid.eq(0),
+                ]
+            with m.Else():
+                m.d.sync += [
+                    source.payload.eq(sink.payload),
+                    source.valid.eq(sink.valid),
+                ]
+        with m.Elif(sink.valid & sink.ready):
+            m.d.sync += [
+                skid_payload.eq(sink.payload),
+                skid_valid.eq(1),
+            ]
+
+        return m
@@ -0,0 +1,54 @@
+from nmigen import *
+from nmigen.hdl.ast import Shape
+from nmigen.hdl.rec import Direction, Layout
+
+
+__all__ = ["Interface"]
+
+
+class Interface(Record):
+    """Stream interface.
+
+    A unidirectional point-to-point interface transferring a payload with a valid/ready
+    handshake. A beat is transferred in each cycle in which both ``valid`` and ``ready`` are
+    asserted. Once ``valid`` is asserted, it must stay asserted, and ``payload`` must not change,
+    until the beat is transferred; ``valid`` must not depend on ``ready`` combinatorially.
+
+    Parameters
+    ----------
+    payload : int or :class:`Shape` or list of fields
+        Shape of the payload; either a shape, or the layout of a record.
+    name : str
+        Name of the underlying record.
+
+    Attributes
+    ----------
+    The correspondence between the signals and the transfer direction changes depending on
+    whether the interface acts as a source or a sink.
+
+    payload : Signal or Record
+        Payload, driven by the source.
+    valid : Signal()
+        Asserted by the source when ``payload`` holds a beat.
+    ready : Signal()
+        Asserted by the sink when it accepts a beat.
+    """
+    def __init__(self, payload, *, name=None):
+        if isinstance(payload, (list, Layout)):
+            payload_field = ("payload", Layout.cast(payload))
+        else:
+            try:
+                payload_field = ("payload", Shape.cast(payload), Direction.FANOUT)
+            except TypeError:
+                raise TypeError("Payload must be a shape or a list of fields, not {!r}"
+                                .format(payload)) from None
+        self.payload_shape = payload_field[1]
+        super().__init__([
+            payload_field,
+            ("valid", 1, Direction.FANOUT),
+            ("ready", 1, Direction.FANIN),
+        ], name=name, src_loc_at=1)
+
+    @property
+    def payload_width(self):
+        return len(self.payload)
@@ -0,0 +1,160 @@
+from nmigen import *
+
+from .bus import Interface
+
+
+__all__ = ["UpConverter", "DownConverter"]
+
+
+def _check(width, ratio):
+    if not isinstance(width, int) or width <= 0:
+        raise ValueError("Width must be a positive integer, not {!r}"
+                         .format(width))
+    if not isinstance(ratio, int) or ratio < 2:
+        raise ValueError("Ratio must be an integer greater than or equal to 2, not {!r}"
+                         .format(ratio))
+
+
+class UpConverter(Elaboratable):
+    """Stream up converter.
+
+    Gathers every ``ratio`` consecutive narrow beats into a wide beat. The first narrow beat is
+    placed in the least significant bits of the wide beat.
+
+    Throughput
+    ----------
+
+    A narrow beat is accepted in every cycle, including the one that completes a wide beat,
+    provided that the previous wide beat is transferred by the source in the same cycle at
+    the latest.
+
+    Latency
+    -------
+
+    A wide beat appears on the source the cycle after its last narrow beat is accepted.
+
+    Parameters
+    ----------
+    width : int
+        Width of the narrow beats.
+    ratio : int
+        Amount of narrow beats in a wide beat.
+
+    Attributes
+    ----------
+    sink : :class:`Interface`
+        Stream of ``width`` bit wide beats.
+    source : :class:`Interface`
+        Stream of ``width * ratio`` bit wide beats.
+    """
+    def __init__(self, *, width, ratio):
+        _check(width, ratio)
+        self.width  = width
+        self.ratio  = ratio
+        self.sink   = Interface(width, name="sink")
+        self.source = Interface(width * ratio, name="source")
+
+    def elaborate(self, platform):
+        m = Module()
+
+        sink, source = self.sink, self.source
+
+        parts = Array(Signal(self.width, name="part_{}".format(index))
+                      for index in range(self.ratio - 1))
+        count = Signal(range(self.ratio))
+        final = Signal()
+
+        m.d.comb += [
+            final.eq(count == self.ratio - 1),
+            # Only the beat that completes a wide beat needs the source to be free.
+            sink.ready.eq(~final | ~source.valid | source.ready),
+        ]
+
+        with m.If(source.valid & source.ready):
+            m.d.sync += source.valid.eq(0)
+
+        with m.If(sink.valid & sink.ready):
+            with m.If(final):
+                m.d.sync += [
+                    source.payload.eq(Cat(*parts, sink.payload)),
+                    source.valid.eq(1),
+                    count.eq(0),
+                ]
+            with m.Else():
+                m.d.sync += [
+                    parts[count].eq(sink.payload),
+                    count.eq(count + 1),
+                ]
+
+        return m
+
+
+class DownConverter(Elaboratable):
+    """Stream down converter.
+
+    Splits every wide beat into ``ratio`` consecutive narrow beats. The first narrow beat is taken
+    from the least significant bits of the wide beat.
+
+    Throughput
+    ----------
+
+    A narrow beat is provided in every cycle. The next wide beat is accepted in the same cycle
+    as the last narrow beat of the previous one is transferred.
+
+    Latency
+    -------
+
+    The first narrow beat appears on the source the cycle after the wide beat is accepted.
+
+    Parameters
+    ----------
+    width : int
+        Width of the narrow beats.
+    ratio : int
+        Amount of narrow beats in a wide beat.
+
+    Attributes
+    ----------
+    sink : :class:`Interface`
+        Stream of ``width * ratio`` bit wide beats.
+    source : :class:`Interface`
+        Stream of ``width`` bit wide beats.
+    """
+    def __init__(self, *, width, ratio):
+        _check(width, ratio)
+        self.width  = width
+        self.ratio  = ratio
+        self.sink   = Interface(width * ratio, name="sink")
+        self.source = Interface(width, name="source")
+
+    def elaborate(self, platform):
+        m = Module()
+
+        sink, source = self.sink, self.source
+
+        data  = Signal(self.width * self.ratio)
+        count = Signal(range(self.ratio))
+        final = Signal()
+
+        m.d.comb += [
+            final.eq(count == self.ratio - 1),
+            source.payload.eq(data.word_select(count, self.width)),
+            sink.ready.eq(~source.valid | (final & source.ready)),
+        ]
+
+        with m.If(source.valid & source.ready):
+            m.d.sync += count.eq(count + 1)
+            with m.If(final):
+                m.d.sync += [
+                    source.valid.eq(0),
+                    count.eq(0),
+                ]
+
+        with m.If(sink.valid & sink.ready):
+            m.d.sync += [
+                data.eq(sink.payload),
+                source.valid.eq(1),
+                count.eq(0),
+            ]
+
+        return m
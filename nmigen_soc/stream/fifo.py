@@ -0,0 +1,125 @@
+from nmigen import *
+from nmigen.lib import fifo
+
+from .bus import Interface
+
+
+__all__ = ["SyncFIFO", "AsyncFIFO"]
+
+
+def _connect(m, queue, sink, source):
+    m.d.comb += [
+        queue.w_data.eq(sink.payload),
+        queue.w_en.eq(sink.valid),
+        sink.ready.eq(queue.w_rdy),
+        source.payload.eq(queue.r_data),
+        source.valid.eq(queue.r_rdy),
+        queue.r_en.eq(source.ready),
+    ]
+
+
+class SyncFIFO(Elaboratable):
+    """Synchronous stream FIFO.
+
+    A first in, first out queue of beats, built on :class:`nmigen.lib.fifo.SyncFIFO` or, if
+    ``buffered`` is true, on :class:`nmigen.lib.fifo.SyncFIFOBuffered`.
+
+    Throughput
+    ----------
+
+    A beat can be accepted by the sink and another one transferred by the source in every cycle,
+    so the FIFO sustains one beat per cycle regardless of its fill level, as long as it is
+    neither empty nor full.
+
+    Latency
+    -------
+
+    A beat appears on the source the cycle after it is accepted by the sink, or two cycles after
+    if ``buffered`` is true.
+
+    Parameters
+    ----------
+    payload : int or :class:`Shape` or list of fields
+        Payload shape. See :class:`Interface`.
+    depth : int
+        Amount of beats the FIFO can hold.
+    buffered : bool
+        Register the payload provided by the source, such that it is not read combinatorially
+        from the storage.
+
+    Attributes
+    ----------
+    sink : :class:`Interface`
+        Stream accepted by the FIFO.
+    source : :class:`Interface`
+        Stream provided by the FIFO.
+    """
+    def __init__(self, payload, *, depth, buffered=False):
+        if not isinstance(depth, int) or depth <= 0:
+            raise ValueError("Depth must be a positive integer, not {!r}"
+                             .format(depth))
+        self.sink     = Interface(payload, name="sink")
+        self.source   = Interface(payload, name="source")
+        self.depth    = depth
+        self.buffered = bool(buffered)
+
+    def elaborate(self, platform):
+        m = Module()
+        if self.buffered:
+            m.submodules.queue = queue = fifo.SyncFIFOBuffered(
+                width=self.sink.payload_width, depth=self.depth)
+        else:
+            m.submodules.queue = queue = fifo.SyncFIFO(
+                width=self.sink.payload_width, depth=self.depth)
+        _connect(m, queue, self.sink, self.source)
+        return m
+
+
+class AsyncFIFO(Elaboratable):
+    """Asynchronous stream FIFO.
+
+    A first in, first out queue of beats between two clock domains, built on
+    :class:`nmigen.lib.fifo.AsyncFIFO`. The sink is in the ``w_domain`` clock domain, and
+    the source is in the ``r_domain`` clock domain.
+
+    Throughput
+    ----------
+
+    The FIFO sustains one beat per cycle of the slower clock domain, as long as it is deep enough
+    to cover the latency of the pointer synchronizers in both directions, i.e. about 8 beats.
+
+    Parameters
+    ----------
+    payload : int or :class:`Shape` or list of fields
+        Payload shape. See :class:`Interface`.
+    depth : int
+        Amount of beats the FIFO can hold. Must be a power of 2.
+    r_domain : str
+        Clock domain of the source.
+    w_domain : str
+        Clock domain of the sink.
+
+    Attributes
+    ----------
+    sink : :class:`Interface`
+        Stream accepted by the FIFO.
+    source : :class:`Interface`
+        Stream provided by the FIFO.
+    """
+    def __init__(self, payload, *, depth, r_domain="read", w_domain="write"):
+        if not isinstance(depth, int) or depth <= 0 or depth & (depth - 1):
+            raise ValueError("Depth must be a positive power of 2, not {!r}"
+                             .format(depth))
+        self.sink     = Interface(payload, name="sink")
+        self.source   = Interface(payload, name="source")
+        self.depth    = depth
+        self.r_domain = r_domain
+        self.w_domain = w_domain
+
+    def elaborate(self, platform):
+        m = Module()
+        m.submodules.queue = queue = fifo.AsyncFIFO(
+            width=self.sink.payload_width, depth=self.depth,
+            r_domain=self.r_domain, w_domain=self.w_domain, exact_depth=True)
+        _connect(m, queue, self.sink, self.source)
+        return m
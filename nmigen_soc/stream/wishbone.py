@@ -0,0 +1,180 @@
+from nmigen import *
+
+from .bus import Interface
+from ..protocol import Command, Status
+from ..wishbone.bus import Interface as WishboneInterface
+
+
+__all__ = ["StreamWishboneBridge"]
+
+
+class StreamWishboneBridge(Elaboratable):
+    """Byte stream to Wishbone bridge.
+
+    A bus initiator performing the accesses requested by commands received from a byte stream,
+    e.g. from a UART, and sending their responses to another byte stream. It implements
+    the protocol described in :class:`..host.serial.SerialTransport`, which is the matching host
+    driver.
+
+    Operation
+    ---------
+
+    Each command is a burst of 1 to 256 accesses to consecutive addresses, or to the same address.
+    Commands are decoded as they are received, and each access is performed as a classic Wishbone
+    cycle selecting every granule of the word, as soon as its data is received (for writes) or
+    the data of the previous read has been sent (for reads). The next command is accepted right
+    after the status of the previous one is sent, so that commands may be pipelined; the byte
+    streams are only stalled while an access is in progress, or while the response is not
+    accepted.
+
+    A cycle terminated with ``err`` reads as 0, and is reported in the status of the command.
+
+    Parameters
+    ----------
+    addr_width : int
+        Address width. See :class:`..wishbone.Interface`.
+    data_width : int
+        Data width. See :class:`..wishbone.Interface`.
+    granularity : int
+        Granularity. See :class:`..wishbone.Interface`.
+
+    Attributes
+    ----------
+    bus : :class:`..wishbone.Interface`
+        Wishbone bus driven by the bridge.
+    sink : :class:`Interface`
+        Byte stream of commands.
+    source : :class:`Interface`
+        Byte stream of responses.
+    """
+    def __init__(self, *, addr_width, data_width=32, granularity=None):
+        self.bus    = WishboneInterface(addr_width=addr_width, data_width=data_width,
+                                        granularity=granularity, features={"err"}, name="bus")
+        self.sink   = Interface(8, name="sink")
+        self.source = Interface(8, name="source")
+
+    def elaborate(self, platform):
+        m = Module()
+
+        bus    = self.bus
+        sink   = self.sink
+        source = self.source
+
+        addr_bytes = (bus.addr_width + 7) // 8
+        data_bytes = bus.data_width // 8
+
+        write = Signal()
+        incr  = Signal()
+        count = Signal(8)
+        addr  = Signal(addr_bytes * 8)
+        data  = Signal(bus.data_width)
+        index = Signal(range(max(addr_bytes, data_bytes)))
+        error = Signal()
+
+        opcode = sink.payload[:2]
+
+        m.d.comb += [
+            bus.adr.eq(addr),
+            bus.dat_w.eq(data),
+            bus.sel.eq(Repl(1, len(bus.sel))),
+            bus.we.eq(write),
+        ]
+
+        def next_word():
+            with m.If(count == 0):
+                m.next = "STATUS"
+            with m.Else():
+                m.d.sync += count.eq(count - 1)
+                with m.If(incr):
+                    m.d.sync += addr.eq(addr[:bus.addr_width] + 1)
+                with m.If(write):
+                    m.next = "WRITE_DATA"
+                with m.Else():
+                    m.next = "ACCESS"
+
+        def first_word():
+            with m.If(write):
+                m.next = "WRITE_DATA"
+            with m.Else():
+                m.next = "ACCESS"
+
+        with m.FSM():
+            with m.State("COMMAND"):
+                m.d.comb += sink.ready.eq(1)
+                with m.If(sink.valid):
+                    m.d.sync += [
+                        write.eq(opcode == Command.WRITE.value),
+                        incr.eq(sink.payload[2]),
+                        error.eq(0),
+                    ]
+                    with m.If(((opcode == Command.WRITE.value) | (opcode == Command.READ.value)) &
+                              (sink.payload[3:] == 0)):
+                        m.next = "COUNT"
+
+            with m.State("COUNT"):
+                m.d.comb += sink.ready.eq(1)
+                with m.If(sink.valid):
+                    m.d.sync += count.eq(sink.payload)
+                    if addr_bytes:
+                        m.next = "ADDRESS"
+                    else:
+                        first_word()
+
+            if addr_bytes:
+                with m.State("ADDRESS"):
+                    m.d.comb += sink.ready.eq(1)
+                    with m.If(sink.valid):
+                        # Shift the address in, least significant byte first.
+                        m.d.sync += addr.eq(Cat(addr[8:], sink.payload))
+                        with m.If(index == addr_bytes - 1):
+                            m.d.sync += index.eq(0)
+                            first_word()
+                        with m.Else():
+                            m.d.sync += index.eq(index + 1)
+
+            with m.State("WRITE_DATA"):
+                m.d.comb += sink.ready.eq(1)
+                with m.If(sink.valid):
+                    m.d.sync += data.eq(Cat(data[8:], sink.payload))
+                    with m.If(index == data_bytes - 1):
+                        m.d.sync += index.eq(0)
+                        m.next = "ACCESS"
+                    with m.Else():
+                        m.d.sync += index.eq(index + 1)
+
+            with m.State("ACCESS"):
+                m.d.comb += [
+                    bus.cyc.eq(1),
+                    bus.stb.eq(1),
+                ]
+                with m.If(bus.ack | bus.err):
+                    with m.If(bus.err):
+                        m.d.sync += error.eq(1)
+                    with m.If(write):
+                        next_word()
+                    with m.Else():
+                        m.d.sync += data.eq(Mux(bus.err, 0, bus.dat_r))
+                        m.next = "READ_DATA"
+
+            with m.State("READ_DATA"):
+                m.d.comb += [
+                    source.payload.eq(data[:8]),
+                    source.valid.eq(1),
+                ]
+                with m.If(source.ready):
+                    m.d.sync += data.eq(data[8:])
+                    with m.If(index == data_bytes - 1):
+                        m.d.sync += index.eq(0)
+                        next_word()
+                    with m.Else():
+                        m.d.sync += index.eq(index + 1)
+
+            with m.State("STATUS"):
+                m.d.comb += [
+                    source.payload.eq(Mux(error, Status.ERROR.value, Status.OK.value)),
+                    source.valid.eq(1),
+                ]
+                with m.If(source.ready):
+                    m.next = "COMMAND"
+
+        return m
@@ -0,0 +1,265 @@
+# nmigen: UnusedElaboratable=no
+
+import unittest
+from nmigen import *
+from nmigen.back.pysim import *
+
+from ..axi.bus import *
+from ..latency import Latency
+
+
+class InterfaceTestCase(unittest.TestCase):
+    def test_lite(self):
+        iface = Interface(addr_width=12, data_width=32, lite=True)
+        self.assertEqual((iface.addr_width, iface.data_width, iface.id_width, iface.lite),
+                         (12, 32, 0, True))
+        self.assertEqual(list(iface.fields), ["aw", "w", "b", "ar", "r"])
+        self.assertEqual(list(iface.aw.fields), ["addr", "prot", "valid", "ready"])
+        self.assertEqual(list(iface.w.fields),  ["data", "strb", "valid", "ready"])
+        self.assertEqual(list(iface.b.fields),  ["resp", "valid", "ready"])
+        self.assertEqual(list(iface.ar.fields), ["addr", "prot", "valid", "ready"])
+        self.assertEqual(list(iface.r.fields),  ["data", "resp", "valid", "ready"])
+        self.assertEqual(len(iface.w.strb), 4)
+        self.assertEqual((iface.memory_map.addr_width, iface.memory_map.data_width), (12, 8))
+
+    def test_full(self):
+        iface = Interface(addr_width=32, data_width=128, id_width=4)
+        self.assertEqual(list(iface.aw.fields), [
+            "addr", "prot", "id", "len", "size", "burst", "lock", "cache", "qos", "valid", "ready"
+        ])
+        self.assertEqual(list(iface.w.fields), ["data", "strb", "last", "valid", "ready"])
+        self.assertEqual(list(iface.b.fields), ["resp", "id", "valid", "ready"])
+        self.assertEqual(list(iface.r.fields), ["data", "resp", "id", "last", "valid", "ready"])
+        self.assertEqual(len(iface.w.strb), 16)
+        self.assertEqual(len(iface.ar.id), 4)
+
+    def test_full_no_id(self):
+        iface = Interface(addr_width=32, data_width=32)
+        self.assertFalse(hasattr(iface.aw, "id"))
+        self.assertFalse(hasattr(iface.r, "id"))
+        self.assertTrue(hasattr(iface.r, "last"))
+
+    def test_wrong_addr_width(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Address width must be a non-negative integer, not -1"):
+            Interface(addr_width=-1, data_width=32)
+
+    def test_wrong_data_width(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Data width must be one of 8, 16, 32, 64, 128, 256, 512, 1024, not 7"):
+            Interface(addr_width=0, data_width=7)
+        with self.assertRaisesRegex(ValueError,
+                r"AXI4-Lite data width must be one of 32, 64, not 128"):
+            Interface(addr_width=0, data_width=128, lite=True)
+
+    def test_wrong_id_width(self):
+        with self.assertRaisesRegex(ValueError,
+                r"ID width must be a non-negative integer, not -1"):
+            Interface(addr_width=0, data_width=32, id_width=-1)
+        with self.assertRaisesRegex(ValueError,
+                r"AXI4-Lite interfaces have no ID signals, ID width must be 0, not 4"):
+            Interface(addr_width=0, data_width=32, id_width=4, lite=True)
+
+
+class DecoderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dut = Decoder(addr_width=16, data_width=32, lite=True)
+
+    def test_add(self):
+        sub_1 = Interface(addr_width=12, data_width=32, lite=True)
+        sub_2 = Interface(addr_width=8,  data_width=32, lite=True)
+        self.assertEqual(self.dut.add(sub_1), (0, 0x1000, 1))
+        self.assertEqual(self.dut.add(sub_2), (0x1000, 0x1100, 1))
+        self.assertEqual(self.dut.bus.memory_map.latency, Latency(read=0, write=0))
+
+    def test_add_wrong_sub_bus(self):
+        with self.assertRaisesRegex(TypeError,
+                r"Subordinate bus must be an instance of axi\.Interface, not 1"):
+            self.dut.add(1)
+
+    def test_add_wrong_kind(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Subordinate bus is an AXI4 interface, but the decoder is an AXI4-Lite decoder"):
+            self.dut.add(Interface(addr_width=12, data_width=32))
+
+    def test_add_wrong_data_width(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Subordinate bus has data width 64, which is not the same as decoder data width "
+                r"32"):
+            self.dut.add(Interface(addr_width=12, data_width=64, lite=True))
+
+    def test_add_wrong_id_width(self):
+        dut = Decoder(addr_width=16, data_width=32, id_width=2)
+        with self.assertRaisesRegex(ValueError,
+                r"Subordinate bus has ID width 4, which is not the same as decoder ID width 2"):
+            dut.add(Interface(addr_width=12, data_width=32, id_width=4))
+
+
+class DecoderSimulationTestCase(unittest.TestCase):
+    def test_sim_lite(self):
+        dut   = Decoder(addr_width=16, data_width=32, lite=True)
+        sub_1 = Interface(addr_width=12, data_width=32, lite=True, name="sub_1")
+        sub_2 = Interface(addr_width=12, data_width=32, lite=True, name="sub_2")
+        dut.add(sub_1)
+        dut.add(sub_2)
+        bus = dut.bus
+
+        def sim_test():
+            # Write to the second subordinate bus.
+            yield bus.aw.addr.eq(0x1004)
+            yield bus.aw.valid.eq(1)
+            yield Settle()
+            self.assertEqual((yield sub_1.aw.valid), 0)
+            self.assertEqual((yield sub_2.aw.valid), 1)
+            self.assertEqual((yield sub_2.aw.addr), 0x004)
+            self.assertEqual((yield bus.aw.ready), 0)
+            yield sub_2.aw.ready.eq(1)
+            yield Settle()
+            self.assertEqual((yield bus.aw.ready), 1)
+            yield
+            yield bus.aw.valid.eq(0)
+            yield sub_2.aw.ready.eq(0)
+            yield bus.w.data.eq(0x12345678)
+            yield bus.w.strb.eq(0b1111)
+            yield bus.w.valid.eq(1)
+            yield sub_2.w.ready.eq(1)
+            yield Settle()
+            self.assertEqual((yield sub_1.w.valid), 0)
+            self.assertEqual((yield sub_2.w.valid), 1)
+            self.assertEqual((yield sub_2.w.data), 0x12345678)
+            self.assertEqual((yield bus.w.ready), 1)
+            yield
+            yield bus.w.valid.eq(0)
+            yield sub_2.w.ready.eq(0)
+            yield bus.b.ready.eq(1)
+            yield Settle()
+            self.assertEqual((yield bus.b.valid), 0)
+            # The response of a subordinate bus that is not selected is ignored.
+            yield sub_1.b.valid.eq(1)
+            yield Settle()
+            self.assertEqual((yield bus.b.valid), 0)
+            yield sub_1.b.valid.eq(0)
+            yield sub_2.b.valid.eq(1)
+            yield sub_2.b.resp.eq(Response.SLVERR)
+            yield Settle()
+            self.assertEqual((yield bus.b.valid), 1)
+            self.assertEqual((yield bus.b.resp), Response.SLVERR.value)
+            self.assertEqual((yield sub_2.b.ready), 1)
+            yield
+            yield sub_2.b.valid.eq(0)
+            yield bus.b.ready.eq(0)
+
+            # Read from the first subordinate bus.
+            yield bus.ar.addr.eq(0x0008)
+            yield bus.ar.valid.eq(1)
+            yield sub_1.ar.ready.eq(1)
+            yield Settle()
+            self.assertEqual((yield sub_1.ar.valid), 1)
+            self.assertEqual((yield sub_2.ar.valid), 0)
+            self.assertEqual((yield bus.ar.ready), 1)
+            yield
+            yield bus.ar.valid.eq(0)
+            yield sub_1.ar.ready.eq(0)
+            yield Settle()
+            # Another read is not accepted until the response is returned.
+            self.assertEqual((yield bus.ar.ready), 0)
+            yield sub_1.r.valid.eq(1)
+            yield sub_1.r.data.eq(0xabcdef01)
+            yield bus.r.ready.eq(1)
+            yield Settle()
+            self.assertEqual((yield bus.r.valid), 1)
+            self.assertEqual((yield bus.r.data), 0xabcdef01)
+            self.assertEqual((yield bus.r.resp), Response.OKAY.value)
+            self.assertEqual((yield sub_1.r.ready), 1)
+            yield
+            yield sub_1.r.valid.eq(0)
+            yield bus.r.ready.eq(0)
+
+            # Write to an unmapped address.
+            yield bus.aw.addr.eq(0x8000)
+            yield bus.aw.valid.eq(1)
+            yield Settle()
+            self.assertEqual((yield sub_1.aw.valid), 0)
+            self.assertEqual((yield sub_2.aw.valid), 0)
+            self.assertEqual((yield bus.aw.ready), 1)
+            yield
+            yield bus.aw.valid.eq(0)
+            yield bus.w.valid.eq(1)
+            yield Settle()
+            self.assertEqual((yield bus.w.ready), 1)
+            yield
+            yield bus.w.valid.eq(0)
+            yield bus.b.ready.eq(1)
+            yield Settle()
+            self.assertEqual((yield bus.b.valid), 1)
+            self.assertEqual((yield bus.b.resp), Response.DECERR.value)
+            yield
+            yield bus.b.ready.eq(0)
+            yield Settle()
+            self.assertEqual((yield bus.b.valid), 0)
+
+        with Simulator(dut, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
+
+    def test_sim_unmapped_burst(self):
+        dut = Decoder(addr_width=16, data_width=32, id_width=4)
+        sub = Interface(addr_width=12, data_width=32, id_width=4, name="sub")
+        dut.add(sub)
+        bus = dut.bus
+
+        def sim_test():
+            yield bus.ar.addr.eq(0x4000)
+            yield bus.ar.len.eq(2)
+            yield bus.ar.id.eq(5)
+            yield bus.ar.valid.eq(1)
+            yield Settle()
+            self.assertEqual((yield sub.ar.valid), 0)
+            self.assertEqual((yield bus.ar.ready), 1)
+            yield
+            yield bus.ar.valid.eq(0)
+            yield bus.r.ready.eq(1)
+            beats = []
+            for _ in range(3):
+                yield Settle()
+                self.assertEqual((yield bus.r.valid), 1)
+                beats.append(((yield bus.r.resp), (yield bus.r.id), (yield bus.r.last)))
+                yield
+            yield Settle()
+            self.assertEqual((yield bus.r.valid), 0)
+            self.assertEqual(beats, [
+                (Response.DECERR.value, 5, 0),
+                (Response.DECERR.value, 5, 0),
+                (Response.DECERR.value, 5, 1),
+            ])
+
+            # A mapped burst is routed until its last beat.
+            yield bus.ar.addr.eq(0x0100)
+            yield bus.ar.len.eq(1)
+            yield bus.ar.valid.eq(1)
+            yield sub.ar.ready.eq(1)
+            yield
+            yield bus.ar.valid.eq(0)
+            yield sub.ar.ready.eq(0)
+            yield sub.r.valid.eq(1)
+            yield sub.r.id.eq(5)
+            yield Settle()
+            self.assertEqual((yield bus.r.id), 5)
+            self.assertEqual((yield bus.r.last), 0)
+            yield
+            yield sub.r.last.eq(1)
+            yield Settle()
+            self.assertEqual((yield bus.r.valid), 1)
+            self.assertEqual((yield bus.r.last), 1)
+            yield
+            yield sub.r.valid.eq(0)
+            yield sub.r.last.eq(0)
+            yield bus.ar.valid.eq(1)
+            yield Settle()
+            self.assertEqual((yield sub.ar.valid), 1)
+
+        with Simulator(dut, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
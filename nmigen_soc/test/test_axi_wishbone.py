@@ -0,0 +1,367 @@
+# nmigen: UnusedElaboratable=no
+
+import unittest
+from nmigen import *
+from nmigen.back.pysim import *
+
+from ..axi.bus import *
+from ..axi.wishbone import *
+from .. import wishbone
+from ..wishbone.bus import CycleType, BurstTypeExt
+from ..latency import Latency
+
+
+def axi_memory(bus, mem, log, errors=frozenset()):
+    # A cycle-based AXI4 subordinate that performs one transaction at a time. Outputs are driven
+    # right after each clock edge, and handshakes are sampled once the design settles.
+    state, addr, beats = "idle", 0, 0
+    data_bytes = bus.data_width // 8
+    resp = Response.OKAY
+    yield Passive()
+    while True:
+        yield bus.aw.ready.eq(state == "idle")
+        yield bus.ar.ready.eq(state == "idle")
+        yield bus.w.ready.eq(state == "w")
+        yield bus.b.valid.eq(state == "b")
+        yield bus.r.valid.eq(state == "r")
+        yield bus.b.resp.eq(resp)
+        yield bus.r.resp.eq(resp)
+        if state == "r":
+            yield bus.r.data.eq(sum(mem.get(addr + i, 0) << (i * 8) for i in range(data_bytes)))
+            yield bus.r.last.eq(beats == 1)
+        yield Settle()
+        if state == "idle":
+            if (yield bus.aw.valid):
+                addr, length = (yield bus.aw.addr), (yield bus.aw.len)
+                log.append(("aw", addr, length))
+                state, beats, resp = "w", length + 1, Response.OKAY
+            elif (yield bus.ar.valid):
+                addr, length = (yield bus.ar.addr), (yield bus.ar.len)
+                log.append(("ar", addr, length))
+                state, beats = "r", length + 1
+                resp = Response.SLVERR if addr in errors else Response.OKAY
+        elif state == "w":
+            if (yield bus.w.valid):
+                data, strb = (yield bus.w.data), (yield bus.w.strb)
+                log.append(("w", strb))
+                for i in range(data_bytes):
+                    if strb & (1 << i):
+                        mem[addr + i] = (data >> (i * 8)) & 0xff
+                if addr in errors:
+                    resp = Response.SLVERR
+                addr, beats = addr + data_bytes, beats - 1
+                assert (yield bus.w.last) == (beats == 0)
+                if beats == 0:
+                    state = "b"
+        elif state == "b":
+            if (yield bus.b.ready):
+                state = "idle"
+        elif state == "r":
+            if (yield bus.r.ready):
+                addr, beats = addr + data_bytes, beats - 1
+                if beats == 0:
+                    state = "idle"
+        yield
+
+
+def wb_cycle(bus, addr, data=None, *, length=1, burst=False):
+    # Perform a Wishbone cycle of `length` transfers, returning a list of tuples
+    # `(wait cycles, terminated with err, read data)`.
+    results = []
+    yield bus.cyc.eq(1)
+    for index in range(length):
+        cycle = 0
+        if not burst:
+            cti = CycleType.CLASSIC
+        elif index == length - 1:
+            cti = CycleType.END_OF_BURST
+        else:
+            cti = CycleType.INCR_BURST
+        yield bus.adr.eq(addr + index)
+        yield bus.we.eq(data is not None)
+        yield bus.sel.eq(~0)
+        if data is not None:
+            yield bus.dat_w.eq(data[index])
+        yield bus.cti.eq(cti)
+        yield bus.bte.eq(BurstTypeExt.LINEAR)
+        yield bus.stb.eq(1)
+        while True:
+            yield Settle()
+            if (yield bus.ack) or (yield bus.err):
+                results.append((cycle, (yield bus.err), (yield bus.dat_r)))
+                yield
+                break
+            yield
+            cycle += 1
+    yield bus.stb.eq(0)
+    yield bus.cyc.eq(0)
+    return results
+
+
+class AXILiteWishboneBridgeTestCase(unittest.TestCase):
+    def test_wrong_wb_bus(self):
+        with self.assertRaisesRegex(TypeError,
+                r"Wishbone bus must be an instance of wishbone\.Interface, not 'foo'"):
+            AXILiteWishboneBridge("foo")
+
+    def test_wrong_wb_bus_data_width(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Wishbone bus data width must be one of 32, 64, not 16"):
+            AXILiteWishboneBridge(wishbone.Interface(addr_width=8, data_width=16, granularity=8))
+
+    def test_wrong_wb_bus_granularity(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Wishbone bus granularity must be 8, not 32"):
+            AXILiteWishboneBridge(wishbone.Interface(addr_width=8, data_width=32))
+
+    def test_memory_map(self):
+        wb_bus = wishbone.Interface(addr_width=10, data_width=32, granularity=8)
+        dut = AXILiteWishboneBridge(wb_bus)
+        self.assertEqual((dut.axi_bus.addr_width, dut.axi_bus.data_width, dut.axi_bus.lite),
+                         (12, 32, True))
+        self.assertEqual(list(dut.axi_bus.memory_map.windows()),
+                         [(wb_bus.memory_map, (0, 0x1000, 1))])
+        self.assertEqual(dut.axi_bus.memory_map.latency, Latency(read=2, write=1))
+
+    def test_sim(self):
+        wb_bus = wishbone.Interface(addr_width=10, data_width=32, granularity=8,
+                                    features={"err", "rty"}, name="wb")
+        dut = AXILiteWishboneBridge(wb_bus)
+        axi = dut.axi_bus
+        mem = {}
+
+        def wb_memory():
+            yield Passive()
+            while True:
+                yield wb_bus.ack.eq(0)
+                yield wb_bus.err.eq(0)
+                yield wb_bus.rty.eq(0)
+                yield Settle()
+                if (yield wb_bus.cyc) and (yield wb_bus.stb):
+                    adr = yield wb_bus.adr
+                    if adr == 0x3ff:
+                        yield wb_bus.err.eq(1)
+                    elif adr == 0x3fe:
+                        yield wb_bus.rty.eq(1)
+                    elif (yield wb_bus.we):
+                        sel, dat_w = (yield wb_bus.sel), (yield wb_bus.dat_w)
+                        word = mem.get(adr, 0)
+                        for i in range(4):
+                            if sel & (1 << i):
+                                word = (word & ~(0xff << (i * 8))) | (dat_w & (0xff << (i * 8)))
+                        mem[adr] = word
+                        yield wb_bus.ack.eq(1)
+                    else:
+                        yield wb_bus.dat_r.eq(mem.get(adr, 0))
+                        yield wb_bus.ack.eq(1)
+                yield
+
+        def axi_write(addr, data, strb=0b1111):
+            yield axi.aw.addr.eq(addr)
+            yield axi.aw.valid.eq(1)
+            yield axi.w.data.eq(data)
+            yield axi.w.strb.eq(strb)
+            yield axi.w.valid.eq(1)
+            yield Settle()
+            while not (yield axi.aw.ready):
+                yield
+                yield Settle()
+            yield
+            yield axi.aw.valid.eq(0)
+            yield axi.w.valid.eq(0)
+            yield axi.b.ready.eq(1)
+            yield Settle()
+            while not (yield axi.b.valid):
+                yield
+                yield Settle()
+            resp = yield axi.b.resp
+            yield
+            yield axi.b.ready.eq(0)
+            return resp
+
+        def axi_read(addr):
+            yield axi.ar.addr.eq(addr)
+            yield axi.ar.valid.eq(1)
+            yield Settle()
+            while not (yield axi.ar.ready):
+                yield
+                yield Settle()
+            yield
+            yield axi.ar.valid.eq(0)
+            yield axi.r.ready.eq(1)
+            cycles = 1
+            yield Settle()
+            while not (yield axi.r.valid):
+                yield
+                yield Settle()
+                cycles += 1
+            result = (cycles, (yield axi.r.resp), (yield axi.r.data))
+            yield
+            yield axi.r.ready.eq(0)
+            return result
+
+        def sim_test():
+            self.assertEqual((yield from axi_write(0x010, 0x12345678)), Response.OKAY.value)
+            self.assertEqual(mem, {0x004: 0x12345678})
+            self.assertEqual((yield from axi_write(0x010, 0xaabbccdd, strb=0b0110)),
+                             Response.OKAY.value)
+            self.assertEqual(mem, {0x004: 0x12bbcc78})
+            self.assertEqual((yield from axi_read(0x010)),
+                             (2, Response.OKAY.value, 0x12bbcc78))
+            self.assertEqual((yield from axi_read(0xffc))[1], Response.SLVERR.value)
+            self.assertEqual((yield from axi_write(0xffc, 0)), Response.SLVERR.value)
+            # A transfer terminated with rty is not retried, and is reported as an error, too.
+            self.assertEqual((yield from axi_read(0xff8))[1], Response.SLVERR.value)
+            self.assertEqual((yield from axi_write(0xff8, 0)), Response.SLVERR.value)
+            self.assertEqual((yield from axi_read(0x010)),
+                             (2, Response.OKAY.value, 0x12bbcc78))
+
+        m = Module()
+        m.submodules.dut = dut
+        with Simulator(m, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(wb_memory())
+            sim.add_sync_process(sim_test())
+            sim.run()
+
+    def test_sim_fairness(self):
+        wb_bus = wishbone.Interface(addr_width=10, data_width=32, granularity=8, name="wb")
+        dut = AXILiteWishboneBridge(wb_bus)
+        axi = dut.axi_bus
+
+        def sim_test():
+            yield axi.aw.valid.eq(1)
+            yield axi.w.valid.eq(1)
+            yield axi.ar.valid.eq(1)
+            yield axi.b.ready.eq(1)
+            yield axi.r.ready.eq(1)
+            yield wb_bus.ack.eq(1)
+            order = []
+            for _ in range(12):
+                yield Settle()
+                if (yield axi.aw.ready):
+                    order.append("w")
+                if (yield axi.ar.ready):
+                    order.append("r")
+                yield
+            self.assertEqual(order, ["w", "r", "w", "r"])
+
+        with Simulator(dut, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
+
+
+class WishboneAXIBridgeTestCase(unittest.TestCase):
+    def test_wrong_axi_bus(self):
+        with self.assertRaisesRegex(TypeError,
+                r"AXI bus must be an instance of axi\.Interface, not 'foo'"):
+            WishboneAXIBridge("foo")
+
+    def test_wrong_axi_bus_lite(self):
+        with self.assertRaisesRegex(ValueError,
+                r"AXI bus must be an AXI4 interface, not an AXI4-Lite interface"):
+            WishboneAXIBridge(Interface(addr_width=16, data_width=32, lite=True))
+
+    def test_wrong_axi_bus_data_width(self):
+        with self.assertRaisesRegex(ValueError,
+                r"AXI bus data width must be one of 8, 16, 32, 64, not 128"):
+            WishboneAXIBridge(Interface(addr_width=16, data_width=128))
+
+    def test_wrong_axi_bus_addr_width(self):
+        with self.assertRaisesRegex(ValueError,
+                r"AXI bus address width must be at least 2, not 1"):
+            WishboneAXIBridge(Interface(addr_width=1, data_width=32))
+
+    def test_wrong_burst_length(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Burst length must be an integer between 1 and 256, not 0"):
+            WishboneAXIBridge(Interface(addr_width=16, data_width=32), burst_length=0)
+
+    def test_memory_map(self):
+        axi_bus = Interface(addr_width=16, data_width=32)
+        dut = WishboneAXIBridge(axi_bus)
+        self.assertEqual((dut.wb_bus.addr_width, dut.wb_bus.data_width, dut.wb_bus.granularity),
+                         (14, 32, 8))
+        self.assertTrue(hasattr(dut.wb_bus, "cti"))
+        self.assertEqual(list(dut.wb_bus.memory_map.windows()),
+                         [(axi_bus.memory_map, (0, 0x10000, 1))])
+        self.assertEqual(dut.wb_bus.memory_map.latency, Latency(read=1, write=2))
+
+    def simulate(self, process, *, burst_length=4, errors=frozenset()):
+        axi_bus = Interface(addr_width=16, data_width=32, name="axi")
+        dut = WishboneAXIBridge(axi_bus, burst_length=burst_length)
+        mem, log = {}, []
+
+        m = Module()
+        m.submodules.dut = dut
+        with Simulator(m, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(axi_memory(axi_bus, mem, log, errors))
+            sim.add_sync_process(process(dut.wb_bus, mem, log))
+            sim.run()
+
+    def test_sim_classic(self):
+        def process(wb, mem, log):
+            results = yield from wb_cycle(wb, 0x10, [0x12345678])
+            self.assertEqual([err for _, err, _ in results], [0])
+            self.assertEqual(log, [("aw", 0x40, 0), ("w", 0b1111)])
+            self.assertEqual([mem[0x40 + i] for i in range(4)], [0x78, 0x56, 0x34, 0x12])
+            del log[:]
+            results = yield from wb_cycle(wb, 0x10)
+            self.assertEqual(results, [(2, 0, 0x12345678)])
+            self.assertEqual(log, [("ar", 0x40, 0)])
+        self.simulate(process)
+
+    def test_sim_write_burst(self):
+        def process(wb, mem, log):
+            data = [0x11111111 * (i + 1) for i in range(6)]
+            results = yield from wb_cycle(wb, 0x10, data, length=6, burst=True)
+            self.assertEqual([err for _, err, _ in results], [0] * 6)
+            self.assertEqual(log, [
+                ("aw", 0x40, 3), ("w", 0b1111), ("w", 0b1111), ("w", 0b1111), ("w", 0b1111),
+                ("aw", 0x50, 3), ("w", 0b1111), ("w", 0b1111), ("w", 0b0000), ("w", 0b0000),
+            ])
+            self.assertEqual(sorted(mem), list(range(0x40, 0x58)))
+            self.assertEqual([mem[0x40 + 4 * i] for i in range(6)],
+                             [0x11 * (i + 1) for i in range(6)])
+        self.simulate(process)
+
+    def test_sim_read_burst(self):
+        def process(wb, mem, log):
+            mem.update({addr: addr for addr in range(0x100)})
+            results = yield from wb_cycle(wb, 0x10, length=6, burst=True)
+            self.assertEqual([dat_r for _, _, dat_r in results],
+                             [0x43424140 + 0x04040404 * i for i in range(6)])
+            self.assertEqual(log, [("ar", 0x40, 3), ("ar", 0x50, 3)])
+            # Within an AXI burst, each beat takes one cycle.
+            self.assertEqual([cycle for cycle, _, _ in results], [2, 0, 0, 0, 2, 0])
+
+            # The excess beats of the second AXI burst are drained before the next transfer.
+            del log[:]
+            results = yield from wb_cycle(wb, 0x20)
+            self.assertEqual(results, [(4, 0, 0x83828180)])
+            self.assertEqual(log, [("ar", 0x80, 0)])
+        self.simulate(process)
+
+    def test_sim_boundary(self):
+        def process(wb, mem, log):
+            yield from wb_cycle(wb, 0x3fe, [1, 2, 3, 4], length=4, burst=True)
+            self.assertEqual([entry for entry in log if entry[0] == "aw"],
+                             [("aw", 0xff8, 1), ("aw", 0x1000, 15)])
+            # The last transfer of a burst is performed as a single beat.
+            del log[:]
+            yield from wb_cycle(wb, 0x3fe, [1, 2, 3], length=3, burst=True)
+            self.assertEqual([entry for entry in log if entry[0] == "aw"],
+                             [("aw", 0xff8, 1), ("aw", 0x1000, 0)])
+        self.simulate(process, burst_length=16)
+
+    def test_sim_error(self):
+        def process(wb, mem, log):
+            results = yield from wb_cycle(wb, 0x10)
+            self.assertEqual(results[0][1], 1)
+            results = yield from wb_cycle(wb, 0x10, [0])
+            self.assertEqual(results[0][1], 1)
+            results = yield from wb_cycle(wb, 0x11, [0])
+            self.assertEqual(results[0][1], 0)
+        self.simulate(process, errors={0x40})
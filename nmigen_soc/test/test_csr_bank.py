@@ -0,0 +1,177 @@
+# nmigen: UnusedElaboratable=no
+
+import unittest
+from nmigen import *
+from nmigen.back.pysim import *
+
+from ..csr.bus import *
+from ..csr.bank import *
+
+
+class FieldTestCase(unittest.TestCase):
+    def test_rw(self):
+        field = Field(4, "rw", reset=0x5)
+        self.assertEqual(field.width, 4)
+        self.assertEqual(field.access, Field.Access.RW)
+        self.assertEqual(field.reset, 0x5)
+        self.assertEqual(len(field.value), 4)
+        self.assertEqual(len(field.w_stb), 1)
+
+    def test_w1c(self):
+        field = Field(3, "w1c")
+        self.assertEqual(len(field.set), 3)
+        self.assertFalse(hasattr(field, "w_stb"))
+
+    def test_w1s(self):
+        field = Field(3, Field.Access.W1S)
+        self.assertEqual(len(field.clear), 3)
+
+    def test_width_wrong(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Width must be a positive integer, not 0"):
+            Field(0, "rw")
+
+    def test_access_wrong(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Access mode must be one of \"r\", \"rw\", \"w1c\", \"w1s\", or \"rc\", "
+                r"not 'wo'"):
+            Field(1, "wo")
+
+    def test_reset_wrong(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Reset value must be a non-negative integer that fits in 2 bits, not 4"):
+            Field(2, "rw", reset=4)
+
+
+class RegisterBankTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dut = RegisterBank(addr_width=8, data_width=8)
+
+    def test_pack(self):
+        a = self.dut.add(Field(3, "rw"))
+        b = self.dut.add(Field(12, "r"))
+        c = self.dut.add(Field(6, "w1c"))
+        d = self.dut.add(Field(4, "rc"))
+        e = self.dut.add(Field(2, "r"))
+
+        regs = list(self.dut.registers())
+        self.assertEqual(len(regs), 3)
+        (elem_1, layout_1), (elem_2, layout_2), (elem_3, layout_3) = regs
+        self.assertEqual(layout_1, ((a, 0),))
+        self.assertEqual(elem_1.width, 3)
+        self.assertEqual(elem_1.access, Element.Access.RW)
+        # The 12-bit field leaves 4 bits free in its 2-chunk register, taken by the 4-bit field.
+        self.assertEqual(layout_2, ((b, 0), (d, 12)))
+        self.assertEqual(elem_2.width, 16)
+        self.assertEqual(elem_2.access, Element.Access.R)
+        self.assertEqual(layout_3, ((c, 0), (e, 6)))
+        self.assertEqual(elem_3.width, 8)
+        self.assertEqual(elem_3.access, Element.Access.RW)
+
+        self.assertEqual(list(self.dut.fields()), [
+            (a, (elem_1, 0)),
+            (b, (elem_2, 0)),
+            (c, (elem_3, 0)),
+            (d, (elem_2, 12)),
+            (e, (elem_3, 6)),
+        ])
+        self.assertEqual(list(self.dut.bus.memory_map.resources()), [
+            (elem_1, (0, 1)),
+            (elem_2, (1, 3)),
+            (elem_3, (3, 4)),
+        ])
+
+    def test_pack_order(self):
+        a = self.dut.add(Field(1, "rw"))
+        b = self.dut.add(Field(8, "rw"))
+        c = self.dut.add(Field(2, "rw"))
+        self.assertEqual([layout for _, layout in self.dut.registers()], [
+            ((c, 0), (a, 2)),
+            ((b, 0),),
+        ])
+
+    def test_add_wrong(self):
+        with self.assertRaisesRegex(TypeError,
+                r"Field must be an instance of csr\.Field, not 'foo'"):
+            self.dut.add("foo")
+
+    def test_add_twice(self):
+        field = self.dut.add(Field(1, "rw"))
+        with self.assertRaisesRegex(ValueError,
+                r"Field .+ is already added"):
+            self.dut.add(field)
+
+    def test_add_frozen(self):
+        self.dut.add(Field(1, "rw"))
+        self.dut.bus
+        with self.assertRaisesRegex(ValueError,
+                r"Cannot add field .+ because the register layout has already been computed"):
+            self.dut.add(Field(1, "rw"))
+
+    def test_sim(self):
+        rw  = self.dut.add(Field(4, "rw", reset=0x9))
+        w1c = self.dut.add(Field(2, "w1c"))
+        w1s = self.dut.add(Field(2, "w1s"))
+        rc  = self.dut.add(Field(4, "rc"))
+        ro  = self.dut.add(Field(4, "r"))
+        bus = self.dut.bus
+
+        (elem_1, layout_1), (elem_2, layout_2) = self.dut.registers()
+        self.assertEqual(layout_1, ((rw, 0), (rc, 4)))
+        self.assertEqual(layout_2, ((ro, 0), (w1c, 4), (w1s, 6)))
+
+        def sim_test():
+            yield ro.value.eq(0xc)
+            yield w1c.set.eq(0b11)
+            yield rc.set.eq(0b0101)
+            yield
+            yield w1c.set.eq(0)
+            yield rc.set.eq(0)
+
+            yield bus.addr.eq(0)
+            yield bus.r_stb.eq(1)
+            yield
+            yield bus.r_stb.eq(0)
+            yield
+            self.assertEqual((yield bus.r_data), 0x59)
+            self.assertEqual((yield rc.value), 0)
+
+            yield bus.addr.eq(1)
+            yield bus.r_stb.eq(1)
+            yield
+            yield bus.r_stb.eq(0)
+            yield
+            self.assertEqual((yield bus.r_data), 0b00_11_1100)
+
+            yield bus.addr.eq(0)
+            yield bus.w_data.eq(0x36)
+            yield bus.w_stb.eq(1)
+            yield
+            yield bus.w_stb.eq(0)
+            yield
+            self.assertEqual((yield rw.w_stb), 1)
+            yield
+            self.assertEqual((yield rw.w_stb), 0)
+            self.assertEqual((yield rw.value), 0x6)
+            self.assertEqual((yield rc.value), 0)
+
+            yield bus.addr.eq(1)
+            yield bus.w_data.eq(0b10_01_0000)
+            yield bus.w_stb.eq(1)
+            yield
+            yield bus.w_stb.eq(0)
+            yield
+            yield
+            self.assertEqual((yield w1c.value), 0b10)
+            self.assertEqual((yield w1s.value), 0b10)
+
+            yield w1s.clear.eq(0b10)
+            yield
+            yield w1s.clear.eq(0)
+            yield
+            self.assertEqual((yield w1s.value), 0b00)
+
+        with Simulator(self.dut, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
@@ -6,6 +6,7 @@ from nmigen.hdl.rec import Layout
 from nmigen.back.pysim import *
 
 from ..csr.bus import *
+from ..latency import Latency
 
 
 class ElementTestCase(unittest.TestCase):
@@ -59,6 +60,21 @@ class ElementTestCase(unittest.TestCase):
                 r"Access mode must be one of \"r\", \"w\", or \"rw\", not 'wo'"):
             Element(1, "wo")
 
+    def test_constant(self):
+        elem = Element(16, "r", constant=0x1234)
+        self.assertEqual(elem.constant, 0x1234)
+        self.assertEqual(Element(16, "r").constant, None)
+
+    def test_constant_wrong(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Constant must be a non-negative integer that fits in 8 bits, not 256"):
+            Element(8, "r", constant=256)
+
+    def test_constant_wrong_access(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Constant element must have access mode \"r\", not 'rw'"):
+            Element(8, "rw", constant=1)
+
 
 class InterfaceTestCase(unittest.TestCase):
     def test_layout(self):
@@ -199,6 +215,119 @@ class MultiplexerTestCase(unittest.TestCase):
             sim.run()
 
 
+    def test_sim_constant(self):
+        bus = self.dut.bus
+
+        elem_24_c = Element(24, "r", constant=0xab00cd)
+        self.dut.add(elem_24_c)
+        elem_8_rw = Element(8, "rw")
+        self.dut.add(elem_8_rw)
+
+        def sim_test():
+            yield elem_8_rw.r_data.eq(0x77)
+
+            yield bus.addr.eq(0)
+            yield bus.r_stb.eq(1)
+            yield
+            self.assertEqual((yield elem_24_c.r_stb), 1)
+            self.assertEqual((yield elem_24_c.r_data), 0xab00cd)
+            yield bus.addr.eq(1)
+            yield
+            self.assertEqual((yield elem_24_c.r_stb), 0)
+            self.assertEqual((yield bus.r_data), 0xcd)
+            yield bus.addr.eq(2)
+            yield
+            self.assertEqual((yield bus.r_data), 0x00)
+            yield bus.addr.eq(3)
+            yield
+            self.assertEqual((yield bus.r_data), 0xab)
+            yield bus.r_stb.eq(0)
+            yield
+            self.assertEqual((yield bus.r_data), 0x77)
+            yield
+            self.assertEqual((yield bus.r_data), 0)
+
+        with Simulator(self.dut, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
+
+    def test_add_alias(self):
+        elem = Element(12, "rw", name="ctrl")
+        self.dut.add(elem)
+        self.assertEqual(self.dut.add_alias(elem, "set"), (2, 4))
+        self.assertEqual(self.dut.add_alias(elem, Alias.Op.CLEAR, addr=8), (8, 10))
+        alias, _ = list(self.dut.bus.memory_map.resources())[2]
+        self.assertEqual((alias.name, alias.width, alias.access, alias.op),
+                         ("ctrl__clear", 12, Element.Access.W, Alias.Op.CLEAR))
+
+    def test_add_alias_wrong(self):
+        elem_r = Element(8, "r", name="status")
+        self.dut.add(elem_r)
+        with self.assertRaisesRegex(ValueError,
+                r"Element 'status' must have access mode \"rw\" to have aliases, not 'r'"):
+            self.dut.add_alias(elem_r, "set")
+        elem_rw = Element(8, "rw", name="ctrl")
+        with self.assertRaisesRegex(ValueError,
+                r"Element 'ctrl' has not been added to the multiplexer"):
+            self.dut.add_alias(elem_rw, "set")
+        with self.assertRaisesRegex(ValueError,
+                r"Operation must be one of \"set\", \"clear\", or \"toggle\", not 'flip'"):
+            self.dut.add_alias(elem_rw, "flip")
+        with self.assertRaisesRegex(TypeError,
+                r"Element must be an instance of csr\.Element, not 'foo'"):
+            self.dut.add_alias("foo", "set")
+
+    def test_sim_alias(self):
+        bus  = self.dut.bus
+        elem = Element(16, "rw", name="ctrl")
+        self.dut.add(elem)
+        self.dut.add_alias(elem, "set")
+        self.dut.add_alias(elem, "clear")
+        self.dut.add_alias(elem, "toggle")
+
+        m = Module()
+        m.submodules.mux = self.dut
+        reg = Signal(16, reset=0x00ff)
+        m.d.comb += elem.r_data.eq(reg)
+        with m.If(elem.w_stb):
+            m.d.sync += reg.eq(elem.w_data)
+
+        def write(addr, value):
+            for offset in range(2):
+                yield bus.addr.eq(addr + offset)
+                yield bus.w_data.eq(value >> (offset * 8))
+                yield bus.w_stb.eq(1)
+                yield
+            yield bus.w_stb.eq(0)
+            yield
+            yield
+
+        def sim_test():
+            yield from write(2, 0x1001)
+            self.assertEqual((yield reg), 0x10ff)
+            yield from write(4, 0x0011)
+            self.assertEqual((yield reg), 0x10ee)
+            yield from write(6, 0xffff)
+            self.assertEqual((yield reg), 0xef11)
+            yield from write(0, 0x1234)
+            self.assertEqual((yield reg), 0x1234)
+
+            # Aliases are write-only.
+            yield bus.addr.eq(2)
+            yield bus.r_stb.eq(1)
+            yield
+            yield bus.r_stb.eq(0)
+            self.assertEqual((yield elem.r_stb), 0)
+            yield
+            self.assertEqual((yield bus.r_data), 0)
+
+        with Simulator(m, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
+
+
 class MultiplexerAlignedTestCase(unittest.TestCase):
     def setUp(self):
         self.dut = Multiplexer(addr_width=16, data_width=8, alignment=2)
@@ -258,6 +387,144 @@ class MultiplexerAlignedTestCase(unittest.TestCase):
             sim.run()
 
 
+class MultiportMultiplexerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dut = MultiportMultiplexer(ports=2, addr_width=16, data_width=8)
+
+    def test_wrong_ports(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Amount of ports must be an integer greater than or equal to 2, not 1"):
+            MultiportMultiplexer(ports=1, addr_width=16, data_width=8)
+
+    def test_buses(self):
+        self.assertEqual(len(self.dut.buses), 2)
+        for bus in self.dut.buses:
+            self.assertEqual((bus.addr_width, bus.data_width), (16, 8))
+        self.assertEqual([bus.name for bus in self.dut.buses], ["csr_0", "csr_1"])
+
+    def test_add(self):
+        elem_1 = Element(16, "rw", name="elem_1")
+        elem_2 = Element(8, "r", name="elem_2")
+        self.assertEqual(self.dut.add(elem_1), (0, 2))
+        self.assertEqual(self.dut.align_to(2), 4)
+        self.assertEqual(self.dut.add(elem_2), (4, 5))
+        for bus in self.dut.buses:
+            resources = list(bus.memory_map.resources())
+            self.assertEqual(len(resources), 2)
+            self.assertIs(resources[0][0], elem_1)
+            self.assertEqual(resources[0][1], (0, 2))
+            self.assertIs(resources[1][0], elem_2)
+            self.assertEqual(resources[1][1], (4, 5))
+
+    def test_add_wrong(self):
+        with self.assertRaisesRegex(TypeError,
+                r"Element must be an instance of csr\.Element, not 'foo'"):
+            self.dut.add("foo")
+
+    def test_sim(self):
+        bus_0, bus_1 = self.dut.buses
+
+        elem_16_rw = Element(16, "rw", name="elem_16_rw")
+        self.dut.add(elem_16_rw)
+        elem_8_c = Element(8, "r", constant=0x5a, name="elem_8_c")
+        self.dut.add(elem_8_c)
+
+        def sim_test():
+            yield elem_16_rw.r_data.eq(0x1234)
+
+            # Concurrent reads of the same register.
+            yield bus_0.addr.eq(0)
+            yield bus_0.r_stb.eq(1)
+            yield bus_1.addr.eq(0)
+            yield bus_1.r_stb.eq(1)
+            yield
+            self.assertEqual((yield elem_16_rw.r_stb), 1)
+            yield bus_0.addr.eq(1)
+            yield bus_1.addr.eq(2)
+            yield
+            self.assertEqual((yield bus_0.r_data), 0x34)
+            self.assertEqual((yield bus_1.r_data), 0x34)
+            yield bus_0.r_stb.eq(0)
+            yield bus_1.r_stb.eq(0)
+            yield
+            self.assertEqual((yield bus_0.r_data), 0x12)
+            self.assertEqual((yield bus_1.r_data), 0x5a)
+
+            # Interleaved writes of the same register are atomic.
+            yield bus_0.addr.eq(0)
+            yield bus_0.w_data.eq(0x11)
+            yield bus_0.w_stb.eq(1)
+            yield bus_1.addr.eq(0)
+            yield bus_1.w_data.eq(0x22)
+            yield bus_1.w_stb.eq(1)
+            yield
+            yield bus_0.w_stb.eq(0)
+            yield bus_1.addr.eq(1)
+            yield bus_1.w_data.eq(0x33)
+            yield
+            yield bus_0.addr.eq(1)
+            yield bus_0.w_data.eq(0x44)
+            yield bus_0.w_stb.eq(1)
+            yield bus_1.w_stb.eq(0)
+            yield
+            self.assertEqual((yield elem_16_rw.w_stb), 1)
+            self.assertEqual((yield elem_16_rw.w_data), 0x3322)
+            yield bus_0.w_stb.eq(0)
+            yield
+            self.assertEqual((yield elem_16_rw.w_stb), 1)
+            self.assertEqual((yield elem_16_rw.w_data), 0x4411)
+            yield
+            self.assertEqual((yield elem_16_rw.w_stb), 0)
+
+            # Writes of the same register completed in the same cycle; bus 0 wins.
+            for bus, value in ((bus_0, 0xaabb), (bus_1, 0xccdd)):
+                yield bus.addr.eq(0)
+                yield bus.w_data.eq(value & 0xff)
+                yield bus.w_stb.eq(1)
+            yield
+            for bus, value in ((bus_0, 0xaabb), (bus_1, 0xccdd)):
+                yield bus.addr.eq(1)
+                yield bus.w_data.eq(value >> 8)
+            yield
+            yield bus_0.w_stb.eq(0)
+            yield bus_1.w_stb.eq(0)
+            yield
+            self.assertEqual((yield elem_16_rw.w_stb), 1)
+            self.assertEqual((yield elem_16_rw.w_data), 0xaabb)
+            yield
+            self.assertEqual((yield elem_16_rw.w_stb), 0)
+
+        with Simulator(self.dut, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
+
+    def test_sim_r_stb(self):
+        elems = [Element(16, "r", name="elem_{}".format(index)) for index in range(3)]
+        for elem in elems:
+            self.dut.add(elem)
+
+        def sim_test():
+            for bus in self.dut.buses:
+                for index, elem in enumerate(elems):
+                    yield bus.addr.eq(index * 2)
+                    yield bus.r_stb.eq(1)
+                    yield Settle()
+                    for other in elems:
+                        self.assertEqual((yield other.r_stb), int(other is elem))
+                    yield bus.addr.eq(index * 2 + 1)
+                    yield Settle()
+                    for other in elems:
+                        self.assertEqual((yield other.r_stb), 0)
+                    yield bus.r_stb.eq(0)
+                    yield
+
+        with Simulator(self.dut, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
+
+
 class DecoderTestCase(unittest.TestCase):
     def setUp(self):
         self.dut = Decoder(addr_width=16, data_width=8)
@@ -336,3 +603,234 @@ class DecoderTestCase(unittest.TestCase):
             sim.add_clock(1e-6)
             sim.add_sync_process(sim_test())
             sim.run()
+
+    def test_sim_minimal_decode(self):
+        dut = Decoder(addr_width=16, data_width=8, minimal_decode=True)
+        mux_1 = Multiplexer(addr_width=10, data_width=8)
+        dut.add(mux_1.bus)
+        mux_2 = Multiplexer(addr_width=10, data_width=8)
+        dut.add(mux_2.bus, addr=0x8000)
+        self.assertEqual([pattern for _, (pattern, _) in
+                          dut.bus.memory_map.window_patterns(minimize=True)],
+                         ["0---------------", "1---------------"])
+
+        def sim_test():
+            for addr, sub in [(0x0001, mux_1), (0x8001, mux_2), (0x4001, mux_1), (0xc401, mux_2)]:
+                yield dut.bus.addr.eq(addr)
+                yield dut.bus.r_stb.eq(1)
+                yield Delay(1e-6)
+                for other in (mux_1, mux_2):
+                    self.assertEqual((yield other.bus.r_stb), int(other is sub))
+                self.assertEqual((yield sub.bus.addr), addr & 0x3ff)
+
+        m = Module()
+        m.submodules += dut, mux_1, mux_2
+        with Simulator(m, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_process(sim_test())
+            sim.run()
+
+
+class BankedMultiplexerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dut = BankedMultiplexer(addr_width=12, data_width=8, bank_addr_width=4)
+
+    def test_bank_addr_width_wrong(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Bank address width must be a positive integer, not 0"):
+            BankedMultiplexer(addr_width=12, data_width=8, bank_addr_width=0)
+        with self.assertRaisesRegex(ValueError,
+                r"Bank address width must be less than or equal to address width 12, not 13"):
+            BankedMultiplexer(addr_width=12, data_width=8, bank_addr_width=13)
+
+    def test_add_wrong(self):
+        with self.assertRaisesRegex(TypeError,
+                r"Element must be an instance of csr\.Element, not 'foo'"):
+            self.dut.add("foo")
+
+    def test_add_twice(self):
+        elem = self.dut.add(Element(8, "rw", name="elem"))
+        with self.assertRaisesRegex(ValueError,
+                r"Element 'elem' is already added"):
+            self.dut.add(elem)
+
+    def test_add_too_wide(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Element 'elem' spans 17 addresses, which is more than the 16 addresses of "
+                r"a bank"):
+            self.dut.add(Element(136, "rw", name="elem"))
+
+    def test_add_frozen(self):
+        self.dut.add(Element(8, "rw"))
+        self.dut.bus
+        with self.assertRaisesRegex(ValueError,
+                r"Cannot add element 'elem' because the bank layout has already been computed"):
+            self.dut.add(Element(8, "rw", name="elem"))
+
+    def test_empty(self):
+        self.assertEqual(list(self.dut.banks()), [])
+        self.assertEqual(list(self.dut.bus.memory_map.all_resources()), [])
+
+    def test_banks(self):
+        widths = [8, 16, 32, 8, 8, 24, 32, 8, 8, 8, 16, 32]
+        elems  = [self.dut.add(Element(width, "rw", name="elem_{}".format(index)))
+                  for index, width in enumerate(widths)]
+        # 25 addresses need 2 banks; filling the first bank greedily would give 15 and 10.
+        banks = list(self.dut.banks())
+        self.assertEqual(len(banks), 2)
+        (mux_1, range_1), (mux_2, range_2) = banks
+        self.assertEqual(range_1, (0x00, 0x10))
+        self.assertEqual(range_2, (0x10, 0x20))
+        self.assertEqual([elem for elem, _ in mux_1.bus.memory_map.resources()], elems[:6])
+        self.assertEqual([elem for elem, _ in mux_2.bus.memory_map.resources()], elems[6:])
+
+        self.assertEqual([(elem, addr_range[:2]) for elem, addr_range in
+                          self.dut.bus.memory_map.all_resources()], [
+            (elems[0],  (0x00, 0x01)),
+            (elems[1],  (0x01, 0x03)),
+            (elems[2],  (0x03, 0x07)),
+            (elems[3],  (0x07, 0x08)),
+            (elems[4],  (0x08, 0x09)),
+            (elems[5],  (0x09, 0x0c)),
+            (elems[6],  (0x10, 0x14)),
+            (elems[7],  (0x14, 0x15)),
+            (elems[8],  (0x15, 0x16)),
+            (elems[9],  (0x16, 0x17)),
+            (elems[10], (0x17, 0x19)),
+            (elems[11], (0x19, 0x1d)),
+        ])
+
+    def test_banks_balanced(self):
+        dut = BankedMultiplexer(addr_width=16, data_width=8, bank_addr_width=6)
+        for index in range(1000):
+            dut.add(Element(8, "rw"))
+        sizes = [len(list(mux.bus.memory_map.resources())) for mux, _ in dut.banks()]
+        # Banks of 64 registers would leave the last one with only 40.
+        self.assertEqual(len(sizes), 16)
+        self.assertEqual(sum(sizes), 1000)
+        self.assertEqual(max(sizes), 63)
+
+    def test_sim(self):
+        elems = [self.dut.add(Element(16, "rw", name="elem_{}".format(index)))
+                 for index in range(20)]
+        bus = self.dut.bus
+        self.assertEqual(len(list(self.dut.banks())), 3)
+
+        def sim_test():
+            for index, elem in enumerate(elems):
+                yield elem.r_data.eq(0x100 * index + index)
+
+            for index, elem in enumerate(elems):
+                addr, _, _ = bus.memory_map.find_resource(elem)
+                yield bus.addr.eq(addr)
+                yield bus.r_stb.eq(1)
+                yield
+                yield bus.addr.eq(addr + 1)
+                yield
+                yield bus.r_stb.eq(0)
+                self.assertEqual((yield bus.r_data), index)
+                yield
+                self.assertEqual((yield bus.r_data), index)
+
+            addr, _, _ = bus.memory_map.find_resource(elems[17])
+            yield bus.addr.eq(addr)
+            yield bus.w_data.eq(0x34)
+            yield bus.w_stb.eq(1)
+            yield
+            yield bus.addr.eq(addr + 1)
+            yield bus.w_data.eq(0x12)
+            yield
+            yield bus.w_stb.eq(0)
+            yield
+            for elem in elems:
+                self.assertEqual((yield elem.w_stb), int(elem is elems[17]))
+            self.assertEqual((yield elems[17].w_data), 0x1234)
+
+        with Simulator(self.dut, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
+
+
+class DecoderTreeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dut = DecoderTree(addr_width=16, data_width=8, max_fanout=4)
+
+    def test_wrong_max_fanout(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Maximum fanout must be an integer greater than or equal to 2, not 'foo'"):
+            DecoderTree(addr_width=16, data_width=8, max_fanout="foo")
+
+    def test_add_wrong_sub_bus(self):
+        with self.assertRaisesRegex(TypeError,
+                r"Subordinate bus must be an instance of csr\.Interface, not 1"):
+            self.dut.add(1)
+
+    def test_add_wrong_data_width(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Subordinate bus has data width 16, which is not the same as "
+                r"decoder data width 8"):
+            self.dut.add(Interface(addr_width=10, data_width=16))
+
+    def test_add_frozen(self):
+        list(self.dut.paths())
+        with self.assertRaisesRegex(ValueError,
+                r"Cannot add subordinate bus .* because the tree layout has already been "
+                r"computed"):
+            self.dut.add(Interface(addr_width=4, data_width=8))
+
+    def test_layout(self):
+        flat = Decoder(addr_width=16, data_width=8)
+        for index in range(10):
+            mux = Multiplexer(addr_width=4, data_width=8)
+            mux.add(Element(8, "rw", name="elem_{}".format(index)))
+            self.assertEqual(self.dut.add(mux.bus), flat.add(mux.bus))
+        self.assertEqual([(path.start, path.depth, path.latency) for path in self.dut.paths()],
+                         [(index * 0x10, 2, Latency(read=0, write=0))
+                          for index in range(10)])
+        self.assertEqual([len(list(decoder.bus.memory_map.windows()))
+                          for decoder in [self.dut._root, *self.dut._decoders]],
+                         [3, 4, 4, 2])
+        self.assertEqual(list(self.dut.bus.memory_map.all_resources()),
+                         list(flat.bus.memory_map.all_resources()))
+
+    def test_sim(self):
+        muxes = []
+        elems = []
+        for index in range(9):
+            mux  = Multiplexer(addr_width=4, data_width=8)
+            elem = Element(8, "rw", name="elem_{}".format(index))
+            mux.add(elem)
+            self.dut.add(mux.bus, addr=index * 0x100)
+            muxes.append(mux)
+            elems.append(elem)
+        bus = self.dut.bus
+
+        def sim_test():
+            for index, elem in enumerate(elems):
+                yield elem.r_data.eq(0x11 * index)
+
+            for index, elem in enumerate(elems):
+                yield bus.addr.eq(index * 0x100)
+                yield bus.r_stb.eq(1)
+                yield
+                yield bus.r_stb.eq(0)
+                yield
+                self.assertEqual((yield bus.r_data), 0x11 * index)
+
+            yield bus.addr.eq(0x500)
+            yield bus.w_data.eq(0x55)
+            yield bus.w_stb.eq(1)
+            yield
+            yield bus.w_stb.eq(0)
+            yield
+            for elem in elems:
+                self.assertEqual((yield elem.w_stb), int(elem is elems[5]))
+            self.assertEqual((yield elems[5].w_data), 0x55)
+
+        m = Module()
+        m.submodules.dut = self.dut
+        m.submodules += muxes
+        with Simulator(m, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
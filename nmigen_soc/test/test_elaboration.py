@@ -0,0 +1,142 @@
+# nmigen: UnusedElaboratable=no
+
+import os
+import tempfile
+import unittest
+import warnings
+from nmigen import *
+from nmigen.hdl.ir import Fragment
+from nmigen.back.pysim import *
+
+from ..elaboration import *
+from .. import csr, wishbone
+
+
+def make_mux(width=16):
+    elem = csr.Element(width, "rw", name="elem")
+    mux  = csr.Multiplexer(addr_width=4, data_width=8)
+    mux.add(elem)
+    return mux, elem
+
+
+def make_wb_decoder(register_response=False):
+    dec = wishbone.Decoder(addr_width=10, data_width=32, granularity=8, features={"err"},
+                           register_response=register_response)
+    dec.add(wishbone.Interface(addr_width=6, data_width=32, granularity=8))
+    dec.add(wishbone.Interface(addr_width=6, data_width=32, granularity=8, features={"err"}))
+    return dec
+
+
+class NestedComponent(Elaboratable):
+    def __init__(self):
+        self.mux, _ = make_mux()
+
+    def _elaboration_signature(self):
+        return ("nested",), list(self.mux.bus.fields.values())
+
+    def elaborate(self, platform):
+        m = Module()
+        m.submodules.mux = self.mux
+        return m
+
+
+class ElaborationCacheTestCase(unittest.TestCase):
+    def test_wrong_path(self):
+        with self.assertRaisesRegex(TypeError,
+                r"Cache path must be a string or None, not 1"):
+            ElaborationCache(path=1)
+
+    def test_wrong_component(self):
+        with self.assertRaisesRegex(TypeError,
+                r"Component 'foo' does not support elaboration caching"):
+            ElaborationCache()("foo")
+
+    def test_digest(self):
+        cache = ElaborationCache()
+        self.assertEqual(cache.digest(make_mux()[0]), cache.digest(make_mux()[0]))
+        self.assertNotEqual(cache.digest(make_mux()[0]), cache.digest(make_mux(8)[0]))
+        self.assertEqual(cache.digest(make_wb_decoder()), cache.digest(make_wb_decoder()))
+        self.assertNotEqual(cache.digest(make_wb_decoder()),
+                            cache.digest(make_wb_decoder(register_response=True)))
+
+        csr_dec = csr.Decoder(addr_width=8, data_width=8)
+        csr_dec.add(make_mux()[0].bus)
+        self.assertNotEqual(cache.digest(csr_dec), cache.digest(make_mux()[0]))
+
+    def test_reuse(self):
+        cache = ElaborationCache()
+        dec_1 = make_wb_decoder()
+        dec_2 = make_wb_decoder()
+        frag_1 = cache.get(dec_1)
+        frag_2 = cache.get(dec_2)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(len(frag_1.statements), len(frag_2.statements))
+        self.assertIsInstance(frag_2, Fragment)
+        self.assertNotIn("elaborate", vars(dec_2))
+
+    def test_uncacheable(self):
+        cache = ElaborationCache()
+        with self.assertWarnsRegex(UserWarning,
+                r"Component <.+> cannot be cached, because its fragment has subfragments, clock "
+                r"domains or ports, or cannot be pickled"):
+            frag = cache.get(NestedComponent())
+        self.assertEqual(len(frag.subfragments), 1)
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            cache.get(NestedComponent())
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_sim_independent(self):
+        cache = ElaborationCache()
+        mux_1, elem_1 = make_mux()
+        mux_2, elem_2 = make_mux()
+
+        m = Module()
+        m.submodules.mux_1 = cache(mux_1)
+        m.submodules.mux_2 = cache(mux_2)
+
+        def csr_write(bus, value):
+            for index in range(2):
+                yield bus.addr.eq(index)
+                yield bus.w_data.eq(value >> (index * 8))
+                yield bus.w_stb.eq(1)
+                yield
+            yield bus.w_stb.eq(0)
+            yield
+
+        def sim_test():
+            yield from csr_write(mux_1.bus, 0x1234)
+            self.assertEqual((yield elem_1.w_stb), 1)
+            self.assertEqual((yield elem_1.w_data), 0x1234)
+            self.assertEqual((yield elem_2.w_stb), 0)
+            yield from csr_write(mux_2.bus, 0x5678)
+            self.assertEqual((yield elem_1.w_stb), 0)
+            self.assertEqual((yield elem_2.w_stb), 1)
+            self.assertEqual((yield elem_2.w_data), 0x5678)
+            self.assertEqual((yield elem_1.w_data), 0x1234)
+
+        with Simulator(m, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
+
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_persist(self):
+        with tempfile.TemporaryDirectory() as path:
+            cache_1 = ElaborationCache(path=path)
+            mux_1, _ = make_mux()
+            cache_1.get(mux_1)
+            self.assertEqual(os.listdir(path), ["{}.pickle".format(cache_1.digest(mux_1))])
+
+            cache_2 = ElaborationCache(path=path)
+            mux_2, elem_2 = make_mux()
+            frag = cache_2.get(mux_2)
+            self.assertEqual((cache_2.hits, cache_2.misses), (1, 0))
+            self.assertIn(elem_2.w_stb, frag.drivers["sync"])
+
+            cache_2.clear()
+            with open(os.path.join(path, os.listdir(path)[0]), "wb") as f:
+                f.write(b"garbage")
+            cache_2.get(make_mux()[0])
+            self.assertEqual((cache_2.hits, cache_2.misses), (1, 1))
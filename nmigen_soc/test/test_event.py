@@ -0,0 +1,150 @@
+# nmigen: UnusedElaboratable=no
+
+import unittest
+from nmigen import *
+from nmigen.hdl.rec import Layout
+from nmigen.back.pysim import *
+
+from ..event import *
+
+
+class SourceTestCase(unittest.TestCase):
+    def test_trigger(self):
+        self.assertEqual(Source().trigger, Source.Trigger.LEVEL)
+        self.assertEqual(Source(trigger="rise").trigger, Source.Trigger.RISE)
+        self.assertEqual(Source(trigger=Source.Trigger.FALL).trigger, Source.Trigger.FALL)
+
+    def test_layout(self):
+        src = Source(name="src")
+        self.assertEqual(src.layout, Layout.cast([("i", 1)]))
+
+    def test_wrong_trigger(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Trigger mode must be one of \"level\", \"rise\", or \"fall\", not 'foo'"):
+            Source(trigger="foo")
+
+
+class EventManagerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dut = EventManager(csr_data_width=8)
+
+    def test_wrong_csr_data_width(self):
+        with self.assertRaisesRegex(ValueError,
+                r"CSR data width must be a positive integer, not 0"):
+            EventManager(csr_data_width=0)
+
+    def test_add(self):
+        src_0 = Source(name="src_0")
+        src_1 = Source(name="src_1")
+        self.assertEqual(self.dut.add(src_0), 0)
+        self.assertEqual(self.dut.add(src_1), 1)
+        sources = list(self.dut.sources())
+        self.assertEqual([number for number, _ in sources], [0, 1])
+        self.assertIs(sources[0][1], src_0)
+        self.assertIs(sources[1][1], src_1)
+
+    def test_add_wrong(self):
+        with self.assertRaisesRegex(TypeError,
+                r"Event source must be an instance of event\.Source, not 'foo'"):
+            self.dut.add("foo")
+
+    def test_add_twice(self):
+        src = Source(name="src")
+        self.dut.add(src)
+        with self.assertRaisesRegex(ValueError,
+                r"Event source \(rec src i\) is already added"):
+            self.dut.add(src)
+
+    def test_add_frozen(self):
+        self.dut.add(Source(name="src_0"))
+        self.dut.csr_bus
+        with self.assertRaisesRegex(ValueError,
+                r"Cannot add event source \(rec src_1 i\) because the register layout has "
+                r"already been computed"):
+            self.dut.add(Source(name="src_1"))
+
+    def test_no_sources(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Event manager has no event sources"):
+            self.dut.csr_bus
+
+    def test_registers(self):
+        for index in range(12):
+            self.dut.add(Source(name="src_{}".format(index)))
+        regs = [(elem.name, start, end)
+                for elem, (start, end) in self.dut.csr_bus.memory_map.resources()]
+        self.assertEqual(regs, [("pending", 0, 2), ("enable", 2, 4), ("highest", 4, 5)])
+
+    def test_sim(self):
+        level = Source(trigger="level", name="level")
+        rise  = Source(trigger="rise", name="rise")
+        fall  = Source(trigger="fall", name="fall")
+        dut = self.dut
+        for src in (level, rise, fall):
+            dut.add(src)
+
+        addrs = {elem.name: start for elem, (start, _) in dut.csr_bus.memory_map.resources()}
+
+        def csr_read(name):
+            yield dut.csr_bus.addr.eq(addrs[name])
+            yield dut.csr_bus.r_stb.eq(1)
+            yield
+            yield dut.csr_bus.r_stb.eq(0)
+            yield
+            return (yield dut.csr_bus.r_data)
+
+        def csr_write(name, value):
+            yield dut.csr_bus.addr.eq(addrs[name])
+            yield dut.csr_bus.w_data.eq(value)
+            yield dut.csr_bus.w_stb.eq(1)
+            yield
+            yield dut.csr_bus.w_stb.eq(0)
+            yield
+            yield
+
+        def sim_test():
+            yield fall.i.eq(1)
+            yield
+            yield
+            self.assertEqual((yield dut.irq), 0)
+            self.assertEqual((yield from csr_read("highest")), 0)
+
+            # Pending events are not reported until enabled.
+            yield rise.i.eq(1)
+            yield
+            yield
+            self.assertEqual((yield dut.irq), 0)
+            self.assertEqual((yield from csr_read("pending")), 0b010)
+            yield from csr_write("enable", 0b111)
+            self.assertEqual((yield dut.irq), 1)
+            self.assertEqual((yield from csr_read("highest")), 2)
+
+            # A level-triggered event has a higher priority, and is pending while asserted.
+            yield level.i.eq(1)
+            yield
+            yield
+            self.assertEqual((yield from csr_read("highest")), 1)
+            yield from csr_write("pending", 0b001)
+            self.assertEqual((yield from csr_read("pending")), 0b011)
+            yield level.i.eq(0)
+            yield
+            yield from csr_write("pending", 0b001)
+            self.assertEqual((yield from csr_read("pending")), 0b010)
+            self.assertEqual((yield from csr_read("highest")), 2)
+
+            # An edge-triggered event remains pending until cleared.
+            yield rise.i.eq(0)
+            yield fall.i.eq(0)
+            yield
+            yield
+            self.assertEqual((yield from csr_read("pending")), 0b110)
+            yield from csr_write("pending", 0b010)
+            self.assertEqual((yield from csr_read("highest")), 3)
+            yield from csr_write("pending", 0b100)
+            self.assertEqual((yield from csr_read("highest")), 0)
+            self.assertEqual((yield dut.irq), 0)
+
+        with Simulator(dut, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
@@ -0,0 +1,199 @@
+# nmigen: UnusedElaboratable=no
+
+import unittest
+from nmigen import *
+from nmigen.back.pysim import *
+
+from .. import csr
+from ..csr.wishbone import WishboneCSRBridge
+from ..memory import MemoryMap
+from ..wishbone import Interface as WishboneInterface
+from ..host.transport import Transport, SimulationTransport
+from ..host.client import *
+
+
+class RecordingTransport(Transport):
+    def __init__(self):
+        super().__init__()
+        self.memory = {}
+        self.log    = []
+
+    def _execute(self, ops):
+        self.log.append(ops)
+        results = []
+        for op in ops:
+            if op[0] == "r":
+                results.append(self.memory.get(op[1], 0))
+            else:
+                self.memory[op[1]] = op[2]
+        return results
+
+
+class _Peripheral(Elaboratable):
+    def __init__(self):
+        self.ctrl   = csr.Element(8,  "rw", name="ctrl")
+        self.status = csr.Element(16, "r",  name="status")
+        self.data   = csr.Element(24, "rw", name="data")
+        self.cmd    = csr.Element(8,  "w",  name="cmd")
+        self.mux    = csr.Multiplexer(addr_width=4, data_width=8)
+        for element in (self.ctrl, self.status, self.data, self.cmd):
+            self.mux.add(element)
+        self.last_cmd = Signal(8)
+
+    def elaborate(self, platform):
+        m = Module()
+        m.submodules.mux = self.mux
+        ctrl = Signal(8, reset=0x5a)
+        data = Signal(24)
+        m.d.comb += [
+            self.ctrl.r_data.eq(ctrl),
+            self.status.r_data.eq(0xbeef),
+            self.data.r_data.eq(data),
+        ]
+        with m.If(self.ctrl.w_stb):
+            m.d.sync += ctrl.eq(self.ctrl.w_data)
+        with m.If(self.data.w_stb):
+            m.d.sync += data.eq(self.data.w_data)
+        with m.If(self.cmd.w_stb):
+            m.d.sync += self.last_cmd.eq(self.cmd.w_data)
+        return m
+
+
+class RegisterClientTestCase(unittest.TestCase):
+    def setUp(self):
+        self.periph    = _Peripheral()
+        self.transport = RecordingTransport()
+        self.client    = RegisterClient(self.periph.mux.bus.memory_map, self.transport)
+
+    def test_registers(self):
+        self.assertEqual([(reg.name, reg.addr, reg.size, reg.width, reg.access)
+                          for reg in self.client.registers()], [
+            ("ctrl",   0, 1, 8,  "rw"),
+            ("status", 1, 2, 16, "r"),
+            ("data",   3, 3, 24, "rw"),
+            ("cmd",    6, 1, 8,  "w"),
+        ])
+        self.assertIs(self.client["data"], self.client.data)
+        self.assertIs(self.client[self.periph.data], self.client.data)
+
+    def test_wrong_register(self):
+        with self.assertRaises(KeyError):
+            self.client["foo"]
+        with self.assertRaisesRegex(AttributeError,
+                r"Register client has no register 'foo'"):
+            self.client.foo
+
+    def test_ambiguous_name(self):
+        memory_map = MemoryMap(addr_width=4, data_width=8)
+        elem_1 = csr.Element(8, "rw", name="reg")
+        elem_2 = csr.Element(8, "rw", name="reg")
+        memory_map.add_resource(elem_1, size=1)
+        memory_map.add_resource(elem_2, size=1)
+        client = RegisterClient(memory_map, self.transport)
+        with self.assertRaisesRegex(KeyError,
+                r"Register name 'reg' is ambiguous; look the register up by its resource "
+                r"instead"):
+            client["reg"]
+        self.assertEqual(client[elem_2].addr, 1)
+
+    def test_wrong_transport(self):
+        with self.assertRaisesRegex(TypeError,
+                r"Transport must be an instance of Transport, not 'foo'"):
+            RegisterClient(self.periph.mux.bus.memory_map, "foo")
+
+    def test_chunks(self):
+        self.client.data.write(0x123456)
+        self.assertEqual(self.transport.log[-1],
+                         [("w", 3, 0x56), ("w", 4, 0x34), ("w", 5, 0x12)])
+        self.assertEqual(self.client.data.read(), 0x123456)
+        self.assertEqual(self.transport.log[-1], [("r", 3), ("r", 4), ("r", 5)])
+
+    def test_access(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Register 'status' is read-only"):
+            self.client.status.write(1)
+        with self.assertRaisesRegex(ValueError,
+                r"Register 'cmd' is write-only"):
+            self.client.cmd.read()
+        self.assertEqual(self.transport.round_trips, 0)
+
+    def test_wrong_value(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Value of register 'ctrl' must be a non-negative integer that fits in 8 bits, "
+                r"not 256"):
+            self.client.ctrl.write(256)
+
+    def test_batch(self):
+        with self.client.batch() as batch:
+            batch.write("ctrl", 1)
+            pending = [batch.read(self.client.ctrl) for _ in range(10)]
+            batch.write(self.periph.cmd, 2)
+            self.assertEqual(len(batch), 12)
+            with self.assertRaisesRegex(ValueError,
+                    r"Read of register 'ctrl' has not been committed yet"):
+                pending[0].value
+        self.assertEqual(self.transport.round_trips, 1)
+        self.assertEqual([p.value for p in pending], [1] * 10)
+        self.assertEqual(len(batch), 0)
+
+    def test_batch_exception(self):
+        with self.assertRaises(ZeroDivisionError):
+            with self.client.batch() as batch:
+                batch.write("ctrl", 1)
+                1 // 0
+        self.assertEqual(self.transport.round_trips, 0)
+
+
+class SimulationTestCase(unittest.TestCase):
+    def test_csr(self):
+        periph = _Peripheral()
+        with Simulator(periph, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            transport = SimulationTransport(sim, periph.mux.bus)
+            client = RegisterClient(periph.mux.bus.memory_map, transport)
+            self.assertEqual(client.ctrl.read(), 0x5a)
+            with client.batch() as batch:
+                batch.write("ctrl", 0xa5)
+                batch.write("data", 0xabcdef)
+                batch.write("cmd", 0x42)
+                ctrl   = batch.read("ctrl")
+                status = batch.read("status")
+                data   = batch.read("data")
+            self.assertEqual((ctrl.value, status.value, data.value), (0xa5, 0xbeef, 0xabcdef))
+            self.assertEqual(transport.round_trips, 2)
+
+            def check():
+                self.assertEqual((yield periph.last_cmd), 0x42)
+            sim.add_sync_process(check)
+            sim.run()
+
+    def test_wishbone(self):
+        periph = _Peripheral()
+        bridge = WishboneCSRBridge(periph.mux.bus, data_width=32)
+        m = Module()
+        m.submodules.periph = periph
+        m.submodules.bridge = bridge
+        with Simulator(m, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            transport = SimulationTransport(sim, bridge.wb_bus)
+            client = RegisterClient(bridge.wb_bus.memory_map, transport)
+            self.assertEqual([(reg.name, reg.addr) for reg in client.registers()],
+                             [("ctrl", 0), ("status", 1), ("data", 3), ("cmd", 6)])
+            with client.batch() as batch:
+                batch.write("data", 0x654321)
+                status = batch.read("status")
+                data   = batch.read("data")
+            self.assertEqual((status.value, data.value), (0xbeef, 0x654321))
+
+    def test_wishbone_err(self):
+        bus = WishboneInterface(addr_width=4, data_width=8, features={"err"}, name="bus")
+        bus.memory_map.add_resource(csr.Element(8, "rw", name="reg"), size=1, addr=5)
+        m = Module()
+        m.d.comb += bus.err.eq(bus.cyc & bus.stb)
+        m.domains.sync = ClockDomain("sync")
+        with Simulator(m, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            client = RegisterClient(bus.memory_map, SimulationTransport(sim, bus))
+            with self.assertRaisesRegex(OSError,
+                    r"Register access to address 0x5 failed"):
+                client.reg.read()
@@ -0,0 +1,204 @@
+# nmigen: UnusedElaboratable=no
+
+import os
+import select
+import socket
+import threading
+import tty
+import unittest
+from nmigen.back.pysim import *
+
+from ..host.serial import *
+from ..stream.wishbone import StreamWishboneBridge
+
+
+class MockPort:
+    def __init__(self, response=b""):
+        self.requests = []
+        self.response = bytearray(response)
+
+    def write(self, data):
+        self.requests.append(bytes(data))
+        return len(data)
+
+    def read(self, size):
+        data = bytes(self.response[:size])
+        del self.response[:size]
+        return data
+
+    def close(self):
+        pass
+
+
+def wishbone_target(bus, memory, error_addrs=()):
+    yield Passive()
+    while True:
+        yield Settle()
+        if (yield bus.cyc) and (yield bus.stb):
+            adr = yield bus.adr
+            yield
+            if adr in error_addrs:
+                yield bus.err.eq(1)
+            else:
+                if (yield bus.we):
+                    memory[adr] = yield bus.dat_w
+                else:
+                    yield bus.dat_r.eq(memory.get(adr, 0))
+                yield bus.ack.eq(1)
+            yield
+            yield bus.ack.eq(0)
+            yield bus.err.eq(0)
+        else:
+            yield
+
+
+def simulate_link(dut, fd, memory, error_addrs=()):
+    # Exchange bytes between the streams of the bridge and a file descriptor, until it is closed.
+    def process():
+        received = bytearray()
+        while True:
+            if not received and select.select([fd], [], [], 0)[0]:
+                try:
+                    chunk = os.read(fd, 4096)
+                except OSError: # a pty whose other end is closed
+                    chunk = b""
+                if not chunk:
+                    return
+                received += chunk
+            yield dut.sink.valid.eq(bool(received))
+            if received:
+                yield dut.sink.payload.eq(received[0])
+            yield dut.source.ready.eq(1)
+            yield Settle()
+            if received and (yield dut.sink.ready):
+                del received[0]
+            if (yield dut.source.valid):
+                os.write(fd, bytes([(yield dut.source.payload)]))
+            yield
+
+    sim = Simulator(dut)
+    sim.add_clock(1e-6)
+    sim.add_sync_process(process)
+    sim.add_sync_process(wishbone_target(dut.bus, memory, error_addrs))
+    thread = threading.Thread(target=sim.run)
+    thread.start()
+    return thread
+
+
+class SerialTransportTestCase(unittest.TestCase):
+    def test_wrong_addr_width(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Address width must be a non-negative integer, not -1"):
+            SerialTransport(MockPort(), addr_width=-1)
+
+    def test_wrong_data_width(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Data width must be one of 8, 16, 32, 64, not 24"):
+            SerialTransport(MockPort(), addr_width=8, data_width=24)
+
+    def test_wrong_max_pending(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Maximum amount of pending response bytes must be an integer greater than or "
+                r"equal to 5, not 4"):
+            SerialTransport(MockPort(), addr_width=8, max_pending=4)
+
+    def test_wrong_access(self):
+        transport = SerialTransport(MockPort(), addr_width=8, data_width=8)
+        with self.assertRaisesRegex(ValueError,
+                r"Address 0x100 is outside of the address space"):
+            transport.execute([("r", 0x100)])
+        with self.assertRaisesRegex(ValueError,
+                r"Value 0x100 does not fit in 8 bits"):
+            transport.execute([("w", 0, 0x100)])
+
+    def test_bursts(self):
+        port = MockPort(bytes([0x00, 0x34, 0x12, 0x78, 0x56, 0x00, 0x00, 0xcd, 0xab, 0x00]))
+        transport = SerialTransport(port, addr_width=12, data_width=16)
+        self.assertEqual(transport.execute([
+            ("w", 0x010, 0x1111), ("w", 0x011, 0x2222), ("w", 0x012, 0x3333),
+            ("r", 0x100), ("r", 0x100),
+            ("w", 0x020, 0x4444),
+            ("r", 0x200),
+        ]), [0x1234, 0x5678, 0xabcd])
+        # All commands are sent at once.
+        self.assertEqual(port.requests, [bytes([
+            0x05, 2, 0x10, 0x00, 0x11, 0x11, 0x22, 0x22, 0x33, 0x33,
+            0x02, 1, 0x00, 0x01,
+            0x01, 0, 0x20, 0x00, 0x44, 0x44,
+            0x02, 0, 0x00, 0x02,
+        ])])
+        self.assertEqual((transport.round_trips, transport.commands), (1, 4))
+
+    def test_max_pending(self):
+        port = MockPort(bytes(2 + 1) * 2 + bytes(1 + 1))
+        transport = SerialTransport(port, addr_width=8, data_width=8, max_pending=3)
+        self.assertEqual(transport.execute([("r", addr) for addr in range(5)]), [0] * 5)
+        # Read bursts are split so that each response fits, and commands are sent in groups whose
+        # responses fit.
+        self.assertEqual(port.requests, [
+            bytes([0x06, 1, 0x00]),
+            bytes([0x06, 1, 0x02]),
+            bytes([0x02, 0, 0x04]),
+        ])
+
+    def test_long_burst(self):
+        port = MockPort(bytes(2))
+        transport = SerialTransport(port, addr_width=16, data_width=8)
+        transport.execute([("w", addr, 0) for addr in range(300)])
+        self.assertEqual(len(port.requests), 1)
+        self.assertEqual(port.requests[0][:4], bytes([0x05, 255, 0x00, 0x00]))
+        self.assertEqual(port.requests[0][260:264], bytes([0x05, 43, 0x00, 0x01]))
+
+    def test_error(self):
+        port = MockPort(bytes([0x00, 0x00, 0x01, 0x01]))
+        transport = SerialTransport(port, addr_width=8, data_width=8)
+        with self.assertRaisesRegex(OSError,
+                r"Register access to address 0x20 failed"):
+            transport.execute([("w", 0x10, 0), ("r", 0x20), ("w", 0x30, 0)])
+        # The responses to the other commands are consumed.
+        self.assertEqual(port.response, b"")
+
+    def test_closed(self):
+        transport = SerialTransport(MockPort(), addr_width=8, data_width=8)
+        with self.assertRaisesRegex(ConnectionError,
+                r"Connection closed"):
+            transport.execute([("r", 0)])
+
+
+class SerialLinkTestCase(unittest.TestCase):
+    def check_link(self, host_port, bridge_fd):
+        dut    = StreamWishboneBridge(addr_width=16, data_width=32)
+        memory = {}
+        thread = simulate_link(dut, bridge_fd, memory, error_addrs=(0xdead,))
+        try:
+            transport = SerialTransport(host_port, addr_width=16, data_width=32,
+                                        max_pending=64)
+            ops  = [("w", 0x1000 + addr, addr * 0x01010101) for addr in range(40)]
+            ops += [("r", 0x1000 + addr) for addr in range(40)]
+            ops += [("w", 0x2000, value) for value in range(3)]
+            self.assertEqual(transport.execute(ops),
+                             [addr * 0x01010101 for addr in range(40)])
+            self.assertEqual(memory[0x2000], 2)
+            with self.assertRaisesRegex(OSError,
+                    r"Register access to address 0xdead failed"):
+                transport.execute([("r", 0xdead)])
+            self.assertEqual(transport.execute([("r", 0x1027)]), [0x27272727])
+        finally:
+            host_port.close()
+            thread.join()
+
+    def test_socket(self):
+        host_sock, bridge_sock = socket.socketpair()
+        # The socket is closed once the file is closed.
+        with host_sock:
+            host_port = host_sock.makefile("rwb", buffering=0)
+        with bridge_sock:
+            self.check_link(host_port, bridge_sock.fileno())
+
+    def test_pty(self):
+        master_fd, slave_fd = os.openpty()
+        try:
+            tty.setraw(slave_fd)
+            self.check_link(open(master_fd, "r+b", buffering=0), slave_fd)
+        finally:
+            os.close(slave_fd)
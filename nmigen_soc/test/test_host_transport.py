@@ -0,0 +1,99 @@
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from ..host.transport import *
+
+
+class MmapTransportTestCase(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.write(fd, bytes(range(256)) * 32)
+        os.close(fd)
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def test_read_write(self):
+        with MmapTransport(self.path, size=0x100) as transport:
+            self.assertEqual(transport.execute([("r", 0), ("r", 1)]),
+                             [0x03020100, 0x07060504])
+            self.assertEqual(transport.execute([("w", 1, 0xdeadbeef), ("r", 1), ("r", 2)]),
+                             [0xdeadbeef, 0x0b0a0908])
+            self.assertEqual(transport.round_trips, 2)
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(8), bytes([0, 1, 2, 3, 0xef, 0xbe, 0xad, 0xde]))
+
+    def test_offset_stride(self):
+        # The offset need not be aligned to the allocation granularity.
+        with MmapTransport(self.path, size=0x100, offset=0x1010, word_size=2,
+                           stride=4) as transport:
+            self.assertEqual(transport.execute([("r", 0), ("r", 1)]), [0x1110, 0x1514])
+            transport.execute([("w", 1, 0xabcd)])
+        with open(self.path, "rb") as f:
+            f.seek(0x1014)
+            self.assertEqual(f.read(4), bytes([0xcd, 0xab, 0x16, 0x17]))
+
+    def test_wrong_word_size(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Word size must be one of 1, 2, 4, 8, not 3"):
+            MmapTransport(self.path, size=0x100, word_size=3)
+
+    def test_wrong_stride(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Stride must be a positive multiple of the word size 4, not 6"):
+            MmapTransport(self.path, size=0x100, stride=6)
+
+    def test_wrong_addr(self):
+        with MmapTransport(self.path, size=0x100) as transport:
+            with self.assertRaisesRegex(ValueError,
+                    r"Address 0x40 is outside of the mapped region"):
+                transport.execute([("r", 0x40)])
+
+    def test_wrong_access(self):
+        with MmapTransport(self.path, size=0x100) as transport:
+            with self.assertRaisesRegex(ValueError,
+                    r"Access must be a tuple \(\"r\", addr\) or \(\"w\", addr, value\), "
+                    r"not \('w', 0\)"):
+                transport.execute([("w", 0)])
+            self.assertEqual(transport.round_trips, 0)
+
+
+class SocketTransportTestCase(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.write(fd, bytes(0x100))
+        os.close(fd)
+        self.target = MmapTransport(self.path, size=0x100)
+        client_sock, server_sock = socket.socketpair()
+        self.server = threading.Thread(target=serve, args=(server_sock, self.target))
+        self.server.start()
+        self.server_sock = server_sock
+        self.transport = SocketTransport(client_sock)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.join()
+        self.server_sock.close()
+        self.target.close()
+        os.unlink(self.path)
+
+    def test_batch(self):
+        ops = [("w", addr, addr * 0x01010101) for addr in range(16)]
+        ops += [("r", addr) for addr in reversed(range(16))]
+        self.assertEqual(self.transport.execute(ops),
+                         [addr * 0x01010101 for addr in reversed(range(16))])
+        self.assertEqual(self.transport.round_trips, 1)
+        self.assertEqual(self.target.round_trips, 1)
+
+    def test_empty(self):
+        self.assertEqual(self.transport.execute([]), [])
+
+    def test_error(self):
+        with self.assertRaisesRegex(OSError,
+                r"Register access failed: Address 0x100 is outside of the mapped region"):
+            self.transport.execute([("r", 0x100)])
+        # The connection is still usable after an error.
+        self.assertEqual(self.transport.execute([("w", 0, 1), ("r", 0)]), [1])
@@ -0,0 +1,189 @@
+# nmigen: UnusedElaboratable=no
+
+import unittest
+from nmigen import *
+from nmigen.back.pysim import *
+
+from ..memory import MemoryMap
+from ..latency import *
+from .. import csr, wishbone
+from ..csr.wishbone import WishboneCSRBridge
+
+
+class LatencyTestCase(unittest.TestCase):
+    def test_exact(self):
+        latency = Latency(read=1, write=2)
+        self.assertEqual(latency.read, (1, 1))
+        self.assertEqual(latency.write, (2, 2))
+
+    def test_range(self):
+        latency = Latency(read=(1, 3), write=0)
+        self.assertEqual(latency.read, (1, 3))
+        self.assertEqual(latency.write, (0, 0))
+
+    def test_add(self):
+        self.assertEqual(Latency(read=(1, 3), write=1) + Latency(read=2, write=(0, 4)),
+                         Latency(read=(3, 5), write=(1, 5)))
+
+    def test_repr(self):
+        self.assertEqual(repr(Latency(read=(1, 3), write=2)),
+                         "Latency(read=(1, 3), write=(2, 2))")
+
+    def test_wrong_read(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Read latency must be a non-negative integer or a \(best, worst\) tuple "
+                r"of non-negative integers, not -1"):
+            Latency(read=-1, write=0)
+
+    def test_wrong_write(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Write latency must be a non-negative integer or a \(best, worst\) tuple "
+                r"of non-negative integers, not \(3, 1\)"):
+            Latency(read=0, write=(3, 1))
+
+
+class LatencyAnalysisTestCase(unittest.TestCase):
+    def setUp(self):
+        # wishbone.Decoder -> WishboneCSRBridge -> csr.Decoder -> csr.Multiplexer
+        self.elem_1 = csr.Element(8, "rw", name="elem_1")
+        self.elem_2 = csr.Element(16, "r", name="elem_2")
+        self.mux_1  = csr.Multiplexer(addr_width=4, data_width=8)
+        self.mux_1.add(self.elem_1)
+        self.mux_2  = csr.Multiplexer(addr_width=4, data_width=8)
+        self.mux_2.add(self.elem_2)
+        self.csr_dec = csr.Decoder(addr_width=8, data_width=8)
+        self.csr_dec.add(self.mux_1.bus)
+        self.csr_dec.add(self.mux_2.bus)
+        self.bridge = WishboneCSRBridge(self.csr_dec.bus, data_width=32)
+
+        self.memory = object()
+        self.mem_bus = wishbone.Interface(addr_width=4, data_width=32, granularity=8)
+        self.mem_bus.memory_map.add_resource(self.memory, size=16)
+        self.mem_bus.memory_map.latency = Latency(read=(1, 2), write=1)
+        self.raw_res = object()
+        self.raw_bus = wishbone.Interface(addr_width=4, data_width=32, granularity=8)
+        self.raw_bus.memory_map.add_resource(self.raw_res, size=4)
+
+        self.wb_dec = wishbone.Decoder(addr_width=10, data_width=32, granularity=8)
+        self.wb_dec.add(self.bridge.wb_bus)
+        self.wb_dec.add(self.mem_bus)
+        self.wb_dec.add(self.raw_bus)
+
+    def test_wrong_root(self):
+        with self.assertRaisesRegex(TypeError,
+                r"Root memory map must be an instance of MemoryMap, not 'foo'"):
+            LatencyAnalysis("foo")
+
+    def test_declared(self):
+        self.assertEqual(self.mux_1.bus.memory_map.latency, Latency(read=1, write=1))
+        self.assertEqual(self.csr_dec.bus.memory_map.latency, Latency(read=0, write=0))
+        self.assertEqual(self.bridge.wb_bus.memory_map.latency, Latency(read=4, write=4))
+        self.assertEqual(self.wb_dec.bus.memory_map.latency, Latency(read=0, write=0))
+        self.assertIsNone(MemoryMap(addr_width=1, data_width=8).latency)
+
+    def test_resources(self):
+        entries = list(LatencyAnalysis(self.wb_dec.bus.memory_map).resources())
+        self.assertEqual(len(entries), 4)
+        self.assertIs(entries[0].resource, self.elem_1)
+        self.assertEqual((entries[0].start, entries[0].end, entries[0].width), (0, 1, 8))
+        self.assertEqual(entries[0].latency, Latency(read=5, write=5))
+        self.assertTrue(entries[0].complete)
+        self.assertIs(entries[1].resource, self.elem_2)
+        self.assertEqual((entries[1].start, entries[1].end, entries[1].width), (16, 18, 8))
+        self.assertEqual(entries[1].latency, Latency(read=5, write=5))
+        self.assertIs(entries[2].resource, self.memory)
+        self.assertEqual(entries[2].latency, Latency(read=(1, 2), write=1))
+        self.assertTrue(entries[2].complete)
+        self.assertIs(entries[3].resource, self.raw_res)
+        self.assertEqual(entries[3].latency, Latency(read=0, write=0))
+        self.assertFalse(entries[3].complete)
+
+    def test_resources_order(self):
+        analysis = LatencyAnalysis(self.wb_dec.bus.memory_map)
+        self.assertEqual([(entry.resource, (entry.start, entry.end, entry.width))
+                          for entry in analysis.resources()],
+                         list(self.wb_dec.bus.memory_map.all_resources()))
+
+    def test_resources_shared(self):
+        # The same resource, reachable through two windows with different latencies.
+        resource = object()
+        fast_map = MemoryMap(addr_width=2, data_width=8)
+        fast_map.add_resource(resource, size=4)
+        fast_map.latency = Latency(read=1, write=1)
+        slow_map = MemoryMap(addr_width=2, data_width=8)
+        slow_map.add_resource(resource, size=4)
+        slow_map.latency = Latency(read=3, write=2)
+        root_map = MemoryMap(addr_width=4, data_width=8)
+        root_map.add_window(slow_map)
+        root_map.add_window(fast_map)
+
+        analysis = LatencyAnalysis(root_map)
+        self.assertEqual([(entry.start, entry.latency) for entry in analysis.resources()], [
+            (0, Latency(read=3, write=2)),
+            (4, Latency(read=1, write=1)),
+        ])
+        self.assertEqual(analysis.find(resource).start, 0)
+
+    def test_subtree(self):
+        entries = list(LatencyAnalysis(self.csr_dec.bus.memory_map).resources())
+        self.assertEqual([entry.latency for entry in entries],
+                         [Latency(read=1, write=1), Latency(read=1, write=1)])
+
+    def test_find(self):
+        analysis = LatencyAnalysis(self.wb_dec.bus.memory_map)
+        self.assertIs(analysis.find(self.memory).resource, self.memory)
+        with self.assertRaises(KeyError):
+            analysis.find(object())
+
+    def test_over_budget(self):
+        analysis = LatencyAnalysis(self.wb_dec.bus.memory_map)
+        self.assertEqual([entry.resource for entry in analysis.over_budget(read=2)],
+                         [self.elem_1, self.elem_2])
+        self.assertEqual([entry.resource for entry in analysis.over_budget(read=1)],
+                         [self.elem_1, self.elem_2, self.memory])
+        self.assertEqual([entry.resource for entry in analysis.over_budget(write=1)],
+                         [self.elem_1, self.elem_2])
+        self.assertEqual(analysis.over_budget(), [])
+
+    def test_over_budget_wrong(self):
+        analysis = LatencyAnalysis(self.wb_dec.bus.memory_map)
+        with self.assertRaisesRegex(ValueError,
+                r"Read latency budget must be a non-negative integer or None, not -1"):
+            analysis.over_budget(read=-1)
+
+    def test_sim_bridge(self):
+        elem = csr.Element(16, "rw", name="elem")
+        mux  = csr.Multiplexer(addr_width=4, data_width=8)
+        mux.add(elem)
+        dut  = WishboneCSRBridge(mux.bus, data_width=16)
+        entry = LatencyAnalysis(dut.wb_bus.memory_map).find(elem)
+
+        m = Module()
+        m.submodules.mux = mux
+        m.submodules.dut = dut
+
+        def sim_test():
+            for we in (0, 1):
+                yield dut.wb_bus.cyc.eq(1)
+                yield dut.wb_bus.stb.eq(1)
+                yield dut.wb_bus.sel.eq(0b11)
+                yield dut.wb_bus.we.eq(we)
+                cycles = 0
+                while True:
+                    yield
+                    yield Settle()
+                    cycles += 1
+                    if (yield dut.wb_bus.ack):
+                        break
+                yield dut.wb_bus.cyc.eq(0)
+                yield dut.wb_bus.stb.eq(0)
+                yield
+                if we:
+                    self.assertEqual(cycles, entry.latency.write[1])
+                else:
+                    self.assertEqual(cycles, entry.latency.read[1])
+
+        with Simulator(m, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
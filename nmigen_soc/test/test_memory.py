@@ -1,6 +1,6 @@
 import unittest
 
-from ..memory import _RangeMap, MemoryMap
+from ..memory import _RangeMap, _CompactRangeMap, MemoryMap
 
 
 class RangeMapTestCase(unittest.TestCase):
@@ -40,6 +40,58 @@ class RangeMapTestCase(unittest.TestCase):
         self.assertEqual(range_map.get(15), None)
 
 
+class CompactRangeMapTestCase(unittest.TestCase):
+    def test_insert(self):
+        range_map = _CompactRangeMap()
+        range_map.insert(range(0,10), "a")
+        range_map.insert(range(20,21), "c")
+        range_map.insert(range(15,16), "b")
+        range_map.insert(range(16,20,2), "q")
+        self.assertEqual(list(range_map.items()), [
+            (range(0,10), "a"), (range(15,16), "b"), (range(16,20,2), "q"), (range(20,21), "c")
+        ])
+
+    def test_overlaps(self):
+        range_map = _CompactRangeMap()
+        range_map.insert(range(10,20), "a")
+        self.assertEqual(range_map.overlaps(range(5,15)), ["a"])
+        self.assertEqual(range_map.overlaps(range(15,25)), ["a"])
+        self.assertEqual(range_map.overlaps(range(0,5)), [])
+        self.assertEqual(range_map.overlaps(range(25,30)), [])
+
+    def test_insert_wrong_overlap(self):
+        range_map = _CompactRangeMap()
+        range_map.insert(range(0,10), "a")
+        with self.assertRaises(AssertionError):
+            range_map.insert(range(5,15), "b")
+
+    def test_get(self):
+        range_map = _CompactRangeMap()
+        range_map.insert(range(5,15), "a")
+        self.assertEqual(range_map.get(0), None)
+        self.assertEqual(range_map.get(5), "a")
+        self.assertEqual(range_map.get(14), "a")
+        self.assertEqual(range_map.get(15), None)
+
+    def test_view(self):
+        range_map = _CompactRangeMap()
+        view_1 = range_map.view(1)
+        view_2 = range_map.view(2)
+        range_map.insert(range(4,4), "e")
+        view_2["e"] = range(4,4)
+        range_map.insert(range(4,8), "b")
+        view_1["b"] = range(4,8)
+        range_map.insert(range(0,4), "a")
+        view_2["a"] = range(0,4)
+        self.assertIn("b", view_1)
+        self.assertNotIn("b", view_2)
+        self.assertNotIn("x", view_1)
+        self.assertEqual(view_2["e"], range(4,4))
+        with self.assertRaises(KeyError):
+            view_1["a"]
+        self.assertEqual(list(view_2.items()), [("a", range(0,4)), ("e", range(4,4))])
+
+
 class MemoryMapTestCase(unittest.TestCase):
     def test_wrong_addr_width(self):
         with self.assertRaisesRegex(ValueError,
@@ -56,6 +108,29 @@ class MemoryMapTestCase(unittest.TestCase):
                 r"Alignment must be a non-negative integer, not -1"):
             MemoryMap(addr_width=16, data_width=8, alignment=-1)
 
+    def test_wrong_compact_addr_width(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Compact memory map address width must be at most 64, not 65"):
+            MemoryMap(addr_width=65, data_width=8, compact=True)
+
+    def test_compact(self):
+        memory_map = MemoryMap(addr_width=16, data_width=8, compact=True)
+        self.assertTrue(memory_map.compact)
+        self.assertEqual(memory_map.add_resource("a", size=2), (0, 2))
+        self.assertEqual(memory_map.add_resource("b", size=2, addr=0x10), (0x10, 0x12))
+        window = MemoryMap(addr_width=2, data_width=8)
+        self.assertEqual(memory_map.add_window(window, addr=0x8), (0x8, 0xc, 1))
+        self.assertEqual(list(memory_map.resources()), [("a", (0, 2)), ("b", (0x10, 0x12))])
+        self.assertEqual(list(memory_map.windows()), [(window, (0x8, 0xc, 1))])
+        with self.assertRaisesRegex(ValueError,
+                r"Resource 'a' is already added at address range 0x0..0x2"):
+            memory_map.add_resource("a", size=1)
+        with self.assertRaisesRegex(ValueError,
+                r"Address range 0x1..0x11 overlaps with resource 'a' at 0x0..0x2, window "
+                r"<nmigen_soc\.memory\.MemoryMap object at .+?> at 0x8..0xc, resource 'b' at "
+                r"0x10..0x12"):
+            memory_map.add_resource("c", size=0x10, addr=0x1)
+
     def test_add_resource(self):
         memory_map = MemoryMap(addr_width=16, data_width=8)
         self.assertEqual(memory_map.add_resource("a", size=1), (0, 1))
@@ -220,6 +295,62 @@ class MemoryMapTestCase(unittest.TestCase):
             (window_2, ("0001------------", 1)),
         ])
 
+    def test_iter_window_patterns_minimize(self):
+        memory_map = MemoryMap(addr_width=16, data_width=8)
+        window_1 = MemoryMap(addr_width=8, data_width=8)
+        memory_map.add_window(window_1, addr=0x0000)
+        window_2 = MemoryMap(addr_width=8, data_width=8)
+        memory_map.add_window(window_2, addr=0x4000)
+        window_3 = MemoryMap(addr_width=8, data_width=8)
+        memory_map.add_window(window_3, addr=0x8100)
+        memory_map.add_resource("a", size=4, addr=0xff00)
+        self.assertEqual(list(memory_map.window_patterns(minimize=True)), [
+            (window_1, ("00--------------", 1)),
+            (window_2, ("01--------------", 1)),
+            (window_3, ("10--------------", 1)),
+        ])
+
+    def test_iter_window_patterns_minimize_single(self):
+        memory_map = MemoryMap(addr_width=16, data_width=8)
+        window = MemoryMap(addr_width=8, data_width=8)
+        memory_map.add_window(window, addr=0x1200)
+        self.assertEqual(list(memory_map.window_patterns(minimize=True)), [
+            (window, ("----------------", 1)),
+        ])
+
+    def test_iter_window_patterns_minimize_msb(self):
+        memory_map = MemoryMap(addr_width=8, data_width=8)
+        window_1 = MemoryMap(addr_width=4, data_width=8)
+        memory_map.add_window(window_1, addr=0x00)
+        window_2 = MemoryMap(addr_width=4, data_width=8)
+        memory_map.add_window(window_2, addr=0xf0)
+        self.assertEqual(list(memory_map.window_patterns(minimize=True)), [
+            (window_1, ("0-------", 1)),
+            (window_2, ("1-------", 1)),
+        ])
+
+    def test_iter_window_patterns_minimize_resources(self):
+        memory_map = MemoryMap(addr_width=8, data_width=8)
+        memory_map.add_resource("a", size=3, addr=0x81)
+        window = MemoryMap(addr_width=4, data_width=8)
+        memory_map.add_window(window, addr=0x90)
+        # The resource occupies addresses 0x81..0x83, which are told apart from the window by
+        # bit 4 alone.
+        self.assertEqual(list(memory_map.window_patterns(minimize=True)), [
+            (window, ("---1----", 1)),
+        ])
+
+    def test_iter_window_patterns_minimize_dense(self):
+        memory_map = MemoryMap(addr_width=16, data_width=16)
+        window_1 = MemoryMap(addr_width=10, data_width=8)
+        memory_map.add_window(window_1, sparse=False)
+        memory_map.add_resource("a", size=1, addr=0x300)
+        # The pattern of a dense window covers addresses outside of its range, so it is not
+        # minimized if they are assigned.
+        self.assertEqual(list(memory_map.window_patterns(minimize=True)), [
+            (window_1, ("000000----------", 2)),
+        ])
+
     def test_align_to(self):
         memory_map = MemoryMap(addr_width=16, data_width=8)
         self.assertEqual(memory_map.add_resource("a", size=1), (0, 1))
@@ -234,11 +365,13 @@ class MemoryMapTestCase(unittest.TestCase):
 
 
 class MemoryMapDiscoveryTestCase(unittest.TestCase):
+    compact = False
+
     def setUp(self):
-        self.root = MemoryMap(addr_width=32, data_width=32)
+        self.root = MemoryMap(addr_width=32, data_width=32, compact=self.compact)
         self.res1 = "res1"
         self.root.add_resource(self.res1, size=16)
-        self.win1 = MemoryMap(addr_width=16, data_width=32)
+        self.win1 = MemoryMap(addr_width=16, data_width=32, compact=self.compact)
         self.root.add_window(self.win1)
         self.res2 = "res2"
         self.win1.add_resource(self.res2, size=32)
@@ -246,11 +379,11 @@ class MemoryMapDiscoveryTestCase(unittest.TestCase):
         self.win1.add_resource(self.res3, size=32)
         self.res4 = "res4"
         self.root.add_resource(self.res4, size=1)
-        self.win2 = MemoryMap(addr_width=16, data_width=8)
+        self.win2 = MemoryMap(addr_width=16, data_width=8, compact=self.compact)
         self.root.add_window(self.win2, sparse=True)
         self.res5 = "res5"
         self.win2.add_resource(self.res5, size=16)
-        self.win3 = MemoryMap(addr_width=16, data_width=8)
+        self.win3 = MemoryMap(addr_width=16, data_width=8, compact=self.compact)
         self.root.add_window(self.win3, sparse=False)
         self.res6 = "res6"
         self.win3.add_resource(self.res6, size=16)
@@ -281,3 +414,7 @@ class MemoryMapDiscoveryTestCase(unittest.TestCase):
 
     def test_decode_address_missing(self):
         self.assertIsNone(self.root.decode_address(0x00000100))
+
+
+class CompactMemoryMapDiscoveryTestCase(MemoryMapDiscoveryTestCase):
+    compact = True
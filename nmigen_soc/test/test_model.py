@@ -0,0 +1,221 @@
+# nmigen: UnusedElaboratable=no
+
+import unittest
+from nmigen import *
+from nmigen.back.pysim import *
+
+from ..model import *
+from .. import csr
+from ..csr.wishbone import WishboneCSRBridge
+
+
+class _Peripheral(Elaboratable):
+    def __init__(self, models, name):
+        self.models = models
+        self.ctrl   = csr.Element(16, "rw", name="{}_ctrl".format(name))
+        self.status = csr.Element(8,  "r",  name="{}_status".format(name))
+        self.ident  = csr.Element(24, "r",  constant=0xc0ffee, name="{}_ident".format(name))
+        self.data   = csr.Element(32, "w",  name="{}_data".format(name))
+        self.mux    = csr.Multiplexer(addr_width=5, data_width=8)
+        for elem in (self.ctrl, self.status, self.ident, self.data):
+            self.mux.add(elem)
+        for op in ("set", "clear", "toggle"):
+            self.mux.add_alias(self.ctrl, op)
+
+        self.ctrl_reg = Signal(16, reset=0x0f0f, name="{}_ctrl_reg".format(name))
+        self.reads    = Signal(8, name="{}_reads".format(name))
+        self.data_reg = Signal(32, name="{}_data_reg".format(name))
+
+    def elaborate(self, platform):
+        m = Module()
+        m.submodules.mux = self.models(self.mux)
+        m.d.comb += [
+            self.ctrl.r_data.eq(self.ctrl_reg),
+            self.status.r_data.eq(self.reads),
+        ]
+        with m.If(self.ctrl.w_stb):
+            m.d.sync += self.ctrl_reg.eq(self.ctrl.w_data)
+        with m.If(self.status.r_stb):
+            m.d.sync += self.reads.eq(self.reads + 1)
+        with m.If(self.data.w_stb):
+            m.d.sync += self.data_reg.eq(self.data.w_data)
+        return m
+
+
+class _SoC(Elaboratable):
+    def __init__(self, models, periph_models):
+        self.models  = models
+        self.periphs = [_Peripheral(periph_models, "p0"), _Peripheral(periph_models, "p1")]
+        self.decoder = csr.Decoder(addr_width=8, data_width=8)
+        for periph in self.periphs:
+            self.decoder.add(periph.mux.bus)
+        self.bridge  = WishboneCSRBridge(self.decoder.bus, data_width=32)
+
+    def elaborate(self, platform):
+        m = Module()
+        m.submodules.decoder = self.models(self.decoder)
+        m.submodules.bridge  = self.models(self.bridge)
+        for index, periph in enumerate(self.periphs):
+            m.submodules["periph_{}".format(index)] = periph
+        return m
+
+
+def wishbone_trace(ops, *, bus_models, periph_models):
+    models = SimulationModels(enabled=bus_models)
+    # Peripherals share the models of the bus if both are enabled, and use models of their own if
+    # only theirs are, so that models are connected to the logic of the other components.
+    if periph_models and bus_models:
+        periph_models = models
+    else:
+        periph_models = SimulationModels(enabled=periph_models)
+    soc    = _SoC(models, periph_models)
+    bus    = soc.bridge.wb_bus
+    probes = [bus.ack, bus.dat_r]
+    for periph in soc.periphs:
+        probes += [periph.ctrl_reg, periph.reads, periph.data_reg,
+                   periph.ctrl.w_stb, periph.status.r_stb, periph.data.w_stb]
+    trace  = []
+
+    def sample():
+        values = []
+        for probe in probes:
+            values.append((yield probe))
+        trace.append(tuple(values))
+
+    def process():
+        for we, adr, sel, dat_w in ops:
+            yield bus.cyc.eq(1)
+            yield bus.stb.eq(1)
+            yield bus.we.eq(we)
+            yield bus.adr.eq(adr)
+            yield bus.sel.eq(sel)
+            yield bus.dat_w.eq(dat_w)
+            while True:
+                # Combinatorial outputs of the models are only updated shortly after the clock
+                # edge.
+                yield Delay(1e-8)
+                yield from sample()
+                if (yield bus.ack):
+                    break
+                yield
+            yield
+            yield bus.cyc.eq(0)
+            yield bus.stb.eq(0)
+            yield Delay(1e-8)
+            yield from sample()
+            yield
+
+    with Simulator(soc, vcd_file=open("test.vcd", "w")) as sim:
+        sim.add_clock(1e-6)
+        models.add_process(sim)
+        if periph_models is not models:
+            periph_models.add_process(sim)
+        sim.add_sync_process(process)
+        sim.run()
+    return trace
+
+
+class SimulationModelsTestCase(unittest.TestCase):
+    def test_wrong_component(self):
+        with self.assertRaisesRegex(TypeError,
+                r"Component 'foo' has no behavioural model"):
+            SimulationModels()("foo")
+
+    def test_disabled(self):
+        mux = csr.Multiplexer(addr_width=4, data_width=8)
+        self.assertIs(SimulationModels(enabled=False)(mux), mux)
+
+    def test_models(self):
+        models  = SimulationModels()
+        mux     = csr.Multiplexer(addr_width=4, data_width=8)
+        decoder = csr.Decoder(addr_width=8, data_width=8)
+        bridge  = WishboneCSRBridge(decoder.bus)
+        self.assertIsInstance(models(mux), MultiplexerModel)
+        self.assertIsInstance(models(decoder), DecoderModel)
+        self.assertIsInstance(models(bridge), WishboneCSRBridgeModel)
+        with self.assertRaisesRegex(TypeError,
+                r"Component must be an instance of csr\.Multiplexer, not 'foo'"):
+            MultiplexerModel("foo")
+
+    def assertTraceEqual(self, model, logic):
+        self.assertEqual(len(model), len(logic))
+        for cycle, (model_values, logic_values) in enumerate(zip(model, logic)):
+            self.assertEqual(model_values, logic_values, "cycle {}".format(cycle))
+
+    def test_wishbone(self):
+        ops = [
+            # (we, adr, sel, dat_w); p0 is at 0x00..0x20, p1 at 0x20..0x40.
+            (0, 0x00, 0b1111, 0),           # p0 ctrl, status
+            (0, 0x00, 0b0011, 0),           # p0 ctrl
+            (0, 0x01, 0b0111, 0),           # p0 ident
+            (1, 0x00, 0b0011, 0x1234),      # p0 ctrl
+            (0, 0x08, 0b0011, 0),           # p1 ctrl
+            (1, 0x01, 0b1000, 0xaa000000),  # p0 data, first chunk
+            (1, 0x02, 0b0111, 0x00bbccdd),  # p0 data, last chunks
+            (1, 0x03, 0b0011, 0x8001),      # p0 ctrl set alias
+            (1, 0x03, 0b1100, 0x00010000),  # p0 ctrl clear alias
+            (1, 0x04, 0b0011, 0xffff),      # p0 ctrl toggle alias
+            (0, 0x03, 0b1111, 0),           # p0 aliases, write-only
+            (0, 0x00, 0b1111, 0),
+            (1, 0x0b, 0b0011, 0x0001),      # p1 ctrl set alias
+            (0, 0x08, 0b0111, 0),           # p1 ctrl, status
+            (0, 0x3f, 0b1111, 0),           # unmapped
+            (0, 0x00, 0b0100, 0),           # p0 status alone
+        ]
+        logic = wishbone_trace(ops, bus_models=False, periph_models=False)
+        self.assertTraceEqual(wishbone_trace(ops, bus_models=True,  periph_models=True),  logic)
+        self.assertTraceEqual(wishbone_trace(ops, bus_models=True,  periph_models=False), logic)
+        self.assertTraceEqual(wishbone_trace(ops, bus_models=False, periph_models=True),  logic)
+
+    def test_csr_root(self):
+        # The multiplexer is driven by the testbench, which samples the registered outputs right
+        # after the clock edge, once they are updated by the models.
+        models = SimulationModels()
+        mux    = csr.Multiplexer(addr_width=4, data_width=8)
+        elem_r = csr.Element(16, "r", name="elem_r")
+        elem_w = csr.Element(8, "w", name="elem_w")
+        mux.add(elem_r)
+        mux.add(elem_w)
+        bus = mux.bus
+
+        m = Module()
+        m.domains.sync = ClockDomain("sync")
+        m.submodules.mux = models(mux)
+        m.d.comb += elem_r.r_data.eq(0x5aa5)
+
+        def process():
+            yield bus.addr.eq(0)
+            yield bus.r_stb.eq(1)
+            yield Delay(1e-8)
+            self.assertEqual((yield elem_r.r_stb), 1)
+            yield
+            yield bus.r_stb.eq(0)
+            yield bus.addr.eq(1)
+            yield Settle()
+            self.assertEqual((yield bus.r_data), 0xa5)
+            yield bus.r_stb.eq(1)
+            yield
+            yield bus.r_stb.eq(0)
+            yield Settle()
+            self.assertEqual((yield bus.r_data), 0x5a)
+            yield
+            yield Settle()
+            self.assertEqual((yield bus.r_data), 0)
+
+            yield bus.addr.eq(2)
+            yield bus.w_data.eq(0x3d)
+            yield bus.w_stb.eq(1)
+            yield
+            yield bus.w_stb.eq(0)
+            yield Settle()
+            self.assertEqual((yield elem_w.w_stb), 1)
+            self.assertEqual((yield elem_w.w_data), 0x3d)
+            yield
+            yield Settle()
+            self.assertEqual((yield elem_w.w_stb), 0)
+
+        with Simulator(m, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            models.add_process(sim)
+            sim.add_sync_process(process)
+            sim.run()
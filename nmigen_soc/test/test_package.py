@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import nmigen_soc
+
+
+class PackageTestCase(unittest.TestCase):
+    def test_lazy_submodule(self):
+        self.assertIs(nmigen_soc.memory, sys.modules["nmigen_soc.memory"])
+        self.assertIn("csr", dir(nmigen_soc))
+
+    def test_wrong_attribute(self):
+        with self.assertRaisesRegex(AttributeError,
+                r"module 'nmigen_soc' has no attribute 'foo'"):
+            nmigen_soc.foo
+
+    @unittest.skipIf(sys.version_info < (3, 7), "submodules are imported eagerly before 3.7")
+    def test_import_without_nmigen(self):
+        code = ("import sys, nmigen_soc.memory, nmigen_soc.latency, nmigen_soc.host.trace, "
+                "nmigen_soc.host.client, nmigen_soc.host.transport, nmigen_soc.host.serial, "
+                "nmigen_soc.protocol; "
+                "print(sorted(name for name in sys.modules "
+                "if name.split('.')[0] in ('nmigen', 'pkg_resources')))")
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(nmigen_soc.__file__)))
+        output = subprocess.check_output([sys.executable, "-c", code], cwd=root_dir,
+                                         universal_newlines=True)
+        self.assertEqual(output.strip(), "[]")
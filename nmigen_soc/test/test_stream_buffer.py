@@ -0,0 +1,76 @@
+# nmigen: UnusedElaboratable=no
+
+import unittest
+from nmigen import *
+from nmigen.back.pysim import *
+
+from ..stream.buffer import *
+
+
+def produce(stream, beats, valid_pattern=(1,)):
+    # Offer `beats`, inserting a bubble in the cycles in which `valid_pattern` is 0.
+    cycle = 0
+    for beat in beats:
+        while not valid_pattern[cycle % len(valid_pattern)]:
+            yield stream.valid.eq(0)
+            yield
+            cycle += 1
+        yield stream.payload.eq(beat)
+        yield stream.valid.eq(1)
+        yield Settle()
+        while not (yield stream.ready):
+            yield
+            yield Settle()
+            cycle += 1
+        yield
+        cycle += 1
+    yield stream.valid.eq(0)
+
+
+def consume(stream, count, results, ready_pattern=(1,)):
+    # Collect `count` beats as `(cycle, payload)` tuples, deasserting `ready` in the cycles in
+    # which `ready_pattern` is 0.
+    cycle = 0
+    while len(results) < count:
+        yield stream.ready.eq(ready_pattern[cycle % len(ready_pattern)])
+        yield Settle()
+        if (yield stream.valid) and (yield stream.ready):
+            results.append((cycle, (yield stream.payload)))
+        yield
+        cycle += 1
+
+
+class SkidBufferTestCase(unittest.TestCase):
+    def simulate(self, dut, beats, *, valid_pattern=(1,), ready_pattern=(1,)):
+        results = []
+        with Simulator(dut, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(produce(dut.sink, beats, valid_pattern))
+            sim.add_sync_process(consume(dut.source, len(beats), results, ready_pattern))
+            sim.run()
+        return results
+
+    def test_throughput(self):
+        dut = SkidBuffer(8)
+        results = self.simulate(dut, list(range(32)))
+        self.assertEqual([payload for _, payload in results], list(range(32)))
+        # One beat per cycle, after a latency of one cycle.
+        self.assertEqual([cycle for cycle, _ in results], list(range(1, 33)))
+
+    def test_backpressure(self):
+        dut = SkidBuffer(8)
+        ready_pattern = (1, 0, 1, 1, 0, 0, 1)
+        results = self.simulate(dut, list(range(32)), ready_pattern=ready_pattern)
+        self.assertEqual([payload for _, payload in results], list(range(32)))
+        # Every cycle in which the source is ready transfers a beat.
+        cycles = [cycle for cycle, _ in results]
+        ready_cycles = [cycle for cycle in range(1, cycles[-1] + 1)
+                        if ready_pattern[cycle % len(ready_pattern)]]
+        self.assertEqual(cycles, ready_cycles)
+
+    def test_bubbles(self):
+        dut = SkidBuffer([("data", 8), ("last", 1)])
+        beats = [index | ((index % 4 == 3) << 8) for index in range(16)]
+        results = self.simulate(dut, beats, valid_pattern=(1, 1, 0),
+                                ready_pattern=(0, 1, 1, 1))
+        self.assertEqual([payload for _, payload in results], beats)
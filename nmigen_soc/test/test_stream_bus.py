@@ -0,0 +1,26 @@
+# nmigen: UnusedElaboratable=no
+
+import unittest
+from nmigen import *
+
+from ..stream.bus import *
+
+
+class InterfaceTestCase(unittest.TestCase):
+    def test_shape(self):
+        iface = Interface(8)
+        self.assertEqual(list(iface.fields), ["payload", "valid", "ready"])
+        self.assertEqual(iface.payload_width, 8)
+        self.assertEqual(iface.payload_shape, unsigned(8))
+        self.assertIsInstance(iface.payload, Signal)
+
+    def test_layout(self):
+        iface = Interface([("data", 8), ("last", 1)])
+        self.assertEqual(iface.payload_width, 9)
+        self.assertEqual(len(iface.payload.data), 8)
+        self.assertEqual(len(iface.payload.last), 1)
+
+    def test_wrong_payload(self):
+        with self.assertRaisesRegex(TypeError,
+                r"Payload must be a shape or a list of fields, not 'foo'"):
+            Interface("foo")
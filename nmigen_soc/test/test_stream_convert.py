@@ -0,0 +1,107 @@
+# nmigen: UnusedElaboratable=no
+
+import unittest
+from nmigen import *
+from nmigen.back.pysim import *
+
+from ..stream.convert import *
+
+
+def produce(stream, beats, valid_pattern=(1,)):
+    # Offer `beats`, inserting a bubble in the cycles in which `valid_pattern` is 0.
+    cycle = 0
+    for beat in beats:
+        while not valid_pattern[cycle % len(valid_pattern)]:
+            yield stream.valid.eq(0)
+            yield
+            cycle += 1
+        yield stream.payload.eq(beat)
+        yield stream.valid.eq(1)
+        yield Settle()
+        while not (yield stream.ready):
+            yield
+            yield Settle()
+            cycle += 1
+        yield
+        cycle += 1
+    yield stream.valid.eq(0)
+
+
+def consume(stream, count, results, ready_pattern=(1,)):
+    # Collect `count` beats as `(cycle, payload)` tuples, deasserting `ready` in the cycles in
+    # which `ready_pattern` is 0.
+    cycle = 0
+    while len(results) < count:
+        yield stream.ready.eq(ready_pattern[cycle % len(ready_pattern)])
+        yield Settle()
+        if (yield stream.valid) and (yield stream.ready):
+            results.append((cycle, (yield stream.payload)))
+        yield
+        cycle += 1
+
+
+def simulate(dut, beats, count, *, ready_pattern=(1,)):
+    results = []
+    with Simulator(dut, vcd_file=open("test.vcd", "w")) as sim:
+        sim.add_clock(1e-6)
+        sim.add_sync_process(produce(dut.sink, beats))
+        sim.add_sync_process(consume(dut.source, count, results, ready_pattern))
+        sim.run()
+    return results
+
+
+class UpConverterTestCase(unittest.TestCase):
+    def test_wrong_width(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Width must be a positive integer, not 0"):
+            UpConverter(width=0, ratio=2)
+
+    def test_wrong_ratio(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Ratio must be an integer greater than or equal to 2, not 1"):
+            UpConverter(width=8, ratio=1)
+
+    def test_streams(self):
+        dut = UpConverter(width=8, ratio=4)
+        self.assertEqual(dut.sink.payload_width, 8)
+        self.assertEqual(dut.source.payload_width, 32)
+
+    def test_throughput(self):
+        dut = UpConverter(width=8, ratio=4)
+        results = simulate(dut, list(range(64)), 16)
+        self.assertEqual([payload for _, payload in results],
+                         [0x03020100 + 0x04040404 * index for index in range(16)])
+        # One narrow beat per cycle, i.e. one wide beat every 4 cycles.
+        self.assertEqual([cycle for cycle, _ in results], list(range(4, 68, 4)))
+
+    def test_backpressure(self):
+        dut = UpConverter(width=4, ratio=2)
+        results = simulate(dut, [index & 0xf for index in range(64)], 32,
+                           ready_pattern=(0, 1, 0, 0, 1))
+        self.assertEqual([payload for _, payload in results],
+                         [((2 * index + 1) & 0xf) << 4 | (2 * index) & 0xf
+                          for index in range(32)])
+
+
+class DownConverterTestCase(unittest.TestCase):
+    def test_wrong_ratio(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Ratio must be an integer greater than or equal to 2, not 0"):
+            DownConverter(width=8, ratio=0)
+
+    def test_streams(self):
+        dut = DownConverter(width=8, ratio=4)
+        self.assertEqual(dut.sink.payload_width, 32)
+        self.assertEqual(dut.source.payload_width, 8)
+
+    def test_throughput(self):
+        dut = DownConverter(width=8, ratio=4)
+        results = simulate(dut, [0x03020100 + 0x04040404 * index for index in range(16)], 64)
+        self.assertEqual([payload for _, payload in results], list(range(64)))
+        self.assertEqual([cycle for cycle, _ in results], list(range(1, 65)))
+
+    def test_backpressure(self):
+        dut = DownConverter(width=8, ratio=3)
+        results = simulate(dut, [0x020100 + 0x030303 * index for index in range(8)], 24,
+                           ready_pattern=(1, 0, 0, 1, 1))
+        self.assertEqual([payload for _, payload in results], list(range(24)))
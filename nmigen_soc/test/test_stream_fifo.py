@@ -0,0 +1,91 @@
+# nmigen: UnusedElaboratable=no
+
+import unittest
+from nmigen import *
+from nmigen.back.pysim import *
+
+from ..stream.fifo import *
+
+
+def produce(stream, beats, valid_pattern=(1,)):
+    # Offer `beats`, inserting a bubble in the cycles in which `valid_pattern` is 0.
+    cycle = 0
+    for beat in beats:
+        while not valid_pattern[cycle % len(valid_pattern)]:
+            yield stream.valid.eq(0)
+            yield
+            cycle += 1
+        yield stream.payload.eq(beat)
+        yield stream.valid.eq(1)
+        yield Settle()
+        while not (yield stream.ready):
+            yield
+            yield Settle()
+            cycle += 1
+        yield
+        cycle += 1
+    yield stream.valid.eq(0)
+
+
+def consume(stream, count, results, ready_pattern=(1,)):
+    # Collect `count` beats as `(cycle, payload)` tuples, deasserting `ready` in the cycles in
+    # which `ready_pattern` is 0.
+    cycle = 0
+    while len(results) < count:
+        yield stream.ready.eq(ready_pattern[cycle % len(ready_pattern)])
+        yield Settle()
+        if (yield stream.valid) and (yield stream.ready):
+            results.append((cycle, (yield stream.payload)))
+        yield
+        cycle += 1
+
+
+class SyncFIFOTestCase(unittest.TestCase):
+    def test_wrong_depth(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Depth must be a positive integer, not 0"):
+            SyncFIFO(8, depth=0)
+
+    def simulate(self, dut, beats, *, ready_pattern=(1,)):
+        results = []
+        with Simulator(dut, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(produce(dut.sink, beats))
+            sim.add_sync_process(consume(dut.source, len(beats), results, ready_pattern))
+            sim.run()
+        return results
+
+    def test_throughput(self):
+        for buffered, latency in ((False, 1), (True, 2)):
+            with self.subTest(buffered=buffered):
+                dut = SyncFIFO(8, depth=4, buffered=buffered)
+                results = self.simulate(dut, list(range(32)))
+                self.assertEqual([payload for _, payload in results], list(range(32)))
+                self.assertEqual([cycle for cycle, _ in results],
+                                 list(range(latency, latency + 32)))
+
+    def test_backpressure(self):
+        dut = SyncFIFO([("data", 8), ("last", 1)], depth=4)
+        results = self.simulate(dut, list(range(64)), ready_pattern=(0, 0, 0, 1, 1, 1, 1, 1))
+        self.assertEqual([payload for _, payload in results], list(range(64)))
+
+
+class AsyncFIFOTestCase(unittest.TestCase):
+    def test_wrong_depth(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Depth must be a positive power of 2, not 12"):
+            AsyncFIFO(8, depth=12)
+
+    def test_throughput(self):
+        dut = AsyncFIFO(8, depth=16)
+        results = []
+        with Simulator(dut, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6, domain="write")
+            sim.add_clock(1e-6, domain="read", phase=0.3e-6)
+            sim.add_sync_process(produce(dut.sink, list(range(64))), domain="write")
+            sim.add_sync_process(consume(dut.source, 64, results), domain="read")
+            sim.run()
+        self.assertEqual([payload for _, payload in results], list(range(64)))
+        # After the pointer synchronization latency, one beat per cycle.
+        cycles = [cycle for cycle, _ in results]
+        self.assertEqual(cycles, list(range(cycles[0], cycles[0] + 64)))
@@ -0,0 +1,143 @@
+# nmigen: UnusedElaboratable=no
+
+import unittest
+from nmigen import *
+from nmigen.back.pysim import *
+
+from ..stream.wishbone import *
+
+
+def produce(stream, beats):
+    for beat in beats:
+        yield stream.payload.eq(beat)
+        yield stream.valid.eq(1)
+        yield Settle()
+        while not (yield stream.ready):
+            yield
+            yield Settle()
+        yield
+    yield stream.valid.eq(0)
+
+
+def consume(stream, count, results, ready_pattern=(1,)):
+    cycle = 0
+    while len(results) < count:
+        yield stream.ready.eq(ready_pattern[cycle % len(ready_pattern)])
+        yield Settle()
+        if (yield stream.valid) and (yield stream.ready):
+            results.append((yield stream.payload))
+        yield
+        cycle += 1
+
+
+def wishbone_target(bus, memory, error_addrs=()):
+    # Terminate each cycle in the cycle after it is requested.
+    yield Passive()
+    while True:
+        yield Settle()
+        if (yield bus.cyc) and (yield bus.stb):
+            adr = yield bus.adr
+            yield
+            if adr in error_addrs:
+                yield bus.err.eq(1)
+            else:
+                if (yield bus.we):
+                    memory[adr] = yield bus.dat_w
+                else:
+                    yield bus.dat_r.eq(memory.get(adr, 0))
+                yield bus.ack.eq(1)
+            yield
+            yield bus.ack.eq(0)
+            yield bus.err.eq(0)
+        else:
+            yield
+
+
+def simulate(dut, commands, count, memory, *, error_addrs=(), ready_pattern=(1,)):
+    results = []
+    with Simulator(dut, vcd_file=open("test.vcd", "w")) as sim:
+        sim.add_clock(1e-6)
+        sim.add_sync_process(produce(dut.sink, commands))
+        sim.add_sync_process(consume(dut.source, count, results, ready_pattern))
+        sim.add_sync_process(wishbone_target(dut.bus, memory, error_addrs))
+        sim.run()
+    return results
+
+
+class StreamWishboneBridgeTestCase(unittest.TestCase):
+    def test_bus(self):
+        dut = StreamWishboneBridge(addr_width=16, data_width=32, granularity=8)
+        self.assertEqual((dut.bus.addr_width, dut.bus.data_width, dut.bus.granularity),
+                         (16, 32, 8))
+        self.assertTrue(hasattr(dut.bus, "err"))
+        self.assertEqual((dut.sink.payload_width, dut.source.payload_width), (8, 8))
+
+    def test_wrong_data_width(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Data width must be one of 8, 16, 32, 64, not 12"):
+            StreamWishboneBridge(addr_width=16, data_width=12)
+
+    def test_burst(self):
+        dut = StreamWishboneBridge(addr_width=16, data_width=32)
+        memory = {0x1235: 0xcafef00d}
+        commands = [
+            # Write 3 words from 0x1233, with auto-increment.
+            0x05, 2, 0x33, 0x12,
+            0x01, 0x02, 0x03, 0x04,
+            0x11, 0x12, 0x13, 0x14,
+            0x21, 0x22, 0x23, 0x24,
+            # Read 4 words from 0x1233, with auto-increment.
+            0x06, 3, 0x33, 0x12,
+            # Read 2 words from 0x1234, without auto-increment.
+            0x02, 1, 0x34, 0x12,
+        ]
+        results = simulate(dut, commands, 1 + 17 + 9, memory)
+        self.assertEqual(memory, {0x1233: 0x04030201, 0x1234: 0x14131211,
+                                  0x1235: 0x24232221})
+        self.assertEqual(results, [
+            0x00,
+            0x01, 0x02, 0x03, 0x04,
+            0x11, 0x12, 0x13, 0x14,
+            0x21, 0x22, 0x23, 0x24,
+            0x00, 0x00, 0x00, 0x00,
+            0x00,
+            0x11, 0x12, 0x13, 0x14,
+            0x11, 0x12, 0x13, 0x14,
+            0x00,
+        ])
+
+    def test_fixed_write(self):
+        dut = StreamWishboneBridge(addr_width=8, data_width=8)
+        memory = {}
+        results = simulate(dut, [0x01, 2, 0x40, 0xaa, 0xbb, 0xcc, 0x01, 0, 0xff, 0xdd],
+                           2, memory)
+        self.assertEqual(memory, {0x40: 0xcc, 0xff: 0xdd})
+        self.assertEqual(results, [0x00, 0x00])
+
+    def test_address_wrap(self):
+        dut = StreamWishboneBridge(addr_width=4, data_width=8)
+        memory = {}
+        simulate(dut, [0x05, 1, 0x0f, 0x01, 0x02], 1, memory)
+        self.assertEqual(memory, {0x0f: 0x01, 0x00: 0x02})
+
+    def test_ignored_commands(self):
+        dut = StreamWishboneBridge(addr_width=8, data_width=8)
+        memory = {0x10: 0x5a}
+        results = simulate(dut, [0x00, 0xff, 0x03, 0x0a, 0x02, 0, 0x10], 2, memory)
+        self.assertEqual(results, [0x5a, 0x00])
+
+    def test_error(self):
+        dut = StreamWishboneBridge(addr_width=8, data_width=16)
+        memory = {0x10: 0x1234, 0x12: 0x5678}
+        results = simulate(dut, [0x06, 2, 0x10, 0x02, 0, 0x12], 7 + 3,
+                           memory, error_addrs=(0x11,))
+        # The error is reported in the status of its command only.
+        self.assertEqual(results, [0x34, 0x12, 0x00, 0x00, 0x78, 0x56, 0x01,
+                                   0x78, 0x56, 0x00])
+
+    def test_backpressure(self):
+        dut = StreamWishboneBridge(addr_width=8, data_width=32)
+        memory = {addr: addr * 0x01010101 for addr in range(16)}
+        results = simulate(dut, [0x06, 15, 0x00], 16 * 4 + 1, memory,
+                           ready_pattern=(1, 0, 0, 1, 1))
+        self.assertEqual(results, [addr for addr in range(16) for _ in range(4)] + [0x00])
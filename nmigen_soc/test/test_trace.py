@@ -0,0 +1,257 @@
+# nmigen: UnusedElaboratable=no
+
+import unittest
+from nmigen import *
+from nmigen.back.pysim import *
+
+from ..memory import MemoryMap
+from .. import csr, wishbone
+from ..trace import *
+from ..host.trace import *
+
+
+class CSRFields:
+    # Accesses the control and status fields of a recorder through its CSR bus, wherever its
+    # register bank places them.
+    def __init__(self, dut):
+        self.bus    = dut.csr_bus
+        self.fields = {field.name: (field, elem, offset)
+                       for field, (elem, offset) in dut.fields()}
+        self.addrs  = {elem: start for elem, (start, _) in self.bus.memory_map.resources()}
+
+    def write(self, **values):
+        elem  = self.fields[next(iter(values))][1]
+        value = 0
+        for name, field_value in values.items():
+            _, field_elem, offset = self.fields[name]
+            assert field_elem is elem
+            value |= field_value << offset
+        for index in range((elem.width + self.bus.data_width - 1) // self.bus.data_width):
+            yield self.bus.addr.eq(self.addrs[elem] + index)
+            yield self.bus.w_data.eq(value >> (index * self.bus.data_width))
+            yield self.bus.w_stb.eq(1)
+            yield
+        yield self.bus.w_stb.eq(0)
+        yield
+        yield
+
+    def read(self, name):
+        field, elem, offset = self.fields[name]
+        value = 0
+        for index in range((elem.width + self.bus.data_width - 1) // self.bus.data_width):
+            yield self.bus.addr.eq(self.addrs[elem] + index)
+            yield self.bus.r_stb.eq(1)
+            yield
+            yield self.bus.r_stb.eq(0)
+            yield
+            value |= (yield self.bus.r_data) << (index * self.bus.data_width)
+        return (value >> offset) & ((1 << field.width) - 1)
+
+
+class TraceDecoderTestCase(unittest.TestCase):
+    def setUp(self):
+        # 16-bit words: 6-bit timestamp deltas, 7-bit address deltas, 2 extension words.
+        self.dut = TraceDecoder(entry_width=16, addr_width=12, timestamp_width=16)
+
+    def sync(self, addr, timestamp, *, we=0, err=0, lost=0):
+        payload = addr | timestamp << 12
+        return [
+            0b10 << 14 | we << 13 | err << 12 | lost << 11,
+            0b11 << 14 | payload & 0x3fff,
+            0b11 << 14 | payload >> 14,
+        ]
+
+    def delta(self, dts, da, *, we=0, err=0):
+        return [we << 14 | err << 13 | dts << 7 | da & 0x7f]
+
+    def test_wrong_entry_width(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Entry width must be an integer greater than or equal to 5, not 4"):
+            TraceDecoder(entry_width=4, addr_width=8, timestamp_width=8)
+
+    def test_decode(self):
+        words = self.sync(0x100, 10, we=1) + self.delta(3, -4) + self.delta(1, 2, err=1)
+        self.assertEqual(self.dut.decode(words), [
+            TraceEntry(10, 0x100, True,  False, False, None),
+            TraceEntry(13, 0x0fc, False, False, False, None),
+            TraceEntry(14, 0x0fe, False, True,  False, None),
+        ])
+
+    def test_decode_wrapped(self):
+        words = self.delta(1, 1) + self.sync(0x200, 5, lost=1) + self.delta(2, 3)
+        # The oldest word is the second extension word of an overwritten sync entry, followed by
+        # a delta entry that refers to it; both are skipped.
+        words = words[3:] + words[:3]
+        self.assertEqual(self.dut.decode(words, wr_ptr=2, wrapped=True), [
+            TraceEntry(5, 0x200, False, False, True, None),
+            TraceEntry(7, 0x203, False, False, False, None),
+        ])
+
+    def test_decode_resource(self):
+        memory_map = MemoryMap(addr_width=12, data_width=8)
+        memory_map.add_resource("foo", size=0x100, addr=0x100)
+        dut = TraceDecoder(entry_width=16, addr_width=12, timestamp_width=16,
+                           memory_map=memory_map)
+        words = self.sync(0x100, 0) + self.delta(1, -1)
+        self.assertEqual([entry.resource for entry in dut.decode(words)], ["foo", None])
+
+
+class TraceRecorderTestCase(unittest.TestCase):
+    def test_wrong_bus(self):
+        with self.assertRaisesRegex(TypeError,
+                r"Bus must be an instance of wishbone\.Interface or csr\.Interface, not 'foo'"):
+            TraceRecorder("foo")
+
+    def test_wrong_depth(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Depth must be a power of 2 greater than 1, not 3"):
+            TraceRecorder(csr.Interface(addr_width=8, data_width=8), depth=3)
+
+    def test_wrong_entry_width(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Entry width must be one of 16, 32, 64, not 8"):
+            TraceRecorder(csr.Interface(addr_width=8, data_width=8), entry_width=8)
+
+    def test_wrong_filter(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Resource 'foo' is not a part of the memory map of the observed bus"):
+            TraceRecorder(csr.Interface(addr_width=8, data_width=8), filters=["foo"])
+
+    def test_sim(self):
+        bus = wishbone.Interface(addr_width=10, data_width=32, granularity=8)
+        sub_map = MemoryMap(addr_width=8, data_width=8)
+        sub_map.add_resource("reg_a", size=4)
+        sub_map.add_resource("reg_b", size=4)
+        bus.memory_map.add_window(sub_map, addr=0x100)
+        bus.memory_map.add_resource("ram", size=0x100, addr=0x800)
+
+        dut = TraceRecorder(bus, depth=16, entry_width=16, timestamp_width=16,
+                            filters=[sub_map])
+        decoder = dut.decoder()
+        regs    = CSRFields(dut)
+
+        def wb_cycle(adr, we=0, wait=0):
+            yield bus.adr.eq(adr)
+            yield bus.we.eq(we)
+            yield bus.cyc.eq(1)
+            yield bus.stb.eq(1)
+            for _ in range(wait):
+                yield
+            yield bus.ack.eq(1)
+            yield
+            yield bus.ack.eq(0)
+            yield bus.cyc.eq(0)
+            yield bus.stb.eq(0)
+            yield
+
+        def sim_test():
+            yield from wb_cycle(0x100 >> 2, we=1)
+            for _ in range(3):
+                yield
+            yield from wb_cycle(0x104 >> 2, wait=2)
+            yield from wb_cycle(0x800 >> 2)     # filtered out
+            yield from wb_cycle(0x100 >> 2)
+            yield
+
+            words = []
+            for index in range(16):
+                yield dut.wb_bus.adr.eq(index)
+                yield dut.wb_bus.cyc.eq(1)
+                yield dut.wb_bus.stb.eq(1)
+                yield
+                while not (yield dut.wb_bus.ack):
+                    yield
+                words.append((yield dut.wb_bus.dat_r))
+                yield dut.wb_bus.stb.eq(0)
+                yield
+
+            wr_ptr  = yield from regs.read("wr_ptr")
+            entries = decoder.decode(words, wr_ptr=wr_ptr)
+            self.assertEqual([(entry.addr, entry.we, entry.resource) for entry in entries], [
+                (0x100 >> 2, True,  "reg_a"),
+                (0x104 >> 2, False, "reg_b"),
+                (0x100 >> 2, False, "reg_a"),
+            ])
+            # One sync entry of 3 words, then two delta entries.
+            self.assertEqual(wr_ptr, 5)
+            self.assertEqual(entries[1].timestamp - entries[0].timestamp, 7)
+
+        with Simulator(dut, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
+
+    def test_sim_trigger(self):
+        bus = csr.Interface(addr_width=8, data_width=8)
+        elem_a = csr.Element(8, "rw")
+        elem_b = csr.Element(8, "rw")
+        bus.memory_map.add_resource(elem_a, size=1)
+        bus.memory_map.add_resource(elem_b, size=1)
+
+        dut = TraceRecorder(bus, depth=16, entry_width=16, timestamp_width=8,
+                            triggers=[elem_b])
+
+        regs = CSRFields(dut)
+
+        def sim_test():
+            # Keep recording enabled, and stop 2 transactions after a trigger.
+            yield from regs.write(post_count=2, enable=1, trigger_en=1)
+
+            for addr in [0, 0, 1, 0, 0, 0, 0]:
+                yield bus.addr.eq(addr)
+                yield bus.w_stb.eq(1)
+                yield
+                yield bus.w_stb.eq(0)
+                yield
+            yield
+
+            self.assertEqual((yield from regs.read("triggered")), 1)
+            self.assertEqual((yield from regs.read("done")), 1)
+            # One sync entry of 3 words, then four delta entries; the second transaction completes
+            # while the sync entry is being written, and is held back rather than dropped.
+            self.assertEqual((yield from regs.read("wr_ptr")), 7)
+            self.assertEqual((yield from regs.read("dropped")), 0)
+
+        with Simulator(dut, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
+
+    def test_sim_trigger_drop_pending(self):
+        bus = csr.Interface(addr_width=8, data_width=8)
+        elem_a = csr.Element(8, "rw")
+        elem_b = csr.Element(8, "rw")
+        bus.memory_map.add_resource(elem_a, size=1)
+        bus.memory_map.add_resource(elem_b, size=1)
+
+        dut = TraceRecorder(bus, depth=16, entry_width=16, timestamp_width=8,
+                            triggers=[elem_b])
+
+        regs = CSRFields(dut)
+
+        def sim_test():
+            # Keep recording enabled, and stop right after a trigger.
+            yield from regs.write(post_count=0, enable=1, trigger_en=1)
+
+            # The first transaction is recorded as a sync entry. The trigger completes while its
+            # extension words are being written, and is held back; the last transaction completes
+            # while the trigger is recorded, and is held back until the recorder stops.
+            for addr in [0, None, 1, 0]:
+                if addr is not None:
+                    yield bus.addr.eq(addr)
+                yield bus.w_stb.eq(addr is not None)
+                yield
+            yield bus.w_stb.eq(0)
+            for _ in range(4):
+                yield
+
+            self.assertEqual((yield from regs.read("triggered")), 1)
+            self.assertEqual((yield from regs.read("done")), 1)
+            # One sync entry of 3 words, then one delta entry.
+            self.assertEqual((yield from regs.read("wr_ptr")), 4)
+            self.assertEqual((yield from regs.read("dropped")), 1)
+
+        with Simulator(dut, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
@@ -6,6 +6,7 @@ from nmigen.hdl.rec import *
 from nmigen.back.pysim import *
 
 from ..wishbone.bus import *
+from ..latency import Latency
 
 
 class InterfaceTestCase(unittest.TestCase):
@@ -131,6 +132,16 @@ class DecoderTestCase(unittest.TestCase):
                 r"not have a corresponding input"):
             self.dut.add(Interface(addr_width=15, data_width=32, granularity=16, features={"err"}))
 
+    def test_wrong_default_response(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Default response must be one of None, \"ack\", or \"err\", not 'foo'"):
+            Decoder(addr_width=31, data_width=32, default_response="foo")
+
+    def test_wrong_default_response_err(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Default response \"err\" requires the decoder to have an \"err\" signal"):
+            Decoder(addr_width=31, data_width=32, default_response="err")
+
 
 class DecoderSimulationTestCase(unittest.TestCase):
     def test_simple(self):
@@ -191,6 +202,147 @@ class DecoderSimulationTestCase(unittest.TestCase):
             sim.add_process(sim_test())
             sim.run()
 
+    def test_full_granularity(self):
+        dut = Decoder(addr_width=16, data_width=8, granularity=8)
+        sub_1 = Interface(addr_width=8, data_width=8)
+        dut.add(sub_1, addr=0x0000)
+        sub_2 = Interface(addr_width=8, data_width=8)
+        dut.add(sub_2, addr=0x4000)
+
+        def sim_test():
+            yield dut.bus.cyc.eq(1)
+            yield dut.bus.adr.eq(0x4010)
+            yield Delay(1e-6)
+            self.assertEqual((yield sub_1.cyc), 0)
+            self.assertEqual((yield sub_2.cyc), 1)
+
+            yield dut.bus.adr.eq(0x4110)
+            yield Delay(1e-6)
+            self.assertEqual((yield sub_1.cyc), 0)
+            self.assertEqual((yield sub_2.cyc), 0)
+
+        with Simulator(dut, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_process(sim_test())
+            sim.run()
+
+    def test_minimal_decode(self):
+        dut = Decoder(addr_width=16, data_width=8, granularity=8, minimal_decode=True)
+        sub_1 = Interface(addr_width=8, data_width=8)
+        dut.add(sub_1, addr=0x0000)
+        sub_2 = Interface(addr_width=8, data_width=8)
+        dut.add(sub_2, addr=0x4000)
+        sub_3 = Interface(addr_width=8, data_width=8)
+        dut.add(sub_3, addr=0x8100)
+
+        def sim_test():
+            yield dut.bus.cyc.eq(1)
+            for addr, sub in [(0x0010, sub_1), (0x4010, sub_2), (0x8110, sub_3),
+                              # Unassigned addresses alias onto windows.
+                              (0x4110, sub_2), (0xa010, sub_3)]:
+                yield dut.bus.adr.eq(addr)
+                yield Delay(1e-6)
+                for other in (sub_1, sub_2, sub_3):
+                    self.assertEqual((yield other.cyc), int(other is sub))
+                self.assertEqual((yield sub.adr), 0x10)
+
+        with Simulator(dut, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_process(sim_test())
+            sim.run()
+
+    def test_register_response(self):
+        class Responder(Elaboratable):
+            def __init__(self, value, **kwargs):
+                self.bus   = Interface(**kwargs)
+                self.value = value
+                self.count = Signal(8)
+
+            def elaborate(self, platform):
+                m = Module()
+                m.d.comb += [
+                    self.bus.ack.eq(self.bus.cyc & self.bus.stb),
+                    self.bus.dat_r.eq(self.value),
+                ]
+                with m.If(self.bus.ack):
+                    m.d.sync += self.count.eq(self.count + 1)
+                return m
+
+        dut = Decoder(addr_width=16, data_width=16, granularity=16, features={"err"},
+                      register_response=True)
+        sub_1 = Responder(0x1234, addr_width=8, data_width=16)
+        dut.add(sub_1.bus)
+        sub_2 = Responder(0x5678, addr_width=8, data_width=16)
+        dut.add(sub_2.bus)
+        self.assertEqual(dut.bus.memory_map.latency, Latency(read=1, write=1))
+
+        m = Module()
+        m.submodules += dut, sub_1, sub_2
+
+        def sim_test():
+            # Two back-to-back classic cycles. The response is returned one cycle after the
+            # subordinate acknowledges it; stb is withheld from the subordinates meanwhile, so each
+            # access is seen exactly once, and the next one starts a cycle later.
+            yield dut.bus.cyc.eq(1)
+            yield dut.bus.stb.eq(1)
+            for addr, value, latency in [(0x0100, 0x5678, 1), (0x0001, 0x1234, 2)]:
+                yield dut.bus.adr.eq(addr)
+                cycles = 0
+                while True:
+                    yield
+                    yield Settle()
+                    cycles += 1
+                    if (yield dut.bus.ack):
+                        break
+                self.assertEqual(cycles, latency)
+                self.assertEqual((yield dut.bus.dat_r), value)
+                self.assertEqual((yield dut.bus.err), 0)
+            yield dut.bus.cyc.eq(0)
+            yield dut.bus.stb.eq(0)
+            yield
+            yield Settle()
+            self.assertEqual((yield dut.bus.ack), 0)
+            self.assertEqual((yield sub_1.count), 1)
+            self.assertEqual((yield sub_2.count), 1)
+
+        with Simulator(m, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
+
+    def test_default_response(self):
+        for default_response in ("ack", "err"):
+            dut = Decoder(addr_width=16, data_width=8, features={"err"},
+                          default_response=default_response)
+            sub = Interface(addr_width=8, data_width=8, features={"err"})
+            dut.add(sub)
+
+            def sim_test():
+                yield dut.bus.cyc.eq(1)
+                yield dut.bus.stb.eq(1)
+                yield sub.ack.eq(1)
+                yield sub.dat_r.eq(0x55)
+                yield dut.bus.adr.eq(0x0010)
+                yield Delay(1e-6)
+                self.assertEqual((yield dut.bus.ack), 1)
+                self.assertEqual((yield dut.bus.err), 0)
+                self.assertEqual((yield dut.bus.dat_r), 0x55)
+
+                yield dut.bus.adr.eq(0x1010)
+                yield sub.ack.eq(0)
+                yield Delay(1e-6)
+                self.assertEqual((yield sub.cyc), 0)
+                self.assertEqual((yield dut.bus.ack), int(default_response == "ack"))
+                self.assertEqual((yield dut.bus.err), int(default_response == "err"))
+                self.assertEqual((yield dut.bus.dat_r), 0)
+
+                yield dut.bus.stb.eq(0)
+                yield Delay(1e-6)
+                self.assertEqual((yield dut.bus.ack), 0)
+                self.assertEqual((yield dut.bus.err), 0)
+
+            with Simulator(dut, vcd_file=open("test.vcd", "w")) as sim:
+                sim.add_process(sim_test())
+                sim.run()
+
     def test_addr_translate(self):
         class AddressLoopback(Elaboratable):
             def __init__(self, **kwargs):
@@ -296,3 +448,158 @@ class DecoderSimulationTestCase(unittest.TestCase):
         with Simulator(m, vcd_file=open("test.vcd", "w")) as sim:
             sim.add_process(sim_test())
             sim.run()
+
+
+class DecoderTreeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dut = DecoderTree(addr_width=16, data_width=32, granularity=8, max_fanout=4)
+
+    def test_wrong_max_fanout(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Maximum fanout must be an integer greater than or equal to 2, not 1"):
+            DecoderTree(addr_width=16, data_width=32, max_fanout=1)
+
+    def test_add_wrong(self):
+        with self.assertRaisesRegex(TypeError,
+                r"Subordinate bus must be an instance of wishbone\.Interface, not 'foo'"):
+            self.dut.add("foo")
+
+    def test_add_wrong_optional_output(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Subordinate bus has optional output 'err', but the decoder does "
+                r"not have a corresponding input"):
+            self.dut.add(Interface(addr_width=4, data_width=32, granularity=8, features={"err"}))
+
+    def test_add_frozen(self):
+        self.dut.bus
+        with self.assertRaisesRegex(ValueError,
+                r"Cannot add subordinate bus .* because the tree layout has already been "
+                r"computed"):
+            self.dut.add(Interface(addr_width=4, data_width=32, granularity=8))
+
+    def test_flat(self):
+        subs = [Interface(addr_width=4, data_width=32, granularity=8) for _ in range(4)]
+        for sub in subs:
+            self.dut.add(sub)
+        self.assertEqual([(path.sub_bus, path.start, path.end, path.depth)
+                          for path in self.dut.paths()],
+                         [(subs[0], 0x00, 0x40, 1), (subs[1], 0x40, 0x80, 1),
+                          (subs[2], 0x80, 0xc0, 1), (subs[3], 0xc0, 0x100, 1)])
+        self.assertEqual(len(list(self.dut.bus.memory_map.windows())), 4)
+
+    def test_balanced(self):
+        subs = [Interface(addr_width=4, data_width=32, granularity=8) for _ in range(64)]
+        for sub in subs:
+            self.assertEqual(self.dut.add(sub), (len(self.dut._subs) * 0x40 - 0x40,
+                                                 len(self.dut._subs) * 0x40, 1))
+        self.assertEqual([path.depth for path in self.dut.paths()], [3] * 64)
+        self.assertEqual([path.start for path in self.dut.paths()],
+                         [index * 0x40 for index in range(64)])
+        self.assertEqual(len(self.dut._decoders), 4 + 16)
+        for decoder in [self.dut._root, *self.dut._decoders]:
+            self.assertEqual(len(list(decoder.bus.memory_map.windows())), 4)
+
+    def test_addresses(self):
+        flat = Decoder(addr_width=16, data_width=32, granularity=8)
+        subs = []
+        for index, (addr_width, addr) in enumerate([
+                    (4, None), (4, None), (8, None), (4, 0x8000),
+                    (4, None), (10, 0x1000), (4, 0x0c00), (4, None),
+                ]):
+            sub = Interface(addr_width=addr_width, data_width=32, granularity=8)
+            sub.memory_map.add_resource(object(), size=1)
+            self.assertEqual(self.dut.add(sub, addr=addr), flat.add(sub, addr=addr))
+            subs.append(sub)
+        self.assertEqual([(path.start, path.end) for path in self.dut.paths()],
+                         [(0x0000, 0x0040), (0x0040, 0x0080), (0x0400, 0x0800),
+                          (0x0c00, 0x0c40), (0x0c40, 0x0c80), (0x1000, 0x2000),
+                          (0x8000, 0x8040), (0x8040, 0x8080)])
+        self.assertEqual(list(self.dut.bus.memory_map.all_resources()),
+                         list(flat.bus.memory_map.all_resources()))
+        for decoder in [self.dut._root, *self.dut._decoders]:
+            self.assertLessEqual(len(list(decoder.bus.memory_map.windows())), 4)
+
+    def test_sparse(self):
+        sub = Interface(addr_width=4, data_width=8, granularity=8)
+        self.assertEqual(self.dut.add(sub, sparse=True), (0x00, 0x10, 1))
+
+    def test_register_response_latency(self):
+        dut = DecoderTree(addr_width=16, data_width=32, granularity=8, max_fanout=2,
+                          register_response=True)
+        for _ in range(3):
+            dut.add(Interface(addr_width=4, data_width=32, granularity=8))
+        self.assertEqual([(path.depth, path.latency) for path in dut.paths()],
+                         [(2, Latency(read=2, write=2)), (2, Latency(read=2, write=2)),
+                          (1, Latency(read=1, write=1))])
+
+
+class DecoderTreeSimulationTestCase(unittest.TestCase):
+    class Responder(Elaboratable):
+        def __init__(self, value, **kwargs):
+            self.bus   = Interface(**kwargs)
+            self.value = value
+            self.count = Signal(8)
+
+        def elaborate(self, platform):
+            m = Module()
+            m.d.comb += [
+                self.bus.ack.eq(self.bus.cyc & self.bus.stb),
+                self.bus.dat_r.eq(self.value),
+            ]
+            with m.If(self.bus.ack):
+                m.d.sync += self.count.eq(self.count + 1)
+            return m
+
+    def simulate(self, register_response):
+        dut  = DecoderTree(addr_width=16, data_width=16, granularity=16, max_fanout=2,
+                           register_response=register_response)
+        subs = []
+        for index in range(5):
+            sub = self.Responder(0x1100 * (index + 1), addr_width=8, data_width=16)
+            dut.add(sub.bus)
+            subs.append(sub)
+        depths = {path.sub_bus.memory_map: path.depth for path in dut.paths()}
+
+        m = Module()
+        m.submodules.dut = dut
+        m.submodules += subs
+
+        def sim_test():
+            yield dut.bus.cyc.eq(1)
+            yield dut.bus.stb.eq(1)
+            for index in (4, 0, 2, 1, 3):
+                yield dut.bus.adr.eq(index << 8)
+                cycles = 0
+                while True:
+                    yield
+                    yield Settle()
+                    cycles += 1
+                    if (yield dut.bus.ack):
+                        break
+                    self.assertLess(cycles, 8)
+                # With registered responses, every decoder on the path adds 1 cycle.
+                if register_response:
+                    self.assertEqual(cycles, depths[subs[index].bus.memory_map])
+                else:
+                    self.assertEqual(cycles, 1)
+                self.assertEqual((yield dut.bus.dat_r), 0x1100 * (index + 1))
+                yield dut.bus.stb.eq(0)
+                yield
+                yield dut.bus.stb.eq(1)
+            yield dut.bus.cyc.eq(0)
+            yield dut.bus.stb.eq(0)
+            yield
+            yield Settle()
+            for sub in subs:
+                self.assertEqual((yield sub.count), 1)
+
+        with Simulator(m, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
+
+    def test_combinatorial(self):
+        self.simulate(register_response=False)
+
+    def test_register_response(self):
+        self.simulate(register_response=True)
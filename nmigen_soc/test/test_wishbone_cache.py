@@ -0,0 +1,294 @@
+# nmigen: UnusedElaboratable=no
+
+import unittest
+from nmigen import *
+from nmigen.back.pysim import *
+
+from ..wishbone.bus import *
+from ..wishbone.cache import *
+
+
+class SlowMemory(Elaboratable):
+    def __init__(self, *, addr_width, data_width, granularity=None, latency=3, features=()):
+        self.bus     = Interface(addr_width=addr_width, data_width=data_width,
+                                 granularity=granularity, features=features)
+        self.mem     = Memory(width=data_width, depth=2 ** addr_width,
+                              init=[0x1000 + index for index in range(2 ** addr_width)])
+        self.latency = latency
+        self.reads   = Signal(16)
+        self.writes  = Signal(16)
+        self.fail    = Signal()
+
+    def elaborate(self, platform):
+        m = Module()
+        m.submodules.rd_port = rd_port = self.mem.read_port(domain="comb")
+        m.submodules.wr_port = wr_port = self.mem.write_port(granularity=self.bus.granularity)
+
+        # While ``fail`` is asserted, accesses are terminated with ``err`` (if the bus has it)
+        # and have no effect.
+        if hasattr(self.bus, "err"):
+            err  = self.bus.err
+            fail = self.fail
+        else:
+            err  = Signal()
+            fail = Const(0)
+
+        wait = Signal(range(self.latency + 1))
+        m.d.comb += [
+            rd_port.addr.eq(self.bus.adr),
+            wr_port.addr.eq(self.bus.adr),
+            wr_port.data.eq(self.bus.dat_w),
+            self.bus.dat_r.eq(rd_port.data),
+        ]
+        with m.If(self.bus.cyc & self.bus.stb & ~self.bus.ack & ~err):
+            m.d.sync += wait.eq(wait + 1)
+            with m.If(wait == self.latency):
+                m.d.sync += wait.eq(0)
+                with m.If(fail):
+                    m.d.sync += err.eq(1)
+                with m.Elif(self.bus.we):
+                    m.d.comb += wr_port.en.eq(self.bus.sel)
+                    m.d.sync += [
+                        self.bus.ack.eq(1),
+                        self.writes.eq(self.writes + 1),
+                    ]
+                with m.Else():
+                    m.d.sync += [
+                        self.bus.ack.eq(1),
+                        self.reads.eq(self.reads + 1),
+                    ]
+        with m.Else():
+            m.d.sync += [
+                self.bus.ack.eq(0),
+                err.eq(0),
+            ]
+
+        return m
+
+
+def wb_access(bus, adr, *, we=0, dat_w=0, sel=None):
+    # Returns ``(None, cycles)`` if the access is terminated with ``err``.
+    yield bus.adr.eq(adr)
+    yield bus.we.eq(we)
+    yield bus.dat_w.eq(dat_w)
+    yield bus.sel.eq((1 << len(bus.sel)) - 1 if sel is None else sel)
+    yield bus.cyc.eq(1)
+    yield bus.stb.eq(1)
+    cycles = 0
+    while True:
+        yield
+        cycles += 1
+        if hasattr(bus, "err") and (yield bus.err):
+            dat_r = None
+            break
+        if (yield bus.ack):
+            dat_r = yield bus.dat_r
+            break
+    yield bus.cyc.eq(0)
+    yield bus.stb.eq(0)
+    yield
+    return dat_r, cycles
+
+
+class CacheTestCase(unittest.TestCase):
+    def test_wrong_target(self):
+        with self.assertRaisesRegex(TypeError,
+                r"Target bus must be an instance of wishbone\.Interface, not 'foo'"):
+            Cache("foo", size=16)
+
+    def test_wrong_target_stall(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Target bus has optional output 'stall', which is not supported"):
+            Cache(Interface(addr_width=8, data_width=32, features={"stall"}), size=16)
+
+    def test_wrong_size(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Size must be a positive power of 2, not 12"):
+            Cache(Interface(addr_width=8, data_width=32), size=12)
+
+    def test_wrong_size_small(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Size 8 must be at least line length 4 times associativity 4"):
+            Cache(Interface(addr_width=8, data_width=32), size=8, ways=4)
+
+    def test_wrong_addr_width(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Cache with 16 sets of 4 words cannot be used with target address width 4"):
+            Cache(Interface(addr_width=4, data_width=32), size=64)
+
+    def test_memory_map(self):
+        target = Interface(addr_width=8, data_width=32, granularity=8)
+        dut = Cache(target, size=16)
+        self.assertEqual(list(dut.bus.memory_map.windows()), [
+            (target.memory_map, (0, 0x400, 1)),
+        ])
+
+    def test_sim_write_through(self):
+        mem = SlowMemory(addr_width=8, data_width=32, granularity=8, features={"cti", "bte"})
+        dut = Cache(mem.bus, size=16, line_length=4, ways=2)
+        bus = dut.bus
+
+        def process():
+            dat_r, cycles = yield from wb_access(bus, 0x11)
+            self.assertEqual(dat_r, 0x1011)
+            self.assertEqual((yield mem.reads), 4)
+
+            dat_r, cycles = yield from wb_access(bus, 0x12)
+            self.assertEqual(dat_r, 0x1012)
+            self.assertEqual(cycles, 2)
+            self.assertEqual((yield mem.reads), 4)
+
+            yield from wb_access(bus, 0x13, we=1, dat_w=0xaabbccdd, sel=0b0101)
+            self.assertEqual((yield mem.writes), 1)
+            dat_r, cycles = yield from wb_access(bus, 0x13)
+            self.assertEqual(dat_r, 0x00bb10dd)
+            self.assertEqual(cycles, 2)
+
+            # Two more lines mapping to the same set; the first one is evicted.
+            yield from wb_access(bus, 0x21)
+            yield from wb_access(bus, 0x31)
+            self.assertEqual((yield mem.reads), 12)
+            yield from wb_access(bus, 0x21)
+            self.assertEqual((yield mem.reads), 12)
+            dat_r, _ = yield from wb_access(bus, 0x13)
+            self.assertEqual(dat_r, 0x00bb10dd)
+            self.assertEqual((yield mem.reads), 16)
+
+            self.assertEqual((yield dut._hits.value), 4)
+            self.assertEqual((yield dut._misses.value), 4)
+
+        m = Module()
+        m.submodules.dut = dut
+        m.submodules.mem = mem
+        with Simulator(m, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(process())
+            sim.run()
+
+    def test_sim_write_back(self):
+        mem = SlowMemory(addr_width=6, data_width=16, latency=1)
+        dut = Cache(mem.bus, size=8, line_length=2, ways=1, write_back=True)
+        bus = dut.bus
+
+        def process():
+            yield from wb_access(bus, 0x04, we=1, dat_w=0xabcd)
+            self.assertEqual((yield mem.reads), 2)
+            self.assertEqual((yield mem.writes), 0)
+            dat_r, _ = yield from wb_access(bus, 0x04)
+            self.assertEqual(dat_r, 0xabcd)
+            dat_r, _ = yield from wb_access(bus, 0x05)
+            self.assertEqual(dat_r, 0x1005)
+
+            # Evict the modified line.
+            dat_r, _ = yield from wb_access(bus, 0x14)
+            self.assertEqual(dat_r, 0x1014)
+            self.assertEqual((yield mem.writes), 2)
+            self.assertEqual((yield dut._writebacks.value), 1)
+
+            yield from wb_access(bus, 0x15, we=1, dat_w=0x5555)
+            self.assertEqual((yield mem.writes), 2)
+
+            # Flush.
+            fields = {field.name: (elem, offset)
+                      for field, (elem, offset) in dut._bank.fields()}
+            addrs  = {elem: start for elem, (start, _) in dut.csr_bus.memory_map.resources()}
+            elem, offset = fields["flush"]
+            yield dut.csr_bus.addr.eq(addrs[elem])
+            yield dut.csr_bus.w_data.eq(1 << offset)
+            yield dut.csr_bus.w_stb.eq(1)
+            yield
+            yield dut.csr_bus.w_stb.eq(0)
+            for _ in range(64):
+                yield
+            self.assertEqual((yield dut._flush.value), 0)
+            self.assertEqual((yield mem.writes), 4)
+            self.assertEqual((yield mem.mem[0x15]), 0x5555)
+
+            dat_r, _ = yield from wb_access(bus, 0x15)
+            self.assertEqual(dat_r, 0x5555)
+            self.assertEqual((yield mem.reads), 6)
+
+        m = Module()
+        m.submodules.dut = dut
+        m.submodules.mem = mem
+        with Simulator(m, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(process())
+            sim.run()
+
+    def test_err_feature(self):
+        dut = Cache(Interface(addr_width=8, data_width=32), size=16)
+        self.assertFalse(hasattr(dut.bus, "err"))
+        dut = Cache(Interface(addr_width=8, data_width=32, features={"err"}), size=16)
+        self.assertTrue(hasattr(dut.bus, "err"))
+
+    def test_sim_err_write_through(self):
+        mem = SlowMemory(addr_width=8, data_width=32, granularity=8, latency=1,
+                         features={"err"})
+        dut = Cache(mem.bus, size=16, line_length=4, ways=2)
+        bus = dut.bus
+
+        def process():
+            dat_r, _ = yield from wb_access(bus, 0x11)
+            self.assertEqual(dat_r, 0x1011)
+
+            # A failed write-through hit is terminated with err, and does not update the line.
+            yield mem.fail.eq(1)
+            dat_r, _ = yield from wb_access(bus, 0x13, we=1, dat_w=0xaabbccdd)
+            self.assertIsNone(dat_r)
+            self.assertEqual((yield mem.writes), 0)
+            yield mem.fail.eq(0)
+            dat_r, cycles = yield from wb_access(bus, 0x13)
+            self.assertEqual(dat_r, 0x1013)
+            self.assertEqual(cycles, 2)
+            yield mem.fail.eq(1)
+
+            # A failed refill is terminated with err, and does not leave a valid line.
+            dat_r, _ = yield from wb_access(bus, 0x21)
+            self.assertIsNone(dat_r)
+            self.assertEqual((yield mem.reads), 4)
+
+            yield mem.fail.eq(0)
+            dat_r, _ = yield from wb_access(bus, 0x21)
+            self.assertEqual(dat_r, 0x1021)
+            self.assertEqual((yield mem.reads), 8)
+            dat_r, cycles = yield from wb_access(bus, 0x11)
+            self.assertEqual(dat_r, 0x1011)
+            self.assertEqual(cycles, 2)
+
+        m = Module()
+        m.submodules.dut = dut
+        m.submodules.mem = mem
+        with Simulator(m, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(process())
+            sim.run()
+
+    def test_sim_err_write_back(self):
+        mem = SlowMemory(addr_width=6, data_width=16, latency=1, features={"err"})
+        dut = Cache(mem.bus, size=8, line_length=2, ways=1, write_back=True)
+        bus = dut.bus
+
+        def process():
+            yield from wb_access(bus, 0x04, we=1, dat_w=0xabcd)
+
+            # A failed eviction is terminated with err, and the line stays modified.
+            yield mem.fail.eq(1)
+            dat_r, _ = yield from wb_access(bus, 0x14)
+            self.assertIsNone(dat_r)
+            self.assertEqual((yield dut._writebacks.value), 0)
+
+            yield mem.fail.eq(0)
+            dat_r, _ = yield from wb_access(bus, 0x14)
+            self.assertEqual(dat_r, 0x1014)
+            self.assertEqual((yield mem.writes), 2)
+            self.assertEqual((yield mem.mem[0x04]), 0xabcd)
+            self.assertEqual((yield dut._writebacks.value), 1)
+
+        m = Module()
+        m.submodules.dut = dut
+        m.submodules.mem = mem
+        with Simulator(m, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(process())
+            sim.run()
@@ -0,0 +1,313 @@
+# nmigen: UnusedElaboratable=no
+
+import unittest
+from nmigen import *
+from nmigen.back.pysim import *
+
+from ..wishbone.bus import *
+from ..wishbone.dma import *
+
+
+class MockMemory(Elaboratable):
+    def __init__(self, *, addr_width, init, pipelined=False, desc_port=False, err_addr=None):
+        features = {"cti", "bte", "err"}
+        if pipelined:
+            features.add("stall")
+        self.bus       = Interface(addr_width=addr_width, data_width=32, features=features)
+        if desc_port:
+            self.desc_bus = Interface(addr_width=addr_width, data_width=32,
+                                      features={"cti", "bte", "err"})
+        self.mem       = Memory(width=32, depth=2 ** addr_width, init=init)
+        self.pipelined = pipelined
+        self.err_addr  = err_addr
+
+    def elaborate(self, platform):
+        m = Module()
+        bus = self.bus
+
+        err_hit = Const(0)
+        if self.err_addr is not None:
+            err_hit = bus.adr == self.err_addr
+
+        m.submodules.wr_port = wr_port = self.mem.write_port()
+        m.d.comb += [
+            wr_port.addr.eq(bus.adr),
+            wr_port.data.eq(bus.dat_w),
+        ]
+
+        if self.pipelined:
+            m.submodules.rd_port = rd_port = self.mem.read_port(transparent=False)
+            # Stall every third cycle.
+            phase = Signal(range(3))
+            m.d.sync += phase.eq(Mux(phase == 2, 0, phase + 1))
+            m.d.comb += bus.stall.eq(phase == 0)
+            accept = bus.cyc & bus.stb & ~bus.stall
+            m.d.comb += [
+                rd_port.addr.eq(bus.adr),
+                bus.dat_r.eq(rd_port.data),
+                wr_port.en.eq(accept & bus.we & ~err_hit),
+            ]
+            m.d.sync += [
+                bus.ack.eq(accept & ~err_hit),
+                bus.err.eq(accept & err_hit),
+            ]
+        else:
+            m.submodules.rd_port = rd_port = self.mem.read_port(domain="comb")
+            m.d.comb += [
+                rd_port.addr.eq(bus.adr),
+                bus.dat_r.eq(rd_port.data),
+                bus.ack.eq(bus.cyc & bus.stb & ~err_hit),
+                bus.err.eq(bus.cyc & bus.stb & err_hit),
+                wr_port.en.eq(bus.ack & bus.we),
+            ]
+
+        if hasattr(self, "desc_bus"):
+            # Read-only port, answering in the same cycle.
+            desc_bus = self.desc_bus
+            desc_hit = Const(0)
+            if self.err_addr is not None:
+                desc_hit = desc_bus.adr == self.err_addr
+            m.submodules.desc_port = desc_port = self.mem.read_port(domain="comb")
+            m.d.comb += [
+                desc_port.addr.eq(desc_bus.adr),
+                desc_bus.dat_r.eq(desc_port.data),
+                desc_bus.ack.eq(desc_bus.cyc & desc_bus.stb & ~desc_hit),
+                desc_bus.err.eq(desc_bus.cyc & desc_bus.stb & desc_hit),
+            ]
+
+        return m
+
+
+class DMATestCase(unittest.TestCase):
+    def test_wrong_burst_length(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Burst length must be a positive integer, not 0"):
+            DMA(addr_width=8, burst_length=0)
+
+    def test_wrong_length_width(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Length width must be a positive integer, not 0"):
+            DMA(addr_width=8, length_width=0)
+
+    def test_wrong_data_width(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Data width 16 is too narrow for descriptors with address width 8 and length "
+                r"width 16"):
+            DMA(addr_width=8, data_width=16, length_width=16)
+
+    def test_bus(self):
+        dut = DMA(addr_width=8)
+        self.assertTrue(hasattr(dut.bus, "cti"))
+        self.assertFalse(hasattr(dut.bus, "stall"))
+        self.assertFalse(hasattr(dut, "desc_bus"))
+        dut = DMA(addr_width=8, pipelined=True)
+        self.assertTrue(hasattr(dut.bus, "stall"))
+        dut = DMA(addr_width=8, prefetch=True)
+        self.assertEqual(dut.desc_bus.addr_width, 8)
+        self.assertTrue(hasattr(dut.desc_bus, "err"))
+
+    def run_dma(self, dut, init, *, regs, control={}, pipelined=False, err_addr=None,
+                max_cycles=500):
+        memory = MockMemory(addr_width=dut.bus.addr_width, init=init, pipelined=pipelined,
+                            desc_port=dut.prefetch, err_addr=err_addr)
+
+        m = Module()
+        m.submodules.dut    = dut
+        m.submodules.memory = memory
+        m.d.comb += dut.bus.connect(memory.bus)
+        if dut.prefetch:
+            m.d.comb += dut.desc_bus.connect(memory.desc_bus)
+
+        fields = {field.name: (elem, offset) for field, (elem, offset) in dut._bank.fields()}
+        addrs  = {elem: start for elem, (start, _) in dut.csr_bus.memory_map.resources()}
+
+        def csr_write(values):
+            elem  = fields[next(iter(values))][0]
+            value = 0
+            for name, field_value in values.items():
+                self.assertIs(fields[name][0], elem)
+                value |= field_value << fields[name][1]
+            yield dut.csr_bus.addr.eq(addrs[elem])
+            yield dut.csr_bus.w_data.eq(value)
+            yield dut.csr_bus.w_stb.eq(1)
+            yield
+            yield dut.csr_bus.w_stb.eq(0)
+            yield
+
+        log = []
+        result = {"times": []}
+
+        def sim_test():
+            for name, value in regs.items():
+                yield from csr_write({name: value})
+            yield from csr_write({"start": 1, **control})
+            for cycles in range(max_cycles):
+                yield
+                yield Settle()
+                if (yield memory.bus.cyc) and (yield memory.bus.stb):
+                    if pipelined:
+                        accepted = not (yield memory.bus.stall)
+                    else:
+                        accepted = (yield memory.bus.ack) or (yield memory.bus.err)
+                    if accepted:
+                        log.append(((yield memory.bus.adr), (yield memory.bus.we),
+                                    (yield memory.bus.cti)))
+                        result["times"].append(cycles)
+                if not (yield dut._busy.value) and not (yield dut._start.value):
+                    break
+            else:
+                self.fail("DMA did not finish")
+            result["cycles"] = cycles
+            result["done"]   = yield dut._done.value
+            result["error"]  = yield dut._error.value
+            result["irq"]    = yield dut.irq
+            result["mem"]    = []
+            for index in range(len(init)):
+                result["mem"].append((yield memory.mem[index]))
+
+        with Simulator(m, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
+
+        return result, log
+
+    def test_sim_burst(self):
+        dut  = DMA(addr_width=8, burst_length=4, length_width=8)
+        init = [0x100 + index for index in range(32)] + [0] * 32
+        result, log = self.run_dma(dut, init, regs={"src_addr": 2, "dst_addr": 40, "length": 10})
+
+        self.assertEqual(result["done"], 1)
+        self.assertEqual(result["error"], 0)
+        self.assertEqual(result["irq"], 1)
+        self.assertEqual(result["mem"][40:50], [0x100 + index for index in range(2, 12)])
+        self.assertEqual(result["mem"][50], 0)
+        self.assertEqual(result["mem"][39], 0)
+
+        # Chunks of 4, 4 and 2 words; reads and writes alternate.
+        self.assertEqual([(adr, we) for adr, we, _ in log],
+            [(2 + index, 0) for index in range(4)] + [(40 + index, 1) for index in range(4)] +
+            [(6 + index, 0) for index in range(4)] + [(44 + index, 1) for index in range(4)] +
+            [(10 + index, 0) for index in range(2)] + [(48 + index, 1) for index in range(2)])
+        self.assertEqual([cti for _, _, cti in log[:4]],
+                         [CycleType.INCR_BURST.value] * 3 + [CycleType.END_OF_BURST.value])
+
+    def test_sim_fixed(self):
+        dut  = DMA(addr_width=8, burst_length=4, length_width=8)
+        init = [0x100 + index for index in range(32)] + [0] * 32
+        result, log = self.run_dma(dut, init, regs={"src_addr": 4, "dst_addr": 60, "length": 3},
+                                   control={"dst_fixed": 1})
+
+        self.assertEqual(result["done"], 1)
+        self.assertEqual(result["mem"][60], 0x106)
+        self.assertEqual(result["mem"][61], 0)
+        writes = [(adr, cti) for adr, we, cti in log if we]
+        self.assertEqual(writes, [(60, CycleType.CONST_BURST.value),
+                                  (60, CycleType.CONST_BURST.value),
+                                  (60, CycleType.END_OF_BURST.value)])
+
+    def test_sim_pipelined(self):
+        dut  = DMA(addr_width=8, burst_length=8, length_width=8, pipelined=True)
+        init = [0x200 + index for index in range(32)] + [0] * 32
+        result, log = self.run_dma(dut, init, regs={"src_addr": 0, "dst_addr": 32, "length": 12},
+                                   pipelined=True)
+
+        self.assertEqual(result["done"], 1)
+        self.assertEqual(result["mem"][32:44], [0x200 + index for index in range(12)])
+        self.assertEqual(result["mem"][44], 0)
+        self.assertEqual(len(log), 24)
+
+    def test_sim_zero_length(self):
+        dut  = DMA(addr_width=8, length_width=8)
+        init = [0] * 16
+        result, log = self.run_dma(dut, init, regs={"length": 0})
+        self.assertEqual(result["done"], 1)
+        self.assertEqual(log, [])
+
+    sg_init = [0x300 + index for index in range(32)] + [0] * 32 + [
+        # Descriptor 0, at 64: copy 3 words from 0 to 32.
+        0, 32, 3, 72,
+        0, 0, 0, 0,
+        # Descriptor 1, at 72: copy 5 words from 10 to 36, and stop.
+        10, 36, 5 | 1 << 31, 0,
+    ]
+
+    def test_sim_scatter_gather(self):
+        dut  = DMA(addr_width=8, burst_length=4, length_width=8)
+        result, log = self.run_dma(dut, self.sg_init, regs={"desc_addr": 64},
+                                   control={"sg": 1})
+
+        self.assertEqual(result["done"], 1)
+        self.assertEqual(result["error"], 0)
+        self.assertEqual(result["mem"][32:35], [0x300, 0x301, 0x302])
+        self.assertEqual(result["mem"][35], 0)
+        self.assertEqual(result["mem"][36:41], [0x30a + index for index in range(5)])
+        self.assertEqual(result["mem"][41], 0)
+
+        # Each descriptor is fetched after the data of the previous one is transferred.
+        self.assertEqual([(adr, we) for adr, we, _ in log],
+            [(64 + index, 0) for index in range(4)] +
+            [(0, 0), (1, 0), (2, 0), (32, 1), (33, 1), (34, 1)] +
+            [(72 + index, 0) for index in range(4)] +
+            [(10 + index, 0) for index in range(4)] + [(36 + index, 1) for index in range(4)] +
+            [(14, 0), (40, 1)])
+        # Bus cycles take 1 cycle per word. The engine spends 1 more cycle before each of
+        # the 2 descriptor fetches and 3 chunks, and 1 to finish; no time is hidden.
+        self.assertEqual(result["cycles"], len(log) + 6)
+
+    def test_sim_scatter_gather_prefetch(self):
+        dut  = DMA(addr_width=8, burst_length=4, length_width=8, prefetch=True)
+        result, log = self.run_dma(dut, self.sg_init, regs={"desc_addr": 64},
+                                   control={"sg": 1})
+
+        self.assertEqual(result["done"], 1)
+        self.assertEqual(result["error"], 0)
+        self.assertEqual(result["mem"][32:35], [0x300, 0x301, 0x302])
+        self.assertEqual(result["mem"][35], 0)
+        self.assertEqual(result["mem"][36:41], [0x30a + index for index in range(5)])
+        self.assertEqual(result["mem"][41], 0)
+
+        # Descriptors are fetched through the descriptor bus; the data bus only carries data.
+        self.assertEqual([(adr, we) for adr, we, _ in log],
+            [(0, 0), (1, 0), (2, 0), (32, 1), (33, 1), (34, 1)] +
+            [(10 + index, 0) for index in range(4)] + [(36 + index, 1) for index in range(4)] +
+            [(14, 0), (40, 1)])
+
+        # The bubble between the data of chained descriptors shrinks from a descriptor fetch
+        # and 2 dispatch cycles to the 2 dispatch cycles alone.
+        def bubble(result, log):
+            last_write = max(index for index, (adr, _, _) in enumerate(log) if adr == 34)
+            first_read = min(index for index, (adr, _, _) in enumerate(log) if adr == 10)
+            return result["times"][first_read] - result["times"][last_write] - 1
+
+        serial_dut = DMA(addr_width=8, burst_length=4, length_width=8)
+        serial_result, serial_log = self.run_dma(serial_dut, self.sg_init,
+                                                 regs={"desc_addr": 64}, control={"sg": 1})
+        self.assertEqual(bubble(serial_result, serial_log), 6)
+        self.assertEqual(bubble(result, log), 2)
+        self.assertEqual(serial_result["cycles"] - result["cycles"], 4)
+
+    def test_sim_scatter_gather_prefetch_error(self):
+        dut  = DMA(addr_width=8, burst_length=4, length_width=8, prefetch=True)
+        result, log = self.run_dma(dut, self.sg_init, regs={"desc_addr": 64},
+                                   control={"sg": 1}, err_addr=74)
+
+        self.assertEqual(result["done"], 0)
+        self.assertEqual(result["error"], 1)
+        # The data of the first descriptor is transferred before the transfer is aborted.
+        self.assertEqual(result["mem"][32:35], [0x300, 0x301, 0x302])
+        self.assertEqual(result["mem"][36], 0)
+        self.assertEqual([(adr, we) for adr, we, _ in log],
+            [(0, 0), (1, 0), (2, 0), (32, 1), (33, 1), (34, 1)])
+
+    def test_sim_error(self):
+        dut  = DMA(addr_width=8, burst_length=4, length_width=8)
+        init = [0x100 + index for index in range(16)] + [0] * 16
+        result, log = self.run_dma(dut, init, regs={"src_addr": 0, "dst_addr": 16, "length": 8},
+                                   err_addr=5)
+
+        self.assertEqual(result["done"], 0)
+        self.assertEqual(result["error"], 1)
+        self.assertEqual(result["irq"], 1)
+        # The first chunk is copied, the second chunk is aborted before any word is written.
+        self.assertEqual(result["mem"][16:24], [0x100, 0x101, 0x102, 0x103, 0, 0, 0, 0])
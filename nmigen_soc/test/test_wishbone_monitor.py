@@ -0,0 +1,120 @@
+# nmigen: UnusedElaboratable=no
+
+import unittest
+from nmigen import *
+from nmigen.back.pysim import *
+
+from ..memory import MemoryMap
+from ..wishbone.bus import *
+from ..wishbone.monitor import *
+
+
+def csr_read(bus, addr, width):
+    value = 0
+    for index in range((width + bus.data_width - 1) // bus.data_width):
+        yield bus.addr.eq(addr + index)
+        yield bus.r_stb.eq(1)
+        yield
+        yield bus.r_stb.eq(0)
+        yield
+        value |= (yield bus.r_data) << (index * bus.data_width)
+    return value
+
+
+class MonitorTestCase(unittest.TestCase):
+    def test_wrong_bus(self):
+        with self.assertRaisesRegex(TypeError,
+                r"Bus must be an instance of wishbone\.Interface, not 'foo'"):
+            Monitor("foo")
+
+    def test_wrong_counter_width(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Counter width must be a positive integer, not 0"):
+            Monitor(Interface(addr_width=8, data_width=8), counter_width=0)
+
+    def test_wrong_latency_bins(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Amount of latency bins must be a non-negative integer, not -1"):
+            Monitor(Interface(addr_width=8, data_width=8), latency_bins=-1)
+
+    def test_wrong_csr_data_width(self):
+        for csr_data_width in (0, 3, "8"):
+            with self.assertRaisesRegex(ValueError,
+                    r"CSR data width must be a positive power of 2, not {!r}"
+                    .format(csr_data_width)):
+                Monitor(Interface(addr_width=8, data_width=8), csr_data_width=csr_data_width)
+
+    def test_registers(self):
+        bus = Interface(addr_width=8, data_width=8, features={"err"})
+        bus.memory_map.add_window(MemoryMap(addr_width=7, data_width=8))
+        bus.memory_map.add_window(MemoryMap(addr_width=7, data_width=8))
+        dut = Monitor(bus, counter_width=16, latency_bins=2)
+        names = [elem.name for elem, _ in dut.csr_bus.memory_map.resources()]
+        self.assertEqual(names, [
+            "enable__clear", "cycles", "busy", "stall", "xfers", "errors",
+            "window_0", "window_1", "latency_0", "latency_1",
+        ])
+
+    def test_sim(self):
+        bus = Interface(addr_width=8, data_width=16, granularity=8)
+        bus.memory_map.add_window(MemoryMap(addr_width=8, data_width=8))
+        bus.memory_map.add_window(MemoryMap(addr_width=8, data_width=8))
+        dut = Monitor(bus, counter_width=8, latency_bins=3)
+
+        addrs = {elem.name: start for elem, (start, _) in dut.csr_bus.memory_map.resources()}
+
+        def sim_test():
+            # A transaction to window 0 with latency 1.
+            yield bus.adr.eq(0x10)
+            yield bus.cyc.eq(1)
+            yield bus.stb.eq(1)
+            yield bus.ack.eq(1)
+            yield
+            # A transaction to window 1 with latency 3.
+            yield bus.adr.eq(0x90)
+            yield bus.ack.eq(0)
+            yield
+            yield
+            yield bus.ack.eq(1)
+            yield
+            yield bus.ack.eq(0)
+            yield bus.stb.eq(0)
+            yield
+            yield bus.cyc.eq(0)
+            yield
+
+            # Stop counting.
+            yield dut.csr_bus.addr.eq(addrs["enable__clear"])
+            yield dut.csr_bus.w_data.eq(0b00)
+            yield dut.csr_bus.w_stb.eq(1)
+            yield
+            yield dut.csr_bus.w_stb.eq(0)
+            yield
+            yield
+
+            self.assertEqual((yield from csr_read(dut.csr_bus, addrs["cycles"], 8)), 9)
+            self.assertEqual((yield from csr_read(dut.csr_bus, addrs["busy"], 8)), 5)
+            self.assertEqual((yield from csr_read(dut.csr_bus, addrs["stall"], 8)), 2)
+            self.assertEqual((yield from csr_read(dut.csr_bus, addrs["xfers"], 8)), 2)
+            self.assertEqual((yield from csr_read(dut.csr_bus, addrs["window_0"], 8)), 1)
+            self.assertEqual((yield from csr_read(dut.csr_bus, addrs["window_1"], 8)), 1)
+            self.assertEqual((yield from csr_read(dut.csr_bus, addrs["latency_0"], 8)), 1)
+            self.assertEqual((yield from csr_read(dut.csr_bus, addrs["latency_1"], 8)), 1)
+            self.assertEqual((yield from csr_read(dut.csr_bus, addrs["latency_2"], 8)), 0)
+
+            # Clear and restart counting.
+            yield dut.csr_bus.addr.eq(addrs["enable__clear"])
+            yield dut.csr_bus.w_data.eq(0b11)
+            yield dut.csr_bus.w_stb.eq(1)
+            yield
+            yield dut.csr_bus.w_stb.eq(0)
+            yield
+            yield
+            yield
+            self.assertEqual((yield from csr_read(dut.csr_bus, addrs["xfers"], 8)), 0)
+            self.assertEqual((yield from csr_read(dut.csr_bus, addrs["cycles"], 8)), 3)
+
+        with Simulator(dut, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
@@ -0,0 +1,160 @@
+# nmigen: UnusedElaboratable=no
+
+import unittest
+from nmigen import *
+from nmigen.back.pysim import *
+
+from ..wishbone.bus import *
+from ..wishbone.sram import *
+from ..latency import Latency
+
+
+class InterleavedSRAMTestCase(unittest.TestCase):
+    def test_wrong_size(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Size must be a positive power of 2, not 48"):
+            InterleavedSRAM(size=48, data_width=32)
+
+    def test_wrong_banks(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Amount of banks must be a positive power of 2, not 3"):
+            InterleavedSRAM(size=64, data_width=32, banks=3)
+
+    def test_wrong_stride(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Stride must be a positive power of 2, not 0"):
+            InterleavedSRAM(size=64, data_width=32, stride=0)
+
+    def test_wrong_size_small(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Size 16 must be at least amount of banks 4 times stride 8"):
+            InterleavedSRAM(size=16, data_width=32, banks=4, stride=8)
+
+    def test_wrong_ports(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Amount of ports must be a positive integer, not 0"):
+            InterleavedSRAM(size=64, data_width=32, ports=0)
+
+    def test_memory_map(self):
+        dut = InterleavedSRAM(size=32, data_width=32, granularity=8, banks=4, stride=2, ports=3)
+        self.assertEqual(len(dut.buses), 3)
+        for bus in dut.buses:
+            self.assertEqual(bus.addr_width, 5)
+            self.assertEqual(bus.memory_map.latency, Latency(read=(1, 3), write=(1, 3)))
+            resources = list(bus.memory_map.resources())
+            self.assertEqual(resources, list(dut.buses[0].memory_map.resources()))
+            self.assertEqual(len(resources), 16)
+            self.assertEqual(resources[:6], [
+                (InterleavedSRAM.Stripe(bank=0, offset=0), (0x00, 0x08)),
+                (InterleavedSRAM.Stripe(bank=1, offset=0), (0x08, 0x10)),
+                (InterleavedSRAM.Stripe(bank=2, offset=0), (0x10, 0x18)),
+                (InterleavedSRAM.Stripe(bank=3, offset=0), (0x18, 0x20)),
+                (InterleavedSRAM.Stripe(bank=0, offset=2), (0x20, 0x28)),
+                (InterleavedSRAM.Stripe(bank=1, offset=2), (0x28, 0x30)),
+            ])
+            self.assertEqual(bus.memory_map.decode_address(0x4c),
+                             InterleavedSRAM.Stripe(bank=1, offset=4))
+
+    def test_csr(self):
+        dut = InterleavedSRAM(size=64, data_width=32, banks=8, counter_width=16,
+                              csr_data_width=8)
+        self.assertEqual([(elem.name, start, end)
+                          for elem, (start, end) in dut.csr_bus.memory_map.resources()],
+                         [("conflicts_{}".format(index), index * 2, index * 2 + 2)
+                          for index in range(8)])
+
+
+class InterleavedSRAMSimulationTestCase(unittest.TestCase):
+    def test_sim(self):
+        dut = InterleavedSRAM(size=64, data_width=16, granularity=8, banks=4, stride=1, ports=3)
+        bus_0, bus_1, bus_2 = dut.buses
+
+        def issue(bus, adr, *, we=0, dat_w=0, sel=0b11):
+            yield bus.cyc.eq(1)
+            yield bus.stb.eq(1)
+            yield bus.adr.eq(adr)
+            yield bus.we.eq(we)
+            yield bus.dat_w.eq(dat_w)
+            yield bus.sel.eq(sel)
+
+        def release(*buses):
+            for bus in buses:
+                yield bus.cyc.eq(0)
+                yield bus.stb.eq(0)
+
+        def acks():
+            ack = []
+            for bus in dut.buses:
+                ack.append((yield bus.ack))
+            return ack
+
+        def sim_test():
+            # Fill the memory through port 0; sequential words are in different banks.
+            for adr in range(16):
+                yield from issue(bus_0, adr, we=1, dat_w=0x1100 + adr)
+                yield
+                yield Settle()
+                self.assertEqual((yield from acks()), [1, 0, 0])
+                yield from release(bus_0)
+                yield
+
+            # Accesses to different banks proceed in the same cycle.
+            yield from issue(bus_0, 4)
+            yield from issue(bus_1, 5)
+            yield from issue(bus_2, 7, we=1, dat_w=0xaa55, sel=0b01)
+            yield
+            yield Settle()
+            self.assertEqual((yield from acks()), [1, 1, 1])
+            self.assertEqual((yield bus_0.dat_r), 0x1104)
+            self.assertEqual((yield bus_1.dat_r), 0x1105)
+            yield from release(bus_0, bus_1, bus_2)
+            yield
+            for index in range(4):
+                self.assertEqual((yield dut._conflicts[index].value), 0)
+
+            # Accesses to the same bank are serialized in round-robin order.
+            yield from issue(bus_0, 3)
+            yield from issue(bus_1, 7)
+            yield from issue(bus_2, 11)
+            order = []
+            for _ in range(3):
+                yield
+                yield Settle()
+                ack = yield from acks()
+                self.assertEqual(sum(ack), 1)
+                port = ack.index(1)
+                order.append(port)
+                self.assertEqual((yield dut.buses[port].dat_r),
+                                 {0: 0x1103, 1: 0x1155, 2: 0x110b}[port])
+                yield from release(dut.buses[port])
+            self.assertEqual(sorted(order), [0, 1, 2])
+            yield
+            self.assertEqual((yield dut._conflicts[3].value), 2)
+            self.assertEqual((yield dut._conflicts[0].value), 0)
+
+            # The port that was granted last has the lowest priority.
+            yield from issue(bus_0, 1)
+            yield
+            yield Settle()
+            self.assertEqual((yield from acks()), [1, 0, 0])
+            yield from release(bus_0)
+            yield
+            yield from issue(bus_0, 5)
+            yield from issue(bus_1, 9)
+            yield
+            yield Settle()
+            self.assertEqual((yield from acks()), [0, 1, 0])
+            self.assertEqual((yield bus_1.dat_r), 0x1109)
+            yield from release(bus_1)
+            yield
+            yield Settle()
+            self.assertEqual((yield from acks()), [1, 0, 0])
+            self.assertEqual((yield bus_0.dat_r), 0x1105)
+            yield from release(bus_0)
+            yield
+            self.assertEqual((yield dut._conflicts[1].value), 1)
+
+        with Simulator(dut, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
@@ -0,0 +1,259 @@
+# nmigen: UnusedElaboratable=no
+
+import unittest
+from nmigen import *
+from nmigen.back.pysim import *
+
+from ..wishbone.bus import *
+from ..wishbone.watchdog import *
+from ..latency import Latency
+
+
+def csr_read(bus, addr, width):
+    value = 0
+    for index in range((width + bus.data_width - 1) // bus.data_width):
+        yield bus.addr.eq(addr + index)
+        yield bus.r_stb.eq(1)
+        yield
+        yield bus.r_stb.eq(0)
+        yield
+        value |= (yield bus.r_data) << (index * bus.data_width)
+    return value
+
+
+def csr_write(bus, addr, width, value):
+    chunks = (width + bus.data_width - 1) // bus.data_width
+    for index in range(chunks):
+        yield bus.addr.eq(addr + index)
+        yield bus.w_data.eq(value >> (index * bus.data_width))
+        yield bus.w_stb.eq(1)
+        yield
+    yield bus.w_stb.eq(0)
+    yield
+
+
+class WatchdogTestCase(unittest.TestCase):
+    def test_wrong_sub_bus(self):
+        with self.assertRaisesRegex(TypeError,
+                r"Subordinate bus must be an instance of wishbone\.Interface, not 'foo'"):
+            Watchdog("foo", timeout=16)
+
+    def test_wrong_counter_width(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Counter width must be a positive integer, not 0"):
+            Watchdog(Interface(addr_width=8, data_width=8), timeout=16, counter_width=0)
+
+    def test_wrong_timeout(self):
+        with self.assertRaisesRegex(ValueError,
+                r"Timeout must be a positive integer that fits in 4 bits, not 16"):
+            Watchdog(Interface(addr_width=8, data_width=8), timeout=16, counter_width=4)
+        with self.assertRaisesRegex(ValueError,
+                r"Timeout must be a positive integer that fits in 16 bits, not 0"):
+            Watchdog(Interface(addr_width=8, data_width=8), timeout=0)
+
+    def test_wrong_csr_data_width(self):
+        with self.assertRaisesRegex(ValueError,
+                r"CSR data width must be a positive integer, not 0"):
+            Watchdog(Interface(addr_width=8, data_width=8), timeout=16, csr_data_width=0)
+
+    def test_bus(self):
+        sub_bus = Interface(addr_width=10, data_width=32, granularity=8,
+                            features={"rty", "stall"})
+        dut = Watchdog(sub_bus, timeout=16)
+        self.assertEqual((dut.bus.addr_width, dut.bus.data_width, dut.bus.granularity),
+                         (10, 32, 8))
+        self.assertTrue(hasattr(dut.bus, "err"))
+        self.assertTrue(hasattr(dut.bus, "rty"))
+        self.assertTrue(hasattr(dut.bus, "stall"))
+        self.assertFalse(hasattr(dut.bus, "cti"))
+        self.assertEqual(dut.bus.memory_map.latency, Latency(read=0, write=0))
+        windows = list(dut.bus.memory_map.windows())
+        self.assertEqual(len(windows), 1)
+        self.assertIs(windows[0][0], sub_bus.memory_map)
+
+    def test_registers(self):
+        dut = Watchdog(Interface(addr_width=12, data_width=8, features={"err"}),
+                       timeout=16, counter_width=16)
+        regs = [(elem.name, start, end)
+                for elem, (start, end) in dut.csr_bus.memory_map.resources()]
+        self.assertEqual(regs, [
+            ("timeout", 0, 2), ("timeouts", 2, 4), ("errors", 4, 6), ("fault_addr", 6, 8),
+        ])
+
+    def test_registers_no_err(self):
+        dut = Watchdog(Interface(addr_width=12, data_width=8), timeout=16)
+        names = [elem.name for elem, _ in dut.csr_bus.memory_map.resources()]
+        self.assertEqual(names, ["timeout", "timeouts", "fault_addr"])
+
+    def test_sim(self):
+        sub_bus = Interface(addr_width=8, data_width=8, features={"err"})
+        dut = Watchdog(sub_bus, timeout=3, counter_width=8)
+
+        addrs = {elem.name: start for elem, (start, _) in dut.csr_bus.memory_map.resources()}
+
+        def wait_term():
+            cycles = 0
+            while True:
+                yield
+                yield Settle()
+                cycles += 1
+                if (yield dut.bus.ack) or (yield dut.bus.err):
+                    return cycles
+
+        def sim_test():
+            # A subordinate bus that responds in time.
+            yield dut.bus.adr.eq(0x12)
+            yield dut.bus.cyc.eq(1)
+            yield dut.bus.stb.eq(1)
+            yield
+            yield
+            yield sub_bus.ack.eq(1)
+            yield Settle()
+            self.assertEqual((yield dut.bus.ack), 1)
+            self.assertEqual((yield dut.bus.err), 0)
+            yield
+            yield sub_bus.ack.eq(0)
+
+            # A subordinate bus that never responds.
+            yield dut.bus.adr.eq(0x34)
+            self.assertEqual((yield from wait_term()), 3)
+            self.assertEqual((yield dut.bus.err), 1)
+            self.assertEqual((yield sub_bus.cyc), 0)
+            self.assertEqual((yield sub_bus.stb), 0)
+            yield
+            yield dut.bus.stb.eq(0)
+            yield Settle()
+            self.assertEqual((yield dut.bus.err), 0)
+            self.assertEqual((yield sub_bus.cyc), 1)
+
+            # A subordinate bus that responds with an error.
+            yield dut.bus.adr.eq(0x56)
+            yield dut.bus.stb.eq(1)
+            yield sub_bus.err.eq(1)
+            yield Settle()
+            self.assertEqual((yield dut.bus.err), 1)
+            yield
+            yield sub_bus.err.eq(0)
+            yield dut.bus.stb.eq(0)
+            yield dut.bus.cyc.eq(0)
+            yield
+
+            self.assertEqual((yield from csr_read(dut.csr_bus, addrs["timeouts"], 8)), 1)
+            self.assertEqual((yield from csr_read(dut.csr_bus, addrs["errors"], 8)), 1)
+            self.assertEqual((yield from csr_read(dut.csr_bus, addrs["fault_addr"], 8)), 0x56)
+            yield from csr_write(dut.csr_bus, addrs["timeouts"], 8, 0)
+            self.assertEqual((yield from csr_read(dut.csr_bus, addrs["timeouts"], 8)), 0)
+
+            # A longer timeout.
+            yield from csr_write(dut.csr_bus, addrs["timeout"], 8, 5)
+            self.assertEqual((yield from csr_read(dut.csr_bus, addrs["timeout"], 8)), 5)
+            yield dut.bus.adr.eq(0x78)
+            yield dut.bus.cyc.eq(1)
+            yield dut.bus.stb.eq(1)
+            self.assertEqual((yield from wait_term()), 5)
+            self.assertEqual((yield dut.bus.err), 1)
+            yield
+            yield dut.bus.stb.eq(0)
+            yield dut.bus.cyc.eq(0)
+            yield
+            self.assertEqual((yield from csr_read(dut.csr_bus, addrs["fault_addr"], 8)), 0x78)
+
+            # A disabled watchdog.
+            yield from csr_write(dut.csr_bus, addrs["timeout"], 8, 0)
+            yield dut.bus.cyc.eq(1)
+            yield dut.bus.stb.eq(1)
+            for _ in range(10):
+                yield
+                yield Settle()
+                self.assertEqual((yield dut.bus.err), 0)
+            self.assertEqual((yield from csr_read(dut.csr_bus, addrs["timeouts"], 8)), 1)
+
+        with Simulator(dut, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
+
+    def test_sim_pipelined(self):
+        sub_bus = Interface(addr_width=8, data_width=8, features={"stall"})
+        dut = Watchdog(sub_bus, timeout=3, counter_width=8)
+
+        addrs = {elem.name: start for elem, (start, _) in dut.csr_bus.memory_map.resources()}
+
+        def sim_test():
+            # An initiator that holds cyc without any transfer in progress is not timed out.
+            yield dut.bus.cyc.eq(1)
+            for _ in range(10):
+                yield
+                yield Settle()
+                self.assertEqual((yield dut.bus.err), 0)
+
+            # A transfer that is accepted, and then answered in time.
+            yield dut.bus.adr.eq(0x12)
+            yield dut.bus.stb.eq(1)
+            yield
+            yield dut.bus.stb.eq(0)
+            yield
+            yield sub_bus.ack.eq(1)
+            yield Settle()
+            self.assertEqual((yield dut.bus.ack), 1)
+            yield
+            yield sub_bus.ack.eq(0)
+            for _ in range(10):
+                yield
+                yield Settle()
+                self.assertEqual((yield dut.bus.err), 0)
+
+            # A transfer that is accepted, and never answered.
+            yield dut.bus.adr.eq(0x34)
+            yield dut.bus.stb.eq(1)
+            yield
+            yield dut.bus.stb.eq(0)
+            cycles = 0
+            while True:
+                yield Settle()
+                if (yield dut.bus.err):
+                    break
+                yield
+                cycles += 1
+            self.assertEqual(cycles, 2)
+            yield
+            yield dut.bus.cyc.eq(0)
+            yield
+
+            self.assertEqual((yield from csr_read(dut.csr_bus, addrs["timeouts"], 8)), 1)
+
+        with Simulator(dut, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
+
+    def test_sim_decoder(self):
+        decoder = Decoder(addr_width=8, data_width=8, features={"err"}, default_response="err")
+        decoder.add(Interface(addr_width=4, data_width=8))
+        dut = Watchdog(decoder.bus, timeout=4, counter_width=8)
+
+        m = Module()
+        m.submodules.decoder = decoder
+        m.submodules.dut     = dut
+
+        addrs = {elem.name: start for elem, (start, _) in dut.csr_bus.memory_map.resources()}
+
+        def sim_test():
+            # An access to an unmapped address is terminated immediately.
+            yield dut.bus.adr.eq(0x80)
+            yield dut.bus.cyc.eq(1)
+            yield dut.bus.stb.eq(1)
+            yield Settle()
+            self.assertEqual((yield dut.bus.err), 1)
+            yield
+            yield dut.bus.stb.eq(0)
+            yield dut.bus.cyc.eq(0)
+            yield
+            self.assertEqual((yield from csr_read(dut.csr_bus, addrs["errors"], 8)), 1)
+            self.assertEqual((yield from csr_read(dut.csr_bus, addrs["timeouts"], 8)), 0)
+            self.assertEqual((yield from csr_read(dut.csr_bus, addrs["fault_addr"], 8)), 0x80)
+
+        with Simulator(m, vcd_file=open("test.vcd", "w")) as sim:
+            sim.add_clock(1e-6)
+            sim.add_sync_process(sim_test())
+            sim.run()
@@ -0,0 +1,421 @@
+from nmigen import *
+from nmigen.utils import log2_int, bits_for
+
+from .memory import MemoryMap
+from . import csr
+from .csr.bank import Field, RegisterBank
+from . import wishbone
+from .host.trace import _entry_layout, TraceDecoder
+
+
+__all__ = ["TraceRecorder"]
+
+
+class TraceRecorder(Elaboratable):
+    """Bus transaction trace recorder.
+
+    A passive observer of a Wishbone or CSR bus that records completed transactions into
+    a ring buffer in block RAM. The buffer is read through a Wishbone bus, and the recorder is
+    controlled through a CSR bus. See :class:`..host.trace.TraceDecoder` for the encoding of
+    the buffer, and :meth:`decoder` for a way to decode it.
+
+    Compression
+    -----------
+
+    Each transaction is recorded as a single delta entry holding the address and timestamp
+    differences from the previous transaction, if they fit. Otherwise, a sync entry holding
+    the absolute address and timestamp is recorded, which takes several buffer words. Since bus
+    accesses are usually local and closely spaced in time, most transactions are recorded as delta
+    entries, and the buffer holds several times more transactions than it would if each entry
+    were a full address and timestamp.
+
+    While the extension words of a sync entry are being written, one completed transaction can be
+    held back and recorded afterwards. Any further transactions completed during that time are
+    counted as dropped, and the next recorded transaction is recorded as a sync entry with
+    the ``lost`` flag set. If the recorder stops while a transaction is held back, that
+    transaction is not recorded, and is counted as dropped as well.
+
+    Filters and triggers
+    --------------------
+
+    If ``filters`` is not empty, only transactions to the address ranges it describes are
+    recorded. If ``triggers`` is not empty and the ``trigger_en`` control field is set,
+    the recorder stops after recording ``post_count`` more transactions once a transaction to
+    the address ranges it describes is recorded, and sets the ``done`` status field.
+
+    Each element of ``filters`` and ``triggers`` may be a resource or a window located anywhere
+    in the memory map of the observed bus, or a :class:`range` of addresses in the units of that
+    memory map.
+
+    Control and status registers
+    ----------------------------
+
+    * ``enable`` (R/W, reset 1): recording is enabled.
+    * ``trigger_en`` (R/W): stop after a trigger.
+    * ``restart`` (W1S): clear the buffer and all status fields.
+    * ``post_count`` (R/W): amount of transactions recorded after a trigger.
+    * ``triggered``, ``done``, ``wrapped`` (R/O): status flags.
+    * ``wr_ptr`` (R/O): address of the next buffer word to be written.
+    * ``dropped`` (R/O): saturating count of dropped transactions.
+
+    Parameters
+    ----------
+    bus : :class:`..wishbone.Interface` or :class:`..csr.Interface`
+        Observed bus.
+    depth : int
+        Amount of words in the buffer. Must be a power of 2.
+    entry_width : int
+        Width of buffer words. One of 16, 32, 64.
+    timestamp_width : int
+        Width of the timestamp counter.
+    filters : iter(object)
+        Address ranges to record.
+    triggers : iter(object)
+        Address ranges that trigger the recorder.
+    csr_data_width : int
+        Data width of the CSR bus.
+
+    Attributes
+    ----------
+    bus : :class:`..wishbone.Interface` or :class:`..csr.Interface`
+        Observed bus.
+    wb_bus : :class:`..wishbone.Interface`
+        Wishbone bus providing read-only access to the buffer.
+    csr_bus : :class:`..csr.Interface`
+        CSR bus providing access to the control and status registers.
+    """
+    def __init__(self, bus, *, depth=1024, entry_width=32, timestamp_width=32,
+                 filters=(), triggers=(), csr_data_width=8):
+        if isinstance(bus, wishbone.Interface):
+            self._addr_shift = log2_int(bus.data_width // bus.granularity)
+        elif isinstance(bus, csr.Interface):
+            self._addr_shift = 0
+        else:
+            raise TypeError("Bus must be an instance of wishbone.Interface or csr.Interface, "
+                            "not {!r}"
+                            .format(bus))
+        if not isinstance(depth, int) or depth < 2 or depth & (depth - 1):
+            raise ValueError("Depth must be a power of 2 greater than 1, not {!r}"
+                             .format(depth))
+        if entry_width not in (16, 32, 64):
+            raise ValueError("Entry width must be one of 16, 32, 64, not {!r}"
+                             .format(entry_width))
+        if not isinstance(timestamp_width, int) or timestamp_width <= 0:
+            raise ValueError("Timestamp width must be a positive integer, not {!r}"
+                             .format(timestamp_width))
+
+        self.bus             = bus
+        self.depth           = depth
+        self.entry_width     = entry_width
+        self.timestamp_width = timestamp_width
+
+        self._filters  = [self._resolve_range(item) for item in filters]
+        self._triggers = [self._resolve_range(item) for item in triggers]
+
+        self._mem = Memory(width=entry_width, depth=depth)
+
+        self.wb_bus = wishbone.Interface(addr_width=log2_int(depth), data_width=entry_width,
+                                         name="wb")
+        self.wb_bus.memory_map.add_resource(self._mem, size=depth)
+
+        ptr_width = log2_int(depth)
+        self._enable     = Field(1, "rw", reset=1, name="enable")
+        self._trigger_en = Field(1, "rw", name="trigger_en")
+        self._restart    = Field(1, "w1s", name="restart")
+        self._post_count = Field(ptr_width + 1, "rw", name="post_count")
+        self._triggered  = Field(1, "r", name="triggered")
+        self._done       = Field(1, "r", name="done")
+        self._wrapped    = Field(1, "r", name="wrapped")
+        self._wr_ptr     = Field(ptr_width, "r", name="wr_ptr")
+        self._dropped    = Field(16, "r", name="dropped")
+
+        fields = [self._enable, self._trigger_en, self._restart, self._post_count,
+                  self._triggered, self._done, self._wrapped, self._wr_ptr, self._dropped]
+        chunks = sum((field.width + csr_data_width - 1) // csr_data_width for field in fields)
+        self._bank = RegisterBank(addr_width=max(1, bits_for(chunks - 1)),
+                                  data_width=csr_data_width)
+        for field in fields:
+            self._bank.add(field)
+
+    def _resolve_range(self, item):
+        memory_map = self.bus.memory_map
+        if isinstance(item, range):
+            start, end = item.start, item.stop
+        elif isinstance(item, MemoryMap):
+            for window, (start, end, _) in memory_map.windows():
+                if window is item:
+                    break
+            else:
+                raise ValueError("Window {!r} is not a part of the memory map of the observed bus"
+                                 .format(item))
+        else:
+            try:
+                start, end, _ = memory_map.find_resource(item)
+            except KeyError:
+                raise ValueError("Resource {!r} is not a part of the memory map of the observed "
+                                 "bus"
+                                 .format(item)) from None
+        # Convert from memory map units to bus address units.
+        return start >> self._addr_shift, (end - 1) >> self._addr_shift
+
+    @property
+    def csr_bus(self):
+        return self._bank.bus
+
+    def fields(self):
+        """Iterate control and status fields.
+
+        Yield values
+        ------------
+        A tuple ``field, (element, offset)`` describing the register of :attr:`csr_bus` containing
+        each field, and the bit offset of the field within that register. See
+        :meth:`..csr.bank.RegisterBank.fields`.
+        """
+        yield from self._bank.fields()
+
+    def decoder(self, memory_map=None):
+        """Create a decoder for the buffer contents.
+
+        Arguments
+        ---------
+        memory_map : :class:`..memory.MemoryMap` or None
+            Memory map used to annotate entries with resources. If ``None``, the memory map of
+            the observed bus is used.
+
+        Return value
+        ------------
+        A :class:`..host.trace.TraceDecoder`.
+        """
+        if memory_map is None:
+            memory_map = self.bus.memory_map
+        return TraceDecoder(entry_width=self.entry_width, addr_width=len(self._bus_addr()),
+                            timestamp_width=self.timestamp_width, memory_map=memory_map,
+                            addr_shift=self._addr_shift)
+
+    def _bus_addr(self):
+        if isinstance(self.bus, wishbone.Interface):
+            return self.bus.adr
+        else:
+            return self.bus.addr
+
+    def elaborate(self, platform):
+        m = Module()
+        m.submodules.bank = self._bank
+
+        # Observed transactions.
+
+        bus  = self.bus
+        addr = self._bus_addr()
+        if isinstance(bus, wishbone.Interface):
+            term = bus.ack
+            err  = Const(0)
+            if hasattr(bus, "err"):
+                term = term | bus.err
+                err  = bus.err
+            event = bus.cyc & bus.stb & term
+            we    = bus.we
+        else:
+            event = bus.r_stb | bus.w_stb
+            we    = bus.w_stb
+            err   = Const(0)
+
+        def in_ranges(ranges):
+            return Cat((addr >= first) & (addr <= last) for first, last in ranges).any()
+
+        if self._filters:
+            event = event & in_ranges(self._filters)
+        trigger = 0
+        if self._triggers:
+            trigger = in_ranges(self._triggers)
+
+        # Control and status.
+
+        restart   = self._restart.value
+        triggered = Signal()
+        done      = Signal()
+        wrapped   = Signal()
+        wr_ptr    = Signal(log2_int(self.depth))
+        dropped   = Signal(16)
+        post_left = Signal.like(self._post_count.value)
+        m.d.comb += [
+            self._restart.clear.eq(restart),
+            self._triggered.value.eq(triggered),
+            self._done.value.eq(done),
+            self._wrapped.value.eq(wrapped),
+            self._wr_ptr.value.eq(wr_ptr),
+            self._dropped.value.eq(dropped),
+        ]
+
+        # Encoding.
+
+        w = self.entry_width
+        dts_width, da_width = _entry_layout(w)
+        ext_bits  = w - 2
+        ext_count = (len(addr) + self.timestamp_width + ext_bits - 1) // ext_bits
+
+        timestamp = Signal(self.timestamp_width)
+        last_ts   = Signal(self.timestamp_width)
+        last_addr = Signal(len(addr))
+        have_ref  = Signal()
+        lost      = Signal()
+        ext_data  = Signal(ext_count * ext_bits)
+        ext_left  = Signal(range(ext_count + 1))
+
+        m.d.sync += timestamp.eq(timestamp + 1)
+
+        # A transaction that completes while the extension words of a sync entry are being written
+        # is held in a pending entry, and recorded afterwards; only if the pending entry is
+        # already occupied, the transaction is dropped.
+        pend_valid = Signal()
+        pend_addr  = Signal.like(addr)
+        pend_ts    = Signal.like(timestamp)
+        pend_we    = Signal()
+        pend_err   = Signal()
+        pend_trig  = Signal()
+        pend_lost  = Signal()
+
+        stopping  = triggered & (post_left == 0)
+        recording = self._enable.value & ~done & ~stopping
+        capture   = recording & event
+
+        cand_valid = Signal()
+        cand_addr  = Signal.like(addr)
+        cand_ts    = Signal.like(timestamp)
+        cand_we    = Signal()
+        cand_err   = Signal()
+        cand_trig  = Signal()
+        with m.If(pend_valid):
+            m.d.comb += [
+                cand_valid.eq(~stopping),
+                cand_addr.eq(pend_addr),
+                cand_ts.eq(pend_ts),
+                cand_we.eq(pend_we),
+                cand_err.eq(pend_err),
+                cand_trig.eq(pend_trig),
+            ]
+        with m.Else():
+            m.d.comb += [
+                cand_valid.eq(capture),
+                cand_addr.eq(addr),
+                cand_ts.eq(timestamp),
+                cand_we.eq(we),
+                cand_err.eq(err),
+                cand_trig.eq(trigger),
+            ]
+
+        dts = Signal(self.timestamp_width)
+        da  = Signal(signed(len(addr) + 1))
+        m.d.comb += [
+            dts.eq(cand_ts - last_ts),
+            da.eq(cand_addr - last_addr),
+        ]
+        fits = have_ref & (dts < (1 << dts_width))
+        fits = fits & (da >= -(1 << (da_width - 1))) & (da < (1 << (da_width - 1)))
+
+        wr_port = m.submodules.wr_port = self._mem.write_port()
+        m.d.comb += wr_port.addr.eq(wr_ptr)
+
+        def hold(live):
+            with m.If(live):
+                m.d.sync += [
+                    pend_valid.eq(1),
+                    pend_addr.eq(addr),
+                    pend_ts.eq(timestamp),
+                    pend_we.eq(we),
+                    pend_err.eq(err),
+                    pend_trig.eq(trigger),
+                    pend_lost.eq(0),
+                ]
+
+        with m.If(restart):
+            m.d.sync += [
+                timestamp.eq(0),
+                have_ref.eq(0),
+                lost.eq(0),
+                ext_left.eq(0),
+                pend_valid.eq(0),
+                wr_ptr.eq(0),
+                wrapped.eq(0),
+                triggered.eq(0),
+                done.eq(0),
+                dropped.eq(0),
+            ]
+
+        with m.Elif(ext_left != 0):
+            m.d.comb += [
+                wr_port.data.eq(Cat(ext_data[:ext_bits], Const(0b11, 2))),
+                wr_port.en.eq(1),
+            ]
+            m.d.sync += [
+                ext_data.eq(ext_data >> ext_bits),
+                ext_left.eq(ext_left - 1),
+            ]
+            with m.If(pend_valid):
+                with m.If(capture):
+                    # The dropped transaction completed after the pending one.
+                    m.d.sync += pend_lost.eq(1)
+                    with m.If(dropped != (1 << len(dropped)) - 1):
+                        m.d.sync += dropped.eq(dropped + 1)
+            with m.Else():
+                hold(capture)
+
+        with m.Else():
+            m.d.sync += pend_valid.eq(0)
+            with m.If(pend_valid):
+                hold(capture)
+                with m.If(stopping):
+                    # The recorder stopped while the pending transaction was held back.
+                    with m.If(dropped != (1 << len(dropped)) - 1):
+                        m.d.sync += dropped.eq(dropped + 1)
+
+            with m.If(cand_valid):
+                with m.If(fits & ~lost):
+                    m.d.comb += wr_port.data.eq(Cat(da[:da_width], dts[:dts_width],
+                                                    cand_err, cand_we, Const(0, 1)))
+                with m.Else():
+                    m.d.comb += wr_port.data.eq(Cat(Const(0, w - 5), lost, cand_err, cand_we,
+                                                    Const(0b10, 2)))
+                    m.d.sync += [
+                        ext_data.eq(Cat(cand_addr, cand_ts)),
+                        ext_left.eq(ext_count),
+                    ]
+                m.d.comb += wr_port.en.eq(1)
+                m.d.sync += [
+                    last_addr.eq(cand_addr),
+                    last_ts.eq(cand_ts),
+                    have_ref.eq(1),
+                    lost.eq(0),
+                ]
+
+                with m.If(self._trigger_en.value & ~triggered & cand_trig):
+                    m.d.sync += [
+                        triggered.eq(1),
+                        post_left.eq(self._post_count.value),
+                    ]
+                with m.If(triggered & (post_left != 0)):
+                    m.d.sync += post_left.eq(post_left - 1)
+
+            with m.If(pend_valid & pend_lost):
+                m.d.sync += [
+                    have_ref.eq(0),
+                    lost.eq(1),
+                ]
+
+        with m.If(~restart & wr_port.en):
+            m.d.sync += wr_ptr.eq(wr_ptr + 1)
+            with m.If(wr_ptr == self.depth - 1):
+                m.d.sync += wrapped.eq(1)
+
+        with m.If(~restart & stopping & (ext_left == 0)):
+            m.d.sync += done.eq(1)
+
+        # Buffer readout.
+
+        rd_port = m.submodules.rd_port = self._mem.read_port()
+        m.d.comb += [
+            rd_port.addr.eq(self.wb_bus.adr),
+            self.wb_bus.dat_r.eq(rd_port.data),
+        ]
+        m.d.sync += self.wb_bus.ack.eq(self.wb_bus.cyc & self.wb_bus.stb & ~self.wb_bus.ack)
+
+        return m
@@ -1 +1,6 @@
 from .bus import *
+from .monitor import *
+from .cache import *
+from .dma import *
+from .watchdog import *
+from .sram import *
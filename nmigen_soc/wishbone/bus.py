@@ -4,9 +4,11 @@ from nmigen.hdl.rec import Direction
 from nmigen.utils import log2_int
 
 from ..memory import MemoryMap
+from ..latency import Latency
+from ..interconnect import DecoderTree as _DecoderTree
 
 
-__all__ = ["CycleType", "BurstTypeExt", "Interface", "Decoder"]
+__all__ = ["CycleType", "BurstTypeExt", "Interface", "Decoder", "DecoderTree"]
 
 
 class CycleType(Enum):
@@ -146,6 +148,44 @@ class Decoder(Elaboratable):
 
     An address decoder for subordinate Wishbone buses.
 
+    Response path
+    -------------
+
+    Read data of the subordinate buses is gathered with a one-hot AND-OR multiplexer, whose depth
+    does not grow with the amount of windows as that of a priority multiplexer would.
+
+    If ``register_response`` is true, the cycle termination signals (``ack``, ``err``, ``rty``)
+    and the read data are registered before being returned to the initiator, which breaks
+    the combinatorial path from the initiator through the decoder and a subordinate bus and back.
+    If the bus has no ``stall`` signal, ``stb`` is withheld from the subordinate buses while
+    a registered response is returned, such that a classic cycle that is still in progress is not
+    mistaken for a new one; consecutive transfers therefore take an additional cycle each.
+    Otherwise, responses of pipelined transfers are simply delayed.
+
+    Unmapped addresses
+    ------------------
+
+    By default, accesses to addresses outside of any window are never terminated, and
+    the initiator waits forever. If ``default_response`` is ``"ack"``, such accesses are
+    terminated with ``ack`` in the same cycle, and read as zero; if it is ``"err"``, they are
+    terminated with ``err``.
+
+    Latency
+    -------
+
+    The decoder adds no latency, or 1 cycle if ``register_response`` is true. This latency is
+    declared in the memory map of :attr:`bus`; see :class:`..latency.LatencyAnalysis`.
+
+    Minimal decoding
+    ----------------
+
+    If ``minimal_decode`` is true, subordinate buses are selected by comparing only the address
+    bits needed to tell their windows apart, as computed by
+    :meth:`..memory.MemoryMap.window_patterns` with ``minimize=True``. This reduces decoding
+    logic, but accesses to addresses outside of any window are forwarded to one of
+    the subordinate buses instead of never being acknowledged, and are only given the default
+    response if they do not match any of the minimized windows.
+
     Parameters
     ----------
     addr_width : int
@@ -158,6 +198,12 @@ class Decoder(Elaboratable):
         Optional signal set. See :class:`Interface`.
     alignment : int
         Window alignment. See :class:`Interface`.
+    minimal_decode : bool
+        Only compare the address bits needed to tell windows apart.
+    register_response : bool
+        Register the response path.
+    default_response : None or str
+        Response to accesses to unmapped addresses: ``None`` (no response), ``"ack"`` or ``"err"``.
 
     Attributes
     ----------
@@ -165,12 +211,25 @@ class Decoder(Elaboratable):
         CSR bus providing access to subordinate buses.
     """
     def __init__(self, *, addr_width, data_width, granularity=None, features=frozenset(),
-                 alignment=0):
+                 alignment=0, minimal_decode=False, register_response=False,
+                 default_response=None):
+        if default_response not in (None, "ack", "err"):
+            raise ValueError("Default response must be one of None, \"ack\", or \"err\", not {!r}"
+                             .format(default_response))
+        if default_response == "err" and "err" not in set(features):
+            raise ValueError("Default response \"err\" requires the decoder to have an \"err\" "
+                             "signal")
         self.bus   = Interface(addr_width=addr_width, data_width=data_width,
                                granularity=granularity, features=features,
                                alignment=alignment)
         self._map  = self.bus.memory_map
         self._subs = dict()
+        self.minimal_decode    = minimal_decode
+        self.register_response = register_response
+        self.default_response  = default_response
+
+        response_latency = 1 if register_response else 0
+        self._map.latency = Latency(read=response_latency, write=response_latency)
 
     def align_to(self, alignment):
         """Align the implicit address of the next window.
@@ -191,6 +250,11 @@ class Decoder(Elaboratable):
 
         See :meth:`MemoryMap.add_resource` for details.
         """
+        self._check_sub_bus(sub_bus, sparse=sparse)
+        self._subs[sub_bus.memory_map] = sub_bus
+        return self._map.add_window(sub_bus.memory_map, addr=addr, sparse=sparse)
+
+    def _check_sub_bus(self, sub_bus, *, sparse):
         if not isinstance(sub_bus, Interface):
             raise TypeError("Subordinate bus must be an instance of wishbone.Interface, not {!r}"
                             .format(sub_bus))
@@ -215,8 +279,18 @@ class Decoder(Elaboratable):
                                  "does not have a corresponding input"
                                  .format(opt_output))
 
-        self._subs[sub_bus.memory_map] = sub_bus
-        return self._map.add_window(sub_bus.memory_map, addr=addr, sparse=sparse)
+    def _elaboration_signature(self):
+        # See :class:`..elaboration.ElaborationCache`.
+        key   = [self.bus.addr_width, self.bus.data_width, self.bus.granularity,
+                 tuple(self.bus.fields), self.minimal_decode, self.register_response,
+                 self.default_response]
+        ports = list(self.bus.fields.values())
+        for sub_map, (sub_start, sub_end, sub_ratio) in self._map.windows():
+            sub_bus = self._subs[sub_map]
+            key.append((sub_start, sub_end, sub_ratio, sub_bus.addr_width, sub_bus.data_width,
+                        sub_bus.granularity, tuple(sub_bus.fields)))
+            ports += sub_bus.fields.values()
+        return tuple(key), ports
 
     def elaborate(self, platform):
         m = Module()
@@ -225,17 +299,33 @@ class Decoder(Elaboratable):
         err_fanin   = 0
         rty_fanin   = 0
         stall_fanin = 0
+        dat_r_fanin = 0
+
+        unmapped = Signal()
+
+        sub_stb = self.bus.stb
+        if self.register_response and not hasattr(self.bus, "stall"):
+            # Withhold the strobe while a registered response is returned; see above.
+            resp_hold = self.bus.ack
+            if hasattr(self.bus, "err"):
+                resp_hold = resp_hold | self.bus.err
+            if hasattr(self.bus, "rty"):
+                resp_hold = resp_hold | self.bus.rty
+            sub_stb = sub_stb & ~resp_hold
 
         with m.Switch(self.bus.adr):
-            for sub_map, (sub_pat, sub_ratio) in self._map.window_patterns():
+            granularity_bits = log2_int(self.bus.data_width // self.bus.granularity)
+            for index, (sub_map, (sub_pat, sub_ratio)) in \
+                    enumerate(self._map.window_patterns(minimize=self.minimal_decode)):
                 sub_bus = self._subs[sub_map]
+                sub_sel = Signal(name="sub_{}_sel".format(index))
 
                 m.d.comb += [
                     sub_bus.adr.eq(self.bus.adr << log2_int(sub_ratio)),
                     sub_bus.dat_w.eq(self.bus.dat_w),
                     sub_bus.sel.eq(Cat(Repl(sel, sub_ratio) for sel in self.bus.sel)),
                     sub_bus.we.eq(self.bus.we),
-                    sub_bus.stb.eq(self.bus.stb),
+                    sub_bus.stb.eq(sub_stb),
                 ]
                 if hasattr(sub_bus, "lock"):
                     m.d.comb += sub_bus.lock.eq(getattr(self.bus, "lock", 0))
@@ -244,25 +334,121 @@ class Decoder(Elaboratable):
                 if hasattr(sub_bus, "bte"):
                     m.d.comb += sub_bus.bte.eq(getattr(self.bus, "bte", BurstTypeExt.LINEAR))
 
-                with m.Case(sub_pat[:-log2_int(self.bus.data_width // self.bus.granularity)]):
+                with m.Case(sub_pat[:len(sub_pat) - granularity_bits]):
                     m.d.comb += [
                         sub_bus.cyc.eq(self.bus.cyc),
-                        self.bus.dat_r.eq(sub_bus.dat_r),
+                        sub_sel.eq(1),
                     ]
-                    ack_fanin |= sub_bus.ack
-                    if hasattr(sub_bus, "err"):
-                        err_fanin |= sub_bus.err
-                    if hasattr(sub_bus, "rty"):
-                        rty_fanin |= sub_bus.rty
-                    if hasattr(sub_bus, "stall"):
-                        stall_fanin |= sub_bus.stall
-
-        m.d.comb += self.bus.ack.eq(ack_fanin)
-        if hasattr(self.bus, "err"):
-            m.d.comb += self.bus.err.eq(err_fanin)
-        if hasattr(self.bus, "rty"):
-            m.d.comb += self.bus.rty.eq(rty_fanin)
+
+                # Only the selected subordinate bus has ``cyc`` asserted, and may respond.
+                ack_fanin |= sub_bus.ack
+                if hasattr(sub_bus, "err"):
+                    err_fanin |= sub_bus.err
+                if hasattr(sub_bus, "rty"):
+                    rty_fanin |= sub_bus.rty
+                if hasattr(sub_bus, "stall"):
+                    stall_fanin |= sub_bus.stall & sub_sel
+                dat_r_fanin |= Mux(sub_sel, sub_bus.dat_r, 0)
+
+            with m.Default():
+                m.d.comb += unmapped.eq(1)
+
+        # Unmapped accesses read as zero, since no subordinate bus is selected.
+        if self.default_response == "ack":
+            ack_fanin |= self.bus.cyc & sub_stb & unmapped
+        elif self.default_response == "err":
+            err_fanin |= self.bus.cyc & sub_stb & unmapped
+
+        if self.register_response:
+            term_fanin = ack_fanin | err_fanin | rty_fanin
+            m.d.sync += self.bus.ack.eq(ack_fanin & self.bus.cyc)
+            if hasattr(self.bus, "err"):
+                m.d.sync += self.bus.err.eq(err_fanin & self.bus.cyc)
+            if hasattr(self.bus, "rty"):
+                m.d.sync += self.bus.rty.eq(rty_fanin & self.bus.cyc)
+            with m.If(term_fanin):
+                m.d.sync += self.bus.dat_r.eq(dat_r_fanin)
+        else:
+            m.d.comb += self.bus.ack.eq(ack_fanin)
+            if hasattr(self.bus, "err"):
+                m.d.comb += self.bus.err.eq(err_fanin)
+            if hasattr(self.bus, "rty"):
+                m.d.comb += self.bus.rty.eq(rty_fanin)
+            m.d.comb += self.bus.dat_r.eq(dat_r_fanin)
         if hasattr(self.bus, "stall"):
             m.d.comb += self.bus.stall.eq(stall_fanin)
 
         return m
+
+
+class DecoderTree(_DecoderTree):
+    """Wishbone bus decoder tree.
+
+    Connects many subordinate Wishbone buses through a hierarchy of :class:`Decoder`s, in which
+    no decoder has more than ``max_fanout`` windows. See :class:`..interconnect.DecoderTree` for
+    the layout of the tree.
+
+    Register slices
+    ---------------
+
+    If ``register_response`` is true, every decoder of the tree registers its response, which
+    places a register slice at every level of the tree; see :class:`Decoder`. The latency of
+    an access to a subordinate bus then grows by 1 cycle for every decoder it traverses, as
+    reported by :meth:`paths`. Otherwise, the tree is combinatorial.
+
+    Unmapped addresses
+    ------------------
+
+    Every decoder of the tree gives ``default_response`` to accesses to unmapped addresses,
+    including addresses within the range of a nested decoder that are outside of any of its
+    windows.
+
+    Parameters
+    ----------
+    addr_width : int
+        Address width. See :class:`Interface`.
+    data_width : int
+        Data width. See :class:`Interface`.
+    granularity : int
+        Granularity. See :class:`Interface`
+    features : iter(str)
+        Optional signal set. See :class:`Interface`.
+    alignment : int
+        Window alignment. See :class:`Interface`.
+    max_fanout : int
+        Largest amount of windows of any decoder. Must be at least 2.
+    register_response : bool
+        Register the response path of every decoder.
+    default_response : None or str
+        Response to accesses to unmapped addresses: ``None`` (no response), ``"ack"`` or ``"err"``.
+
+    Attributes
+    ----------
+    bus : :class:`Interface`
+        Wishbone bus providing access to subordinate buses.
+    """
+    def __init__(self, *, addr_width, data_width, granularity=None, features=frozenset(),
+                 alignment=0, max_fanout=16, register_response=False, default_response=None):
+        self._decoder_params = dict(data_width=data_width, granularity=granularity,
+                                    features=features, alignment=alignment,
+                                    register_response=register_response,
+                                    default_response=default_response)
+        super().__init__(Decoder(addr_width=addr_width, **self._decoder_params),
+                         max_fanout=max_fanout)
+
+    def _new_decoder(self, map_addr_width):
+        # Memory maps of Wishbone buses are addressed in units of granularity.
+        bus = self._root.bus
+        granularity_bits = log2_int(bus.data_width // bus.granularity)
+        return Decoder(addr_width=map_addr_width - granularity_bits, **self._decoder_params)
+
+    def add(self, sub_bus, *, addr=None, sparse=False):
+        """Add a window to a subordinate bus.
+
+        See :meth:`Decoder.add` for details.
+
+        Exceptions
+        ----------
+        Raises :exn:`ValueError` if the layout of the tree has already been computed.
+        """
+        return self._add_sub_bus(sub_bus, addr, dict(sparse=sparse))
@@ -0,0 +1,426 @@
+from nmigen import *
+from nmigen.utils import log2_int, bits_for
+
+from .bus import Interface, CycleType, BurstTypeExt
+from ..csr.bank import Field, RegisterBank
+
+
+__all__ = ["Cache"]
+
+
+class Cache(Elaboratable):
+    """Wishbone cache.
+
+    A set-associative cache placed between Wishbone initiators and a slow Wishbone target.
+
+    Operation
+    ---------
+
+    The cache stores ``size`` data words in lines of ``line_length`` words, organized in ``ways``
+    ways. A read hit completes in 2 cycles. A read miss fills a whole line from the target, and
+    then completes as a read hit. If the target has the ``cti`` signal, a line fill is performed as
+    an incrementing burst, otherwise, as a classic block cycle.
+
+    Write policy
+    ------------
+
+    If ``write_back`` is false, writes are forwarded to the target and update the cached line on
+    a hit (write-through, no write allocate). If ``write_back`` is true, writes update only
+    the cached line, which is allocated on a miss; modified lines are written back to the target
+    when they are evicted or flushed.
+
+    Replacement
+    -----------
+
+    On a miss, an invalid way is replaced if there is one; otherwise, ways are replaced in
+    round-robin order.
+
+    Errors
+    ------
+
+    If the target has the ``err`` signal, so does :attr:`bus`. If the target terminates a cycle
+    with ``err``, the access of the initiator that caused it is terminated with ``err`` as well,
+    and abandoned: a line being filled is invalidated, a line hit by a write is not updated, and
+    a modified line being evicted stays modified. If the eviction was caused by a flush, the flush
+    is abandoned instead, and ``flush`` reads as 0.
+
+    Control and status registers
+    ----------------------------
+
+    * ``flush`` (W1S): write back all modified lines and invalidate all lines. The bit reads as 1
+      until the flush completes.
+    * ``hits``, ``misses`` (R/O): saturating count of cache hits and misses.
+    * ``writebacks`` (R/O): saturating count of lines written back. Only present if
+      ``write_back`` is true.
+
+    Parameters
+    ----------
+    target : :class:`Interface`
+        Bus of the cached target. Targets with ``stall`` are not supported.
+    size : int
+        Cache size, in words. Must be a power of 2.
+    line_length : int
+        Line length, in words. Must be a power of 2.
+    ways : int
+        Associativity. Must be a power of 2.
+    write_back : bool
+        Write policy.
+    counter_width : int
+        Width of the hit and miss counters.
+    csr_data_width : int
+        Data width of the CSR bus.
+
+    Attributes
+    ----------
+    bus : :class:`Interface`
+        Wishbone bus providing access to the cached target. Its memory map includes the memory map
+        of the target as a window.
+    target : :class:`Interface`
+        Bus of the cached target.
+    csr_bus : :class:`..csr.Interface`
+        CSR bus providing access to the control and status registers.
+    """
+    def __init__(self, target, *, size, line_length=4, ways=1, write_back=False,
+                 counter_width=32, csr_data_width=8):
+        if not isinstance(target, Interface):
+            raise TypeError("Target bus must be an instance of wishbone.Interface, not {!r}"
+                            .format(target))
+        if hasattr(target, "stall"):
+            raise ValueError("Target bus has optional output 'stall', which is not supported")
+        for name, value in (("Size", size), ("Line length", line_length), ("Associativity", ways)):
+            if not isinstance(value, int) or value <= 0 or value & (value - 1):
+                raise ValueError("{} must be a positive power of 2, not {!r}"
+                                 .format(name, value))
+        if size < line_length * ways:
+            raise ValueError("Size {} must be at least line length {} times associativity {}"
+                             .format(size, line_length, ways))
+        if (log2_int(line_length) + log2_int(size // (line_length * ways)) >
+                target.addr_width):
+            raise ValueError("Cache with {} sets of {} words cannot be used with target address "
+                             "width {}"
+                             .format(size // (line_length * ways), line_length,
+                                     target.addr_width))
+
+        self.target      = target
+        self.size        = size
+        self.line_length = line_length
+        self.ways        = ways
+        self.write_back  = write_back
+
+        self.bus = Interface(addr_width=target.addr_width, data_width=target.data_width,
+                             granularity=target.granularity,
+                             features={"err"} if hasattr(target, "err") else (), name="bus")
+        self.bus.memory_map.add_window(target.memory_map)
+
+        self._flush      = Field(1, "w1s", name="flush")
+        self._hits       = Field(counter_width, "r", name="hits")
+        self._misses     = Field(counter_width, "r", name="misses")
+        self._writebacks = None
+        fields = [self._flush, self._hits, self._misses]
+        if write_back:
+            self._writebacks = Field(counter_width, "r", name="writebacks")
+            fields.append(self._writebacks)
+
+        chunks = sum((field.width + csr_data_width - 1) // csr_data_width for field in fields)
+        self._bank = RegisterBank(addr_width=max(1, bits_for(chunks - 1)),
+                                  data_width=csr_data_width)
+        for field in fields:
+            self._bank.add(field)
+
+    @property
+    def csr_bus(self):
+        return self._bank.bus
+
+    def elaborate(self, platform):
+        m = Module()
+        m.submodules.bank = self._bank
+
+        bus    = self.bus
+        target = self.target
+
+        offset_bits = log2_int(self.line_length)
+        sets        = self.size // (self.line_length * self.ways)
+        index_bits  = log2_int(sets)
+        tag_bits    = bus.addr_width - offset_bits - index_bits
+
+        req_offset = bus.adr[:offset_bits]
+        req_index  = bus.adr[offset_bits:offset_bits + index_bits]
+        req_tag    = bus.adr[offset_bits + index_bits:]
+
+        # Tag memory words are laid out as ``Cat(tag, valid, dirty)``.
+        data_rd = []
+        data_wr = []
+        tag_rd  = []
+        tag_wr  = []
+        for way in range(self.ways):
+            data_mem = Memory(width=bus.data_width, depth=sets * self.line_length,
+                              name="data_{}".format(way))
+            tag_mem  = Memory(width=tag_bits + 2, depth=sets, name="tag_{}".format(way))
+            data_rd.append(data_mem.read_port(transparent=False))
+            data_wr.append(data_mem.write_port(granularity=bus.granularity))
+            tag_rd.append(tag_mem.read_port(transparent=False))
+            tag_wr.append(tag_mem.write_port())
+            m.submodules["data_rd_{}".format(way)] = data_rd[-1]
+            m.submodules["data_wr_{}".format(way)] = data_wr[-1]
+            m.submodules["tag_rd_{}".format(way)]  = tag_rd[-1]
+            m.submodules["tag_wr_{}".format(way)]  = tag_wr[-1]
+
+        tag_valid = Cat(port.data[tag_bits]     for port in tag_rd)
+        tag_dirty = Cat(port.data[tag_bits + 1] for port in tag_rd)
+        tag_hit   = Cat(port.data[tag_bits] & (port.data[:tag_bits] == req_tag)
+                        for port in tag_rd)
+
+        # Line being evicted or filled.
+        ln_way   = Signal(log2_int(self.ways))
+        ln_index = Signal(index_bits)
+        ln_tag   = Signal(tag_bits)
+        count    = Signal(offset_bits)
+        last     = count == self.line_length - 1
+
+        rr_way   = Signal(log2_int(self.ways))
+        retry    = Signal()
+        # Ways hit by a write being forwarded to the target.
+        wt_hit   = Signal(self.ways)
+
+        flush    = self._flush.value
+        fl_index = Signal(index_bits)
+        fl_way   = Signal(log2_int(self.ways))
+        flushing = Signal()
+        fl_last  = (fl_index == sets - 1) & (fl_way == self.ways - 1)
+
+        for way in range(self.ways):
+            m.d.comb += [
+                data_rd[way].addr.eq(Cat(req_offset, req_index)),
+                tag_rd[way].addr.eq(req_index),
+                data_wr[way].addr.eq(Cat(req_offset, req_index)),
+                data_wr[way].data.eq(bus.dat_w),
+                tag_wr[way].addr.eq(ln_index),
+            ]
+
+        r_data_fanin = 0
+        for way in range(self.ways):
+            r_data_fanin |= Mux(tag_hit[way], data_rd[way].data, 0)
+
+        hit_event       = Signal()
+        miss_event      = Signal()
+        writeback_event = Signal()
+        for field, event in ((self._hits, hit_event), (self._misses, miss_event),
+                             (self._writebacks, writeback_event)):
+            if field is None:
+                continue
+            counter = Signal(len(field.value), name="{}__counter".format(field.name))
+            m.d.comb += field.value.eq(counter)
+            with m.If(event & (counter != (1 << len(counter)) - 1)):
+                m.d.sync += counter.eq(counter + 1)
+
+        def target_cycle(adr, we):
+            m.d.comb += [
+                target.adr.eq(adr),
+                target.we.eq(we),
+                target.cyc.eq(1),
+                target.stb.eq(1),
+            ]
+
+        def burst_cycle():
+            if hasattr(target, "cti"):
+                m.d.comb += target.cti.eq(Mux(last, CycleType.END_OF_BURST,
+                                                    CycleType.INCR_BURST))
+            if hasattr(target, "bte"):
+                m.d.comb += target.bte.eq(BurstTypeExt.LINEAR)
+
+        def victim_way():
+            # Prefer an invalid way; otherwise, use the round-robin way.
+            way = Signal.like(rr_way)
+            m.d.comb += way.eq(rr_way)
+            for index in reversed(range(self.ways)):
+                with m.If(~tag_valid[index]):
+                    m.d.comb += way.eq(index)
+            return way
+
+        with m.FSM():
+            with m.State("IDLE"):
+                with m.If(flush):
+                    m.d.sync += [
+                        flushing.eq(1),
+                        fl_index.eq(0),
+                        fl_way.eq(0),
+                    ]
+                    m.next = "FLUSH-READ"
+                with m.Elif(bus.cyc & bus.stb):
+                    m.next = "CHECK"
+
+            with m.State("CHECK"):
+                m.d.sync += [
+                    retry.eq(0),
+                    ln_index.eq(req_index),
+                    count.eq(0),
+                ]
+                with m.If(~bus.cyc | ~bus.stb):
+                    m.next = "IDLE"
+
+                with m.Elif(tag_hit.any()):
+                    m.d.comb += hit_event.eq(~retry)
+                    with m.If(~bus.we):
+                        m.d.comb += [
+                            bus.dat_r.eq(r_data_fanin),
+                            bus.ack.eq(1),
+                        ]
+                        m.next = "IDLE"
+                    with m.Else():
+                        if self.write_back:
+                            for way in range(self.ways):
+                                m.d.comb += data_wr[way].en.eq(Mux(tag_hit[way], bus.sel, 0))
+                            for way in range(self.ways):
+                                m.d.comb += [
+                                    tag_wr[way].addr.eq(req_index),
+                                    tag_wr[way].data.eq(Cat(req_tag, Const(0b11, 2))),
+                                    tag_wr[way].en.eq(tag_hit[way]),
+                                ]
+                            m.d.comb += bus.ack.eq(1)
+                            m.next = "IDLE"
+                        else:
+                            # The cached line is updated once the target accepts the write.
+                            m.d.sync += wt_hit.eq(tag_hit)
+                            m.next = "WRITE-THROUGH"
+
+                with m.Else():
+                    m.d.comb += miss_event.eq(1)
+                    if not self.write_back:
+                        with m.If(bus.we):
+                            m.d.sync += wt_hit.eq(0)
+                            m.next = "WRITE-THROUGH"
+                        with m.Else():
+                            m.d.sync += ln_way.eq(victim_way())
+                            m.next = "REFILL"
+                    else:
+                        way = victim_way()
+                        m.d.sync += ln_way.eq(way)
+                        with m.If((tag_valid & tag_dirty).bit_select(way, 1)):
+                            m.d.sync += ln_tag.eq(Array(port.data[:tag_bits]
+                                                        for port in tag_rd)[way])
+                            m.next = "EVICT-PRIME"
+                        with m.Else():
+                            m.next = "REFILL"
+
+            with m.State("WRITE-THROUGH"):
+                target_cycle(bus.adr, 1)
+                m.d.comb += [
+                    target.dat_w.eq(bus.dat_w),
+                    target.sel.eq(bus.sel),
+                    bus.ack.eq(target.ack),
+                ]
+                with m.If(target.ack):
+                    for way in range(self.ways):
+                        m.d.comb += data_wr[way].en.eq(Mux(wt_hit[way], bus.sel, 0))
+                    m.next = "IDLE"
+                if hasattr(target, "err"):
+                    with m.If(target.err):
+                        m.d.comb += bus.err.eq(1)
+                        m.next = "IDLE"
+
+            with m.State("REFILL"):
+                target_cycle(Cat(count, ln_index, req_tag), 0)
+                burst_cycle()
+                m.d.comb += target.sel.eq(Repl(1, len(target.sel)))
+                with m.If(target.ack):
+                    for way in range(self.ways):
+                        m.d.comb += [
+                            data_wr[way].addr.eq(Cat(count, ln_index)),
+                            data_wr[way].data.eq(target.dat_r),
+                            data_wr[way].en.eq(Mux(ln_way == way,
+                                                   Repl(1, len(data_wr[way].en)), 0)),
+                        ]
+                    m.d.sync += count.eq(count + 1)
+                    with m.If(last):
+                        for way in range(self.ways):
+                            m.d.comb += [
+                                tag_wr[way].data.eq(Cat(req_tag, Const(0b01, 2))),
+                                tag_wr[way].en.eq(ln_way == way),
+                            ]
+                        m.d.sync += [
+                            rr_way.eq(rr_way + 1),
+                            retry.eq(1),
+                        ]
+                        m.next = "IDLE"
+                if hasattr(target, "err"):
+                    with m.If(target.err):
+                        # The line may already be partially overwritten.
+                        for way in range(self.ways):
+                            m.d.comb += [
+                                tag_wr[way].data.eq(0),
+                                tag_wr[way].en.eq(ln_way == way),
+                            ]
+                        m.d.comb += bus.err.eq(1)
+                        m.next = "IDLE"
+
+            if self.write_back:
+                with m.State("EVICT-PRIME"):
+                    for way in range(self.ways):
+                        m.d.comb += data_rd[way].addr.eq(Cat(count, ln_index))
+                    m.next = "EVICT"
+
+                with m.State("EVICT"):
+                    target_cycle(Cat(count, ln_index, ln_tag), 1)
+                    burst_cycle()
+                    m.d.comb += [
+                        target.dat_w.eq(Array(port.data for port in data_rd)[ln_way]),
+                        target.sel.eq(Repl(1, len(target.sel))),
+                    ]
+                    for way in range(self.ways):
+                        m.d.comb += data_rd[way].addr.eq(Cat((count + target.ack)[:offset_bits],
+                                                             ln_index))
+                    with m.If(target.ack):
+                        m.d.sync += count.eq(count + 1)
+                        with m.If(last):
+                            m.d.comb += writeback_event.eq(1)
+                            with m.If(flushing):
+                                m.next = "FLUSH-CLEAR"
+                            with m.Else():
+                                m.next = "REFILL"
+                    if hasattr(target, "err"):
+                        with m.If(target.err):
+                            with m.If(flushing):
+                                m.d.comb += self._flush.clear.eq(1)
+                                m.d.sync += flushing.eq(0)
+                            with m.Else():
+                                m.d.comb += bus.err.eq(1)
+                            m.next = "IDLE"
+
+            with m.State("FLUSH-READ"):
+                for way in range(self.ways):
+                    m.d.comb += tag_rd[way].addr.eq(fl_index)
+                m.d.sync += [
+                    ln_index.eq(fl_index),
+                    ln_way.eq(fl_way),
+                    count.eq(0),
+                ]
+                m.next = "FLUSH-CHECK"
+
+            with m.State("FLUSH-CHECK"):
+                if self.write_back:
+                    with m.If((tag_valid & tag_dirty).bit_select(fl_way, 1)):
+                        m.d.sync += ln_tag.eq(Array(port.data[:tag_bits]
+                                                    for port in tag_rd)[fl_way])
+                        m.next = "EVICT-PRIME"
+                    with m.Else():
+                        m.next = "FLUSH-CLEAR"
+                else:
+                    m.next = "FLUSH-CLEAR"
+
+            with m.State("FLUSH-CLEAR"):
+                for way in range(self.ways):
+                    m.d.comb += [
+                        tag_wr[way].data.eq(0),
+                        tag_wr[way].en.eq(ln_way == way),
+                    ]
+                with m.If(fl_last):
+                    m.d.comb += self._flush.clear.eq(1)
+                    m.d.sync += flushing.eq(0)
+                    m.next = "IDLE"
+                with m.Else():
+                    with m.If(fl_way == self.ways - 1):
+                        m.d.sync += fl_index.eq(fl_index + 1)
+                    m.d.sync += fl_way.eq(fl_way + 1)
+                    m.next = "FLUSH-READ"
+
+        return m
@@ -0,0 +1,366 @@
+from nmigen import *
+from nmigen.lib.fifo import SyncFIFO
+from nmigen.utils import bits_for
+
+from .bus import Interface, CycleType, BurstTypeExt
+from ..csr.bank import Field, RegisterBank
+
+
+__all__ = ["DMA"]
+
+
+class DMA(Elaboratable):
+    """Wishbone DMA engine.
+
+    A bus initiator that copies blocks of words, controlled through a CSR bus. Addresses and
+    lengths are expressed in units of bus words, i.e. in the same units as the ``adr`` signal.
+
+    Operation
+    ---------
+
+    A transfer is split into chunks of at most ``burst_length`` words. Each chunk is first read
+    from the source into an internal buffer, and then written to the destination. Each address
+    may either be incremented after every word (e.g. for memory), or fixed (e.g. for a peripheral
+    data register).
+
+    If ``pipelined`` is false, every chunk is transferred as a single registered feedback burst,
+    i.e. an incrementing burst for incremented addresses, or a constant address burst for fixed
+    addresses; targets that do not implement ``cti`` treat it as a classic block cycle. If
+    ``pipelined`` is true, every chunk is transferred as a pipelined block cycle, issuing a new
+    request in every cycle the target does not assert ``stall``.
+
+    Scatter-gather
+    --------------
+
+    If the ``sg`` control field is set, the transfer is described by a linked list of descriptors
+    in memory, starting at ``desc_addr``. Each descriptor is four words long:
+
+    0. Source address.
+    1. Destination address.
+    2. Control word: length in bits ``0..length_width``; ``last`` flag (no descriptors follow) in
+       bit ``data_width - 1``; ``src_fixed`` flag in bit ``data_width - 2``; ``dst_fixed`` flag in
+       bit ``data_width - 3``.
+    3. Address of the next descriptor.
+
+    If ``prefetch`` is false, descriptors are fetched through ``bus``, so descriptor fetches
+    cannot overlap data transfers: each descriptor is fetched once the data of the previous one
+    has been transferred, which takes a 4 word read cycle between the data of consecutive
+    descriptors.
+
+    If ``prefetch`` is true, descriptors are fetched through a separate ``desc_bus`` into
+    a buffer holding one descriptor. The next descriptor is fetched while the data of the current
+    one is being transferred, and the data stream moves on to it without waiting for the fetch.
+    If a descriptor fetch is terminated with ``err``, the transfer is aborted once the data of
+    the current descriptor has been transferred.
+
+    Control and status registers
+    ----------------------------
+
+    * ``start`` (W1S): start a transfer. Reads as 1 until the transfer is started.
+    * ``sg`` (R/W): use scatter-gather mode.
+    * ``src_fixed``, ``dst_fixed`` (R/W): do not increment the source or destination address.
+      Ignored in scatter-gather mode.
+    * ``src_addr``, ``dst_addr`` (R/W): source and destination address. Ignored in scatter-gather
+      mode.
+    * ``length`` (R/W): transfer length, in words. Ignored in scatter-gather mode.
+    * ``desc_addr`` (R/W): address of the first descriptor.
+    * ``busy`` (R/O): a transfer is in progress.
+    * ``done`` (W1C): a transfer completed.
+    * ``error`` (W1C): a transfer was aborted because the target terminated a cycle with ``err``.
+
+    Parameters
+    ----------
+    addr_width : int
+        Address width. See :class:`Interface`.
+    data_width : int
+        Data width. See :class:`Interface`.
+    granularity : int
+        Granularity. See :class:`Interface`.
+    burst_length : int
+        Maximum chunk length, in words. Also the depth of the internal buffer.
+    length_width : int
+        Width of transfer lengths.
+    pipelined : bool
+        Use pipelined block cycles.
+    prefetch : bool
+        Fetch descriptors through a separate bus, ahead of the data transfers.
+    csr_data_width : int
+        Data width of the CSR bus.
+
+    Attributes
+    ----------
+    bus : :class:`Interface`
+        Wishbone bus driven by the engine.
+    desc_bus : :class:`Interface`
+        Wishbone bus through which descriptors are fetched. Only present if ``prefetch`` is true.
+    csr_bus : :class:`..csr.Interface`
+        CSR bus providing access to the control and status registers.
+    irq : Signal()
+        Interrupt request. Asserted while ``done`` or ``error`` is set.
+    """
+    def __init__(self, *, addr_width, data_width=32, granularity=None, burst_length=8,
+                 length_width=16, pipelined=False, prefetch=False, csr_data_width=8):
+        if not isinstance(burst_length, int) or burst_length <= 0:
+            raise ValueError("Burst length must be a positive integer, not {!r}"
+                             .format(burst_length))
+        if not isinstance(length_width, int) or length_width <= 0:
+            raise ValueError("Length width must be a positive integer, not {!r}"
+                             .format(length_width))
+        if length_width + 3 > data_width or addr_width > data_width:
+            raise ValueError("Data width {} is too narrow for descriptors with address width {} "
+                             "and length width {}"
+                             .format(data_width, addr_width, length_width))
+
+        features = {"cti", "bte", "err"}
+        if pipelined:
+            features.add("stall")
+        self.bus = Interface(addr_width=addr_width, data_width=data_width,
+                             granularity=granularity, features=features, name="bus")
+        if prefetch:
+            self.desc_bus = Interface(addr_width=addr_width, data_width=data_width,
+                                      granularity=granularity, features={"cti", "bte", "err"},
+                                      name="desc_bus")
+        self.irq = Signal()
+
+        self.burst_length = burst_length
+        self.length_width = length_width
+        self.pipelined    = pipelined
+        self.prefetch     = prefetch
+
+        self._start     = Field(1, "w1s", name="start")
+        self._sg        = Field(1, "rw", name="sg")
+        self._src_fixed = Field(1, "rw", name="src_fixed")
+        self._dst_fixed = Field(1, "rw", name="dst_fixed")
+        self._src_addr  = Field(addr_width, "rw", name="src_addr")
+        self._dst_addr  = Field(addr_width, "rw", name="dst_addr")
+        self._length    = Field(length_width, "rw", name="length")
+        self._desc_addr = Field(addr_width, "rw", name="desc_addr")
+        self._busy      = Field(1, "r", name="busy")
+        self._done      = Field(1, "w1c", name="done")
+        self._error     = Field(1, "w1c", name="error")
+
+        fields = [self._start, self._sg, self._src_fixed, self._dst_fixed, self._src_addr,
+                  self._dst_addr, self._length, self._desc_addr, self._busy, self._done,
+                  self._error]
+        chunks = sum((field.width + csr_data_width - 1) // csr_data_width for field in fields)
+        self._bank = RegisterBank(addr_width=max(1, bits_for(chunks - 1)),
+                                  data_width=csr_data_width)
+        for field in fields:
+            self._bank.add(field)
+
+    @property
+    def csr_bus(self):
+        return self._bank.bus
+
+    def elaborate(self, platform):
+        m = Module()
+        m.submodules.bank = self._bank
+
+        bus = self.bus
+        dw  = bus.data_width
+        aw  = bus.addr_width
+        lw  = self.length_width
+
+        m.submodules.fifo = fifo = SyncFIFO(width=dw, depth=self.burst_length, fwft=True)
+
+        # Descriptor being transferred.
+        src_addr  = Signal(aw)
+        dst_addr  = Signal(aw)
+        src_fixed = Signal()
+        dst_fixed = Signal()
+        remaining = Signal(lw)
+
+        # Descriptor being fetched, or prefetched descriptor.
+        desc       = Array(Signal(dw, name="desc_{}".format(index)) for index in range(4))
+        desc_ctrl  = desc[2]
+        desc_ptr   = Signal(aw)
+        desc_more  = Signal()
+        desc_valid = Signal()
+        desc_error = Signal()
+
+        beats  = Signal(range(self.burst_length + 1))
+        # Wide enough to count the words of a descriptor, too.
+        issued = Signal(range(max(self.burst_length, 4) + 1))
+        acked  = Signal.like(issued)
+
+        m.d.comb += [
+            self._start.clear.eq(0),
+            self._done.set.eq(0),
+            self._error.set.eq(0),
+            self.irq.eq(self._done.value | self._error.value),
+            bus.sel.eq(Repl(1, len(bus.sel))),
+        ]
+
+        def bus_cycle(base, fixed, count, we):
+            """Transfer ``count`` words starting at ``base``, which is incremented after every word
+            unless ``fixed`` is asserted. Return the condition under which the current cycle
+            completes the transfer."""
+            if self.pipelined:
+                beat = issued
+                stb  = issued != count
+                with m.If(stb & ~bus.stall):
+                    m.d.sync += issued.eq(issued + 1)
+            else:
+                beat = acked
+                stb  = acked != count
+                m.d.comb += [
+                    bus.cti.eq(Mux(acked == count - 1, CycleType.END_OF_BURST,
+                                   Mux(fixed, CycleType.CONST_BURST, CycleType.INCR_BURST))),
+                    bus.bte.eq(BurstTypeExt.LINEAR),
+                ]
+            m.d.comb += [
+                bus.adr.eq(base + Mux(fixed, 0, beat)),
+                bus.we.eq(we),
+                bus.cyc.eq(1),
+                bus.stb.eq(stb),
+            ]
+            with m.If(bus.ack):
+                m.d.sync += acked.eq(acked + 1)
+            with m.If(bus.err):
+                end_cycle()
+                m.d.comb += self._error.set.eq(1)
+                m.next = "IDLE"
+            return bus.ack & (acked == count - 1)
+
+        def end_cycle():
+            m.d.sync += [
+                issued.eq(0),
+                acked.eq(0),
+            ]
+
+        def load_desc():
+            return [
+                src_addr.eq(desc[0]),
+                dst_addr.eq(desc[1]),
+                remaining.eq(desc_ctrl[:lw]),
+                dst_fixed.eq(desc_ctrl[dw - 3]),
+                src_fixed.eq(desc_ctrl[dw - 2]),
+            ]
+
+        if self.prefetch:
+            # Descriptor fetch port. The next descriptor is fetched whenever the buffer is empty,
+            # independently of the data transfers.
+            desc_bus = self.desc_bus
+            fetched  = Signal(range(4))
+            m.d.comb += [
+                desc_bus.adr.eq(desc_ptr + fetched),
+                desc_bus.sel.eq(Repl(1, len(desc_bus.sel))),
+                desc_bus.cti.eq(Mux(fetched == 3, CycleType.END_OF_BURST,
+                                    CycleType.INCR_BURST)),
+                desc_bus.bte.eq(BurstTypeExt.LINEAR),
+                desc_bus.cyc.eq(self._busy.value & desc_more & ~desc_valid & ~desc_error),
+                desc_bus.stb.eq(desc_bus.cyc),
+            ]
+            with m.If(desc_bus.cyc & desc_bus.ack):
+                m.d.sync += [
+                    desc[fetched].eq(desc_bus.dat_r),
+                    fetched.eq(fetched + 1),
+                ]
+                with m.If(fetched == 3):
+                    m.d.sync += [
+                        desc_ptr.eq(desc_bus.dat_r),
+                        desc_more.eq(~desc_ctrl[dw - 1]),
+                        desc_valid.eq(1),
+                    ]
+            with m.If(desc_bus.cyc & desc_bus.err):
+                m.d.sync += desc_error.eq(1)
+
+        with m.FSM():
+            with m.State("IDLE"):
+                # Discard any data left over from an aborted transfer.
+                m.d.comb += fifo.r_en.eq(fifo.r_rdy)
+                with m.If(self._start.value & ~fifo.r_rdy):
+                    m.d.comb += self._start.clear.eq(1)
+                    with m.If(self._sg.value):
+                        m.d.sync += [
+                            remaining.eq(0),
+                            desc_ptr.eq(self._desc_addr.value),
+                            desc_more.eq(1),
+                        ]
+                        if self.prefetch:
+                            m.d.sync += [
+                                fetched.eq(0),
+                                desc_valid.eq(0),
+                                desc_error.eq(0),
+                            ]
+                    with m.Else():
+                        m.d.sync += [
+                            src_addr.eq(self._src_addr.value),
+                            dst_addr.eq(self._dst_addr.value),
+                            src_fixed.eq(self._src_fixed.value),
+                            dst_fixed.eq(self._dst_fixed.value),
+                            remaining.eq(self._length.value),
+                            desc_more.eq(0),
+                        ]
+                    m.next = "DISPATCH"
+
+            with m.State("DISPATCH"):
+                m.d.comb += self._busy.value.eq(1)
+                with m.If(remaining != 0):
+                    with m.If(remaining > self.burst_length):
+                        m.d.sync += beats.eq(self.burst_length)
+                    with m.Else():
+                        m.d.sync += beats.eq(remaining)
+                    m.next = "READ"
+                if self.prefetch:
+                    with m.Elif(desc_valid):
+                        m.d.sync += load_desc()
+                        m.d.sync += desc_valid.eq(0)
+                    with m.Elif(desc_error):
+                        m.d.comb += self._error.set.eq(1)
+                        m.next = "IDLE"
+                    with m.Elif(desc_more):
+                        # Wait for the descriptor being fetched.
+                        pass
+                else:
+                    with m.Elif(desc_more):
+                        m.next = "FETCH"
+                with m.Else():
+                    m.d.comb += self._done.set.eq(1)
+                    m.next = "IDLE"
+
+            if not self.prefetch:
+                with m.State("FETCH"):
+                    m.d.comb += self._busy.value.eq(1)
+                    with m.If(bus.ack):
+                        m.d.sync += desc[acked].eq(bus.dat_r)
+                    with m.If(bus_cycle(desc_ptr, 0, 4, 0)):
+                        end_cycle()
+                        # The address of the next descriptor is the last word, acknowledged in this
+                        # cycle.
+                        m.d.sync += load_desc()
+                        m.d.sync += [
+                            desc_ptr.eq(bus.dat_r),
+                            desc_more.eq(~desc_ctrl[dw - 1]),
+                        ]
+                        m.next = "DISPATCH"
+
+            with m.State("READ"):
+                m.d.comb += [
+                    self._busy.value.eq(1),
+                    fifo.w_data.eq(bus.dat_r),
+                    fifo.w_en.eq(bus.ack),
+                ]
+                with m.If(bus_cycle(src_addr, src_fixed, beats, 0)):
+                    end_cycle()
+                    m.next = "WRITE"
+
+            with m.State("WRITE"):
+                m.d.comb += [
+                    self._busy.value.eq(1),
+                    bus.dat_w.eq(fifo.r_data),
+                ]
+                if self.pipelined:
+                    m.d.comb += fifo.r_en.eq(bus.stb & ~bus.stall)
+                else:
+                    m.d.comb += fifo.r_en.eq(bus.ack)
+                with m.If(bus_cycle(dst_addr, dst_fixed, beats, 1)):
+                    end_cycle()
+                    m.d.sync += [
+                        remaining.eq(remaining - beats),
+                        src_addr.eq(src_addr + Mux(src_fixed, 0, beats)),
+                        dst_addr.eq(dst_addr + Mux(dst_fixed, 0, beats)),
+                    ]
+                    m.next = "DISPATCH"
+
+        return m
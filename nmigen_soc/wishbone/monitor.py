@@ -0,0 +1,182 @@
+from nmigen import *
+from nmigen.utils import log2_int, bits_for
+
+from .bus import Interface
+from ..csr.bank import Field, RegisterBank
+
+
+__all__ = ["Monitor"]
+
+
+class Monitor(Elaboratable):
+    """Wishbone bus performance monitor.
+
+    A passive observer of a Wishbone bus that counts bus activity and exposes the counts as CSR
+    registers. The monitor never drives any signal of the observed bus.
+
+    Counters
+    --------
+
+    All counters saturate at their maximum value instead of wrapping around. Counting is performed
+    while the ``enable`` control field is set; writing 1 to the ``clear`` control field resets all
+    counters to zero.
+
+    * ``cycles``: clock cycles.
+    * ``busy``: cycles with ``cyc`` asserted.
+    * ``stall``: cycles with ``cyc`` and ``stb`` asserted that did not transfer data; i.e. cycles
+      with ``stall`` asserted if the bus has a ``stall`` signal, or cycles without a cycle
+      termination (``ack``, ``err`` or ``rty``) otherwise.
+    * ``xfers``: terminated transactions.
+    * ``errors``: transactions terminated with ``err``. Only present if the bus has ``err``.
+    * ``window_<n>``: terminated transactions to the *n*-th window of the memory map of the bus.
+      Only present if ``windows`` is true.
+    * ``latency_<n>``: terminated transactions whose latency, measured in cycles from the first
+      cycle ``stb`` is asserted until the cycle termination inclusive, is in the range
+      ``2 ** n .. 2 ** (n + 1) - 1``; the last bin counts all transactions with greater latency.
+      Only present if ``latency_bins`` is not zero. Latency is measured with classic cycle
+      semantics; if pipelined transactions overlap, it is measured from the cycle termination of
+      the previous transaction.
+
+    Hardware cost
+    -------------
+
+    Each counter costs ``counter_width`` flip-flops, an incrementer and a shadow register in
+    the CSR multiplexer. The amount of counters is controlled by ``windows`` and
+    ``latency_bins``; their width by ``counter_width``.
+
+    Parameters
+    ----------
+    bus : :class:`Interface`
+        Observed bus. If ``windows`` is true, the windows of its memory map must be added before
+        the monitor is created.
+    counter_width : int
+        Width of counters.
+    latency_bins : int
+        Amount of latency histogram bins. If zero, the latency histogram is not implemented.
+    windows : bool
+        Count transactions to each window of the memory map of ``bus``.
+    csr_data_width : int
+        Data width of the CSR bus. Must be a power of 2.
+
+    Attributes
+    ----------
+    bus : :class:`Interface`
+        Observed bus.
+    csr_bus : :class:`..csr.Interface`
+        CSR bus providing access to counters.
+    """
+    def __init__(self, bus, *, counter_width=32, latency_bins=8, windows=True, csr_data_width=8):
+        if not isinstance(bus, Interface):
+            raise TypeError("Bus must be an instance of wishbone.Interface, not {!r}"
+                            .format(bus))
+        if not isinstance(counter_width, int) or counter_width <= 0:
+            raise ValueError("Counter width must be a positive integer, not {!r}"
+                             .format(counter_width))
+        if not isinstance(latency_bins, int) or latency_bins < 0:
+            raise ValueError("Amount of latency bins must be a non-negative integer, not {!r}"
+                             .format(latency_bins))
+        if (not isinstance(csr_data_width, int) or csr_data_width <= 0 or
+                csr_data_width & (csr_data_width - 1)):
+            raise ValueError("CSR data width must be a positive power of 2, not {!r}"
+                             .format(csr_data_width))
+
+        self.bus            = bus
+        self.counter_width  = counter_width
+        self.latency_bins   = latency_bins
+
+        self._enable = Field(1, "rw", reset=1, name="enable")
+        self._clear  = Field(1, "w1s", name="clear")
+        self._cycles = Field(counter_width, "r", name="cycles")
+        self._busy   = Field(counter_width, "r", name="busy")
+        self._stall  = Field(counter_width, "r", name="stall")
+        self._xfers  = Field(counter_width, "r", name="xfers")
+        self._errors = None
+        if hasattr(bus, "err"):
+            self._errors = Field(counter_width, "r", name="errors")
+
+        self._windows = []
+        if windows:
+            granularity_bits = log2_int(bus.data_width // bus.granularity)
+            for index, (_, (pattern, _)) in enumerate(bus.memory_map.window_patterns()):
+                pattern = pattern[:len(pattern) - granularity_bits]
+                self._windows.append((pattern,
+                                      Field(counter_width, "r", name="window_{}".format(index))))
+
+        self._latency = [Field(counter_width, "r", name="latency_{}".format(index))
+                         for index in range(latency_bins)]
+
+        counters = [self._cycles, self._busy, self._stall, self._xfers]
+        if self._errors is not None:
+            counters.append(self._errors)
+        counters += [field for _, field in self._windows]
+        counters += self._latency
+        self._counters = counters
+
+        chunks = 1 + len(counters) * ((counter_width + csr_data_width - 1) // csr_data_width)
+        self._bank = RegisterBank(addr_width=max(1, bits_for(chunks - 1)),
+                                  data_width=csr_data_width)
+        for field in [self._enable, self._clear, *counters]:
+            self._bank.add(field)
+
+    @property
+    def csr_bus(self):
+        return self._bank.bus
+
+    def elaborate(self, platform):
+        m = Module()
+        m.submodules.bank = self._bank
+
+        bus    = self.bus
+        term   = bus.ack
+        if hasattr(bus, "err"):
+            term = term | bus.err
+        if hasattr(bus, "rty"):
+            term = term | bus.rty
+        active = bus.cyc & bus.stb
+        xfer   = active & term
+        if hasattr(bus, "stall"):
+            stall = active & bus.stall
+        else:
+            stall = active & ~term
+
+        clear  = self._clear.value
+        enable = self._enable.value & ~clear
+        m.d.comb += self._clear.clear.eq(clear)
+
+        def count(field, cond):
+            counter = Signal(self.counter_width, name="{}__counter".format(field.name))
+            m.d.comb += field.value.eq(counter)
+            with m.If(clear):
+                m.d.sync += counter.eq(0)
+            with m.Elif(enable & cond & (counter != (1 << self.counter_width) - 1)):
+                m.d.sync += counter.eq(counter + 1)
+
+        count(self._cycles, 1)
+        count(self._busy,   bus.cyc)
+        count(self._stall,  stall)
+        count(self._xfers,  xfer)
+        if self._errors is not None:
+            count(self._errors, active & bus.err)
+
+        for pattern, field in self._windows:
+            count(field, xfer & bus.adr.matches(pattern))
+
+        if self._latency:
+            lat_max = (1 << len(self._latency)) - 1
+            lat_acc = Signal(range(lat_max + 1))
+            lat_cur = Signal(range(lat_max + 1))
+            m.d.comb += lat_cur.eq(Mux(lat_acc == lat_max, lat_max, lat_acc + 1))
+            with m.If(xfer | ~active):
+                m.d.sync += lat_acc.eq(0)
+            with m.Else():
+                m.d.sync += lat_acc.eq(lat_cur)
+
+            # The bin of a latency is the index of its most significant set bit.
+            lat_bin = Signal(range(len(self._latency)))
+            for index in range(len(self._latency)):
+                with m.If(lat_cur[index]):
+                    m.d.comb += lat_bin.eq(index)
+            for index, field in enumerate(self._latency):
+                count(field, xfer & (lat_bin == index))
+
+        return m
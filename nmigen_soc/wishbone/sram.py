@@ -0,0 +1,215 @@
+from collections import namedtuple
+from nmigen import *
+from nmigen.utils import log2_int, bits_for
+
+from .bus import Interface
+from ..csr.bank import Field, RegisterBank
+from ..latency import Latency
+
+
+__all__ = ["InterleavedSRAM"]
+
+
+class InterleavedSRAM(Elaboratable):
+    """Interleaved multi-bank SRAM.
+
+    A memory of ``size`` words split into ``banks`` banks, shared by several Wishbone initiators,
+    each through its own port. Accesses of different ports to different banks proceed in the same
+    cycle; only accesses to the same bank are serialized.
+
+    Interleaving
+    ------------
+
+    The memory is divided into stripes of ``stride`` consecutive words, which are assigned to
+    the banks in turn: the bank of a word is selected by the word address bits
+    ``log2(stride)`` to ``log2(stride) + log2(banks) - 1``. Sequential accesses, or accesses of
+    different initiators to neighbouring words, are therefore spread among the banks.
+
+    The memory map of every port contains a :class:`InterleavedSRAM.Stripe` resource for every
+    stripe, which tells the bank the stripe is in, and its word offset in that bank; e.g.
+    :meth:`..memory.MemoryMap.decode_address` gives the bank of any address. Every port has
+    the same memory map layout, and the same resource objects.
+
+    Arbitration
+    -----------
+
+    Each bank serves one access per cycle. If several ports access the same bank in the same
+    cycle, the bank is granted to them in round-robin order, and the others wait.
+
+    An access is acknowledged in the cycle after the bank is granted to it, with the read data.
+    Only classic cycles are supported; the port does not accept another access in the cycle in
+    which it acknowledges one, so each port performs at most one access every 2 cycles.
+
+    Latency
+    -------
+
+    An access takes 1 cycle if its bank is free, and up to ``ports`` cycles if it waits for
+    the other ports. This latency is declared in the memory map of every port; see
+    :class:`..latency.LatencyAnalysis`.
+
+    Control and status registers
+    ----------------------------
+
+    * ``conflicts_<n>`` (R/O): saturating count of cycles in which bank ``n`` refused an access
+      because it was granted to another port.
+
+    Parameters
+    ----------
+    size : int
+        Memory size, in words. Must be a power of 2.
+    data_width : int
+        Data width. See :class:`Interface`.
+    granularity : int
+        Granularity. See :class:`Interface`.
+    banks : int
+        Amount of banks. Must be a power of 2.
+    stride : int
+        Amount of consecutive words in each bank. Must be a power of 2.
+    ports : int
+        Amount of ports.
+    counter_width : int
+        Width of the conflict counters.
+    csr_data_width : int
+        Data width of the CSR bus.
+
+    Attributes
+    ----------
+    buses : list of :class:`Interface`
+        Wishbone buses providing access to the memory, one for each port.
+    csr_bus : :class:`..csr.Interface`
+        CSR bus providing access to the control and status registers.
+    """
+    Stripe = namedtuple("Stripe", ("bank", "offset"))
+    Stripe.__doc__ = """Stripe of an interleaved memory.
+
+        Attributes
+        ----------
+        bank : int
+            Index of the bank holding the stripe.
+        offset : int
+            Word offset of the stripe in the bank.
+    """
+
+    def __init__(self, *, size, data_width, granularity=None, banks=4, stride=1, ports=2,
+                 counter_width=32, csr_data_width=8):
+        for name, value in (("Size", size), ("Amount of banks", banks), ("Stride", stride)):
+            if not isinstance(value, int) or value <= 0 or value & (value - 1):
+                raise ValueError("{} must be a positive power of 2, not {!r}"
+                                 .format(name, value))
+        if size < banks * stride:
+            raise ValueError("Size {} must be at least amount of banks {} times stride {}"
+                             .format(size, banks, stride))
+        if not isinstance(ports, int) or ports <= 0:
+            raise ValueError("Amount of ports must be a positive integer, not {!r}"
+                             .format(ports))
+
+        self.size   = size
+        self.banks  = banks
+        self.stride = stride
+
+        self.buses = []
+        stripes = [self.Stripe(index % banks, index // banks * stride)
+                   for index in range(size // stride)]
+        for index in range(ports):
+            bus = Interface(addr_width=log2_int(size), data_width=data_width,
+                            granularity=granularity, name="bus_{}".format(index))
+            stripe_size = stride * (bus.data_width // bus.granularity)
+            for stripe in stripes:
+                bus.memory_map.add_resource(stripe, size=stripe_size)
+            bus.memory_map.latency = Latency(read=(1, ports), write=(1, ports))
+            self.buses.append(bus)
+
+        self._conflicts = [Field(counter_width, "r", name="conflicts_{}".format(index))
+                           for index in range(banks)]
+        chunks = banks * ((counter_width + csr_data_width - 1) // csr_data_width)
+        self._bank = RegisterBank(addr_width=max(1, bits_for(chunks - 1)),
+                                  data_width=csr_data_width)
+        for field in self._conflicts:
+            self._bank.add(field)
+
+    @property
+    def csr_bus(self):
+        return self._bank.bus
+
+    def elaborate(self, platform):
+        m = Module()
+        m.submodules.bank = self._bank
+
+        ports       = len(self.buses)
+        data_width  = self.buses[0].data_width
+        granularity = self.buses[0].granularity
+        stride_bits = log2_int(self.stride)
+        bank_bits   = log2_int(self.banks)
+
+        port_req      = []
+        port_bank     = []
+        port_bank_adr = []
+        for bus in self.buses:
+            req = Signal(name="{}_req".format(bus.name))
+            # A port does not issue an access while acknowledging the previous one, since
+            # the initiator has not updated the cycle yet.
+            m.d.comb += req.eq(bus.cyc & bus.stb & ~bus.ack)
+            port_req.append(req)
+            port_bank.append(bus.adr[stride_bits:stride_bits + bank_bits])
+            port_bank_adr.append(Cat(bus.adr[:stride_bits], bus.adr[stride_bits + bank_bits:]))
+
+        bus_adr    = Array(port_bank_adr)
+        bus_we     = Array(bus.we    for bus in self.buses)
+        bus_sel    = Array(bus.sel   for bus in self.buses)
+        bus_dat_w  = Array(bus.dat_w for bus in self.buses)
+        port_grant = [Signal(self.banks, name="{}_grant".format(bus.name)) for bus in self.buses]
+        bank_data  = []
+        for index in range(self.banks):
+            mem    = Memory(width=data_width, depth=self.size // self.banks,
+                            name="bank_{}".format(index))
+            rdport = mem.read_port(transparent=False)
+            wrport = mem.write_port(granularity=granularity)
+            m.submodules["bank_{}_rd".format(index)] = rdport
+            m.submodules["bank_{}_wr".format(index)] = wrport
+            bank_data.append(rdport.data)
+
+            bank_req = Cat(req & (bank == index) for req, bank in zip(port_req, port_bank))
+            grant    = Signal(range(ports), name="bank_{}_grant".format(index))
+            last     = Signal(range(ports), name="bank_{}_last".format(index))
+
+            # Round-robin arbiter: the port granted last has the lowest priority. Later
+            # assignments take precedence, so ports are considered from the lowest priority.
+            with m.Switch(last):
+                for prev in range(ports):
+                    with m.Case(prev):
+                        for offset in reversed(range(1, ports + 1)):
+                            port = (prev + offset) % ports
+                            with m.If(bank_req[port]):
+                                m.d.comb += grant.eq(port)
+
+            with m.If(bank_req.any()):
+                m.d.sync += last.eq(grant)
+            for port in range(ports):
+                m.d.comb += port_grant[port][index].eq(bank_req[port] & (grant == port))
+
+            m.d.comb += [
+                rdport.addr.eq(bus_adr[grant]),
+                wrport.addr.eq(bus_adr[grant]),
+                wrport.data.eq(bus_dat_w[grant]),
+            ]
+            with m.If(bank_req.any() & bus_we[grant]):
+                m.d.comb += wrport.en.eq(bus_sel[grant])
+
+            # A conflict is counted once per cycle, however many ports were refused; there is
+            # a conflict if more than one bit of ``bank_req`` is set.
+            conflict = Signal(name="bank_{}_conflict".format(index))
+            m.d.comb += conflict.eq((bank_req & (bank_req - 1)).any())
+            counter  = Signal(len(self._conflicts[index].value),
+                              name="bank_{}_conflicts".format(index))
+            m.d.comb += self._conflicts[index].value.eq(counter)
+            with m.If(conflict & (counter != (1 << len(counter)) - 1)):
+                m.d.sync += counter.eq(counter + 1)
+
+        for port, bus in enumerate(self.buses):
+            resp_bank = Signal(bank_bits, name="{}_resp_bank".format(bus.name))
+            m.d.sync += bus.ack.eq(port_grant[port].any())
+            with m.If(port_grant[port].any()):
+                m.d.sync += resp_bank.eq(port_bank[port])
+            m.d.comb += bus.dat_r.eq(Array(bank_data)[resp_bank])
+
+        return m
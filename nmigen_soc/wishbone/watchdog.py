@@ -0,0 +1,201 @@
+from nmigen import *
+from nmigen.utils import bits_for
+
+from .bus import Interface
+from ..csr.bus import Element, Multiplexer
+from ..latency import Latency
+
+
+__all__ = ["Watchdog"]
+
+
+class Watchdog(Elaboratable):
+    """Wishbone bus timeout watchdog.
+
+    Forwards transfers from an initiator to a subordinate bus, and terminates transfers that
+    the subordinate bus does not terminate in time with ``err``, so that the initiator does not wait
+    forever. Faults, i.e. such timeouts as well as transfers terminated with ``err`` by
+    the subordinate bus, are counted, and the address of the last fault is captured.
+
+    Operation
+    ---------
+
+    A transfer is waiting while ``cyc`` and ``stb`` are asserted. If the bus has ``stall``,
+    the response to a pipelined transfer may arrive after ``stb`` is deasserted, so the watchdog
+    also counts outstanding transfers, i.e. transfers accepted by the subordinate bus and not yet
+    terminated; a transfer is then waiting while ``cyc`` is asserted and either ``stb`` is
+    asserted or a transfer is outstanding. An initiator that keeps ``cyc`` asserted without any
+    transfer in progress is never timed out.
+
+    The watchdog counts consecutive waiting cycles without a cycle termination. If the count
+    reaches the value of the ``timeout`` register, ``err`` is asserted towards the initiator, and
+    ``cyc`` and ``stb`` are deasserted towards the subordinate bus in the same cycle, which aborts
+    the bus cycle. In other words, a subordinate bus has ``timeout`` cycles to terminate
+    a transfer.
+
+    Put in front of a :class:`Decoder` whose ``default_response`` is ``"err"``, the watchdog also
+    counts, and captures the address of, accesses to unmapped addresses.
+
+    Control and status registers
+    ----------------------------
+
+    * ``timeout`` (R/W): timeout, in cycles. Writing 0 disables the watchdog.
+    * ``timeouts`` (R/W): amount of transfers terminated by the watchdog. Saturates at its maximum
+      value; writing sets it, e.g. to 0.
+    * ``errors`` (R/W): amount of transfers terminated with ``err`` by the subordinate bus.
+      Saturates at its maximum value; writing sets it. Only present if ``sub_bus`` has ``err``.
+    * ``fault_addr`` (R/O): value of ``adr`` in the cycle the last fault was reported. For
+      pipelined transfers, this may be the address of a later transfer.
+
+    Each register is a separate :class:`..csr.Element`, so that writes to one of them never affect
+    the others.
+
+    Latency
+    -------
+
+    The watchdog adds no latency, which is declared in the memory map of :attr:`bus`;
+    see :class:`..latency.LatencyAnalysis`.
+
+    Parameters
+    ----------
+    sub_bus : :class:`Interface`
+        Subordinate bus.
+    timeout : int
+        Reset value of the ``timeout`` register.
+    counter_width : int
+        Width of the ``timeout``, ``timeouts`` and ``errors`` registers.
+    csr_data_width : int
+        Data width of the CSR bus.
+
+    Attributes
+    ----------
+    bus : :class:`Interface`
+        Wishbone bus providing access to the subordinate bus. It has the same optional signals as
+        ``sub_bus``, and ``err``.
+    csr_bus : :class:`..csr.Interface`
+        CSR bus providing access to the registers.
+    """
+    def __init__(self, sub_bus, *, timeout, counter_width=16, csr_data_width=8):
+        if not isinstance(sub_bus, Interface):
+            raise TypeError("Subordinate bus must be an instance of wishbone.Interface, not {!r}"
+                            .format(sub_bus))
+        if not isinstance(counter_width, int) or counter_width <= 0:
+            raise ValueError("Counter width must be a positive integer, not {!r}"
+                             .format(counter_width))
+        if not isinstance(timeout, int) or timeout <= 0 or timeout >= 1 << counter_width:
+            raise ValueError("Timeout must be a positive integer that fits in {} bits, not {!r}"
+                             .format(counter_width, timeout))
+        if not isinstance(csr_data_width, int) or csr_data_width <= 0:
+            raise ValueError("CSR data width must be a positive integer, not {!r}"
+                             .format(csr_data_width))
+
+        self.sub_bus       = sub_bus
+        self.timeout       = timeout
+        self.counter_width = counter_width
+
+        features = {"err"}
+        for opt_signal in ("rty", "stall", "lock", "cti", "bte"):
+            if hasattr(sub_bus, opt_signal):
+                features.add(opt_signal)
+        self.bus = Interface(addr_width=sub_bus.addr_width, data_width=sub_bus.data_width,
+                             granularity=sub_bus.granularity, features=features)
+        self.bus.memory_map.add_window(sub_bus.memory_map)
+        self.bus.memory_map.latency = Latency(read=0, write=0)
+
+        self._timeout    = Element(counter_width, "rw", name="timeout")
+        self._timeouts   = Element(counter_width, "rw", name="timeouts")
+        self._errors     = None
+        if hasattr(sub_bus, "err"):
+            self._errors = Element(counter_width, "rw", name="errors")
+        self._fault_addr = Element(sub_bus.addr_width, "r", name="fault_addr")
+
+        elements = [self._timeout, self._timeouts]
+        if self._errors is not None:
+            elements.append(self._errors)
+        elements.append(self._fault_addr)
+        chunks = sum((elem.width + csr_data_width - 1) // csr_data_width for elem in elements)
+        self._mux = Multiplexer(addr_width=max(1, bits_for(chunks - 1)),
+                                data_width=csr_data_width)
+        for elem in elements:
+            self._mux.add(elem)
+
+    @property
+    def csr_bus(self):
+        return self._mux.bus
+
+    def elaborate(self, platform):
+        m = Module()
+        m.submodules.mux = self._mux
+
+        bus, sub_bus = self.bus, self.sub_bus
+
+        timeout = Signal(self.counter_width, reset=self.timeout)
+        timer   = Signal(self.counter_width)
+        expired = Signal()
+
+        term = bus.ack | bus.err
+        if hasattr(bus, "rty"):
+            term = term | bus.rty
+
+        if hasattr(bus, "stall"):
+            # Amount of transfers accepted by the subordinate bus and not yet terminated.
+            pending = Signal(self.counter_width)
+            with m.If(~bus.cyc | expired):
+                m.d.sync += pending.eq(0)
+            with m.Else():
+                m.d.sync += pending.eq(pending + (bus.stb & ~bus.stall) - term)
+            waiting = bus.cyc & (bus.stb | (pending != 0))
+        else:
+            waiting = bus.cyc & bus.stb
+        m.d.comb += expired.eq(waiting & (timeout != 0) & (timer == timeout))
+
+        m.d.comb += [
+            sub_bus.adr.eq(bus.adr),
+            sub_bus.dat_w.eq(bus.dat_w),
+            sub_bus.sel.eq(bus.sel),
+            sub_bus.we.eq(bus.we),
+            sub_bus.cyc.eq(bus.cyc & ~expired),
+            sub_bus.stb.eq(bus.stb & ~expired),
+            bus.dat_r.eq(sub_bus.dat_r),
+            bus.ack.eq(sub_bus.ack & ~expired),
+        ]
+        for opt_output in ("lock", "cti", "bte"):
+            if hasattr(sub_bus, opt_output):
+                m.d.comb += getattr(sub_bus, opt_output).eq(getattr(bus, opt_output))
+        if hasattr(sub_bus, "rty"):
+            m.d.comb += bus.rty.eq(sub_bus.rty & ~expired)
+        if hasattr(sub_bus, "stall"):
+            m.d.comb += bus.stall.eq(sub_bus.stall & ~expired)
+
+        sub_err = 0
+        if hasattr(sub_bus, "err"):
+            sub_err = sub_bus.cyc & sub_bus.err
+        m.d.comb += bus.err.eq(sub_err | expired)
+
+        with m.If(~waiting | term):
+            m.d.sync += timer.eq(0)
+        with m.Else():
+            m.d.sync += timer.eq(timer + 1)
+
+        with m.If(self._timeout.w_stb):
+            m.d.sync += timeout.eq(self._timeout.w_data)
+
+        def count(elem, cond):
+            counter = Signal(self.counter_width, name="{}__counter".format(elem.name))
+            m.d.comb += elem.r_data.eq(counter)
+            with m.If(elem.w_stb):
+                m.d.sync += counter.eq(elem.w_data)
+            with m.Elif(cond & (counter != (1 << self.counter_width) - 1)):
+                m.d.sync += counter.eq(counter + 1)
+
+        m.d.comb += self._timeout.r_data.eq(timeout)
+        count(self._timeouts, expired)
+        if self._errors is not None:
+            count(self._errors, sub_err)
+
+        fault_addr = Signal.like(bus.adr)
+        m.d.comb += self._fault_addr.r_data.eq(fault_addr)
+        with m.If(bus.err):
+            m.d.sync += fault_addr.eq(bus.adr)
+
+        return m